@@ -0,0 +1,98 @@
+"""Benchmark adaptive polling of a large simulated fleet.
+
+Registers many in-memory lights, changes a small "hot" subset behind the
+manager's back (as a wall switch would) and reports how many polls the
+adaptive poller spent compared with polling every device at the minimum
+interval, and how quickly outside changes were picked up.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_poller.py --devices 10000 --duration 20
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.poller import StatePoller
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--devices', type=int, default=10_000)
+    parser.add_argument('--hot-fraction', type=float, default=0.02)
+    parser.add_argument('--change-interval', type=float, default=1.0,
+                        help='Seconds between outside changes of each hot device')
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--min-interval', type=float, default=0.5)
+    parser.add_argument('--max-interval', type=float, default=8.0)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    
+    manager = DeviceManager()
+    lights = [SmartLightAdapter(f'light{i}', f'Light {i}') for i in range(args.devices)]
+    for light in lights:
+        manager.register_device(light)
+    hot = random.sample(lights, max(1, int(args.devices * args.hot_fraction)))
+    
+    changed_at = {}
+    detection = []
+    
+    def on_change(device_id, state):
+        started = changed_at.pop(device_id, None)
+        if started is not None:
+            detection.append(time.monotonic() - started)
+    manager.add_listener(on_change)
+    
+    poller = StatePoller(manager, min_interval=args.min_interval,
+                         max_interval=args.max_interval, batch_size=args.batch_size,
+                         max_concurrency=args.concurrency)
+    stop = threading.Event()
+    
+    def wall_switches():
+        step = args.change_interval / len(hot)
+        while not stop.is_set():
+            for light in hot:
+                if stop.wait(step):
+                    return
+                brightness = random.randint(0, 100)
+                if light.get_state()['brightness'] != brightness:
+                    changed_at.setdefault(light.device_id, time.monotonic())
+                    light.execute_command('setBrightness', {'brightness': brightness})
+    
+    switches = threading.Thread(target=wall_switches, daemon=True)
+    started = time.monotonic()
+    poller.start()
+    switches.start()
+    time.sleep(args.duration)
+    stop.set()
+    switches.join()
+    poller.stop()
+    elapsed = time.monotonic() - started
+    
+    metrics = poller.get_metrics()
+    fixed_polls = args.devices * elapsed / args.min_interval
+    hot_ids = {light.device_id for light in hot}
+    hot_intervals = [poller.interval_of(i) for i in hot_ids]
+    detection.sort()
+    
+    print(f"devices:              {args.devices} ({len(hot)} hot)")
+    print(f"elapsed:              {elapsed:.1f}s")
+    print(f"polls:                {metrics['polls']} "
+          f"({metrics['polls'] / elapsed:.0f}/s, {metrics['batches']} batches)")
+    print(f"fixed-interval polls: {fixed_polls:.0f} "
+          f"(adaptive uses {metrics['polls'] / fixed_polls:.1%})")
+    print(f"changes detected:     {metrics['changes']}")
+    print(f"avg interval:         {metrics['avgIntervalSec']}s "
+          f"(hot devices {sum(hot_intervals) / len(hot_intervals):.2f}s)")
+    if detection:
+        print(f"detection latency:    p50 {detection[len(detection) // 2]:.2f}s, "
+              f"p95 {detection[int(len(detection) * 0.95)]:.2f}s")
+    print(f"poll latency:         {metrics['pollLatency']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark single-flight deduplication on a contended device.
+
+Many clients read (and double-tap commands on) one slow device at once,
+first without and then with ``SingleFlight``, on both the synchronous and
+dispatcher paths. Reports adapter calls, throughput and caller latency.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_single_flight.py --clients 32 --duration 5
+"""
+
+import argparse
+import threading
+import time
+
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.dispatcher import CommandDispatcher
+from smarthomeharmonizer.core.single_flight import SingleFlight
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+
+class SlowLight(SmartLightAdapter):
+    """Light with a fixed network round trip per adapter call."""
+    
+    def __init__(self, *args, latency: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency
+        self.calls = 0
+    
+    def get_state(self):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().get_state()
+    
+    def execute_command(self, command, parameters=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().execute_command(command, parameters)
+
+
+def run(clients: int, duration: float, latency: float, write_ratio: float,
+        single_flight: bool, dispatcher: bool) -> None:
+    pool = CommandDispatcher(workers=clients) if dispatcher else None
+    manager = DeviceManager(dispatcher=pool,
+                            single_flight=SingleFlight() if single_flight else None)
+    light = SlowLight('hot', 'Hot Light', latency=latency)
+    manager.register_device(light)
+    tracker = LatencyTracker(window=100_000)
+    stop = time.monotonic() + duration
+    
+    def client(index: int) -> None:
+        count = 0
+        while time.monotonic() < stop:
+            started = time.monotonic()
+            count += 1
+            if (count * clients + index) % 100 < write_ratio * 100:
+                manager.execute_command('hot', 'setBrightness', {'brightness': 70})
+            else:
+                manager.get_device_state('hot')
+            tracker.record(time.monotonic() - started)
+    
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if pool is not None:
+        pool.shutdown()
+    
+    latency_ms = tracker.snapshot()
+    label = f"{'dispatcher' if dispatcher else 'sync':<10} " \
+            f"{'single-flight' if single_flight else 'plain':<13}"
+    print(f"{label} requests {tracker.count:>7} ({tracker.count / duration:>7.0f}/s)  "
+          f"adapter calls {light.calls:>6}  "
+          f"p50 {latency_ms['p50Ms']:>7.1f}ms  p99 {latency_ms['p99Ms']:>7.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='Seconds per adapter call')
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+    
+    for dispatcher in (False, True):
+        for single_flight in (False, True):
+            run(args.clients, args.duration, args.latency, args.write_ratio,
+                single_flight, dispatcher)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark timing wheel scheduling, cancellation and expiry.
+
+Schedules many timers spread over an hour, cancels a fraction of them
+and then advances a manually driven clock through the hour, reporting
+the cost per operation.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_timer_wheel.py --timers 100000
+"""
+
+import argparse
+import random
+import time
+
+from smarthomeharmonizer.core.timer_wheel import TimerWheel
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timers', type=int, default=100_000)
+    parser.add_argument('--horizon', type=float, default=3600.0,
+                        help='Seconds over which deadlines are spread')
+    parser.add_argument('--cancel-ratio', type=float, default=0.5)
+    args = parser.parse_args()
+    
+    now = [0.0]
+    wheel = TimerWheel(clock=lambda: now[0])
+    rng = random.Random(1)
+    fired = [0]
+    
+    def callback() -> None:
+        fired[0] += 1
+    
+    started = time.perf_counter()
+    handles = [wheel.schedule(rng.uniform(0, args.horizon), callback)
+               for _ in range(args.timers)]
+    schedule_s = time.perf_counter() - started
+    
+    cancelled = handles[:int(args.timers * args.cancel_ratio)]
+    started = time.perf_counter()
+    for handle in cancelled:
+        handle.cancel()
+    cancel_s = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    while now[0] <= args.horizon:
+        now[0] += 1.0
+        wheel.advance()
+    advance_s = time.perf_counter() - started
+    
+    print(f"timers {args.timers:>7}  "
+          f"schedule {schedule_s / args.timers * 1e6:>5.2f}us  "
+          f"cancel {cancel_s / max(len(cancelled), 1) * 1e6:>5.2f}us  "
+          f"expire {advance_s / max(fired[0], 1) * 1e6:>5.2f}us  "
+          f"fired {fired[0]:>7}  cascaded {wheel.get_metrics()['cascaded']:>7}")
+
+
+if __name__ == '__main__':
+    main()
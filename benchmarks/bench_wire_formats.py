@@ -0,0 +1,77 @@
+"""Benchmark JSON against MessagePack and CBOR for API payloads.
+
+Encodes and decodes a single device state response and a full device
+list with each codec (the pure-Python fallbacks, plus the msgpack and
+cbor2 packages when installed) and reports payload size, gzipped size
+and microseconds per encode and decode.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_wire_formats.py --devices 200 --rounds 2000
+"""
+
+import argparse
+import gzip
+import json
+import time
+
+from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core import wire
+
+
+def codecs():
+    """Yield (name, dumps, loads) for every codec available here."""
+    yield 'json', lambda obj: json.dumps(obj, separators=(',', ':')).encode('utf-8'), json.loads
+    yield 'msgpack (python)', wire.msgpack_dumps, wire.msgpack_loads
+    yield 'cbor (python)', wire.cbor_dumps, wire.cbor_loads
+    if wire.msgpack is not None:
+        yield 'msgpack (native)', wire.msgpack.packb, wire.msgpack.unpackb
+    if wire.cbor2 is not None:
+        yield 'cbor (native)', wire.cbor2.dumps, wire.cbor2.loads
+
+
+def payloads(devices: int):
+    """Build a state response and a device list like the API returns."""
+    manager = DeviceManager()
+    kinds = (SmartLightAdapter, ThermostatAdapter, CoffeeMakerAdapter)
+    for i in range(devices):
+        kind = kinds[i % len(kinds)]
+        manager.register_device(kind(f'{kind.__name__.lower()}{i}', f'Device {i}'))
+    manager.execute_command('thermostatadapter1', 'setTemperature', {'temperature': 68.5})
+    state = {
+        'success': True, 'deviceId': 'thermostatadapter1', 'version': 1,
+        'state': manager.get_device_state('thermostatadapter1')
+    }
+    return [('state', state), (f'list of {devices}', {'success': True,
+                                                     'devices': manager.list_devices()})]
+
+
+def timed(function, argument, rounds: int) -> float:
+    """Get microseconds per call."""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function(argument)
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--devices', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+    
+    for label, payload in payloads(args.devices):
+        rounds = args.rounds if label == 'state' else max(args.rounds // 100, 10)
+        print(f"{label}:")
+        for name, dumps, loads in codecs():
+            body = dumps(payload)
+            assert loads(body) == payload
+            print(f"  {name:<17} {len(body):>7} B  gzip {len(gzip.compress(body)):>6} B  "
+                  f"encode {timed(dumps, payload, rounds):>8.1f}us  "
+                  f"decode {timed(loads, body, rounds):>8.1f}us")
+
+
+if __name__ == '__main__':
+    main()
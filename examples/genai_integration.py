@@ -134,7 +134,7 @@ class NaturalLanguageProcessor:
     def _find_devices(self, device_ref: str) -> List[str]:
         """Find device IDs matching the reference."""
         device_ref = device_ref.strip()
-        devices = self.device_manager.list_devices()
+        devices = self.device_manager.list_devices(fields=['name'])
         
         # Check if it's "all devices"
         if device_ref in ['all', 'everything', 'all lights', 'the lights']:
@@ -303,7 +303,7 @@ class NaturalLanguageProcessor:
         
         # Get devices for this scene
         if scene['devices'] == 'all':
-            devices = self.device_manager.list_devices()
+            devices = self.device_manager.list_devices(fields=[])
             device_ids = [d['deviceId'] for d in devices]
         else:
             device_ids = []
@@ -358,7 +358,7 @@ class NaturalLanguageProcessor:
     
     def _get_device_name(self, device_id: str) -> str:
         """Get friendly name for device."""
-        devices = self.device_manager.list_devices()
+        devices = self.device_manager.list_devices(fields=['name'])
         for device in devices:
             if device['deviceId'] == device_id:
                 return device['name']
@@ -420,7 +420,7 @@ def create_genai_app(device_manager: DeviceManager = None):
     @app.route('/api/v1/genai/capabilities', methods=['GET'])
     def genai_capabilities():
         """Return GenAI capabilities and available commands."""
-        devices = app.device_manager.list_devices()
+        devices = app.device_manager.list_devices(fields=['name', 'type', 'supportedCommands'])
         
         capabilities = {
             'natural_language': True,
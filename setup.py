@@ -39,6 +39,7 @@ setup(
     install_requires=[
         'Flask>=2.0.0',
         'requests>=2.25.0',
+        'backports.zoneinfo>=0.2; python_version < "3.9"',
     ],
     extras_require={
         'dev': [
@@ -51,6 +52,14 @@ setup(
             'sphinx>=6.0',
             'tox>=4.0',
         ],
+        'compression': [
+            'brotli>=1.0',
+            'zstandard>=0.20',
+        ],
+        'binary': [
+            'msgpack>=1.0',
+            'cbor2>=5.4',
+        ],
     },
     entry_points={
         'console_scripts': [
@@ -4,10 +4,12 @@ from smarthomeharmonizer.adapters.base import DeviceAdapter
 from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
 from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
 from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+from smarthomeharmonizer.adapters.http_device import HttpDeviceAdapter
 
 __all__ = [
     'DeviceAdapter',
     'SmartLightAdapter',
     'ThermostatAdapter',
-    'CoffeeMakerAdapter'
+    'CoffeeMakerAdapter',
+    'HttpDeviceAdapter'
 ]
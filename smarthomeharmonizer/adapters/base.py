@@ -1,19 +1,41 @@
 """Base adapter class for device implementations."""
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import copy
 import logging
 
+from smarthomeharmonizer.core.exceptions import InvalidParameterError
+
 logger = logging.getLogger(__name__)
 
+# Called with (delay seconds, field changes, expected field values); returns
+# a handle with a cancel() method
+TransitionScheduler = Callable[[float, Dict[str, Any], Optional[Dict[str, Any]]], Any]
+
 
 class DeviceAdapter(ABC):
     """Abstract base class for device adapters.
     
     All device adapters must inherit from this class and implement
     the required methods for device control and state management.
+    Adapters whose ``execute_command`` only updates in-memory state may
+    set ``SIMULATE_PREDICTIONS`` so write-behind execution can predict
+    command results by running them on a scratch copy.
+    
+    ``RELATIVE_COMMANDS`` maps relative commands such as
+    ``incrementBrightness`` to ``(absolute command, state field, parameter,
+    minimum, maximum)``; the device manager resolves them against the
+    current state before calling ``execute_command``.
+    
+    Adapters model timed behavior, such as a brew finishing, with
+    ``schedule_transition``; the device manager applies the transition
+    through its normal notification path when the delay has passed.
     """
     
+    SIMULATE_PREDICTIONS = False
+    RELATIVE_COMMANDS: Dict[str, Tuple[str, str, str, float, float]] = {}
+    
     def __init__(self, device_id: str, name: str, **kwargs):
         """Initialize the device adapter.
         
@@ -25,7 +47,10 @@ class DeviceAdapter(ABC):
         self.device_id = device_id
         self.name = name
         self._state = self._initialize_state()
+        self._version = 0
         self._config = kwargs
+        self._scheduler: Optional[TransitionScheduler] = None
+        self._transitions: Dict[str, Any] = {}
         logger.info(f"Initialized {self.__class__.__name__} for device {device_id}")
     
     @abstractmethod
@@ -71,6 +96,141 @@ class DeviceAdapter(ABC):
         """
         return self._state.copy()
     
+    def cached_state(self) -> Dict[str, Any]:
+        """Get the last known state without contacting the device.
+        
+        Returns:
+            Copy of the state held by this adapter
+        """
+        return self._state.copy()
+    
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """Replace the device state with a previously captured snapshot.
+        
+        Used when state is owned elsewhere, e.g. a shared state store
+        updated by another process.
+        
+        Args:
+            state: State dictionary as returned by get_state()
+        """
+        if state != self._state:
+            self._version += 1
+        self._state = dict(state)
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # Timers belong to the manager and process that scheduled them
+        state['_scheduler'] = None
+        state['_transitions'] = {}
+        return state
+    
+    def bind_scheduler(self, scheduler: Optional[TransitionScheduler]) -> None:
+        """Attach the scheduler used for timed state transitions.
+        
+        Called by the device manager on registration, and with None on
+        unregistration, which cancels pending transitions.
+        
+        Args:
+            scheduler: Scheduler provided by the device manager, or None
+        """
+        if scheduler is None:
+            for name in list(self._transitions):
+                self.cancel_transition(name)
+        self._scheduler = scheduler
+    
+    def schedule_transition(self, name: str, delay: float, changes: Dict[str, Any],
+                            expected: Optional[Dict[str, Any]] = None) -> bool:
+        """Change state fields after a delay.
+        
+        A pending transition of the same name is cancelled first.
+        
+        Args:
+            name: Transition name, e.g. ``brew``
+            delay: Seconds until the transition
+            changes: Fields to overwrite
+            expected: Only apply if these fields still have these values
+            
+        Returns:
+            True if scheduled, False if no scheduler is attached (the
+            state then stays as it is)
+        """
+        self.cancel_transition(name)
+        if self._scheduler is None:
+            return False
+        self._transitions[name] = self._scheduler(delay, changes, expected)
+        return True
+    
+    def cancel_transition(self, name: str) -> None:
+        """Cancel a pending transition, if any.
+        
+        Args:
+            name: Transition name passed to schedule_transition()
+        """
+        handle = self._transitions.pop(name, None)
+        if handle is not None:
+            handle.cancel()
+    
+    @property
+    def version(self) -> int:
+        """Monotonically increasing number of observed state changes."""
+        return self._version
+    
+    def mark_changed(self) -> int:
+        """Record a state change made by a command.
+        
+        Returns:
+            New state version
+        """
+        self._version += 1
+        return self._version
+    
+    def resolve_relative(self, command: str, parameters: Optional[Dict[str, Any]],
+                         state: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Translate a relative command into its absolute form.
+        
+        Args:
+            command: Command name
+            parameters: Command parameters; relative commands take ``amount``
+            state: Current device state the amount is applied to
+            
+        Returns:
+            Tuple of (command, parameters), unchanged for absolute commands
+            
+        Raises:
+            InvalidParameterError: If the amount is not a number
+        """
+        if command not in self.RELATIVE_COMMANDS:
+            return command, parameters
+        absolute, field, parameter, minimum, maximum = self.RELATIVE_COMMANDS[command]
+        amount = (parameters or {}).get('amount')
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+            raise InvalidParameterError(f"Failed to execute {command}: amount must be a number")
+        value = min(maximum, max(minimum, state[field] + amount))
+        return absolute, {parameter: value}
+    
+    def predict_state(self, command: str, parameters: Optional[Dict[str, Any]] = None,
+                      state: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Predict the state a command will produce without touching the device.
+        
+        Args:
+            command: Command name to predict
+            parameters: Optional parameters for the command
+            state: State to apply the command to; defaults to the last
+                known state of this adapter
+            
+        Returns:
+            Predicted state, or None if this adapter cannot predict it
+            
+        Raises:
+            InvalidCommandError: If command is not supported
+            InvalidParameterError: If the parameters are invalid
+        """
+        if not self.SIMULATE_PREDICTIONS:
+            return None
+        scratch = copy.copy(self)
+        scratch._state = copy.deepcopy(self._state if state is None else state)
+        return scratch.execute_command(command, parameters)
+    
     def validate_command(self, command: str) -> bool:
         """Check if a command is supported.
         
@@ -1,8 +1,11 @@
 """Coffee maker adapter implementation."""
 
 from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta, timezone
 from smarthomeharmonizer.adapters.base import DeviceAdapter
-from smarthomeharmonizer.core.exceptions import InvalidCommandError, AdapterError
+from smarthomeharmonizer.core.exceptions import (
+    InvalidCommandError, InvalidParameterError, AdapterError
+)
 import logging
 import random
 
@@ -12,11 +15,16 @@ logger = logging.getLogger(__name__)
 class CoffeeMakerAdapter(DeviceAdapter):
     """Adapter for coffee maker devices."""
     
+    SIMULATE_PREDICTIONS = True
+    
     SUPPORTED_COMMANDS = ['turnOn', 'turnOff', 'brew', 'setStrength', 'setSize', 'clean', 'getStatus']
     
     BREW_STRENGTHS = ['light', 'medium', 'strong', 'extra_strong']
     BREW_SIZES = ['small', 'medium', 'large']
     
+    # Brew duration per size in seconds
+    BREW_SECONDS = {'small': 60.0, 'medium': 120.0, 'large': 180.0}
+    
     def _initialize_state(self) -> Dict[str, Any]:
         """Initialize coffee maker state."""
         return {
@@ -49,6 +57,7 @@ class CoffeeMakerAdapter(DeviceAdapter):
             elif command == 'turnOff':
                 self._state['powerState'] = 'OFF'
                 self._state['brewing'] = False
+                self.cancel_transition('brew')
                 logger.info(f"Coffee maker {self.device_id} turned OFF")
                 
             elif command == 'brew':
@@ -70,6 +79,12 @@ class CoffeeMakerAdapter(DeviceAdapter):
                 if random.random() > 0.7:
                     self._state['needsCleaning'] = True
                 
+                seconds = self.BREW_SECONDS[self._state['brewSize']]
+                finished = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+                self.schedule_transition('brew', seconds,
+                                         {'brewing': False, 'lastBrewTime': finished.isoformat()},
+                                         expected={'brewing': True})
+                
                 logger.info(f"Coffee maker {self.device_id} started brewing")
                 
             elif command == 'setStrength':
@@ -94,6 +109,9 @@ class CoffeeMakerAdapter(DeviceAdapter):
                 # No state change, just return current state
                 pass
                 
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Error executing {command} on {self.device_id}: {str(e)}")
+            raise InvalidParameterError(f"Failed to execute {command}: {str(e)}")
         except Exception as e:
             logger.error(f"Error executing {command} on {self.device_id}: {str(e)}")
             raise AdapterError(f"Failed to execute {command}: {str(e)}")
@@ -0,0 +1,218 @@
+"""Base adapter for HTTP-controlled devices using pooled keep-alive sessions."""
+
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+from threading import Lock
+from urllib.parse import urlsplit
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from smarthomeharmonizer.adapters.base import DeviceAdapter
+from smarthomeharmonizer.core.exceptions import (
+    InvalidCommandError, InvalidParameterError, AdapterError, TransportError
+)
+
+logger = logging.getLogger(__name__)
+
+RequestBody = Union[None, Dict[str, Any], Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]]
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = Lock()
+
+
+def get_session(base_url: str, pool_size: int = 10) -> requests.Session:
+    """Get the shared keep-alive session for a device host.
+    
+    All adapters talking to the same scheme, host and port share one
+    session whose connection pool holds at most ``pool_size`` connections;
+    callers beyond that wait for a free connection instead of opening more.
+    
+    Args:
+        base_url: Any URL on the device host
+        pool_size: Maximum connections kept open to the host
+        
+    Returns:
+        Session with a bounded connection pool for that host
+    """
+    parts = urlsplit(base_url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+            session.mount(key, adapter)
+            _sessions[key] = session
+        return session
+
+
+def close_sessions() -> None:
+    """Close every shared session and its pooled connections."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+class HttpDeviceAdapter(DeviceAdapter):
+    """Base class for devices controlled through an HTTP API.
+    
+    Subclasses map commands to requests in ``COMMAND_REQUESTS`` as
+    ``command: (method, path, body)`` tuples. ``path`` may contain
+    ``{parameter}`` placeholders; ``body`` is a JSON dict or a callable
+    building one from the command parameters. When ``STATE_REQUEST`` is
+    set, ``get_state`` fetches ``(method, path)`` from the device and
+    passes the JSON reply through ``parse_state``; command replies are
+    parsed the same way and merged into the cached state.
+    
+    ``OPTIMISTIC_STATES`` maps commands to callables returning the state
+    fields a command is expected to set, which lets write-behind execution
+    answer before the device does.
+    
+    Requests reuse keep-alive connections from a pool shared per device
+    host (see ``get_session``). HTTP/1.1 pipelining is not supported by
+    ``requests``, so concurrent commands to one host use separate pooled
+    connections instead.
+    """
+    
+    COMMAND_REQUESTS: Dict[str, Tuple[str, str, RequestBody]] = {}
+    STATE_REQUEST: Optional[Tuple[str, str]] = None
+    OPTIMISTIC_STATES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+    
+    def __init__(self, device_id: str, name: str, base_url: str,
+                 timeout: Union[float, Tuple[float, float]] = (3.05, 5.0),
+                 pool_size: int = 10, **kwargs):
+        """Initialize the HTTP device adapter.
+        
+        Args:
+            device_id: Unique identifier for the device
+            name: Human-readable name for the device
+            base_url: Base URL of the device API, e.g. http://192.168.1.20
+            timeout: Request timeout in seconds, or (connect, read) timeouts
+            pool_size: Maximum pooled connections to the device host
+            **kwargs: Additional device-specific configuration
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        super().__init__(device_id, name, **kwargs)
+    
+    def _initialize_state(self) -> Dict[str, Any]:
+        """Start with an empty state until the device reports one."""
+        return {}
+    
+    def get_supported_commands(self) -> List[str]:
+        """Get the commands declared in COMMAND_REQUESTS."""
+        return list(self.COMMAND_REQUESTS)
+    
+    @property
+    def session(self) -> requests.Session:
+        """Shared keep-alive session for this device's host."""
+        return get_session(self.base_url, self.pool_size)
+    
+    def build_request(self, command: str,
+                      parameters: Dict[str, Any]) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        """Translate a command into an HTTP request.
+        
+        Args:
+            command: Supported command name
+            parameters: Command parameters
+            
+        Returns:
+            Tuple of (method, path, JSON body or None)
+            
+        Raises:
+            InvalidParameterError: If required parameters are missing or invalid
+        """
+        method, path, body = self.COMMAND_REQUESTS[command]
+        try:
+            path = path.format(**parameters)
+            if callable(body):
+                body = body(parameters)
+        except (KeyError, ValueError, TypeError) as e:
+            raise InvalidParameterError(f"Invalid parameters for {command}: {str(e)}")
+        return method, path, body
+    
+    def request(self, method: str, path: str,
+                body: Optional[Dict[str, Any]] = None) -> Any:
+        """Send a request to the device over the pooled session.
+        
+        Args:
+            method: HTTP method
+            path: Path relative to base_url
+            body: Optional JSON body
+            
+        Returns:
+            Decoded JSON reply, or None for an empty reply
+            
+        Raises:
+            TransportError: If the device cannot be reached, times out or
+                answers with a server error
+            AdapterError: If the device rejects the request or its reply
+                cannot be decoded
+        """
+        try:
+            response = self.session.request(method, self.base_url + path, json=body,
+                                            timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error(f"HTTP request to {self.device_id} failed: {str(e)}")
+            raise TransportError(f"Device {self.device_id} request failed: {str(e)}")
+        try:
+            response.raise_for_status()
+            return response.json() if response.content else None
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"HTTP request to {self.device_id} failed: {str(e)}")
+            # Server errors are usually transient; anything else would fail again
+            error = TransportError if response.status_code >= 500 else AdapterError
+            raise error(f"Device {self.device_id} request failed: {str(e)}")
+    
+    def parse_state(self, payload: Any) -> Dict[str, Any]:
+        """Convert a device reply into state fields.
+        
+        Args:
+            payload: Decoded JSON reply
+            
+        Returns:
+            State fields to merge into the device state
+        """
+        return payload if isinstance(payload, dict) else {}
+    
+    def execute_command(self, command: str,
+                        parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute a command by sending its mapped HTTP request."""
+        if not self.validate_command(command):
+            raise InvalidCommandError(
+                f"Command '{command}' not supported by {self.__class__.__name__}"
+            )
+        
+        method, path, body = self.build_request(command, parameters or {})
+        self._state.update(self.parse_state(self.request(method, path, body)))
+        logger.info(f"HTTP device {self.device_id} executed {command}")
+        return self._state.copy()
+    
+    def predict_state(self, command: str, parameters: Optional[Dict[str, Any]] = None,
+                      state: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Predict a command's state from OPTIMISTIC_STATES without a request."""
+        if not self.validate_command(command):
+            raise InvalidCommandError(
+                f"Command '{command}' not supported by {self.__class__.__name__}"
+            )
+        parameters = parameters or {}
+        self.build_request(command, parameters)
+        fields = self.OPTIMISTIC_STATES.get(command)
+        if fields is None:
+            return None
+        predicted = dict(self._state if state is None else state)
+        try:
+            predicted.update(fields(parameters))
+        except (KeyError, ValueError, TypeError) as e:
+            raise InvalidParameterError(f"Invalid parameters for {command}: {str(e)}")
+        return predicted
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Fetch the device state when STATE_REQUEST is set."""
+        if self.STATE_REQUEST is not None:
+            method, path = self.STATE_REQUEST
+            self._state.update(self.parse_state(self.request(method, path)))
+        return self._state.copy()
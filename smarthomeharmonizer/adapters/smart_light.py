@@ -2,7 +2,9 @@
 
 from typing import Dict, Any, List, Optional
 from smarthomeharmonizer.adapters.base import DeviceAdapter
-from smarthomeharmonizer.core.exceptions import InvalidCommandError, AdapterError
+from smarthomeharmonizer.core.exceptions import (
+    InvalidCommandError, InvalidParameterError, AdapterError
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,8 +13,14 @@ logger = logging.getLogger(__name__)
 class SmartLightAdapter(DeviceAdapter):
     """Adapter for smart light devices."""
     
+    SIMULATE_PREDICTIONS = True
+    
     SUPPORTED_COMMANDS = ['turnOn', 'turnOff', 'setBrightness', 'setColor', 'getStatus']
     
+    RELATIVE_COMMANDS = {
+        'incrementBrightness': ('setBrightness', 'brightness', 'brightness', 0, 100)
+    }
+    
     def _initialize_state(self) -> Dict[str, Any]:
         """Initialize smart light state."""
         return {
@@ -61,6 +69,9 @@ class SmartLightAdapter(DeviceAdapter):
                 # No state change, just return current state
                 pass
                 
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Error executing {command} on {self.device_id}: {str(e)}")
+            raise InvalidParameterError(f"Failed to execute {command}: {str(e)}")
         except Exception as e:
             logger.error(f"Error executing {command} on {self.device_id}: {str(e)}")
             raise AdapterError(f"Failed to execute {command}: {str(e)}")
@@ -2,7 +2,9 @@
 
 from typing import Dict, Any, List, Optional
 from smarthomeharmonizer.adapters.base import DeviceAdapter
-from smarthomeharmonizer.core.exceptions import InvalidCommandError, AdapterError
+from smarthomeharmonizer.core.exceptions import (
+    InvalidCommandError, InvalidParameterError, AdapterError
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,8 +13,14 @@ logger = logging.getLogger(__name__)
 class ThermostatAdapter(DeviceAdapter):
     """Adapter for thermostat devices."""
     
+    SIMULATE_PREDICTIONS = True
+    
     SUPPORTED_COMMANDS = ['turnOn', 'turnOff', 'setTemperature', 'setMode', 'getStatus']
     
+    RELATIVE_COMMANDS = {
+        'incrementTemperature': ('setTemperature', 'targetTemperature', 'temperature', 50, 90)
+    }
+    
     MODES = ['heat', 'cool', 'auto', 'off']
     
     def _initialize_state(self) -> Dict[str, Any]:
@@ -73,6 +81,9 @@ class ThermostatAdapter(DeviceAdapter):
                 # No state change, just return current state
                 pass
                 
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Error executing {command} on {self.device_id}: {str(e)}")
+            raise InvalidParameterError(f"Failed to execute {command}: {str(e)}")
         except Exception as e:
             logger.error(f"Error executing {command} on {self.device_id}: {str(e)}")
             raise AdapterError(f"Failed to execute {command}: {str(e)}")
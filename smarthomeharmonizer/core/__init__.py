@@ -2,18 +2,91 @@
 
 from smarthomeharmonizer.core.app import create_app
 from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.state_store import SharedStateStore
+from smarthomeharmonizer.core.sharding import ShardedDeviceManager
+from smarthomeharmonizer.core.hashing import ConsistentHashRing
+from smarthomeharmonizer.core.cluster import ClusterNode
+from smarthomeharmonizer.core.replication import ReplicationPrimary, ReplicationFollower
+from smarthomeharmonizer.core.coalescing import CommandCoalescer
+from smarthomeharmonizer.core.dispatcher import CommandDispatcher
+from smarthomeharmonizer.core.rate_limit import RateLimit, RateLimiter
+from smarthomeharmonizer.core.bulkhead import Bulkhead, CircuitBreaker
+from smarthomeharmonizer.core.retry import Retrier, RetryPolicy
+from smarthomeharmonizer.core.state_cache import StateCache
+from smarthomeharmonizer.core.poller import StatePoller
+from smarthomeharmonizer.core.write_behind import WriteBehind
+from smarthomeharmonizer.core.single_flight import SingleFlight
+from smarthomeharmonizer.core.idempotency import IdempotencyCache
+from smarthomeharmonizer.core.change_log import ChangeLog
+from smarthomeharmonizer.core.history import HistoryRecorder
+from smarthomeharmonizer.core.simulator import FleetSimulator, VirtualClock
+from smarthomeharmonizer.core.timer_wheel import TimerWheel
+from smarthomeharmonizer.core.scheduler import CommandScheduler
+from smarthomeharmonizer.core.rules import RuleEngine
+from smarthomeharmonizer.core.compression import ResponseCompressor
+from smarthomeharmonizer.core.wire import WireCodec
 from smarthomeharmonizer.core.exceptions import (
     SmartHomeHarmonizerError,
     DeviceNotFoundError,
     InvalidCommandError,
-    AdapterError
+    AdapterError,
+    InvalidParameterError,
+    TransportError,
+    CircuitOpenError,
+    QueueFullError,
+    RateLimitError,
+    IdempotencyConflictError,
+    MalformedBodyError,
+    ScheduleNotFoundError,
+    InvalidScheduleError,
+    RuleNotFoundError,
+    InvalidRuleError
 )
 
 __all__ = [
     'create_app',
     'DeviceManager',
+    'SharedStateStore',
+    'ShardedDeviceManager',
+    'ConsistentHashRing',
+    'ClusterNode',
+    'ReplicationPrimary',
+    'ReplicationFollower',
+    'CommandCoalescer',
+    'CommandDispatcher',
+    'RateLimit',
+    'RateLimiter',
+    'Bulkhead',
+    'CircuitBreaker',
+    'Retrier',
+    'RetryPolicy',
+    'StateCache',
+    'StatePoller',
+    'WriteBehind',
+    'SingleFlight',
+    'IdempotencyCache',
+    'ChangeLog',
+    'HistoryRecorder',
+    'FleetSimulator',
+    'VirtualClock',
+    'TimerWheel',
+    'CommandScheduler',
+    'RuleEngine',
+    'ResponseCompressor',
+    'WireCodec',
     'SmartHomeHarmonizerError',
     'DeviceNotFoundError',
     'InvalidCommandError',
-    'AdapterError'
+    'AdapterError',
+    'InvalidParameterError',
+    'TransportError',
+    'CircuitOpenError',
+    'QueueFullError',
+    'RateLimitError',
+    'IdempotencyConflictError',
+    'MalformedBodyError',
+    'ScheduleNotFoundError',
+    'InvalidScheduleError',
+    'RuleNotFoundError',
+    'InvalidRuleError'
 ]
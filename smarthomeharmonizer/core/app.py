@@ -1,22 +1,59 @@
 """Flask application and API endpoints."""
 
 from flask import Flask, request, jsonify
-from typing import Dict, Any, Optional
+from werkzeug.exceptions import HTTPException
+from typing import Dict, Any, Callable, List, Optional, Set
+import hashlib
+import json
+import math
 import logging
 
 from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.cluster import ClusterNode
+from smarthomeharmonizer.core.idempotency import IdempotencyCache
+from smarthomeharmonizer.core.projection import parse_fields
+from smarthomeharmonizer.core.compression import ResponseCompressor
+from smarthomeharmonizer.core.wire import WireCodec
+from smarthomeharmonizer.core.history import HistoryRecorder
+from smarthomeharmonizer.core.scheduler import CommandScheduler
 from smarthomeharmonizer.core.exceptions import (
-    SmartHomeHarmonizerError, DeviceNotFoundError, InvalidCommandError
+    SmartHomeHarmonizerError, DeviceNotFoundError, InvalidCommandError, QueueFullError,
+    RateLimitError, IdempotencyConflictError, PreconditionFailedError, ScheduleNotFoundError
 )
 
 logger = logging.getLogger(__name__)
 
+CLIENT_ID_HEADER = 'X-Client-ID'
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_BATCH_COMMANDS = 100
 
-def create_app(device_manager: Optional[DeviceManager] = None) -> Flask:
+
+def create_app(device_manager: Optional[DeviceManager] = None,
+               cluster: Optional[ClusterNode] = None,
+               read_only: bool = False,
+               idempotency_cache: Optional[IdempotencyCache] = None,
+               compressor: Optional[ResponseCompressor] = None,
+               wire_codec: Optional[WireCodec] = None,
+               history: Optional[HistoryRecorder] = None,
+               scheduler: Optional[CommandScheduler] = None) -> Flask:
     """Create and configure Flask application.
     
     Args:
         device_manager: Optional DeviceManager instance (creates new if None)
+        cluster: Optional cluster node; device requests for devices owned by
+            other nodes are forwarded to their owner
+        read_only: Reject commands, e.g. on a replication follower
+        idempotency_cache: Optional store of command responses replayed for
+            repeated Idempotency-Key headers (creates new if None)
+        compressor: Optional Accept-Encoding negotiated response compression
+            (creates new with a 1 KiB threshold if None)
+        wire_codec: Optional MessagePack/CBOR negotiation for request and
+            response bodies (creates new if None)
+        history: Optional recorder of numeric state fields; enables the
+            device history endpoint
+        scheduler: Optional command scheduler; enables the schedules
+            endpoints
         
     Returns:
         Configured Flask application
@@ -27,7 +64,23 @@ def create_app(device_manager: Optional[DeviceManager] = None) -> Flask:
     if device_manager is None:
         device_manager = DeviceManager()
     
+    if idempotency_cache is None:
+        idempotency_cache = IdempotencyCache()
+    if compressor is None:
+        compressor = ResponseCompressor()
+    if wire_codec is None:
+        wire_codec = WireCodec()
+    
     app.device_manager = device_manager
+    app.cluster = cluster
+    app.idempotency_cache = idempotency_cache
+    app.compressor = compressor
+    app.wire_codec = wire_codec
+    app.history = history
+    app.scheduler = scheduler
+    device_manager.register_metrics('idempotency', idempotency_cache.get_metrics)
+    device_manager.register_metrics('compression', compressor.get_metrics)
+    device_manager.register_metrics('wireFormats', wire_codec.get_metrics)
     
     # Configure logging
     logging.basicConfig(
@@ -40,70 +93,390 @@ def create_app(device_manager: Optional[DeviceManager] = None) -> Flask:
         """Handle device not found errors."""
         return jsonify({'success': False, 'error': str(e)}), 404
     
+    @app.errorhandler(ScheduleNotFoundError)
+    def handle_schedule_not_found(e):
+        """Handle schedule not found errors."""
+        return jsonify({'success': False, 'error': str(e)}), 404
+    
     @app.errorhandler(InvalidCommandError)
     def handle_invalid_command(e):
         """Handle invalid command errors."""
         return jsonify({'success': False, 'error': str(e)}), 400
     
+    @app.errorhandler(QueueFullError)
+    def handle_queue_full(e):
+        """Handle overloaded device queues."""
+        return jsonify({'success': False, 'error': str(e)}), 503
+    
+    @app.errorhandler(RateLimitError)
+    def handle_rate_limited(e):
+        """Handle commands rejected by a rate limit."""
+        response = jsonify({'success': False, 'error': str(e)})
+        if math.isfinite(e.retry_after):
+            response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+        return response, 429
+    
+    @app.errorhandler(IdempotencyConflictError)
+    def handle_idempotency_conflict(e):
+        """Handle idempotency keys reused for a different request."""
+        return jsonify({'success': False, 'error': str(e)}), 422
+    
+    @app.errorhandler(PreconditionFailedError)
+    def handle_precondition_failed(e):
+        """Handle conditional commands whose preconditions no longer hold."""
+        response = jsonify({'success': False, 'error': str(e), 'version': e.version,
+                            'state': e.state})
+        response.set_etag(str(e.version))
+        return response, 412
+    
     @app.errorhandler(SmartHomeHarmonizerError)
     def handle_app_error(e):
         """Handle general application errors."""
         return jsonify({'success': False, 'error': str(e)}), 400
     
+    @app.errorhandler(HTTPException)
+    def handle_http_error(e):
+        """Keep the status of routing and protocol errors such as 404 and 405."""
+        return jsonify({'success': False, 'error': e.description}), e.code
+    
     @app.errorhandler(Exception)
     def handle_unexpected_error(e):
         """Handle unexpected errors."""
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
     
+    @app.after_request
+    def finish_response(response):
+        """Encode and compress the response, then answer If-None-Match with 304."""
+        response = app.wire_codec.process(request, response)
+        response = app.compressor.process(request, response)
+        return response.make_conditional(request)
+    
     @app.route('/health', methods=['GET'])
     def health_check():
         """Health check endpoint."""
         return jsonify({'status': 'healthy', 'version': '0.1.0'})
     
+    @app.route('/api/v1/metrics', methods=['GET'])
+    def get_metrics():
+        """Get metrics reported by the device manager and its components."""
+        return jsonify({'success': True, 'metrics': app.device_manager.get_metrics()})
+    
     @app.route('/api/v1/devices', methods=['GET'])
     def list_devices():
         """List all registered devices."""
-        devices = app.device_manager.list_devices()
-        return jsonify({'success': True, 'devices': devices})
+        fields = parse_fields(request.args.get('fields'))
+        # Taken before reading states so a changes feed started from it
+        # cannot miss a change
+        cursor = app.device_manager.get_change_cursor()
+        devices = app.device_manager.list_devices(fields)
+        if app.cluster is not None:
+            # Every node registers every device but lists only those it owns
+            devices = [d for d in devices if app.cluster.owns(d['deviceId'])]
+            if not request.headers.get(ClusterNode.FORWARDED_HEADER):
+                seen = {d['deviceId'] for d in devices}
+                peer_devices, cursors = app.cluster.gather_devices(fields)
+                for device in peer_devices:
+                    if device['deviceId'] not in seen:
+                        seen.add(device['deviceId'])
+                        devices.append(device)
+                cursors[app.cluster.node_id] = cursor
+                cursor = app.cluster.encode_cursor(cursors)
+        response = jsonify(dict({'success': True, 'devices': devices}, **cursor))
+        # The body digest versions the list, so clients and the compressed
+        # body cache can tell when it is unchanged
+        response.add_etag()
+        return response
+    
+    @app.route('/api/v1/devices/changes', methods=['GET'])
+    def list_changes():
+        """List devices changed since a change sequence number."""
+        since = request.args.get('since', type=int)
+        if since is None:
+            return jsonify({'success': False, 'error': 'Missing or invalid since'}), 400
+        fields = parse_fields(request.args.get('fields'))
+        if app.cluster is None:
+            changes = app.device_manager.changes_since(since, request.args.get('epoch'), fields)
+            return jsonify(dict({'success': True}, **changes))
+        if request.headers.get(ClusterNode.FORWARDED_HEADER):
+            return jsonify(dict({'success': True},
+                                **owned_changes(since, request.args.get('epoch'), fields)))
+        
+        # The cursor holds one position per node; gather every node's feed
+        cursors = app.cluster.decode_cursor(request.args.get('epoch'))
+        resync = cursors is None or since != sum(c['sequence'] for c in cursors.values())
+        cursors = cursors or {}
+        parts = app.cluster.gather_changes(cursors, fields)
+        local = cursors.get(app.cluster.node_id, {'epoch': None, 'sequence': -1})
+        parts[app.cluster.node_id] = owned_changes(local['sequence'], local['epoch'], fields)
+        reachable = {node_id: part for node_id, part in parts.items() if part is not None}
+        # A member joined, left or is unreachable, so devices may have moved
+        # between nodes without a change on either
+        resync = (resync or set(reachable) != set(cursors)
+                  or any(part['resync'] for part in reachable.values()))
+        
+        devices: List[Dict[str, Any]] = []
+        removed: List[str] = []
+        if not resync:
+            seen = set()
+            for part in reachable.values():
+                for device in part['devices']:
+                    if device['deviceId'] not in seen:
+                        seen.add(device['deviceId'])
+                        devices.append(device)
+                removed.extend(part['removed'])
+        cursor = app.cluster.encode_cursor({
+            node_id: {'epoch': part['epoch'], 'sequence': part['sequence']}
+            for node_id, part in reachable.items()
+        })
+        return jsonify(dict({'success': True, 'resync': resync, 'devices': devices,
+                             'removed': removed}, **cursor))
+    
+    def owned_changes(since: int, epoch: Optional[str],
+                      fields: Optional[Set[str]]) -> Dict[str, Any]:
+        """Get this node's change feed, limited to the devices it owns."""
+        changes = app.device_manager.changes_since(since, epoch, fields)
+        changes['devices'] = [d for d in changes['devices'] if app.cluster.owns(d['deviceId'])]
+        changes['removed'] = [d for d in changes['removed'] if app.cluster.owns(d)]
+        return changes
     
     @app.route('/api/v1/devices/<device_id>', methods=['GET'])
     def get_device(device_id: str):
         """Get device information and state."""
-        device = app.device_manager.get_device(device_id)
-        return jsonify({
-            'success': True,
-            'deviceId': device_id,
-            'name': device.name,
-            'type': device.__class__.__name__,
-            'supportedCommands': device.get_supported_commands(),
-            'state': device.get_state()
-        })
+        fields = parse_fields(request.args.get('fields'))
+        info = app.device_manager.describe_device(device_id, fields)
+        return jsonify(dict({'success': True}, **info))
     
     @app.route('/api/v1/devices/<device_id>/state', methods=['GET'])
     def get_device_state(device_id: str):
         """Get device state."""
+        fields = parse_fields(request.args.get('fields'))
+        version = app.device_manager.get_state_version(device_id)
         state = app.device_manager.get_device_state(device_id)
-        return jsonify({'success': True, 'deviceId': device_id, 'state': state})
+        if fields is not None:
+            state = {field: state[field] for field in fields if field in state}
+        response = jsonify({'success': True, 'deviceId': device_id, 'version': version,
+                            'state': state})
+        response.set_etag(str(version))
+        return response
+    
+    def parse_if_match(header: Optional[str]) -> Optional[int]:
+        """Parse an If-Match header holding a single state version."""
+        if header is None or header.strip() == '*':
+            return None
+        value = header.strip()
+        if value.startswith('W/'):
+            value = value[2:]
+        # Drop the format and coding suffixes added to the version ETag
+        value = value.strip('"').split('-', 1)[0]
+        if not value.isdigit():
+            raise InvalidCommandError("If-Match must contain a single state version")
+        return int(value)
+    
+    def idempotent(data: Any, compute: Callable[[], Dict[str, Any]]):
+        """Run a command request once per client and Idempotency-Key header."""
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return jsonify(compute())
+        # Fingerprint the decoded body so JSON and binary retries match
+        body = json.dumps(data, sort_keys=True, default=str)
+        fingerprint = hashlib.sha256(body.encode('utf-8')).hexdigest()
+        # Keys are scoped to the caller so one client cannot read another's
+        # responses; the address is not chosen by the client, and the client
+        # ID separates callers behind one gateway
+        client = f"{request.remote_addr} {request.headers.get(CLIENT_ID_HEADER, '')}"
+        payload, replayed = app.idempotency_cache.run(f"{client} {request.path} {key}",
+                                                      fingerprint, compute)
+        response = jsonify(payload)
+        if replayed:
+            response.headers[REPLAYED_HEADER] = 'true'
+        return response
     
     @app.route('/api/v1/devices/<device_id>/command', methods=['POST'])
     def execute_command(device_id: str):
         """Execute command on device."""
-        data = request.get_json()
+        if read_only:
+            return jsonify({'success': False, 'error': 'Read-only replica'}), 403
         
-        if not data or 'command' not in data:
+        data = app.wire_codec.decode_request(request)
+        
+        if not isinstance(data, dict) or 'command' not in data:
             return jsonify({'success': False, 'error': 'Missing command'}), 400
         
         command = data['command']
         parameters = data.get('parameters', {})
+        priority = data.get('priority')
+        expected = data.get('expected')
+        client_id = request.headers.get(CLIENT_ID_HEADER) or request.remote_addr
+        if_version = parse_if_match(request.headers.get('If-Match'))
+        if expected is not None and not isinstance(expected, dict):
+            return jsonify({'success': False, 'error': 'expected must be an object'}), 400
         
-        state = app.device_manager.execute_command(device_id, command, parameters)
+        def run() -> Dict[str, Any]:
+            state = app.device_manager.execute_command(
+                device_id, command, parameters, priority=priority, client_id=client_id,
+                if_version=if_version, expected=expected
+            )
+            return {
+                'success': True,
+                'deviceId': device_id,
+                'command': command,
+                'version': app.device_manager.get_state_version(device_id),
+                'state': state
+            }
         
-        return jsonify({
-            'success': True,
-            'deviceId': device_id,
-            'command': command,
-            'state': state
-        })
+        response = idempotent(data, run)
+        response.set_etag(str(response.get_json()['version']))
+        return response
+    
+    @app.route('/api/v1/commands/batch', methods=['POST'])
+    def execute_batch():
+        """Execute several commands in order, reporting each result."""
+        if read_only:
+            return jsonify({'success': False, 'error': 'Read-only replica'}), 403
+        
+        data = app.wire_codec.decode_request(request)
+        commands = data.get('commands') if isinstance(data, dict) else None
+        
+        if not isinstance(commands, list) or not commands:
+            return jsonify({'success': False, 'error': 'Missing commands'}), 400
+        if len(commands) > MAX_BATCH_COMMANDS:
+            return jsonify({
+                'success': False,
+                'error': f"At most {MAX_BATCH_COMMANDS} commands per batch"
+            }), 400
+        if not all(isinstance(item, dict) and 'deviceId' in item and 'command' in item
+                   for item in commands):
+            return jsonify({
+                'success': False,
+                'error': 'Each command needs deviceId and command'
+            }), 400
+        
+        client_id = request.headers.get(CLIENT_ID_HEADER) or request.remote_addr
+        
+        def run_one(item: Dict[str, Any]) -> Dict[str, Any]:
+            device_id = item['deviceId']
+            result = {'deviceId': device_id, 'command': item['command']}
+            if app.cluster is not None and not app.cluster.owns(device_id):
+                owner = app.cluster.owner_of(device_id)
+                return dict(result, success=False,
+                            error=f"Device {device_id} is owned by node {owner}")
+            try:
+                state = app.device_manager.execute_command(
+                    device_id, item['command'], item.get('parameters', {}),
+                    priority=item.get('priority'), client_id=client_id,
+                    if_version=item.get('ifVersion'), expected=item.get('expected')
+                )
+            except SmartHomeHarmonizerError as e:
+                return dict(result, success=False, error=str(e))
+            return dict(result, success=True, state=state)
+        
+        def run() -> Dict[str, Any]:
+            return {'success': True, 'results': [run_one(item) for item in commands]}
+        
+        return idempotent(data, run)
+    
+    if history is not None:
+        def parse_number(name: str) -> Optional[float]:
+            """Parse an optional numeric query parameter."""
+            value = request.args.get(name)
+            if value is None:
+                return None
+            try:
+                number = float(value)
+            except ValueError:
+                raise InvalidCommandError(f"{name} must be a number")
+            if not math.isfinite(number):
+                raise InvalidCommandError(f"{name} must be finite")
+            return number
+        
+        @app.route('/api/v1/devices/<device_id>/history', methods=['GET'])
+        def get_device_history(device_id: str):
+            """Get the recorded history of a numeric state field."""
+            # Raises DeviceNotFoundError, answered with a 404
+            app.device_manager.get_device(device_id)
+            field = request.args.get('field')
+            if not field:
+                return jsonify({
+                    'success': False,
+                    'error': 'Missing field',
+                    'fields': app.history.recorded_fields(device_id)
+                }), 400
+            step = parse_number('step')
+            try:
+                samples = app.history.query(device_id, field, parse_number('from'),
+                                            parse_number('to'), step)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            return jsonify({
+                'success': True,
+                'deviceId': device_id,
+                'field': field,
+                'step': step,
+                'memoryBytes': app.history.memory_usage(device_id),
+                'history': samples
+            })
+    
+    if scheduler is not None:
+        @app.route('/api/v1/schedules', methods=['GET'])
+        def list_schedules():
+            """List command schedules, optionally for one device."""
+            return jsonify({
+                'success': True,
+                'schedules': app.scheduler.list_schedules(request.args.get('deviceId'))
+            })
+        
+        @app.route('/api/v1/schedules', methods=['POST'])
+        def create_schedule():
+            """Create a one-shot, cron or sunrise/sunset command schedule."""
+            if read_only:
+                return jsonify({'success': False, 'error': 'Read-only replica'}), 403
+            schedule = app.scheduler.create_schedule(app.wire_codec.decode_request(request))
+            return jsonify({'success': True, 'schedule': schedule}), 201
+        
+        @app.route('/api/v1/schedules/<schedule_id>', methods=['GET'])
+        def get_schedule(schedule_id: str):
+            """Get a schedule and its last run."""
+            return jsonify({'success': True, 'schedule': app.scheduler.get_schedule(schedule_id)})
+        
+        @app.route('/api/v1/schedules/<schedule_id>', methods=['PUT'])
+        def replace_schedule(schedule_id: str):
+            """Replace a schedule definition."""
+            if read_only:
+                return jsonify({'success': False, 'error': 'Read-only replica'}), 403
+            schedule = app.scheduler.replace_schedule(schedule_id,
+                                                      app.wire_codec.decode_request(request))
+            return jsonify({'success': True, 'schedule': schedule})
+        
+        @app.route('/api/v1/schedules/<schedule_id>', methods=['DELETE'])
+        def delete_schedule(schedule_id: str):
+            """Delete a schedule."""
+            if read_only:
+                return jsonify({'success': False, 'error': 'Read-only replica'}), 403
+            app.scheduler.delete_schedule(schedule_id)
+            return jsonify({'success': True, 'message': f'Schedule {schedule_id} deleted'})
+    
+    if cluster is not None:
+        @app.before_request
+        def forward_to_owner():
+            """Proxy device requests to the node owning the device."""
+            return app.cluster.forward_request(request)
+        
+        @app.route('/api/v1/cluster', methods=['GET'])
+        def cluster_members():
+            """Get cluster membership as seen by this node."""
+            return jsonify({
+                'success': True,
+                'nodeId': app.cluster.node_id,
+                'members': app.cluster.get_members()
+            })
+        
+        @app.route('/api/v1/cluster/gossip', methods=['POST'])
+        def cluster_gossip():
+            """Exchange membership tables with a peer."""
+            data = request.get_json()
+            if not data or 'members' not in data:
+                return jsonify({'success': False, 'error': 'Missing members'}), 400
+            return jsonify({'success': True, 'members': app.cluster.merge_gossip(data['members'])})
     
     return app
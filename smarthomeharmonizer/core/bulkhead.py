@@ -0,0 +1,278 @@
+"""Deadlines, circuit breakers and per-adapter-type executor pools."""
+
+from typing import Dict, Any, Callable, Optional, Tuple, Type
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import BoundedSemaphore, Lock
+import time
+import logging
+
+from smarthomeharmonizer.adapters.base import DeviceAdapter
+from smarthomeharmonizer.core.exceptions import (
+    CircuitOpenError, InvalidCommandError, InvalidParameterError, QueueFullError, TransportError
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+    
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``reset_timeout`` seconds. It then lets a single
+    trial call through (half-open): success closes it, failure reopens it.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """Initialize the breaker.
+        
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+    
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+    
+    def allow(self) -> bool:
+        """Check whether a call may proceed, claiming the half-open trial."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+    
+    def record_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+    
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+    
+    def release(self) -> None:
+        """Give back a claimed trial without recording an outcome."""
+        with self._lock:
+            self._trial_running = False
+
+
+class _Compartment:
+    """Executor pool and breaker shared by all devices of one adapter type."""
+    
+    def __init__(self, adapter_type: str, workers: int, max_pending: int,
+                 failure_threshold: int, reset_timeout: float):
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix=f'bulkhead-{adapter_type}')
+        self.slots = BoundedSemaphore(workers + max_pending)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.calls = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.short_circuited = 0
+
+
+class Bulkhead:
+    """Runs adapter calls on per-adapter-type pools with deadlines and breakers.
+    
+    Each adapter class gets its own bounded executor, so a slow or hung
+    device type can only exhaust its own compartment. Every call has a
+    deadline; on expiry the caller gets ``TransportError`` while the stuck
+    call keeps its worker until it returns. Failures and timeouts feed a
+    circuit breaker per device and per adapter type, and calls fail fast
+    with ``CircuitOpenError`` while either breaker is open. Errors in
+    ``ignored_errors`` (rejected input, not a device fault) do not count,
+    so malformed client requests cannot open a breaker.
+    """
+    
+    def __init__(self, workers: int = 4, max_pending: int = 16, deadline: float = 5.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 type_workers: Optional[Dict[str, int]] = None,
+                 type_deadlines: Optional[Dict[str, float]] = None,
+                 ignored_errors: Tuple[Type[BaseException], ...] = (
+                     InvalidCommandError, InvalidParameterError
+                 )):
+        """Initialize the bulkhead.
+        
+        Args:
+            workers: Worker threads per adapter type
+            max_pending: Calls allowed to wait per adapter type beyond workers
+            deadline: Default seconds a call may take
+            failure_threshold: Consecutive failures that open a breaker
+            reset_timeout: Seconds a breaker stays open before a trial call
+            type_workers: Worker counts keyed by adapter class name
+            type_deadlines: Deadlines keyed by adapter class name
+            ignored_errors: Exceptions that do not count as failures
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.type_workers = dict(type_workers or {})
+        self.type_deadlines = dict(type_deadlines or {})
+        self.ignored_errors = ignored_errors
+        self._lock = Lock()
+        self._compartments: Dict[str, _Compartment] = {}
+        self._device_breakers: Dict[str, CircuitBreaker] = {}
+    
+    def _compartment(self, adapter_type: str) -> _Compartment:
+        with self._lock:
+            compartment = self._compartments.get(adapter_type)
+            if compartment is None:
+                compartment = self._compartments[adapter_type] = _Compartment(
+                    adapter_type, self.type_workers.get(adapter_type, self.workers),
+                    self.max_pending, self.failure_threshold, self.reset_timeout
+                )
+            return compartment
+    
+    def breaker_for(self, device_id: str) -> CircuitBreaker:
+        """Get the circuit breaker of a device.
+        
+        Args:
+            device_id: Device ID
+            
+        Returns:
+            Breaker tracking that device's failures
+        """
+        with self._lock:
+            breaker = self._device_breakers.get(device_id)
+            if breaker is None:
+                breaker = self._device_breakers[device_id] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout
+                )
+            return breaker
+    
+    def call(self, device: DeviceAdapter, function: Callable[[], Any]) -> Any:
+        """Run an adapter call in its compartment.
+        
+        Args:
+            device: Adapter the call belongs to
+            function: Callable performing the adapter call
+            
+        Returns:
+            Result of ``function``
+            
+        Raises:
+            CircuitOpenError: If a breaker is open
+            TransportError: If the deadline expires
+            QueueFullError: If the adapter type's compartment is full
+        """
+        adapter_type = device.__class__.__name__
+        compartment = self._compartment(adapter_type)
+        device_breaker = self.breaker_for(device.device_id)
+        
+        if not device_breaker.allow():
+            self._count(compartment, 'short_circuited')
+            raise CircuitOpenError(f"Circuit open for device {device.device_id}")
+        if not compartment.breaker.allow():
+            device_breaker.release()
+            self._count(compartment, 'short_circuited')
+            raise CircuitOpenError(f"Circuit open for adapter type {adapter_type}")
+        
+        if not compartment.slots.acquire(blocking=False):
+            device_breaker.release()
+            compartment.breaker.release()
+            self._count(compartment, 'rejected')
+            raise QueueFullError(f"Executor pool for {adapter_type} is full")
+        
+        self._count(compartment, 'calls')
+        deadline = self.type_deadlines.get(adapter_type, self.deadline)
+        future = compartment.executor.submit(function)
+        future.add_done_callback(lambda _: compartment.slots.release())
+        try:
+            result = future.result(timeout=deadline)
+        except FutureTimeoutError:
+            self._count(compartment, 'timeouts')
+            self._record_failure(compartment, device_breaker)
+            logger.warning(f"{adapter_type} call for {device.device_id} exceeded {deadline}s")
+            raise TransportError(
+                f"Device {device.device_id} did not respond within {deadline} seconds"
+            )
+        except self.ignored_errors:
+            device_breaker.record_success()
+            compartment.breaker.record_success()
+            raise
+        except BaseException:
+            self._record_failure(compartment, device_breaker)
+            raise
+        
+        device_breaker.record_success()
+        compartment.breaker.record_success()
+        return result
+    
+    def _count(self, compartment: _Compartment, counter: str) -> None:
+        with self._lock:
+            setattr(compartment, counter, getattr(compartment, counter) + 1)
+    
+    def _record_failure(self, compartment: _Compartment, device_breaker: CircuitBreaker) -> None:
+        self._count(compartment, 'failures')
+        device_breaker.record_failure()
+        compartment.breaker.record_failure()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get per-adapter-type compartment and breaker metrics.
+        
+        Returns:
+            Call counters and breaker state per adapter type, plus the IDs of
+            devices whose breakers are not closed
+        """
+        with self._lock:
+            counters = {
+                adapter_type: {
+                    'calls': c.calls,
+                    'failures': c.failures,
+                    'timeouts': c.timeouts,
+                    'rejected': c.rejected,
+                    'shortCircuited': c.short_circuited
+                }
+                for adapter_type, c in self._compartments.items()
+            }
+            compartments = dict(self._compartments)
+            device_breakers = dict(self._device_breakers)
+        return {
+            'types': {
+                adapter_type: dict(counters[adapter_type], breaker=c.breaker.state)
+                for adapter_type, c in compartments.items()
+            },
+            'openDevices': sorted(
+                device_id for device_id, breaker in device_breakers.items()
+                if breaker.state != CLOSED
+            )
+        }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down all compartment executors.
+        
+        Args:
+            wait: Block until running calls have returned
+        """
+        with self._lock:
+            compartments = list(self._compartments.values())
+        for compartment in compartments:
+            compartment.executor.shutdown(wait=wait)
@@ -0,0 +1,105 @@
+"""Global change sequence and bounded change log for delta sync."""
+
+from typing import Dict, Any, List, Optional, Tuple
+from threading import Lock
+import secrets
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeLog:
+    """Ring buffer mapping global change sequence numbers to device IDs.
+    
+    Every recorded change takes the next sequence number; the device ID is
+    stored in slot ``sequence % capacity``, so the buffer never grows and
+    finding where a client's cursor starts is a single index. A client
+    whose cursor is older than the oldest retained change, or that comes
+    from a previous process (a different ``epoch``), must resync from the
+    full device list. States equal to the last one recorded for a device
+    (e.g. ``getStatus``) do not count as changes.
+    """
+    
+    def __init__(self, capacity: int = 10_000):
+        """Initialize the log.
+        
+        Args:
+            capacity: Changes retained before the oldest are overwritten
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.epoch = secrets.token_hex(8)
+        self._lock = Lock()
+        self._ring: List[Optional[str]] = [None] * capacity
+        self._sequence = 0
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._queries = 0
+        self._resyncs = 0
+    
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the latest change (0 before any change)."""
+        with self._lock:
+            return self._sequence
+    
+    def record(self, device_id: str, state: Optional[Dict[str, Any]] = None) -> None:
+        """Record a change; usable directly as a state listener.
+        
+        Args:
+            device_id: Device that changed
+            state: New state, or None when the device was removed
+        """
+        with self._lock:
+            if state is None:
+                self._last.pop(device_id, None)
+            elif self._last.get(device_id) == state:
+                return
+            else:
+                self._last[device_id] = state
+            self._sequence += 1
+            self._ring[self._sequence % self.capacity] = device_id
+    
+    def since(self, sequence: int,
+              epoch: Optional[str] = None) -> Tuple[int, Optional[List[str]]]:
+        """Get the devices changed after a sequence number.
+        
+        Args:
+            sequence: Last sequence number the client has seen
+            epoch: Epoch the client's sequence belongs to, if known
+            
+        Returns:
+            Tuple of (current sequence, device IDs ordered by their latest
+            change); the IDs are None when the client must resync because
+            the changes are no longer retained
+        """
+        with self._lock:
+            self._queries += 1
+            if ((epoch is not None and epoch != self.epoch) or sequence < 0
+                    or sequence > self._sequence
+                    or sequence < self._sequence - self.capacity):
+                self._resyncs += 1
+                return self._sequence, None
+            changed: Dict[str, None] = {}
+            for seq in range(sequence + 1, self._sequence + 1):
+                device_id = self._ring[seq % self.capacity]
+                # Move repeated devices to the position of their latest change
+                changed.pop(device_id, None)
+                changed[device_id] = None
+            return self._sequence, list(changed)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get sequence and query counters.
+        
+        Returns:
+            Current sequence, retained range and resync count
+        """
+        with self._lock:
+            return {
+                'epoch': self.epoch,
+                'sequence': self._sequence,
+                'capacity': self.capacity,
+                'oldestRetained': max(self._sequence - self.capacity + 1, 1),
+                'queries': self._queries,
+                'resyncs': self._resyncs
+            }
@@ -0,0 +1,372 @@
+"""Multi-node clustering with hash-based device ownership."""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, RLock, Thread
+import base64
+import json
+import random
+import time
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Response, jsonify
+
+from smarthomeharmonizer.core.hashing import ConsistentHashRing
+
+logger = logging.getLogger(__name__)
+
+
+class ClusterNode:
+    """Membership, device ownership and request forwarding for one node.
+    
+    Nodes agree on device ownership by placing every live member on a
+    consistent hash ring. Membership is either static (the peer list given
+    at construction) or kept current by gossip: each round a node bumps
+    its own heartbeat and exchanges its member table with a random peer,
+    and members whose heartbeat stops advancing for ``failure_timeout``
+    seconds leave the ring until they are heard from again.
+    
+    Requests for devices owned elsewhere are forwarded over a pooled
+    keep-alive HTTP session; forwarded requests carry ``FORWARDED_HEADER``
+    so they are always served locally by the receiving node.
+    
+    Every node registers the full device set and serves only the devices
+    it currently owns, so ownership can move to a surviving node without
+    a handoff when a member fails.
+    """
+    
+    FORWARDED_HEADER = 'X-Harmonizer-Forwarded'
+    CURSOR_PREFIX = 'cluster-'
+    
+    def __init__(self, node_id: str, url: str, peers: Optional[Dict[str, str]] = None,
+                 replicas: int = 100, pool_size: int = 10, timeout: float = 5.0,
+                 failure_timeout: float = 10.0):
+        """Initialize the cluster node.
+        
+        Args:
+            node_id: Unique ID of this node
+            url: Base URL other nodes use to reach this node
+            peers: Mapping of peer node ID to base URL
+            replicas: Virtual points per node on the hash ring
+            pool_size: Keep-alive connections kept per peer
+            timeout: Seconds to wait for a peer response
+            failure_timeout: Seconds without a heartbeat before a peer is
+                considered down (only applies while gossip is running)
+        """
+        self.node_id = node_id
+        self.url = url.rstrip('/')
+        self.replicas = replicas
+        self.timeout = timeout
+        self.failure_timeout = failure_timeout
+        self._lock = RLock()
+        now = time.monotonic()
+        self._members: Dict[str, Dict[str, Any]] = {
+            node_id: {'url': self.url, 'heartbeat': 0, 'seen': now}
+        }
+        for peer_id, peer_url in (peers or {}).items():
+            if peer_id != node_id:
+                self._members[peer_id] = {'url': peer_url.rstrip('/'), 'heartbeat': 0, 'seen': now}
+        self._alive = set(self._members)
+        self._ring = ConsistentHashRing(sorted(self._alive), replicas=replicas)
+        
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(len(self._members), 1), pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self._members), 1))
+        
+        self._detect_failures = False
+        self._gossip_stop = Event()
+        self._gossip_thread: Optional[Thread] = None
+        logger.info(f"Cluster node {node_id} initialized with {len(self._members)} members")
+    
+    def owner_of(self, device_id: str) -> str:
+        """Get the ID of the node owning a device.
+        
+        Args:
+            device_id: Device ID to look up
+            
+        Returns:
+            Owning node ID
+        """
+        with self._lock:
+            return self._ring.get_node(device_id)
+    
+    def owns(self, device_id: str) -> bool:
+        """Check whether this node owns a device.
+        
+        Args:
+            device_id: Device ID to look up
+            
+        Returns:
+            True if this node should serve the device
+        """
+        return self.owner_of(device_id) == self.node_id
+    
+    def get_members(self) -> Dict[str, Dict[str, Any]]:
+        """Get the membership table.
+        
+        Returns:
+            Mapping of node ID to URL, heartbeat and liveness
+        """
+        with self._lock:
+            return {
+                node_id: {
+                    'url': member['url'],
+                    'heartbeat': member['heartbeat'],
+                    'alive': node_id in self._alive
+                }
+                for node_id, member in self._members.items()
+            }
+    
+    def _peer_urls(self) -> Dict[str, str]:
+        with self._lock:
+            return {
+                node_id: self._members[node_id]['url']
+                for node_id in self._alive if node_id != self.node_id
+            }
+    
+    def forward_request(self, request) -> Optional[Response]:
+        """Forward a device request to its owner if this node does not own it.
+        
+        Args:
+            request: Incoming Flask request (URL already matched)
+            
+        Returns:
+            Proxied response, or None if the request should be served locally
+        """
+        device_id = (request.view_args or {}).get('device_id')
+        if device_id is None or request.headers.get(self.FORWARDED_HEADER):
+            return None
+        
+        owner = self.owner_of(device_id)
+        if owner == self.node_id:
+            return None
+        
+        with self._lock:
+            target = self._members[owner]['url'] + request.full_path.rstrip('?')
+        headers = {
+            key: value for key, value in request.headers.items()
+            if key.lower() not in ('host', 'content-length', 'connection')
+        }
+        headers[self.FORWARDED_HEADER] = self.node_id
+        try:
+            upstream = self._session.request(
+                request.method, target, headers=headers,
+                data=request.get_data(), timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            logger.error(f"Forwarding {device_id} to node {owner} failed: {str(e)}")
+            response = jsonify({'success': False, 'error': f"Owner node {owner} unavailable"})
+            response.status_code = 503
+            return response
+        
+        excluded = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+        return Response(
+            upstream.content, status=upstream.status_code,
+            headers=[(k, v) for k, v in upstream.headers.items() if k.lower() not in excluded]
+        )
+    
+    def _gather(self, path: str, params: Dict[str, Dict[str, Any]],
+                action: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """GET a local-only resource from every other live member in parallel.
+        
+        Args:
+            path: Request path, such as ``/api/v1/devices``
+            params: Query parameters for each peer, by node ID
+            action: What the request does, for the warning on failure
+            
+        Returns:
+            Mapping of peer node ID to its JSON body; None for unreachable peers
+        """
+        def fetch(node_id: str, url: str) -> Optional[Dict[str, Any]]:
+            try:
+                response = self._session.get(
+                    f"{url}{path}", timeout=self.timeout, params=params.get(node_id),
+                    headers={self.FORWARDED_HEADER: self.node_id}
+                )
+                response.raise_for_status()
+                return response.json()
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"Could not {action} on node {node_id}: {str(e)}")
+                return None
+        
+        futures = {node_id: self._executor.submit(fetch, node_id, url)
+                   for node_id, url in self._peer_urls().items()}
+        return {node_id: future.result() for node_id, future in futures.items()}
+    
+    def gather_devices(self, fields: Optional[Iterable[str]] = None
+                       ) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Collect the local device lists of all other live members in parallel.
+        
+        Args:
+            fields: Optional field projection passed on to peers
+        
+        Returns:
+            Tuple of (devices reported by peers, change cursor of each peer);
+            unreachable peers are skipped
+        """
+        params = {'fields': ','.join(fields)} if fields is not None else None
+        listings = self._gather('/api/v1/devices',
+                                {node_id: params for node_id in self._peer_urls()},
+                                'list devices')
+        devices: List[Dict[str, Any]] = []
+        cursors: Dict[str, Dict[str, Any]] = {}
+        for node_id, listing in listings.items():
+            if listing is not None:
+                devices.extend(listing.get('devices', []))
+                cursors[node_id] = {'epoch': listing.get('epoch'),
+                                    'sequence': listing.get('sequence')}
+        return devices, cursors
+    
+    def gather_changes(self, cursors: Dict[str, Dict[str, Any]],
+                       fields: Optional[Iterable[str]] = None
+                       ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Collect the local change feeds of all other live members in parallel.
+        
+        Args:
+            cursors: Change cursor of each node, by node ID; peers without
+                one are asked for their current cursor and report a resync
+            fields: Optional field projection passed on to peers
+            
+        Returns:
+            Mapping of peer node ID to its changes; None for unreachable peers
+        """
+        params = {}
+        for node_id in self._peer_urls():
+            cursor = cursors.get(node_id, {'epoch': None, 'sequence': -1})
+            params[node_id] = {'since': cursor['sequence'], 'epoch': cursor['epoch']}
+            if fields is not None:
+                params[node_id]['fields'] = ','.join(fields)
+        return self._gather('/api/v1/devices/changes', params, 'list changes')
+    
+    @classmethod
+    def encode_cursor(cls, cursors: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine per-node change cursors into one cluster change cursor.
+        
+        Args:
+            cursors: Change cursor (``epoch`` and ``sequence``) of each node
+            
+        Returns:
+            Cursor whose ``epoch`` encodes every node's cursor and whose
+            ``sequence`` is the sum of the node sequences
+        """
+        packed = {node_id: [cursor['epoch'], cursor['sequence']]
+                  for node_id, cursor in cursors.items()}
+        token = base64.urlsafe_b64encode(json.dumps(packed, sort_keys=True).encode())
+        return {'epoch': cls.CURSOR_PREFIX + token.decode().rstrip('='),
+                'sequence': sum(cursor['sequence'] for cursor in cursors.values())}
+    
+    @classmethod
+    def decode_cursor(cls, epoch: Optional[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Split a cluster change cursor into per-node change cursors.
+        
+        Args:
+            epoch: ``epoch`` of a cursor made by encode_cursor
+            
+        Returns:
+            Change cursor of each node, or None if the epoch is not a
+            cluster cursor
+        """
+        if epoch is None or not epoch.startswith(cls.CURSOR_PREFIX):
+            return None
+        token = epoch[len(cls.CURSOR_PREFIX):]
+        try:
+            packed = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            return {str(node_id): {'epoch': str(node_epoch), 'sequence': int(sequence)}
+                    for node_id, (node_epoch, sequence) in packed.items()}
+        except (ValueError, TypeError, AttributeError):
+            return None
+    
+    def merge_gossip(self, members: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Merge a peer's member table into ours.
+        
+        Entries with a higher heartbeat than ours replace our entry and
+        mark the member as recently seen.
+        
+        Args:
+            members: Mapping of node ID to ``{'url', 'heartbeat'}``
+            
+        Returns:
+            Our merged member table, for the peer to merge in turn
+        """
+        now = time.monotonic()
+        with self._lock:
+            for node_id, info in members.items():
+                current = self._members.get(node_id)
+                if node_id == self.node_id:
+                    continue
+                if current is None or info['heartbeat'] > current['heartbeat']:
+                    self._members[node_id] = {
+                        'url': info['url'].rstrip('/'),
+                        'heartbeat': info['heartbeat'],
+                        'seen': now
+                    }
+            self._update_ring(now)
+            return {
+                node_id: {'url': m['url'], 'heartbeat': m['heartbeat']}
+                for node_id, m in self._members.items()
+            }
+    
+    def _update_ring(self, now: float) -> None:
+        # Static membership never expires members
+        alive = {
+            node_id for node_id, member in self._members.items()
+            if not self._detect_failures or node_id == self.node_id
+            or now - member['seen'] <= self.failure_timeout
+        }
+        if alive != self._alive:
+            logger.info(f"Cluster membership changed: {sorted(alive)}")
+            self._alive = alive
+            self._ring = ConsistentHashRing(sorted(alive), replicas=self.replicas)
+    
+    def gossip_once(self) -> None:
+        """Run one gossip round with a random peer."""
+        with self._lock:
+            self._detect_failures = True
+            self._members[self.node_id]['heartbeat'] += 1
+            peers = [(node_id, m['url']) for node_id, m in self._members.items()
+                     if node_id != self.node_id]
+            view = {node_id: {'url': m['url'], 'heartbeat': m['heartbeat']}
+                    for node_id, m in self._members.items()}
+        if peers:
+            node_id, url = random.choice(peers)
+            try:
+                response = self._session.post(
+                    f"{url}/api/v1/cluster/gossip", json={'members': view},
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                self.merge_gossip(response.json()['members'])
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.debug(f"Gossip with node {node_id} failed: {str(e)}")
+        with self._lock:
+            self._update_ring(time.monotonic())
+    
+    def start_gossip(self, interval: float = 1.0) -> None:
+        """Start exchanging membership with peers in a background thread.
+        
+        Args:
+            interval: Seconds between gossip rounds
+        """
+        if self._gossip_thread is not None:
+            return
+        self._gossip_stop.clear()
+        
+        def run() -> None:
+            while not self._gossip_stop.wait(interval):
+                self.gossip_once()
+        
+        self._gossip_thread = Thread(target=run, name=f'gossip-{self.node_id}', daemon=True)
+        self._gossip_thread.start()
+    
+    def stop(self) -> None:
+        """Stop gossiping and close pooled connections."""
+        self._gossip_stop.set()
+        if self._gossip_thread is not None:
+            self._gossip_thread.join()
+            self._gossip_thread = None
+        self._executor.shutdown(wait=False)
+        self._session.close()
@@ -0,0 +1,150 @@
+"""Coalescing of rapid-fire last-writer-wins commands."""
+
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+from threading import Event, Lock
+import copy
+import logging
+
+from smarthomeharmonizer.core.exceptions import AdapterError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COALESCABLE_COMMANDS = ('setBrightness', 'setTemperature')
+
+
+def _copy_error(error: BaseException) -> BaseException:
+    """Copy an exception so each waiting caller raises its own instance."""
+    try:
+        return copy.copy(error)
+    except Exception:
+        return AdapterError(str(error))
+
+
+class _PendingCommand:
+    """A coalescing window for one (device, command) pair."""
+    
+    def __init__(self, parameters: Optional[Dict[str, Any]]):
+        self.parameters = parameters
+        self.callers = 1
+        self.flush = Event()
+        self.done = Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class CommandCoalescer:
+    """Collapses bursts of superseded commands into one adapter call.
+    
+    The first caller for a (device, command) pair opens a window of
+    ``window`` seconds. Callers arriving during the window replace the
+    parameters and wait; when the window closes the latest parameters are
+    executed once and every waiting caller receives the resulting state
+    (or a copy of the error). Commands outside ``commands`` run immediately,
+    after any open windows on the same device have been flushed, so the
+    per-device command order is preserved.
+    
+    Every coalescable command is delayed by up to ``window`` seconds, even
+    when nothing supersedes it, so only slider-style commands are
+    coalesced by default.
+    """
+    
+    def __init__(self, window: float = 0.05,
+                 commands: Iterable[str] = DEFAULT_COALESCABLE_COMMANDS):
+        """Initialize the coalescer.
+        
+        Args:
+            window: Seconds to wait for superseding commands
+            commands: Commands whose latest invocation supersedes earlier ones
+                (setBrightness and setTemperature by default)
+        """
+        if window < 0:
+            raise ValueError("window must not be negative")
+        self.window = window
+        self.commands = frozenset(commands)
+        self._lock = Lock()
+        self._pending: Dict[Tuple[str, str], _PendingCommand] = {}
+        self._submitted = 0
+        self._executed = 0
+    
+    def submit(self, device_id: str, command: str, parameters: Optional[Dict[str, Any]],
+               execute: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]) -> Dict[str, Any]:
+        """Run a command, merging it with concurrent superseded commands.
+        
+        Args:
+            device_id: Target device ID
+            command: Command name
+            parameters: Command parameters
+            execute: Callable executing the command with the given parameters
+            
+        Returns:
+            Device state after the (possibly merged) command
+        """
+        if command not in self.commands:
+            self.flush(device_id)
+            with self._lock:
+                self._submitted += 1
+                self._executed += 1
+            return execute(parameters)
+        
+        key = (device_id, command)
+        with self._lock:
+            self._submitted += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.parameters = parameters
+                pending.callers += 1
+                leader = False
+            else:
+                pending = self._pending[key] = _PendingCommand(parameters)
+                leader = True
+        
+        if leader:
+            pending.flush.wait(self.window)
+            with self._lock:
+                del self._pending[key]
+                parameters = pending.parameters
+                self._executed += 1
+            try:
+                pending.result = execute(parameters)
+            except BaseException as e:
+                pending.error = e
+            finally:
+                pending.done.set()
+            if pending.callers > 1:
+                logger.debug(f"Coalesced {pending.callers} {command} commands for {device_id}")
+        else:
+            pending.done.wait()
+        
+        if pending.error is not None:
+            if leader:
+                raise pending.error
+            raise _copy_error(pending.error) from pending.error
+        return dict(pending.result or {})
+    
+    def flush(self, device_id: str) -> None:
+        """Close all open windows for a device and wait for them to execute.
+        
+        Args:
+            device_id: Device whose pending commands should run now
+        """
+        with self._lock:
+            pending = [p for (d, _), p in self._pending.items() if d == device_id]
+        for item in pending:
+            item.flush.set()
+        for item in pending:
+            item.done.wait()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get coalescing metrics.
+        
+        Returns:
+            Submitted and executed command counts and open windows
+        """
+        with self._lock:
+            return {
+                'window': self.window,
+                'submitted': self._submitted,
+                'executed': self._executed,
+                'coalesced': self._submitted - self._executed,
+                'openWindows': len(self._pending)
+            }
@@ -0,0 +1,156 @@
+"""Accept-Encoding negotiated compression of API responses."""
+
+from typing import Dict, Any, Callable, Optional, Tuple
+from collections import OrderedDict
+from threading import Lock
+import gzip
+import hashlib
+import logging
+
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/msgpack', 'application/cbor', 'text/plain', 'text/html'
+)
+
+
+def available_encodings() -> Dict[str, Callable[[bytes, int], bytes]]:
+    """Get the supported content codings in order of preference.
+    
+    Returns:
+        Mapping of coding name to ``compress(data, level)``; brotli and zstd
+        are only present when their packages are installed
+    """
+    encodings: Dict[str, Callable[[bytes, int], bytes]] = {}
+    if brotli is not None:
+        encodings['br'] = lambda data, level: brotli.compress(data, quality=min(level, 11))
+    if zstandard is not None:
+        encodings['zstd'] = (
+            lambda data, level: zstandard.ZstdCompressor(level=level).compress(data)
+        )
+    encodings['gzip'] = (
+        lambda data, level: gzip.compress(data, compresslevel=min(level, 9), mtime=0)
+    )
+    return encodings
+
+
+class ResponseCompressor:
+    """Compresses large responses with the best coding the client accepts.
+    
+    Only successful responses with a compressible mimetype and a body of at
+    least ``min_size`` bytes are compressed. Compressed GET bodies are kept
+    in a small LRU cache keyed by a digest of the uncompressed body, so an
+    unchanged device list is compressed once no matter how often it is
+    fetched; hashing is far cheaper than compressing.
+    """
+    
+    def __init__(self, min_size: int = 1024, level: int = 6, cache_entries: int = 64):
+        """Initialize the compressor.
+        
+        Args:
+            min_size: Smallest body in bytes worth compressing
+            level: Compression level passed to each coding
+            cache_entries: Compressed GET bodies kept for reuse
+        """
+        self.min_size = min_size
+        self.level = level
+        self.cache_entries = cache_entries
+        self.encodings = available_encodings()
+        self._cache: 'OrderedDict[Tuple[bytes, str], bytes]' = OrderedDict()
+        self._lock = Lock()
+        self._compressed = 0
+        self._cache_hits = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+    
+    def negotiate(self, request: Request) -> Optional[str]:
+        """Pick the preferred coding acceptable to the client.
+        
+        Args:
+            request: Incoming request
+            
+        Returns:
+            Coding name, or None to send the body uncompressed
+        """
+        return request.accept_encodings.best_match(list(self.encodings))
+    
+    def process(self, request: Request, response: Response) -> Response:
+        """Compress a response in place when worthwhile.
+        
+        Args:
+            request: Request being answered
+            response: Response to compress
+            
+        Returns:
+            The same response object
+        """
+        if (response.status_code != 200 or response.direct_passthrough
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+        encoding = self.negotiate(request)
+        if encoding is None:
+            return response
+        
+        compressed = self._compress(body, encoding, cacheable=request.method == 'GET')
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag is not None:
+            # A strong ETag must differ between representations
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+    
+    def _compress(self, body: bytes, encoding: str, cacheable: bool) -> bytes:
+        key = (hashlib.sha1(body).digest(), encoding)
+        if cacheable:
+            with self._lock:
+                compressed = self._cache.get(key)
+                if compressed is not None:
+                    self._cache.move_to_end(key)
+                    self._cache_hits += 1
+                    return compressed
+        
+        compressed = self.encodings[encoding](body, self.level)
+        with self._lock:
+            self._compressed += 1
+            self._bytes_in += len(body)
+            self._bytes_out += len(compressed)
+            if cacheable:
+                self._cache[key] = compressed
+                while len(self._cache) > self.cache_entries:
+                    self._cache.popitem(last=False)
+        return compressed
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get compression counters.
+        
+        Returns:
+            Bodies compressed, cache hits, byte totals and overall ratio
+        """
+        with self._lock:
+            return {
+                'encodings': list(self.encodings),
+                'compressed': self._compressed,
+                'cacheHits': self._cache_hits,
+                'bytesIn': self._bytes_in,
+                'bytesOut': self._bytes_out,
+                'ratio': round(self._bytes_out / self._bytes_in, 4) if self._bytes_in else 0.0
+            }
@@ -1,22 +1,113 @@
 """Device registry and management."""
 
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Callable, Iterable, Tuple
 from threading import RLock
 import logging
 
-from smarthomeharmonizer.adapters.base import DeviceAdapter
-from smarthomeharmonizer.core.exceptions import DeviceNotFoundError
+from smarthomeharmonizer.adapters.base import DeviceAdapter, TransitionScheduler
+from smarthomeharmonizer.core.exceptions import DeviceNotFoundError, PreconditionFailedError
+from smarthomeharmonizer.core.state_store import SharedStateStore
+from smarthomeharmonizer.core.coalescing import CommandCoalescer
+from smarthomeharmonizer.core.dispatcher import CommandDispatcher
+from smarthomeharmonizer.core.rate_limit import RateLimiter
+from smarthomeharmonizer.core.bulkhead import Bulkhead
+from smarthomeharmonizer.core.retry import Retrier
+from smarthomeharmonizer.core.state_cache import StateCache
+from smarthomeharmonizer.core.write_behind import WriteBehind
+from smarthomeharmonizer.core.single_flight import SingleFlight
+from smarthomeharmonizer.core.projection import FieldProjection
+from smarthomeharmonizer.core.change_log import ChangeLog
+from smarthomeharmonizer.core.timer_wheel import TimerHandle, TimerWheel
 
 logger = logging.getLogger(__name__)
 
+StateListener = Callable[[str, Dict[str, Any]], None]
+
 
 class DeviceManager:
     """Manages device registry and command routing."""
     
-    def __init__(self):
-        """Initialize the device manager."""
+    def __init__(self, state_store: Optional[SharedStateStore] = None,
+                 coalescer: Optional[CommandCoalescer] = None,
+                 dispatcher: Optional[CommandDispatcher] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 bulkhead: Optional[Bulkhead] = None,
+                 retrier: Optional[Retrier] = None,
+                 state_cache: Optional[StateCache] = None,
+                 write_behind: Optional[WriteBehind] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 change_log: Optional[ChangeLog] = None,
+                 timers: Optional[TimerWheel] = None):
+        """Initialize the device manager.
+        
+        Args:
+            state_store: Optional shared-memory store that keeps device state
+                consistent across worker processes
+            coalescer: Optional stage collapsing bursts of superseded
+                commands to the same device into one adapter call
+            dispatcher: Optional worker pool running commands from bounded
+                per-device priority queues instead of the caller's thread
+            rate_limiter: Optional token-bucket limits on commands per
+                device, adapter type and client
+            bulkhead: Optional per-adapter-type executor pools with call
+                deadlines and circuit breakers
+            retrier: Optional per-adapter-type retry and hedging policies
+                for adapter commands and state reads
+            state_cache: Optional TTL cache in front of adapter get_state()
+                calls, invalidated by commands
+            write_behind: Optional stage answering predictable commands with
+                an optimistic state and applying them in the background;
+                not supported together with a state store
+            single_flight: Optional deduplication letting concurrent
+                identical state reads and idempotent commands share one
+                adapter call
+            change_log: Optional ring buffer of global change sequence
+                numbers backing changes_since (creates new if None)
+            timers: Optional timing wheel running adapters' timed state
+                transitions, such as a brew finishing; without it such
+                transitions never happen
+            
+        Raises:
+            ValueError: If write_behind is combined with a state store
+        """
+        if write_behind is not None and state_store is not None:
+            raise ValueError("Write-behind execution cannot be combined with a state store")
         self._devices: Dict[str, DeviceAdapter] = {}
+        self._device_locks: Dict[str, RLock] = {}
         self._lock = RLock()
+        self._state_store = state_store
+        self._store_versions: Dict[str, int] = {}
+        self._listeners: List[StateListener] = []
+        self._metrics_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._coalescer = coalescer
+        if coalescer is not None:
+            self.register_metrics('coalescing', coalescer.get_metrics)
+        self._dispatcher = dispatcher
+        if dispatcher is not None:
+            self.register_metrics('dispatcher', dispatcher.get_metrics)
+        self._rate_limiter = rate_limiter
+        if rate_limiter is not None:
+            self.register_metrics('rateLimit', rate_limiter.get_metrics)
+        self._bulkhead = bulkhead
+        if bulkhead is not None:
+            self.register_metrics('bulkhead', bulkhead.get_metrics)
+        self._retrier = retrier
+        if retrier is not None:
+            self.register_metrics('retry', retrier.get_metrics)
+        self._state_cache = state_cache
+        if state_cache is not None:
+            self.register_metrics('stateCache', state_cache.get_metrics)
+        self._write_behind = write_behind
+        if write_behind is not None:
+            self.register_metrics('writeBehind', write_behind.get_metrics)
+        self._single_flight = single_flight
+        if single_flight is not None:
+            self.register_metrics('singleFlight', single_flight.get_metrics)
+        self._change_log = change_log or ChangeLog()
+        self.register_metrics('changeLog', self._change_log.get_metrics)
+        self._timers = timers
+        if timers is not None:
+            self.register_metrics('timers', timers.get_metrics)
         logger.info("DeviceManager initialized")
     
     def register_device(self, adapter: DeviceAdapter) -> None:
@@ -32,7 +123,15 @@ class DeviceManager:
             if adapter.device_id in self._devices:
                 raise ValueError(f"Device {adapter.device_id} already registered")
             
+            if self._state_store is not None:
+                if not self._state_store.register(adapter.device_id, adapter.get_state()):
+                    # Another worker registered it first; adopt its state
+                    self._sync_from_store(adapter.device_id, adapter)
+            
             self._devices[adapter.device_id] = adapter
+            if self._timers is not None:
+                adapter.bind_scheduler(self._transition_scheduler(adapter))
+            self._change_log.record(adapter.device_id, adapter.cached_state())
             logger.info(f"Registered device {adapter.device_id} ({adapter.name})")
     
     def unregister_device(self, device_id: str) -> None:
@@ -48,7 +147,14 @@ class DeviceManager:
             if device_id not in self._devices:
                 raise DeviceNotFoundError(f"Device {device_id} not found")
             
-            del self._devices[device_id]
+            self._devices.pop(device_id).bind_scheduler(None)
+            self._device_locks.pop(device_id, None)
+            if self._state_cache is not None:
+                self._state_cache.invalidate(device_id)
+            if self._state_store is not None:
+                self._state_store.release(device_id)
+                self._store_versions.pop(device_id, None)
+            self._change_log.record(device_id)
             logger.info(f"Unregistered device {device_id}")
     
     def get_device(self, device_id: str) -> DeviceAdapter:
@@ -68,43 +174,466 @@ class DeviceManager:
                 raise DeviceNotFoundError(f"Device {device_id} not found")
             return self._devices[device_id]
     
-    def list_devices(self) -> List[Dict[str, Any]]:
+    def device_ids(self) -> List[str]:
+        """Get the IDs of all registered devices.
+        
+        Returns:
+            List of device IDs
+        """
+        with self._lock:
+            return list(self._devices)
+    
+    def list_devices(self, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
         """List all registered devices.
         
+        Args:
+            fields: Optional projection such as ``['name', 'state.powerState']``;
+                device state is only read when a state field is requested
+        
         Returns:
             List of device information dictionaries
+            
+        Raises:
+            InvalidFieldError: If a requested field is unknown
         """
+        projection = FieldProjection(fields)
         with self._lock:
             return [
-                {
-                    'deviceId': device_id,
-                    'name': adapter.name,
-                    'type': adapter.__class__.__name__,
-                    'supportedCommands': adapter.get_supported_commands(),
-                    'state': adapter.get_state()
-                }
+                self._describe(device_id, adapter, projection)
                 for device_id, adapter in self._devices.items()
             ]
     
+    def describe_device(self, device_id: str,
+                        fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Get device information and state.
+        
+        Args:
+            device_id: Device ID to describe
+            fields: Optional projection, as for list_devices
+            
+        Returns:
+            Device information dictionary
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+            InvalidFieldError: If a requested field is unknown
+        """
+        projection = FieldProjection(fields)
+        return self._describe(device_id, self.get_device(device_id), projection)
+    
+    def _describe(self, device_id: str, adapter: DeviceAdapter,
+                  projection: FieldProjection) -> Dict[str, Any]:
+        """Build the projected information dictionary of one device."""
+        info: Dict[str, Any] = {'deviceId': device_id}
+        if projection.wants('name'):
+            info['name'] = adapter.name
+        if projection.wants('type'):
+            info['type'] = adapter.__class__.__name__
+        if projection.wants('supportedCommands'):
+            info['supportedCommands'] = adapter.get_supported_commands()
+        if projection.wants('version'):
+            info['version'] = self._version_of(adapter)
+        if projection.wants('state'):
+            info['state'] = projection.project_state(self._read_state(device_id, adapter))
+        return info
+    
     def execute_command(self, device_id: str, command: str, 
-                       parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                       parameters: Optional[Dict[str, Any]] = None,
+                       priority: Optional[str] = None,
+                       client_id: Optional[str] = None,
+                       if_version: Optional[int] = None,
+                       expected: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Execute a command on a device.
         
+        Conditions and relative commands (e.g. ``incrementBrightness``) are
+        evaluated against the current state under the device lock, in the
+        same step as the command. Such commands are never coalesced, shared
+        or written behind; they run after the device's pending write-behind
+        writes have landed.
+        
         Args:
             device_id: Target device ID
             command: Command to execute
             parameters: Optional command parameters
+            priority: Optional priority class (safety, interactive, bulk,
+                polling) used when a dispatcher is configured
+            client_id: Optional caller identity for per-client rate limits
+            if_version: Only execute if the state version still equals this
+            expected: Only execute if these state fields have these values
             
         Returns:
-            Updated device state
+            Updated device state, or its predicted state when the command
+            was accepted for write-behind execution
             
         Raises:
             DeviceNotFoundError: If device not found
             InvalidCommandError: If command not supported
-            AdapterError: If command execution fails
+            AdapterError: If command execution fails, exceeds its deadline or
+                is short-circuited by an open breaker
+            QueueFullError: If the device command queue is full
+            RateLimitError: If a device or client rate limit is exceeded
+            PreconditionFailedError: If if_version or expected do not match
+        """
+        device = self.get_device(device_id)
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(device_id, device.__class__.__name__, client_id)
+        
+        def run(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            def execute() -> Dict[str, Any]:
+                return self._execute(device, command, params, if_version, expected)
+            if self._dispatcher is None:
+                return execute()
+            return self._dispatcher.submit(device_id, command, execute, priority).result()
+        
+        conditional = (if_version is not None or bool(expected)
+                       or command in device.RELATIVE_COMMANDS)
+        
+        def coalesce() -> Dict[str, Any]:
+            if self._coalescer is not None and not conditional:
+                return self._coalescer.submit(device_id, command, parameters, run)
+            return run(parameters)
+        
+        def submit() -> Dict[str, Any]:
+            if self._single_flight is not None and not conditional:
+                return self._single_flight.execute(device_id, command, parameters, coalesce)
+            return coalesce()
+        
+        if self._write_behind is not None:
+            with self._device_lock(device_id):
+                # Conditions and relative amounts are evaluated against the
+                # device, so such commands wait for the writes queued before them
+                state = None if conditional else self._write_behind.submit(
+                    device, command, parameters, submit, lambda: self._rollback(device)
+                )
+                if state is not None:
+                    if self._state_cache is not None:
+                        self._state_cache.invalidate(device_id)
+                    self._notify(device_id, state)
+                    return state
+                queued = self._write_behind.enqueue(device_id, submit)
+            if queued is not None:
+                return queued.result()
+        return submit()
+    
+    def _execute(self, device: DeviceAdapter, command: str,
+                 parameters: Optional[Dict[str, Any]], if_version: Optional[int] = None,
+                 expected: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run a command on the adapter and publish the resulting state."""
+        device_id = device.device_id
+        # Listeners are notified under the device lock so they observe
+        # changes to one device in execution order
+        with self._device_lock(device_id):
+            if self._state_store is None:
+                state = self._run_command(device, command, parameters, if_version, expected)
+            else:
+                with self._state_store.lock(device_id):
+                    self._sync_from_store(device_id, device)
+                    state = self._run_command(device, command, parameters, if_version, expected)
+                    self._publish(device_id, state)
+            self._notify(device_id, state)
+        return state
+    
+    def _run_command(self, device: DeviceAdapter, command: str,
+                     parameters: Optional[Dict[str, Any]], if_version: Optional[int],
+                     expected: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Check conditions, resolve relative commands and call the adapter.
+        
+        Caller holds the device lock (and the store slot lock if any).
+        """
+        previous = device.cached_state()
+        if if_version is not None or expected or command in device.RELATIVE_COMMANDS:
+            current = self._load_state(device)
+            version = self._version_of(device, predicted=False)
+            if if_version is not None and if_version != version:
+                raise PreconditionFailedError(
+                    f"Device {device.device_id} is at version {version}, not {if_version}",
+                    version, current
+                )
+            for field, value in (expected or {}).items():
+                if current.get(field) != value:
+                    raise PreconditionFailedError(
+                        f"Device {device.device_id} field '{field}' is "
+                        f"{current.get(field)!r}, expected {value!r}",
+                        version, current
+                    )
+            command, parameters = device.resolve_relative(command, parameters, current)
+        
+        state = self._call_adapter(device, command, parameters)
+        if state != previous:
+            device.mark_changed()
+        return state
+    
+    def _call_adapter(self, device: DeviceAdapter, command: str,
+                      parameters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Call the adapter through the configured retrier and bulkhead."""
+        def attempt() -> Dict[str, Any]:
+            if self._bulkhead is None:
+                return device.execute_command(command, parameters)
+            return self._bulkhead.call(device, lambda: device.execute_command(command, parameters))
+        
+        try:
+            if self._retrier is None:
+                return attempt()
+            return self._retrier.execute(device, command, attempt)
+        finally:
+            # The device may have changed even if the command failed
+            if self._state_cache is not None:
+                self._state_cache.invalidate(device.device_id)
+            if self._single_flight is not None:
+                self._single_flight.forget(device.device_id)
+    
+    def _rollback(self, device: DeviceAdapter) -> Dict[str, Any]:
+        """Republish a device's actual state after a failed write-behind command."""
+        with self._device_lock(device.device_id):
+            if self._state_cache is not None:
+                self._state_cache.invalidate(device.device_id)
+            state = self._load_state(device)
+            self._notify(device.device_id, state)
+        return state
+    
+    def apply_state(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Overwrite a device state without executing a command.
+        
+        Used to apply state produced elsewhere, such as records streamed
+        from a replication primary. Listeners are notified as for commands.
+        
+        Args:
+            device_id: Target device ID
+            state: New device state
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        self._apply(device_id, state, merge=False)
+    
+    def update_state(self, device_id: str, changes: Dict[str, Any],
+                     expected: Optional[Dict[str, Any]] = None) -> bool:
+        """Change some fields of a device state without executing a command.
+        
+        Used for changes happening on the device itself, such as simulated
+        temperature drift or a timed transition. Fields are merged under
+        the device lock, so a concurrent command's changes to other fields
+        are kept. Listeners are notified as for commands.
+        
+        Args:
+            device_id: Target device ID
+            changes: Fields to overwrite
+            expected: Only apply if these state fields have these values
+            
+        Returns:
+            False if expected did not match and nothing was changed
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        return self._apply(device_id, changes, merge=True, expected=expected)
+    
+    def _apply(self, device_id: str, state: Dict[str, Any], merge: bool,
+               expected: Optional[Dict[str, Any]] = None) -> bool:
+        """Restore a full or partial state, publish it and notify listeners."""
+        device = self.get_device(device_id)
+        with self._device_lock(device_id):
+            if self._state_store is None:
+                if merge:
+                    current = device.cached_state()
+                    if any(current.get(k) != v for k, v in (expected or {}).items()):
+                        return False
+                    state = {**current, **state}
+                device.restore_state(state)
+            else:
+                with self._state_store.lock(device_id):
+                    if merge:
+                        self._sync_from_store(device_id, device)
+                        current = device.cached_state()
+                        if any(current.get(k) != v for k, v in (expected or {}).items()):
+                            return False
+                        state = {**current, **state}
+                    device.restore_state(state)
+                    self._publish(device_id, device.get_state())
+            if self._state_cache is not None:
+                self._state_cache.invalidate(device_id)
+            self._notify(device_id, device.get_state())
+        return True
+    
+    def _transition_scheduler(self, adapter: DeviceAdapter) -> TransitionScheduler:
+        """Build the scheduler through which an adapter's timed transitions are applied."""
+        device_id = adapter.device_id
+        
+        def schedule(delay: float, changes: Dict[str, Any],
+                     expected: Optional[Dict[str, Any]]) -> TimerHandle:
+            def fire() -> None:
+                if self._devices.get(device_id) is not adapter:
+                    return
+                # Commands cancel transitions under the device lock, so a
+                # transition cancelled while being fired is skipped here
+                with self._device_lock(device_id):
+                    if not handle.cancelled:
+                        self.update_state(device_id, changes, expected)
+            
+            handle = self._timers.schedule(delay, fire)
+            return handle
+        
+        return schedule
+    
+    def refresh_state(self, device_id: str,
+                      previous: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Re-read a device state from its adapter, bypassing the cache.
+        
+        Used by pollers to pick up changes made outside this process, such
+        as a physical switch. A state differing from ``previous`` is
+        published and delivered to listeners as for commands.
+        
+        Args:
+            device_id: Target device ID
+            previous: State the caller last saw, or None to only read
+            
+        Returns:
+            Tuple of (current state, whether it differs from previous)
+            
+        Raises:
+            DeviceNotFoundError: If device not found
         """
         device = self.get_device(device_id)
-        return device.execute_command(command, parameters)
+        with self._device_lock(device_id):
+            state = self._load_state(device)
+            changed = previous is not None and state != previous
+            if changed:
+                device.mark_changed()
+                if self._state_store is not None:
+                    with self._state_store.lock(device_id):
+                        self._publish(device_id, state)
+                if self._state_cache is not None:
+                    self._state_cache.invalidate(device_id)
+                self._notify(device_id, state)
+        return state, changed
+    
+    def get_change_cursor(self) -> Dict[str, Any]:
+        """Get the position of the change log, to start a changes_since feed.
+        
+        Read it before listing devices; every change after it is then
+        reported by changes_since.
+        
+        Returns:
+            Dictionary with the log ``epoch`` and latest ``sequence``
+        """
+        return {'epoch': self._change_log.epoch, 'sequence': self._change_log.sequence}
+    
+    def changes_since(self, sequence: int, epoch: Optional[str] = None,
+                      fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Get the devices that changed after a change sequence number.
+        
+        Args:
+            sequence: Last sequence number the caller has seen
+            epoch: Epoch the sequence was issued in, to detect restarts
+            fields: Optional projection, as for list_devices
+            
+        Returns:
+            Dictionary with ``epoch``, the new ``sequence``, ``resync`` (True
+            when the changes are no longer retained and the caller must
+            reload the full device list), the changed ``devices`` and the
+            IDs of ``removed`` devices
+            
+        Raises:
+            InvalidFieldError: If a requested field is unknown
+        """
+        projection = FieldProjection(fields)
+        current, changed = self._change_log.since(sequence, epoch)
+        result: Dict[str, Any] = {'epoch': self._change_log.epoch, 'sequence': current,
+                                  'resync': changed is None, 'devices': [], 'removed': []}
+        for device_id in changed or ():
+            with self._lock:
+                adapter = self._devices.get(device_id)
+            if adapter is None:
+                result['removed'].append(device_id)
+            else:
+                result['devices'].append(self._describe(device_id, adapter, projection))
+        return result
+    
+    def get_state_version(self, device_id: str) -> int:
+        """Get the version of a device state, for use with if_version.
+        
+        Args:
+            device_id: Device ID to query
+            
+        Returns:
+            Monotonically increasing state version
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        return self._version_of(self.get_device(device_id))
+    
+    def _version_of(self, device: DeviceAdapter, predicted: bool = True) -> int:
+        """Current state version; the store's slot version when shared.
+        
+        While write-behind writes are pending, the version their predicted
+        state will have is reported unless ``predicted`` is False.
+        """
+        if predicted and self._write_behind is not None:
+            pending = self._write_behind.pending_version(device.device_id)
+            if pending is not None:
+                return pending
+        if self._state_store is not None:
+            return self._state_store.version(device.device_id)
+        return device.version
+    
+    def _device_lock(self, device_id: str) -> RLock:
+        """Get the lock serializing commands and notifications for a device."""
+        with self._lock:
+            return self._device_locks.setdefault(device_id, RLock())
+    
+    def add_listener(self, listener: StateListener) -> None:
+        """Subscribe to device state changes.
+        
+        Args:
+            listener: Callable invoked with (device_id, state) after every
+                successful command or applied state; calls for one device
+                are serialized and in order, so listeners must not block
+        """
+        with self._lock:
+            self._listeners.append(listener)
+    
+    def remove_listener(self, listener: StateListener) -> None:
+        """Unsubscribe a state change listener.
+        
+        Args:
+            listener: Previously added listener
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+    
+    def _notify(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Deliver a state change to all listeners, isolating their failures."""
+        self._change_log.record(device_id, state)
+        for listener in list(self._listeners):
+            try:
+                listener(device_id, state)
+            except Exception as e:
+                logger.error(f"State listener failed for {device_id}: {str(e)}", exc_info=True)
+    
+    def register_metrics(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        """Expose metrics from a component attached to this manager.
+        
+        Args:
+            name: Section name in the metrics report
+            provider: Callable returning a JSON-serializable metrics dict
+        """
+        with self._lock:
+            self._metrics_providers[name] = provider
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Collect metrics from all registered providers.
+        
+        Returns:
+            Mapping of section name to metrics dictionary
+        """
+        with self._lock:
+            providers = dict(self._metrics_providers)
+        metrics: Dict[str, Any] = {'devices': len(self._devices)}
+        for name, provider in providers.items():
+            metrics[name] = provider()
+        return metrics
     
     def get_device_state(self, device_id: str) -> Dict[str, Any]:
         """Get current state of a device.
@@ -119,4 +648,48 @@ class DeviceManager:
             DeviceNotFoundError: If device not found
         """
         device = self.get_device(device_id)
-        return device.get_state()
+        return self._read_state(device_id, device)
+    
+    def _read_state(self, device_id: str, adapter: DeviceAdapter) -> Dict[str, Any]:
+        """Read device state, preferring the shared store when configured."""
+        if self._write_behind is not None:
+            pending = self._write_behind.pending_state(device_id)
+            if pending is not None:
+                return pending
+        if self._state_store is not None:
+            entry = self._state_store.read(device_id)
+            if entry is not None:
+                return entry[1]
+        if self._state_cache is not None:
+            return self._state_cache.get(adapter, lambda: self._load_state(adapter))
+        return self._load_state(adapter)
+    
+    def _load_state(self, adapter: DeviceAdapter) -> Dict[str, Any]:
+        """Read state from the adapter, with retries and sharing when configured."""
+        def load() -> Dict[str, Any]:
+            if self._retrier is not None:
+                return self._retrier.read(adapter, adapter.get_state)
+            return adapter.get_state()
+        
+        if self._single_flight is not None:
+            return self._single_flight.read(adapter.device_id, load)
+        return load()
+    
+    def _publish(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Write state to the shared store; caller holds the slot lock."""
+        try:
+            self._store_versions[device_id] = self._state_store.write(device_id, state)
+        except KeyError:
+            # The slot was released by another process; claim a new one
+            self._state_store.register(device_id, state)
+            self._store_versions[device_id] = self._state_store.version(device_id)
+    
+    def _sync_from_store(self, device_id: str, adapter: DeviceAdapter) -> None:
+        """Load a newer state published by another process into the adapter."""
+        if self._state_store.version(device_id) == self._store_versions.get(device_id):
+            return
+        entry = self._state_store.read(device_id)
+        if entry is not None:
+            version, state = entry
+            adapter.restore_state(state)
+            self._store_versions[device_id] = version
@@ -0,0 +1,229 @@
+"""Per-device priority queues drained fairly by a worker pool."""
+
+from typing import Dict, Any, Callable, Deque, List, Optional, Set
+from collections import deque
+from concurrent.futures import Future
+from threading import Condition, Thread
+import time
+import logging
+
+from smarthomeharmonizer.core.exceptions import InvalidCommandError, QueueFullError
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+SAFETY = 'safety'
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+POLLING = 'polling'
+
+PRIORITY_CLASSES = (SAFETY, INTERACTIVE, BULK, POLLING)
+
+DEFAULT_WEIGHTS = {INTERACTIVE: 6, BULK: 3, POLLING: 1}
+
+DEFAULT_COMMAND_PRIORITIES = {
+    'turnOff': SAFETY,
+    'getStatus': POLLING
+}
+
+
+class _Job:
+    """A queued command waiting for a worker."""
+    
+    __slots__ = ('device_id', 'priority', 'run', 'future', 'enqueued')
+    
+    def __init__(self, device_id: str, priority: str, run: Callable[[], Any]):
+        self.device_id = device_id
+        self.priority = priority
+        self.run = run
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+class CommandDispatcher:
+    """Schedules adapter commands by priority class and device fairness.
+    
+    Each device has a bounded queue per priority class and runs at most one
+    command at a time, so commands to one device never race. Workers pick
+    the next class to serve with ``safety`` always first and the remaining
+    classes by smooth weighted round-robin, then take the next device of
+    that class in round-robin order, so one busy device cannot starve the
+    others and a flood of polls cannot delay a safety command.
+    """
+    
+    def __init__(self, workers: int = 4, max_queue: int = 64,
+                 weights: Optional[Dict[str, int]] = None,
+                 command_priorities: Optional[Dict[str, str]] = None):
+        """Initialize the dispatcher and start its workers.
+        
+        Args:
+            workers: Number of worker threads
+            max_queue: Maximum queued commands per device and priority
+                class, so a backlog in one class never blocks another
+            weights: Relative share of worker picks per non-safety class
+            command_priorities: Default class per command name; commands
+                not listed are ``interactive``
+        """
+        self.max_queue = max_queue
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.command_priorities = dict(DEFAULT_COMMAND_PRIORITIES, **(command_priorities or {}))
+        self._condition = Condition()
+        self._queues: Dict[str, Dict[str, Deque[_Job]]] = {}
+        self._ready: Dict[str, Deque[str]] = {cls: deque() for cls in PRIORITY_CLASSES}
+        self._busy: Set[str] = set()
+        self._credits = {cls: 0 for cls in self.weights}
+        self._depth = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._completed = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._rejected = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._wait_times = {cls: LatencyTracker() for cls in PRIORITY_CLASSES}
+        self._running = True
+        self._workers: List[Thread] = []
+        for i in range(workers):
+            worker = Thread(target=self._work, name=f'command-dispatcher-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+    
+    def classify(self, command: str, priority: Optional[str] = None) -> str:
+        """Resolve the priority class of a command.
+        
+        Args:
+            command: Command name
+            priority: Explicit class requested by the caller
+            
+        Returns:
+            Priority class name
+            
+        Raises:
+            InvalidCommandError: If the requested class is unknown
+        """
+        if priority is None:
+            return self.command_priorities.get(command, INTERACTIVE)
+        if priority not in PRIORITY_CLASSES:
+            raise InvalidCommandError(
+                f"Unknown priority '{priority}'. Must be one of: {', '.join(PRIORITY_CLASSES)}"
+            )
+        return priority
+    
+    def submit(self, device_id: str, command: str, run: Callable[[], Any],
+               priority: Optional[str] = None) -> Future:
+        """Queue a command for execution.
+        
+        Args:
+            device_id: Target device ID
+            command: Command name, used for default classification
+            run: Callable performing the command
+            priority: Optional explicit priority class
+            
+        Returns:
+            Future resolved with the result of ``run``
+            
+        Raises:
+            InvalidCommandError: If the priority class is unknown
+            QueueFullError: If the device queue for the class is full
+        """
+        cls = self.classify(command, priority)
+        job = _Job(device_id, cls, run)
+        with self._condition:
+            if not self._running:
+                raise QueueFullError("Command dispatcher is shut down")
+            queues = self._queues.setdefault(device_id, {c: deque() for c in PRIORITY_CLASSES})
+            if len(queues[cls]) >= self.max_queue:
+                self._rejected[cls] += 1
+                raise QueueFullError(
+                    f"{cls.capitalize()} command queue for device {device_id} is full"
+                )
+            if not queues[cls]:
+                self._ready[cls].append(device_id)
+            queues[cls].append(job)
+            self._depth[cls] += 1
+            self._condition.notify()
+        return job.future
+    
+    def _next_job(self) -> Optional[_Job]:
+        """Pick the next job to run; caller holds the condition lock."""
+        eligible = [cls for cls in PRIORITY_CLASSES
+                    if any(d not in self._busy for d in self._ready[cls])]
+        if not eligible:
+            return None
+        
+        if SAFETY in eligible:
+            cls = SAFETY
+        else:
+            total = sum(self.weights[c] for c in eligible)
+            for c in eligible:
+                self._credits[c] += self.weights[c]
+            cls = max(eligible, key=lambda c: self._credits[c])
+            self._credits[cls] -= total
+        
+        ready = self._ready[cls]
+        for _ in range(len(ready)):
+            device_id = ready.popleft()
+            if device_id in self._busy:
+                ready.append(device_id)
+                continue
+            queue = self._queues[device_id][cls]
+            job = queue.popleft()
+            if queue:
+                ready.append(device_id)
+            self._busy.add(device_id)
+            self._depth[cls] -= 1
+            return job
+        return None
+    
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if not self._running:
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+            
+            self._wait_times[job.priority].record(time.monotonic() - job.enqueued)
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.run())
+                except BaseException as e:
+                    job.future.set_exception(e)
+            
+            with self._condition:
+                self._busy.discard(job.device_id)
+                self._completed[job.priority] += 1
+                queues = self._queues.get(job.device_id)
+                if queues is not None and not any(queues.values()):
+                    del self._queues[job.device_id]
+                self._condition.notify_all()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue depth and wait-time metrics per priority class.
+        
+        Returns:
+            Mapping of class name to depth, counters and wait times
+        """
+        with self._condition:
+            counters = {
+                cls: {
+                    'depth': self._depth[cls],
+                    'completed': self._completed[cls],
+                    'rejected': self._rejected[cls]
+                }
+                for cls in PRIORITY_CLASSES
+            }
+            busy = len(self._busy)
+        for cls in PRIORITY_CLASSES:
+            counters[cls]['wait'] = self._wait_times[cls].snapshot()
+        return {'workers': len(self._workers), 'busyDevices': busy, 'classes': counters}
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting commands and stop workers after the queues drain.
+        
+        Args:
+            wait: Block until all workers have exited
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
@@ -1,5 +1,7 @@
 """Custom exceptions for SmartHomeHarmonizer."""
 
+from typing import Dict, Any, Optional
+
 
 class SmartHomeHarmonizerError(Exception):
     """Base exception for SmartHomeHarmonizer."""
@@ -19,3 +21,79 @@ class InvalidCommandError(SmartHomeHarmonizerError):
 class AdapterError(SmartHomeHarmonizerError):
     """Raised when there's an error in a device adapter."""
     pass
+
+
+class InvalidParameterError(AdapterError):
+    """Raised when command parameters are rejected before reaching the device."""
+    pass
+
+
+class TransportError(AdapterError):
+    """Raised when a device cannot be reached or does not answer in time."""
+    pass
+
+
+class CircuitOpenError(AdapterError):
+    """Raised when a call is short-circuited by an open circuit breaker."""
+    pass
+
+
+class InvalidFieldError(SmartHomeHarmonizerError):
+    """Raised when a field projection names an unknown field."""
+    pass
+
+
+class ScheduleNotFoundError(SmartHomeHarmonizerError):
+    """Raised when a command schedule is not found."""
+    pass
+
+
+class InvalidScheduleError(SmartHomeHarmonizerError):
+    """Raised when a command schedule definition is invalid."""
+    pass
+
+
+class RuleNotFoundError(SmartHomeHarmonizerError):
+    """Raised when an automation rule is not found."""
+    pass
+
+
+class InvalidRuleError(SmartHomeHarmonizerError):
+    """Raised when an automation rule definition is invalid."""
+    pass
+
+
+class MalformedBodyError(SmartHomeHarmonizerError):
+    """Raised when a request body cannot be decoded."""
+    pass
+
+
+class QueueFullError(SmartHomeHarmonizerError):
+    """Raised when a device command queue cannot accept more commands."""
+    pass
+
+
+class RateLimitError(SmartHomeHarmonizerError):
+    """Raised when a command exceeds a configured rate limit."""
+    
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class IdempotencyConflictError(SmartHomeHarmonizerError):
+    """Raised when an idempotency key is reused for a different request."""
+    pass
+
+
+class PreconditionFailedError(SmartHomeHarmonizerError):
+    """Raised when a conditional command's version or expected fields do not match."""
+    
+    def __init__(self, message: str, version: int = 0,
+                 state: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.version = version
+        self.state = state
+    
+    def __reduce__(self):
+        return self.__class__, (str(self), self.version, self.state)
@@ -0,0 +1,96 @@
+"""Consistent hashing for distributing devices across owners."""
+
+from typing import Any, Dict, Hashable, Iterable, List
+from bisect import bisect
+import hashlib
+
+
+def stable_hash(key: str) -> int:
+    """Hash a string identically in every process and interpreter run.
+    
+    Args:
+        key: String to hash
+        
+    Returns:
+        64-bit integer hash
+    """
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class ConsistentHashRing:
+    """Hash ring mapping keys to nodes with virtual replicas.
+    
+    Each node is placed on the ring ``replicas`` times so load stays even,
+    and adding or removing a node only moves the keys adjacent to its
+    points instead of reshuffling every key.
+    """
+    
+    def __init__(self, nodes: Iterable[Hashable] = (), replicas: int = 100):
+        """Initialize the ring.
+        
+        Args:
+            nodes: Initial nodes to place on the ring
+            replicas: Number of virtual points per node
+        """
+        if replicas <= 0:
+            raise ValueError("replicas must be positive")
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, Any] = {}
+        self._nodes: List[Any] = []
+        for node in nodes:
+            self.add_node(node)
+    
+    @property
+    def nodes(self) -> List[Any]:
+        """Nodes currently on the ring."""
+        return list(self._nodes)
+    
+    def add_node(self, node: Hashable) -> None:
+        """Place a node on the ring.
+        
+        Args:
+            node: Node identifier (its str() form is hashed)
+            
+        Raises:
+            ValueError: If the node is already on the ring
+        """
+        if node in self._nodes:
+            raise ValueError(f"Node {node} already on the ring")
+        self._nodes.append(node)
+        for replica in range(self.replicas):
+            point = stable_hash(f"{node}#{replica}")
+            self._owners[point] = node
+        self._points = sorted(self._owners)
+    
+    def remove_node(self, node: Hashable) -> None:
+        """Remove a node and its virtual points from the ring.
+        
+        Args:
+            node: Node identifier to remove
+            
+        Raises:
+            ValueError: If the node is not on the ring
+        """
+        if node not in self._nodes:
+            raise ValueError(f"Node {node} not on the ring")
+        self._nodes.remove(node)
+        self._owners = {p: n for p, n in self._owners.items() if n != node}
+        self._points = sorted(self._owners)
+    
+    def get_node(self, key: str) -> Any:
+        """Get the node owning a key.
+        
+        Args:
+            key: Key to look up, e.g. a device ID
+            
+        Returns:
+            Owning node identifier
+            
+        Raises:
+            LookupError: If the ring is empty
+        """
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect(self._points, stable_hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
@@ -0,0 +1,247 @@
+"""Per-device history of numeric state fields in array-backed ring buffers."""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from array import array
+from bisect import bisect_left, bisect_right
+from threading import Lock
+import sys
+import time
+import logging
+
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import InvalidFieldError
+
+logger = logging.getLogger(__name__)
+
+# On/off strings are recorded as 1.0 and 0.0 so usage can be graphed
+SWITCH_VALUES = {'ON': 1.0, 'OFF': 0.0}
+
+MAX_BUCKETS = 10_000
+
+
+class _Series:
+    """Samples of one field: float64 timestamps and float32 values.
+    
+    The arrays grow until ``capacity`` samples and are then overwritten
+    in place starting at ``head``, the index of the oldest sample.
+    """
+    
+    __slots__ = ('times', 'values', 'head', 'last')
+    
+    def __init__(self):
+        self.times = array('d')
+        self.values = array('f')
+        self.head = 0
+        self.last: Optional[float] = None
+    
+    def append(self, timestamp: float, value: float, capacity: int) -> None:
+        self.last = value
+        if len(self.times) < capacity:
+            self.times.append(timestamp)
+            self.values.append(value)
+            return
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % capacity
+    
+    def ordered(self) -> Tuple[array, array]:
+        """Copy the samples out in chronological order."""
+        head = self.head
+        if head == 0:
+            return self.times[:], self.values[:]
+        return self.times[head:] + self.times[:head], self.values[head:] + self.values[:head]
+    
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.times) + sys.getsizeof(self.values)
+
+
+class HistoryRecorder:
+    """Records numeric state fields of every device as it changes.
+    
+    The recorder listens to the device manager and appends a timestamped
+    sample for each numeric field (and ``ON``/``OFF`` switch field) whose
+    value differs from the field's previous sample, so memory is only
+    spent on changes. Each field keeps at most ``capacity`` samples in two
+    compact arrays (12 bytes per sample); older samples are overwritten.
+    Queries return raw samples or min/max/avg per ``step`` seconds, computed
+    with C-level ``min``/``max``/``sum`` over array slices located by
+    bisection rather than a Python loop per sample.
+    """
+    
+    def __init__(self, manager: DeviceManager, capacity: int = 1024,
+                 fields: Optional[Iterable[str]] = None):
+        """Initialize the recorder and subscribe to state changes.
+        
+        Args:
+            manager: Device manager whose state changes are recorded
+            capacity: Samples kept per device field
+            fields: Optional names of the only fields to record
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._manager = manager
+        self.capacity = capacity
+        self.fields = frozenset(fields) if fields is not None else None
+        self._lock = Lock()
+        self._series: Dict[str, Dict[str, _Series]] = {}
+        self._samples = 0
+        
+        manager.add_listener(self.record)
+        manager.register_metrics('history', self.get_metrics)
+    
+    def record(self, device_id: str, state: Dict[str, Any],
+               timestamp: Optional[float] = None) -> None:
+        """Append samples for the fields of a state that changed.
+        
+        Args:
+            device_id: Device the state belongs to
+            state: New device state
+            timestamp: Sample time in epoch seconds (defaults to now)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            series = self._series.setdefault(device_id, {})
+            for field, raw in state.items():
+                if self.fields is not None and field not in self.fields:
+                    continue
+                value = self._numeric(raw)
+                if value is None:
+                    continue
+                samples = series.get(field)
+                if samples is None:
+                    samples = series[field] = _Series()
+                elif samples.last == value:
+                    continue
+                # Keep each series sorted even if the wall clock steps back
+                if samples.times:
+                    timestamp = max(timestamp, samples.times[samples.head - 1])
+                samples.append(timestamp, value, self.capacity)
+                self._samples += 1
+    
+    @staticmethod
+    def _numeric(value: Any) -> Optional[float]:
+        if isinstance(value, bool):
+            return float(value)
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            return SWITCH_VALUES.get(value)
+        return None
+    
+    def recorded_fields(self, device_id: str) -> List[str]:
+        """Get the fields with recorded history for a device.
+        
+        Args:
+            device_id: Device ID
+            
+        Returns:
+            Field names in first-recorded order
+        """
+        with self._lock:
+            return list(self._series.get(device_id, {}))
+    
+    def query(self, device_id: str, field: str, start: Optional[float] = None,
+              end: Optional[float] = None, step: Optional[float] = None) -> Dict[str, Any]:
+        """Get the history of one field, optionally downsampled.
+        
+        Args:
+            device_id: Device ID
+            field: Recorded state field
+            start: Earliest sample time in epoch seconds (inclusive)
+            end: Latest sample time in epoch seconds (inclusive)
+            step: Bucket width in seconds; buckets start at ``start`` (or
+                the first sample) and empty buckets are omitted
+                
+        Returns:
+            Columns ``t`` and ``value`` for raw samples, or ``t`` (bucket
+            start), ``min``, ``max``, ``avg`` and ``count`` when downsampled
+            
+        Raises:
+            InvalidFieldError: If the field has no recorded history
+            ValueError: If step is not positive or yields too many buckets
+        """
+        if step is not None and step <= 0:
+            raise ValueError("step must be positive")
+        with self._lock:
+            samples = self._series.get(device_id, {}).get(field)
+            if samples is None:
+                raise InvalidFieldError(f"No history of field '{field}' for device {device_id}")
+            times, values = samples.ordered()
+        
+        low = bisect_left(times, start) if start is not None else 0
+        high = bisect_right(times, end) if end is not None else len(times)
+        times, values = times[low:high], values[low:high]
+        if step is None:
+            return {'t': times.tolist(), 'value': values.tolist()}
+        return self._downsample(times, values, times[0] if start is None and times else start,
+                                step)
+    
+    @staticmethod
+    def _downsample(times: array, values: array, origin: Optional[float],
+                    step: float) -> Dict[str, Any]:
+        result: Dict[str, List[Any]] = {'t': [], 'min': [], 'max': [], 'avg': [], 'count': []}
+        if not times:
+            return result
+        if (times[-1] - origin) / step >= MAX_BUCKETS:
+            raise ValueError(f"step yields more than {MAX_BUCKETS} buckets")
+        
+        low = 0
+        while low < len(times):
+            # Jump straight to the bucket holding the next sample
+            bucket = origin + (times[low] - origin) // step * step
+            high = bisect_left(times, bucket + step, low)
+            chunk = values[low:high]
+            result['t'].append(bucket)
+            result['min'].append(min(chunk))
+            result['max'].append(max(chunk))
+            result['avg'].append(sum(chunk) / len(chunk))
+            result['count'].append(len(chunk))
+            low = high
+        return result
+    
+    def memory_usage(self, device_id: str) -> int:
+        """Get the bytes held by a device's history arrays.
+        
+        Args:
+            device_id: Device ID
+            
+        Returns:
+            Allocated bytes, including array overhead
+        """
+        with self._lock:
+            return sum(s.nbytes() for s in self._series.get(device_id, {}).values())
+    
+    def forget(self, device_id: str) -> None:
+        """Drop the history of a device, e.g. after it was unregistered.
+        
+        Args:
+            device_id: Device ID
+        """
+        with self._lock:
+            self._series.pop(device_id, None)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get sample counts and memory cost.
+        
+        Returns:
+            Devices, series, retained samples and bytes in total and per device
+        """
+        with self._lock:
+            per_device = [sum(s.nbytes() for s in series.values())
+                          for series in self._series.values()]
+            retained = sum(len(s.times) for series in self._series.values()
+                           for s in series.values())
+            return {
+                'devices': len(per_device),
+                'series': sum(len(series) for series in self._series.values()),
+                'recorded': self._samples,
+                'retained': retained,
+                'memoryBytes': sum(per_device),
+                'avgBytesPerDevice': round(sum(per_device) / len(per_device)) if per_device else 0,
+                'maxBytesPerDevice': max(per_device, default=0)
+            }
+    
+    def stop(self) -> None:
+        """Stop recording state changes."""
+        self._manager.remove_listener(self.record)
@@ -0,0 +1,137 @@
+"""Idempotency-key cache for retried command requests."""
+
+from typing import Dict, Any, Callable, Optional, Tuple
+from collections import OrderedDict
+from threading import Event, Lock
+import time
+import logging
+
+from smarthomeharmonizer.core.exceptions import IdempotencyConflictError, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """Response stored under an idempotency key, or a request still running."""
+    
+    __slots__ = ('fingerprint', 'expires_at', 'response', 'done')
+    
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.expires_at = float('inf')
+        self.response: Optional[Dict[str, Any]] = None
+        self.done = Event()
+
+
+class IdempotencyCache:
+    """Bounded, TTL-evicted store of responses keyed by Idempotency-Key.
+    
+    The first request with a key runs; its successful response is kept for
+    ``ttl`` seconds and replayed to any repeat without running the command
+    again. A repeat arriving while the first request is still running
+    waits for it. Failed requests are not stored, so a client retrying a
+    failure runs the command again. Reusing a key for a different request
+    body raises ``IdempotencyConflictError``.
+    
+    Running requests are never evicted, as waiters rely on their result,
+    but they count towards ``max_entries``: stored responses make room for
+    them, and a new key is refused once running requests alone fill the
+    cache.
+    """
+    
+    def __init__(self, ttl: float = 600.0, max_entries: int = 10_000):
+        """Initialize the cache.
+        
+        Args:
+            ttl: Seconds a stored response is replayed
+            max_entries: Maximum running and stored requests; the oldest
+                stored responses go first
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Stored responses in expiry order, and requests still running
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._running: Dict[str, _Entry] = {}
+        self._lock = Lock()
+        self._stored = 0
+        self._replayed = 0
+        self._evictions = 0
+    
+    def run(self, key: str, fingerprint: str,
+            compute: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Run a request once per key, replaying the stored response for repeats.
+        
+        Args:
+            key: Idempotency key, scoped by the caller (e.g. to the endpoint)
+            fingerprint: Digest of the request body
+            compute: Callable running the request and returning its response
+            
+        Returns:
+            Tuple of (response, whether it was replayed)
+            
+        Raises:
+            IdempotencyConflictError: If the key was used for another body
+            QueueFullError: If max_entries requests are already running
+        """
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                self._trim(now)
+                entry = self._running.get(key) or self._entries.get(key)
+                if entry is None:
+                    if len(self._running) >= self.max_entries:
+                        raise QueueFullError("Too many requests with idempotency keys running")
+                    entry = self._running[key] = _Entry(fingerprint)
+                    self._trim(now)
+                    break
+                if entry.fingerprint != fingerprint:
+                    raise IdempotencyConflictError(
+                        "Idempotency key was already used for a different request"
+                    )
+                if entry.response is not None:
+                    self._replayed += 1
+                    return entry.response, True
+            # Another request with this key is running; wait and look again
+            entry.done.wait()
+        
+        try:
+            response = compute()
+        except BaseException:
+            with self._lock:
+                del self._running[key]
+            entry.done.set()
+            raise
+        
+        with self._lock:
+            entry.response = response
+            entry.expires_at = time.monotonic() + self.ttl
+            del self._running[key]
+            self._entries[key] = entry
+            self._stored += 1
+            self._trim(time.monotonic())
+        entry.done.set()
+        return response, False
+    
+    def _trim(self, now: float) -> None:
+        """Drop expired or excess stored responses; caller holds the lock."""
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if (entry.expires_at > now
+                    and len(self._entries) + len(self._running) <= self.max_entries):
+                return
+            self._entries.popitem(last=False)
+            self._evictions += 1
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get stored, replayed and evicted response counters.
+        
+        Returns:
+            Counters and current size
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries) + len(self._running),
+                'stored': self._stored,
+                'replayed': self._replayed,
+                'evictions': self._evictions
+            }
@@ -0,0 +1,219 @@
+"""Adaptive background polling of device states."""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Condition, Thread
+import heapq
+import random
+import time
+import logging
+
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import DeviceNotFoundError
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class StatePoller:
+    """Refreshes device states that change outside our control.
+    
+    Devices are kept in a min-heap ordered by their next poll time. A
+    driver thread pops due devices in batches of up to ``batch_size`` and
+    hands each batch to a worker pool; at most ``max_concurrency`` batches
+    run at once. Each device's interval adapts: it shrinks by ``speedup``
+    when a poll finds a change and grows by ``backoff`` when it does not,
+    bounded by ``min_interval`` and ``max_interval``. A poll only counts as
+    a change when the state differs from the last one published through
+    the manager, so commands sent through the API do not speed up polling;
+    changed states are published via ``DeviceManager.refresh_state``. The
+    first poll of a device only records a baseline.
+    """
+    
+    def __init__(self, manager: DeviceManager, min_interval: float = 5.0,
+                 max_interval: float = 300.0, batch_size: int = 100,
+                 max_concurrency: int = 8, speedup: float = 0.5, backoff: float = 1.5):
+        """Initialize the poller.
+        
+        Args:
+            manager: Device manager whose devices are polled
+            min_interval: Shortest seconds between polls of one device
+            max_interval: Longest seconds between polls of one device
+            batch_size: Maximum devices handed to one worker at a time
+            max_concurrency: Maximum batches polled in parallel
+            speedup: Interval multiplier after a detected change
+            backoff: Interval multiplier after an unchanged poll
+        """
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Intervals must satisfy 0 < min_interval <= max_interval")
+        self._manager = manager
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.speedup = speedup
+        self.backoff = backoff
+        self._condition = Condition()
+        self._heap: List[Tuple[float, str]] = []
+        self._intervals: Dict[str, float] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._slots = BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='state-poller')
+        self._thread: Optional[Thread] = None
+        self._running = False
+        self._polls = 0
+        self._changes = 0
+        self._errors = 0
+        self._batches = 0
+        self._poll_latency = LatencyTracker()
+        
+        manager.add_listener(self._on_state_change)
+        manager.register_metrics('poller', self.get_metrics)
+    
+    def track(self, device_ids: Iterable[str]) -> None:
+        """Start polling devices, spreading their first polls over min_interval.
+        
+        Args:
+            device_ids: Devices to poll
+        """
+        now = time.monotonic()
+        with self._condition:
+            for device_id in device_ids:
+                if device_id in self._intervals:
+                    continue
+                self._intervals[device_id] = self.min_interval
+                heapq.heappush(self._heap, (now + random.uniform(0, self.min_interval), device_id))
+            self._condition.notify()
+    
+    def untrack(self, device_id: str) -> None:
+        """Stop polling a device.
+        
+        Args:
+            device_id: Device to stop polling
+        """
+        with self._condition:
+            self._intervals.pop(device_id, None)
+            self._last.pop(device_id, None)
+    
+    def interval_of(self, device_id: str) -> Optional[float]:
+        """Get the current polling interval of a device.
+        
+        Args:
+            device_id: Device ID
+            
+        Returns:
+            Interval in seconds, or None if the device is not tracked
+        """
+        with self._condition:
+            return self._intervals.get(device_id)
+    
+    def start(self) -> None:
+        """Track every registered device and start the driver thread."""
+        self.track(self._manager.device_ids())
+        self._running = True
+        self._thread = Thread(target=self._drive, name='state-poller-driver', daemon=True)
+        self._thread.start()
+    
+    def _drive(self) -> None:
+        while True:
+            with self._condition:
+                batch = self._next_batch()
+                while self._running and not batch:
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                    batch = self._next_batch()
+                if not self._running:
+                    return
+            # Block while max_concurrency batches are already running
+            self._slots.acquire()
+            self._executor.submit(self._poll_batch, batch)
+    
+    def _next_batch(self) -> List[str]:
+        """Pop due devices; caller holds the condition lock."""
+        now = time.monotonic()
+        batch: List[str] = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            _, device_id = heapq.heappop(self._heap)
+            if device_id in self._intervals:
+                batch.append(device_id)
+        return batch
+    
+    def _poll_batch(self, batch: List[str]) -> None:
+        try:
+            with self._condition:
+                self._batches += 1
+            for device_id in batch:
+                self._poll(device_id)
+        finally:
+            self._slots.release()
+    
+    def _poll(self, device_id: str) -> None:
+        with self._condition:
+            previous = self._last.get(device_id)
+        started = time.monotonic()
+        try:
+            state, changed = self._manager.refresh_state(device_id, previous)
+        except DeviceNotFoundError:
+            self.untrack(device_id)
+            return
+        except Exception as e:
+            logger.warning(f"Polling {device_id} failed: {str(e)}")
+            self._reschedule(device_id, changed=False, error=True)
+            return
+        finally:
+            self._poll_latency.record(time.monotonic() - started)
+        
+        if previous is None:
+            self._on_state_change(device_id, state)
+        self._reschedule(device_id, changed)
+    
+    def _on_state_change(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Remember the latest state so only outside changes count as drift."""
+        with self._condition:
+            if device_id in self._intervals:
+                self._last[device_id] = state
+    
+    def _reschedule(self, device_id: str, changed: bool, error: bool = False) -> None:
+        with self._condition:
+            self._polls += 1
+            self._changes += changed
+            self._errors += error
+            interval = self._intervals.get(device_id)
+            if interval is None:
+                return
+            factor = self.speedup if changed else self.backoff
+            interval = min(self.max_interval, max(self.min_interval, interval * factor))
+            self._intervals[device_id] = interval
+            heapq.heappush(self._heap, (time.monotonic() + interval, device_id))
+            self._condition.notify()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get polling counters and interval distribution.
+        
+        Returns:
+            Tracked devices, poll and change counts, intervals and latency
+        """
+        with self._condition:
+            intervals = list(self._intervals.values())
+            metrics = {
+                'tracked': len(intervals),
+                'polls': self._polls,
+                'changes': self._changes,
+                'errors': self._errors,
+                'batches': self._batches,
+                'minIntervalSec': round(min(intervals), 3) if intervals else 0.0,
+                'avgIntervalSec': round(sum(intervals) / len(intervals), 3) if intervals else 0.0
+            }
+        metrics['pollLatency'] = self._poll_latency.snapshot()
+        return metrics
+    
+    def stop(self) -> None:
+        """Stop the driver and wait for running batches."""
+        self._manager.remove_listener(self._on_state_change)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
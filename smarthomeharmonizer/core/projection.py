@@ -0,0 +1,79 @@
+"""Field projection for device listings and state responses."""
+
+from typing import Dict, Any, Iterable, Optional, Set
+
+from smarthomeharmonizer.core.exceptions import InvalidFieldError
+
+DEVICE_FIELDS = ('deviceId', 'name', 'type', 'supportedCommands', 'state')
+OPTIONAL_DEVICE_FIELDS = ('version',)
+
+
+def parse_fields(value: Optional[str]) -> Optional[Set[str]]:
+    """Split a ``fields=`` query parameter.
+    
+    Args:
+        value: Comma-separated field names, or None
+        
+    Returns:
+        Set of field names, or None when no projection was requested
+    """
+    if value is None:
+        return None
+    return {field.strip() for field in value.split(',') if field.strip()}
+
+
+class FieldProjection:
+    """Selection of device attributes and state fields to compute.
+    
+    ``state`` selects the whole state and ``state.<field>`` single state
+    fields. ``deviceId`` is always included so results can be matched up.
+    Attributes that are not selected are never computed, so a projection
+    without state fields does not read device state at all.
+    """
+    
+    def __init__(self, fields: Optional[Iterable[str]] = None):
+        """Initialize the projection.
+        
+        Args:
+            fields: Requested field names; None selects the default fields
+            
+        Raises:
+            InvalidFieldError: If a field name is unknown
+        """
+        if fields is None:
+            self.attributes = set(DEVICE_FIELDS)
+            self.state_fields: Optional[Set[str]] = None
+            return
+        
+        self.attributes = {'deviceId'}
+        state_fields: Set[str] = set()
+        whole_state = False
+        for field in fields:
+            if field.startswith('state.') and len(field) > len('state.'):
+                state_fields.add(field[len('state.'):])
+            elif field == 'state':
+                whole_state = True
+            elif field in DEVICE_FIELDS or field in OPTIONAL_DEVICE_FIELDS:
+                self.attributes.add(field)
+            else:
+                raise InvalidFieldError(f"Unknown field '{field}'")
+        if whole_state or state_fields:
+            self.attributes.add('state')
+        self.state_fields = None if whole_state else state_fields
+    
+    def wants(self, attribute: str) -> bool:
+        """Check whether a device attribute was selected."""
+        return attribute in self.attributes
+    
+    def project_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only the selected state fields.
+        
+        Args:
+            state: Full device state
+            
+        Returns:
+            Projected state; fields the device does not have are omitted
+        """
+        if self.state_fields is None:
+            return state
+        return {field: state[field] for field in self.state_fields if field in state}
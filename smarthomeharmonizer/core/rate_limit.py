@@ -0,0 +1,205 @@
+"""Token-bucket rate limiting for device commands."""
+
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+from array import array
+from collections import OrderedDict
+from threading import Lock
+import time
+import logging
+
+from smarthomeharmonizer.core.exceptions import RateLimitError
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimit(NamedTuple):
+    """Sustained rate and burst size of one token bucket."""
+    
+    rate: float
+    burst: float
+
+
+class TokenBucketTable:
+    """Lazily refilled token buckets stored in flat arrays.
+    
+    Each key owns one slot in two ``array('d')`` columns holding its token
+    count and last refill time, so a bucket costs 16 bytes plus its index
+    entry. Buckets are refilled only when touched, making every operation
+    O(1). When ``max_keys`` is reached the least recently used bucket is
+    evicted; an evicted bucket simply starts full again.
+    """
+    
+    def __init__(self, max_keys: int = 100_000):
+        """Initialize the table.
+        
+        Args:
+            max_keys: Maximum number of buckets kept
+        """
+        if max_keys <= 0:
+            raise ValueError("max_keys must be positive")
+        self.max_keys = max_keys
+        self._index: 'OrderedDict[str, int]' = OrderedDict()
+        self._tokens = array('d')
+        self._updated = array('d')
+        self._free: List[int] = []
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    def _slot(self, key: str, limit: RateLimit, now: float) -> int:
+        slot = self._index.get(key)
+        if slot is not None:
+            self._index.move_to_end(key)
+            return slot
+        
+        if len(self._index) >= self.max_keys:
+            _, slot = self._index.popitem(last=False)
+            self._free.append(slot)
+        if self._free:
+            slot = self._free.pop()
+            self._tokens[slot] = limit.burst
+            self._updated[slot] = now
+        else:
+            slot = len(self._tokens)
+            self._tokens.append(limit.burst)
+            self._updated.append(now)
+        self._index[key] = slot
+        return slot
+    
+    def available(self, key: str, limit: RateLimit, now: float) -> Tuple[int, float]:
+        """Refill a bucket up to ``now``.
+        
+        Args:
+            key: Bucket key
+            limit: Rate and burst of the bucket
+            now: Current monotonic time
+            
+        Returns:
+            Tuple of (slot, available tokens)
+        """
+        slot = self._slot(key, limit, now)
+        tokens = min(limit.burst,
+                     self._tokens[slot] + (now - self._updated[slot]) * limit.rate)
+        self._tokens[slot] = tokens
+        self._updated[slot] = now
+        return slot, tokens
+    
+    def take(self, slot: int, tokens: float = 1.0) -> None:
+        """Remove tokens from a bucket refilled by ``available``."""
+        self._tokens[slot] -= tokens
+    
+    def memory_bytes(self) -> int:
+        """Approximate bytes used by the bucket columns."""
+        return (self._tokens.itemsize * len(self._tokens)
+                + self._updated.itemsize * len(self._updated))
+
+
+class RateLimiter:
+    """Enforces per-device, per-adapter-type and per-client command limits.
+    
+    Every command takes one token from its device bucket and, when a client
+    is identified, one from the client bucket. Device buckets use the first
+    limit configured for the device ID, then for its adapter type, then
+    ``default_device_limit``. A command is admitted only if every bucket
+    involved has a token, so a rejected command consumes nothing.
+    """
+    
+    def __init__(self, default_device_limit: Optional[RateLimit] = None,
+                 type_limits: Optional[Dict[str, RateLimit]] = None,
+                 device_limits: Optional[Dict[str, RateLimit]] = None,
+                 client_limit: Optional[RateLimit] = None,
+                 max_keys: int = 100_000):
+        """Initialize the limiter.
+        
+        Args:
+            default_device_limit: Limit for devices without a specific one
+            type_limits: Limits keyed by adapter class name
+            device_limits: Limits keyed by device ID
+            client_limit: Limit applied to each API client
+            max_keys: Maximum buckets kept per table
+        """
+        self.default_device_limit = default_device_limit
+        self.type_limits = dict(type_limits or {})
+        self.device_limits = dict(device_limits or {})
+        self.client_limit = client_limit
+        self._devices = TokenBucketTable(max_keys)
+        self._clients = TokenBucketTable(max_keys)
+        self._lock = Lock()
+        self._allowed = 0
+        self._rejected = 0
+    
+    def device_limit(self, device_id: str, adapter_type: str) -> Optional[RateLimit]:
+        """Resolve the limit applying to a device.
+        
+        Args:
+            device_id: Device ID
+            adapter_type: Adapter class name
+            
+        Returns:
+            Applicable limit, or None if the device is unlimited
+        """
+        return self.device_limits.get(
+            device_id, self.type_limits.get(adapter_type, self.default_device_limit)
+        )
+    
+    def acquire(self, device_id: str, adapter_type: str,
+                client_id: Optional[str] = None) -> None:
+        """Admit one command or reject it.
+        
+        Args:
+            device_id: Target device ID
+            adapter_type: Adapter class name of the device
+            client_id: Optional identifier of the calling client
+            
+        Raises:
+            RateLimitError: If a bucket is empty; ``retry_after`` holds the
+                seconds until the command would be admitted
+        """
+        checks = []
+        limit = self.device_limit(device_id, adapter_type)
+        if limit is not None:
+            checks.append((self._devices, device_id, limit, f"device {device_id}"))
+        if client_id is not None and self.client_limit is not None:
+            checks.append((self._clients, client_id, self.client_limit, f"client {client_id}"))
+        if not checks:
+            return
+        
+        now = time.monotonic()
+        with self._lock:
+            granted = []
+            limited = []
+            retry_after = 0.0
+            for table, key, bucket_limit, label in checks:
+                slot, tokens = table.available(key, bucket_limit, now)
+                if tokens >= 1.0:
+                    granted.append((table, slot))
+                    continue
+                limited.append(label)
+                if bucket_limit.rate > 0:
+                    retry_after = max(retry_after, (1.0 - tokens) / bucket_limit.rate)
+                else:
+                    retry_after = float('inf')
+            
+            if limited:
+                self._rejected += 1
+                raise RateLimitError(
+                    f"Rate limit exceeded for {' and '.join(limited)}", retry_after
+                )
+            for table, slot in granted:
+                table.take(slot)
+            self._allowed += 1
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get admission counters and bucket table sizes.
+        
+        Returns:
+            Allowed and rejected counts, tracked keys and bucket memory
+        """
+        with self._lock:
+            return {
+                'allowed': self._allowed,
+                'rejected': self._rejected,
+                'deviceBuckets': len(self._devices),
+                'clientBuckets': len(self._clients),
+                'bucketBytes': self._devices.memory_bytes() + self._clients.memory_bytes()
+            }
@@ -0,0 +1,299 @@
+"""Warm-standby replication of device state to follower processes."""
+
+from typing import Dict, Any, List, Optional, Tuple
+from threading import Condition, Event, Lock, Thread
+import json
+import socket
+import struct
+import time
+import logging
+
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import DeviceNotFoundError
+
+logger = logging.getLogger(__name__)
+
+_FRAME_HEADER = struct.Struct('>I')
+
+
+def _send_frame(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Send one length-prefixed JSON message."""
+    payload = json.dumps(message).encode('utf-8')
+    sock.sendall(_FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Replication connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_frame(sock: socket.socket) -> Dict[str, Any]:
+    """Receive one length-prefixed JSON message."""
+    (size,) = _FRAME_HEADER.unpack(_recv_exact(sock, _FRAME_HEADER.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+class ReplicationPrimary:
+    """Streams ordered, batched state-change records to followers.
+    
+    Every state change on the primary's DeviceManager becomes a record
+    with a global sequence number. Records are buffered and flushed as one
+    batch when ``batch_size`` is reached or every ``flush_interval``
+    seconds. A newly connected follower first receives a snapshot of all
+    device states, then the live stream. A follower that cannot take a
+    batch within ``send_timeout`` seconds is disconnected rather than
+    stalling the others; it reconnects and resynchronizes from a fresh
+    snapshot.
+    """
+    
+    def __init__(self, manager: DeviceManager, host: str = '127.0.0.1', port: int = 0,
+                 batch_size: int = 256, flush_interval: float = 0.01,
+                 send_timeout: float = 2.0):
+        """Initialize the primary and start listening for followers.
+        
+        Args:
+            manager: Device manager whose state changes are replicated
+            host: Interface to listen on
+            port: TCP port to listen on (0 picks a free port)
+            batch_size: Records that trigger an immediate flush
+            flush_interval: Maximum seconds a record waits before flushing
+            send_timeout: Seconds a follower may block one send before it
+                is dropped
+        """
+        self._manager = manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.send_timeout = send_timeout
+        self._sequence = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._condition = Condition()
+        self._send_lock = Lock()
+        self._followers: List[socket.socket] = []
+        self._records_sent = 0
+        self._batches_sent = 0
+        self._followers_dropped = 0
+        self._stop = Event()
+        self._server = socket.create_server((host, port))
+        self._server.settimeout(0.2)
+        self._threads: List[Thread] = []
+        
+        manager.add_listener(self._on_state_change)
+        manager.register_metrics('replication', self.get_metrics)
+    
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port followers should connect to."""
+        return self._server.getsockname()[:2]
+    
+    def start(self) -> None:
+        """Start accepting followers and flushing batches."""
+        for target in (self._accept_loop, self._flush_loop):
+            thread = Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Replication primary listening on {self.address}")
+    
+    def _on_state_change(self, device_id: str, state: Dict[str, Any]) -> None:
+        # Called under the manager's device lock, so sequence numbers follow
+        # the execution order of each device
+        with self._condition:
+            self._sequence += 1
+            self._pending.append({
+                'seq': self._sequence,
+                'deviceId': device_id,
+                'state': state,
+                'ts': time.time()
+            })
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+    
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn, addr = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(self.send_timeout)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._send_lock:
+                with self._condition:
+                    sequence = self._sequence
+                records = [
+                    {'seq': sequence, 'deviceId': device['deviceId'],
+                     'state': device['state'], 'ts': time.time()}
+                    for device in self._manager.list_devices()
+                ]
+                try:
+                    _send_frame(conn, {'snapshot': True, 'primarySequence': sequence,
+                                       'records': records})
+                except OSError:
+                    conn.close()
+                    continue
+                self._followers.append(conn)
+            logger.info(f"Replication follower connected from {addr}")
+    
+    def _flush_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._condition:
+                if len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                sequence = self._sequence
+            if batch:
+                self._broadcast({'snapshot': False, 'primarySequence': sequence,
+                                 'records': batch})
+    
+    def _broadcast(self, message: Dict[str, Any]) -> None:
+        with self._send_lock:
+            for conn in list(self._followers):
+                try:
+                    _send_frame(conn, message)
+                except OSError as e:
+                    # Includes send timeouts from followers that stopped reading
+                    logger.warning(f"Dropping replication follower: {str(e)}")
+                    self._followers.remove(conn)
+                    self._followers_dropped += 1
+                    conn.close()
+            self._records_sent += len(message['records'])
+            self._batches_sent += 1
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get primary-side replication metrics.
+        
+        Returns:
+            Sequence, follower count and batching counters
+        """
+        with self._condition:
+            pending = len(self._pending)
+            sequence = self._sequence
+        return {
+            'role': 'primary',
+            'sequence': sequence,
+            'followers': len(self._followers),
+            'pendingRecords': pending,
+            'recordsSent': self._records_sent,
+            'batchesSent': self._batches_sent,
+            'followersDropped': self._followers_dropped
+        }
+    
+    def stop(self) -> None:
+        """Stop replicating and disconnect followers."""
+        self._stop.set()
+        self._manager.remove_listener(self._on_state_change)
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._server.close()
+        with self._send_lock:
+            for conn in self._followers:
+                conn.close()
+            self._followers.clear()
+
+
+class ReplicationFollower:
+    """Applies a primary's state-change stream to a local DeviceManager.
+    
+    The follower's manager should have the same devices registered as the
+    primary; serve it with ``create_app(manager, read_only=True)`` to offload
+    read traffic. The connection is re-established automatically, starting
+    with a fresh snapshot.
+    """
+    
+    def __init__(self, manager: DeviceManager, host: str, port: int,
+                 reconnect_interval: float = 1.0):
+        """Initialize the follower.
+        
+        Args:
+            manager: Local device manager receiving replicated state
+            host: Primary host
+            port: Primary replication port
+            reconnect_interval: Seconds to wait before reconnecting
+        """
+        self._manager = manager
+        self._address = (host, port)
+        self.reconnect_interval = reconnect_interval
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._sock: Optional[socket.socket] = None
+        self.connected = False
+        self.applied_sequence = 0
+        self.primary_sequence = 0
+        self.lag_seconds = 0.0
+        self.records_applied = 0
+        
+        manager.register_metrics('replication', self.get_metrics)
+    
+    def start(self) -> None:
+        """Start following the primary in a background thread."""
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._sock = socket.create_connection(self._address)
+                self.connected = True
+                logger.info(f"Following replication primary at {self._address}")
+                while not self._stop.is_set():
+                    self._apply(_recv_frame(self._sock))
+            except (OSError, ConnectionError, ValueError) as e:
+                if not self._stop.is_set():
+                    logger.warning(f"Replication stream interrupted: {str(e)}")
+            finally:
+                self.connected = False
+                if self._sock is not None:
+                    self._sock.close()
+            self._stop.wait(self.reconnect_interval)
+    
+    def _apply(self, batch: Dict[str, Any]) -> None:
+        self.primary_sequence = batch['primarySequence']
+        for record in batch['records']:
+            if not batch['snapshot'] and record['seq'] <= self.applied_sequence:
+                # Already covered by the snapshot this stream started from
+                continue
+            try:
+                self._manager.apply_state(record['deviceId'], record['state'])
+            except DeviceNotFoundError:
+                logger.warning(f"Replicated device {record['deviceId']} is not registered")
+            self.applied_sequence = record['seq']
+            self.lag_seconds = max(time.time() - record['ts'], 0.0)
+            self.records_applied += 1
+        if batch['snapshot']:
+            self.applied_sequence = batch['primarySequence']
+            self.lag_seconds = 0.0
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get follower-side replication metrics.
+        
+        Returns:
+            Connection status, sequences and replication lag
+        """
+        return {
+            'role': 'follower',
+            'connected': self.connected,
+            'appliedSequence': self.applied_sequence,
+            'primarySequence': self.primary_sequence,
+            'lagRecords': max(self.primary_sequence - self.applied_sequence, 0),
+            'lagSeconds': round(self.lag_seconds, 6),
+            'recordsApplied': self.records_applied
+        }
+    
+    def stop(self) -> None:
+        """Stop following and close the connection."""
+        self._stop.set()
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
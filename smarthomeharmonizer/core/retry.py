@@ -0,0 +1,261 @@
+"""Jittered retries and hedged reads for flaky network-backed adapters."""
+
+from typing import Dict, Any, Callable, FrozenSet, Iterable, Optional, Tuple, Type
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+import random
+import time
+import logging
+
+from smarthomeharmonizer.adapters.base import DeviceAdapter
+from smarthomeharmonizer.core.exceptions import (
+    CircuitOpenError, InvalidCommandError, InvalidParameterError, TransportError
+)
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDEMPOTENT_COMMANDS = (
+    'turnOn', 'turnOff', 'setBrightness', 'setColor', 'setTemperature',
+    'setMode', 'setStrength', 'setSize', 'getStatus'
+)
+
+DEFAULT_READ_COMMANDS = ('getStatus',)
+
+# Would fail the same way again, or must fail fast
+NEVER_RETRIED = (InvalidCommandError, InvalidParameterError, CircuitOpenError)
+
+
+class RetryPolicy:
+    """Retry and hedging settings for one adapter type.
+    
+    Only idempotent commands are retried; anything else (e.g. ``brew``)
+    runs exactly once. Only transient errors in ``retry_on`` are retried;
+    rejected input and breaker rejections never are, whatever ``retry_on``
+    says. Retries wait a "full jitter" delay drawn uniformly
+    from zero to ``base_delay * 2 ** attempt`` capped at ``max_delay``.
+    With ``hedge`` enabled, a read still running after the observed
+    ``hedge_percentile`` latency is duplicated and the first answer wins.
+    """
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.05,
+                 max_delay: float = 1.0, hedge: bool = False,
+                 hedge_percentile: float = 0.95, initial_hedge_delay: float = 0.05,
+                 min_samples: int = 20,
+                 idempotent_commands: Iterable[str] = DEFAULT_IDEMPOTENT_COMMANDS,
+                 read_commands: Iterable[str] = DEFAULT_READ_COMMANDS,
+                 retry_on: Tuple[Type[BaseException], ...] = (TransportError, OSError)):
+        """Initialize the policy.
+        
+        Args:
+            max_attempts: Total attempts for idempotent calls (1 disables retries)
+            base_delay: Backoff base in seconds
+            max_delay: Maximum backoff in seconds
+            hedge: Send a duplicate of slow reads
+            hedge_percentile: Latency percentile after which a read is hedged
+            initial_hedge_delay: Hedge delay used until enough samples exist
+            min_samples: Samples required before the percentile is trusted
+            idempotent_commands: Commands that are safe to repeat
+            read_commands: Commands that only read state and may be hedged
+            retry_on: Exceptions that trigger a retry
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_samples = min_samples
+        self.idempotent_commands: FrozenSet[str] = frozenset(idempotent_commands)
+        self.read_commands: FrozenSet[str] = frozenset(read_commands)
+        self.retry_on = retry_on
+    
+    def backoff(self, attempt: int) -> float:
+        """Get the jittered delay before retry number ``attempt`` (from 0)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class _TypeStats:
+    """Latency samples and counters for one adapter type."""
+    
+    def __init__(self):
+        self.latency = LatencyTracker()
+        self.saved = LatencyTracker()
+        self.calls = 0
+        self.retries = 0
+        self.exhausted = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+
+class Retrier:
+    """Applies per-adapter-type retry policies to adapter calls."""
+    
+    def __init__(self, default_policy: Optional[RetryPolicy] = None,
+                 policies: Optional[Dict[str, RetryPolicy]] = None,
+                 hedge_workers: int = 8):
+        """Initialize the retrier.
+        
+        Args:
+            default_policy: Policy for adapter types without their own
+            policies: Policies keyed by adapter class name
+            hedge_workers: Threads available for hedged reads
+        """
+        self.default_policy = default_policy or RetryPolicy()
+        self.policies = dict(policies or {})
+        self._executor = ThreadPoolExecutor(max_workers=hedge_workers,
+                                            thread_name_prefix='hedged-read')
+        self._lock = Lock()
+        self._stats: Dict[str, _TypeStats] = {}
+    
+    def policy_for(self, adapter_type: str) -> RetryPolicy:
+        """Get the policy applying to an adapter type.
+        
+        Args:
+            adapter_type: Adapter class name
+            
+        Returns:
+            Configured policy, or the default policy
+        """
+        return self.policies.get(adapter_type, self.default_policy)
+    
+    def _stats_for(self, adapter_type: str) -> _TypeStats:
+        with self._lock:
+            stats = self._stats.get(adapter_type)
+            if stats is None:
+                stats = self._stats[adapter_type] = _TypeStats()
+            return stats
+    
+    def execute(self, device: DeviceAdapter, command: str,
+                call: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Run a command call with retries (and hedging for read commands).
+        
+        Args:
+            device: Adapter the command targets
+            command: Command name, used to decide whether it is idempotent
+            call: Callable performing one attempt
+            
+        Returns:
+            Result of the first successful attempt
+        """
+        adapter_type = device.__class__.__name__
+        policy = self.policy_for(adapter_type)
+        if command in policy.read_commands:
+            return self.read(device, call)
+        retryable = command in policy.idempotent_commands
+        return self._with_retries(adapter_type, policy, call, retryable)
+    
+    def read(self, device: DeviceAdapter, call: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Run an idempotent read with retries and optional hedging.
+        
+        Args:
+            device: Adapter being read
+            call: Callable performing one read
+            
+        Returns:
+            Result of the first successful read
+        """
+        adapter_type = device.__class__.__name__
+        policy = self.policy_for(adapter_type)
+        attempt = call
+        if policy.hedge:
+            attempt = lambda: self._hedged(adapter_type, policy, call)
+        return self._with_retries(adapter_type, policy, attempt, True)
+    
+    def _with_retries(self, adapter_type: str, policy: RetryPolicy,
+                      call: Callable[[], Any], retryable: bool) -> Any:
+        stats = self._stats_for(adapter_type)
+        attempts = policy.max_attempts if retryable else 1
+        for attempt in range(attempts):
+            started = time.monotonic()
+            try:
+                result = call()
+            except policy.retry_on as e:
+                if isinstance(e, NEVER_RETRIED):
+                    raise
+                if attempt + 1 >= attempts:
+                    if retryable:
+                        with self._lock:
+                            stats.exhausted += 1
+                    raise
+                delay = policy.backoff(attempt)
+                logger.debug(f"Retrying {adapter_type} call in {delay:.3f}s after: {str(e)}")
+                with self._lock:
+                    stats.retries += 1
+                time.sleep(delay)
+                continue
+            stats.latency.record(time.monotonic() - started)
+            with self._lock:
+                stats.calls += 1
+            return result
+    
+    def _hedge_delay(self, stats: _TypeStats, policy: RetryPolicy) -> float:
+        if stats.latency.count < policy.min_samples:
+            return policy.initial_hedge_delay
+        return stats.latency.percentile(policy.hedge_percentile)
+    
+    def _hedged(self, adapter_type: str, policy: RetryPolicy,
+                call: Callable[[], Any]) -> Any:
+        stats = self._stats_for(adapter_type)
+        started = time.monotonic()
+        primary = self._executor.submit(call)
+        done, _ = wait([primary], timeout=self._hedge_delay(stats, policy))
+        if done:
+            return primary.result()
+        
+        with self._lock:
+            stats.hedges += 1
+        hedge = self._executor.submit(call)
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                if future is hedge:
+                    self._record_hedge_win(stats, started, primary)
+                return future.result()
+        raise error  # type: ignore[misc]
+    
+    def _record_hedge_win(self, stats: _TypeStats, started: float, primary: Future) -> None:
+        answered = time.monotonic()
+        with self._lock:
+            stats.hedge_wins += 1
+        
+        def record_saving(_: Future) -> None:
+            # Time the caller would have kept waiting for the primary
+            stats.saved.record(max(time.monotonic() - answered, 0.0))
+        primary.add_done_callback(record_saving)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get retry and hedging metrics per adapter type.
+        
+        Returns:
+            Counters, call latency and tail latency saved by hedging
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            adapter_type: {
+                'calls': s.calls,
+                'retries': s.retries,
+                'exhausted': s.exhausted,
+                'hedges': s.hedges,
+                'hedgeWins': s.hedge_wins,
+                'latency': s.latency.snapshot(),
+                'hedgeSaved': s.saved.snapshot()
+            }
+            for adapter_type, s in stats.items()
+        }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the hedging executor.
+        
+        Args:
+            wait: Block until running hedged reads have returned
+        """
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,383 @@
+"""Automation rules triggered by device state changes."""
+
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition
+import secrets
+import time
+import logging
+
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import (
+    DeviceNotFoundError, InvalidRuleError, RuleNotFoundError, SmartHomeHarmonizerError
+)
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+RULES_CLIENT_ID = 'rules'
+
+CONDITIONS = ('becomes', 'above', 'below')
+
+
+def _scope(spec: Dict[str, Any], what: str) -> Tuple[str, str]:
+    """Get ('device', ID) or ('type', adapter class name) from a trigger or action."""
+    scopes = [key for key in ('deviceId', 'deviceType') if spec.get(key) is not None]
+    if len(scopes) != 1 or not isinstance(spec[scopes[0]], str):
+        raise InvalidRuleError(f"{what} needs exactly one of deviceId or deviceType")
+    return ('device' if scopes[0] == 'deviceId' else 'type'), spec[scopes[0]]
+
+
+class Rule:
+    """When a field of a device (or any device of a type) changes, run commands."""
+    
+    def __init__(self, rule_id: str, spec: Dict[str, Any]):
+        """Validate and parse a rule definition.
+        
+        Args:
+            rule_id: Rule ID
+            spec: Definition with ``when`` and ``then``. ``when`` holds
+                ``deviceId`` or ``deviceType`` (adapter class name),
+                ``field`` and at most one of ``becomes`` (a value),
+                ``above`` or ``below`` (a number); without one, any change
+                of the field triggers. ``then`` is a list of actions with
+                ``deviceId`` or ``deviceType``, ``command`` and optional
+                ``parameters``.
+                
+        Raises:
+            InvalidRuleError: If the definition is invalid
+        """
+        if not isinstance(spec, dict) or not isinstance(spec.get('when'), dict):
+            raise InvalidRuleError("Rule needs a when object")
+        when = spec['when']
+        self.id = rule_id
+        self.scope, self.target = _scope(when, 'when')
+        self.field = when.get('field')
+        if not isinstance(self.field, str):
+            raise InvalidRuleError("when needs a field")
+        conditions = [key for key in CONDITIONS if key in when]
+        if len(conditions) > 1:
+            raise InvalidRuleError(f"when takes at most one of {', '.join(CONDITIONS)}")
+        self.condition = conditions[0] if conditions else None
+        self.value = when.get(self.condition) if self.condition else None
+        if self.condition == 'becomes':
+            try:
+                hash(self.value)
+            except TypeError:
+                raise InvalidRuleError("becomes must be a string, number, boolean or null")
+        elif self.condition is not None and (isinstance(self.value, bool)
+                                             or not isinstance(self.value, (int, float))):
+            raise InvalidRuleError(f"{self.condition} must be a number")
+        
+        actions = spec.get('then')
+        if isinstance(actions, dict):
+            actions = [actions]
+        if not isinstance(actions, list) or not actions:
+            raise InvalidRuleError("Rule needs at least one action in then")
+        self.actions: List[Dict[str, Any]] = []
+        for action in actions:
+            if not isinstance(action, dict) or not isinstance(action.get('command'), str):
+                raise InvalidRuleError("Each action needs a command")
+            scope, target = _scope(action, 'Each action')
+            parameters = action.get('parameters') or {}
+            if not isinstance(parameters, dict):
+                raise InvalidRuleError("Action parameters must be an object")
+            self.actions.append({'scope': scope, 'target': target,
+                                 'command': action['command'], 'parameters': parameters})
+        self.fired = 0
+    
+    def matches(self, old: Any, new: Any) -> bool:
+        """Check whether a field changing from old to new triggers the rule."""
+        if self.condition is None:
+            return True
+        if self.condition == 'becomes':
+            return new == self.value
+        if isinstance(new, bool) or not isinstance(new, (int, float)):
+            return False
+        above = self.condition == 'above'
+        if (new > self.value) if above else (new < self.value):
+            # Only crossing the threshold triggers, not moving beyond it
+            if isinstance(old, bool) or not isinstance(old, (int, float)):
+                return True
+            return not ((old > self.value) if above else (old < self.value))
+        return False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the definition and fire count."""
+        key = {'device': 'deviceId', 'type': 'deviceType'}
+        when = {key[self.scope]: self.target, 'field': self.field}
+        if self.condition is not None:
+            when[self.condition] = self.value
+        return {
+            'id': self.id,
+            'when': when,
+            'then': [{key[a['scope']]: a['target'], 'command': a['command'],
+                      'parameters': a['parameters']} for a in self.actions],
+            'fired': self.fired
+        }
+
+
+class _Bucket:
+    """Rules watching one field of one device or adapter type."""
+    
+    __slots__ = ('equals', 'others')
+    
+    def __init__(self):
+        # ``becomes`` rules by expected value, so other values skip them
+        self.equals: Dict[Any, Dict[str, Rule]] = {}
+        self.others: Dict[str, Rule] = {}
+
+
+class RuleEngine:
+    """Runs automation rules when device state changes.
+    
+    Rules are indexed by ``(device ID, field)`` or ``(adapter type,
+    field)``, and ``becomes`` rules further by their expected value, so a
+    state change only evaluates rules watching a field that changed to a
+    value that could match; the cost per event does not grow with the
+    number of unrelated rules. Triggers are edge-sensitive: a rule fires
+    when the field changes into its condition, not on every notification.
+    
+    Actions run as ordinary commands on a worker pool, never inside the
+    state listener, so devices' locks are never nested. Each action
+    remembers the chain of rules that led to it; the state change it
+    causes on the target device inherits that chain. A rule reappearing in
+    its own chain is a loop and does not fire again, and chains longer
+    than ``max_depth`` rules are cut off. Both are counted and logged.
+    
+    Changes are detected against the last state the engine saw for a
+    device, taken from the manager at start; the first notification for a
+    device registered later only records its baseline.
+    """
+    
+    def __init__(self, manager: DeviceManager, max_depth: int = 8, workers: int = 4):
+        """Initialize the engine and subscribe to state changes.
+        
+        Args:
+            manager: Device manager whose state changes trigger rules
+            max_depth: Most rules one external change may set off in sequence
+            workers: Threads executing rule actions
+        """
+        if max_depth < 1:
+            raise ValueError("max_depth must be at least 1")
+        self._manager = manager
+        self.max_depth = max_depth
+        self._condition = Condition()
+        self._rules: Dict[str, Rule] = {}
+        self._index: Dict[Tuple[str, str, str], _Bucket] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._types: Dict[str, str] = {}
+        # Rule chain behind the command currently running on a device
+        self._causes: Dict[str, Tuple[str, ...]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rule-engine')
+        self._pending = 0
+        self._events = 0
+        self._evaluated = 0
+        self._fired = 0
+        self._actions = 0
+        self._failed = 0
+        self._loops = 0
+        self._depth_limited = 0
+        self._latency = LatencyTracker()
+        
+        for device_id in manager.device_ids():
+            try:
+                self._last[device_id] = manager.get_device_state(device_id)
+            except DeviceNotFoundError:
+                continue
+        manager.add_listener(self.handle)
+        manager.register_metrics('rules', self.get_metrics)
+    
+    def add_rule(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a rule.
+        
+        Args:
+            spec: Rule definition (see Rule)
+            
+        Returns:
+            The added rule
+            
+        Raises:
+            InvalidRuleError: If the definition is invalid
+        """
+        rule = Rule(f'rule-{secrets.token_hex(6)}', spec)
+        with self._condition:
+            self._rules[rule.id] = rule
+            bucket = self._index.setdefault((rule.scope, rule.target, rule.field), _Bucket())
+            if rule.condition == 'becomes':
+                bucket.equals.setdefault(rule.value, {})[rule.id] = rule
+            else:
+                bucket.others[rule.id] = rule
+        return rule.to_dict()
+    
+    def remove_rule(self, rule_id: str) -> None:
+        """Delete a rule.
+        
+        Args:
+            rule_id: Rule ID
+            
+        Raises:
+            RuleNotFoundError: If the rule does not exist
+        """
+        with self._condition:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                raise RuleNotFoundError(f"Rule {rule_id} not found")
+            key = (rule.scope, rule.target, rule.field)
+            bucket = self._index[key]
+            if rule.condition == 'becomes':
+                bucket.equals[rule.value].pop(rule_id)
+                if not bucket.equals[rule.value]:
+                    del bucket.equals[rule.value]
+            else:
+                bucket.others.pop(rule_id)
+            if not bucket.equals and not bucket.others:
+                del self._index[key]
+    
+    def list_rules(self) -> List[Dict[str, Any]]:
+        """List rules in the order they were added.
+        
+        Returns:
+            Rules with their fire counts
+        """
+        with self._condition:
+            return [rule.to_dict() for rule in self._rules.values()]
+    
+    def _type_of(self, device_id: str) -> Optional[str]:
+        device_type = self._types.get(device_id)
+        if device_type is None:
+            try:
+                device_type = self._manager.get_device(device_id).__class__.__name__
+            except DeviceNotFoundError:
+                return None
+            self._types[device_id] = device_type
+        return device_type
+    
+    def handle(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Evaluate the rules watching the fields that changed; the state listener.
+        
+        Args:
+            device_id: Device whose state changed
+            state: New device state
+        """
+        started = time.perf_counter()
+        device_type = self._type_of(device_id)
+        triggered: List[Rule] = []
+        with self._condition:
+            self._events += 1
+            previous = self._last.get(device_id)
+            self._last[device_id] = state
+            if previous is None:
+                # First state seen for a device registered later: baseline only
+                return
+            chain = self._causes.get(device_id, ())
+            for field, value in state.items():
+                old = previous.get(field)
+                if field in previous and old == value:
+                    continue
+                for key in (('device', device_id, field), ('type', device_type, field)):
+                    bucket = self._index.get(key)
+                    if bucket is None:
+                        continue
+                    candidates = list(bucket.others.values())
+                    try:
+                        candidates.extend(bucket.equals.get(value, {}).values())
+                    except TypeError:
+                        # Unhashable values (e.g. colors) cannot equal a becomes value
+                        pass
+                    self._evaluated += len(candidates)
+                    triggered.extend(rule for rule in candidates if rule.matches(old, value))
+            for rule in triggered:
+                self._fire(rule, chain)
+        self._latency.record(time.perf_counter() - started)
+    
+    def _fire(self, rule: Rule, chain: Tuple[str, ...]) -> None:
+        """Queue a triggered rule's actions; caller holds the lock."""
+        if rule.id in chain:
+            self._loops += 1
+            logger.warning(f"Rule loop stopped: {' -> '.join(chain + (rule.id,))}")
+            return
+        if len(chain) >= self.max_depth:
+            self._depth_limited += 1
+            logger.warning(f"Rule cascade cut off after {len(chain)} rules at {rule.id}")
+            return
+        rule.fired += 1
+        self._fired += 1
+        chain = chain + (rule.id,)
+        for action in rule.actions:
+            self._pending += 1
+            self._executor.submit(self._run_action, action, chain)
+    
+    def _targets(self, action: Dict[str, Any]) -> List[str]:
+        if action['scope'] == 'device':
+            return [action['target']]
+        return [device_id for device_id in self._manager.device_ids()
+                if self._type_of(device_id) == action['target']]
+    
+    def _run_action(self, action: Dict[str, Any], chain: Tuple[str, ...]) -> None:
+        try:
+            for device_id in self._targets(action):
+                with self._condition:
+                    self._causes[device_id] = chain
+                try:
+                    self._manager.execute_command(device_id, action['command'],
+                                                  action['parameters'],
+                                                  client_id=RULES_CLIENT_ID)
+                    ok = True
+                except SmartHomeHarmonizerError as e:
+                    logger.warning(f"Rule action {action['command']} on {device_id} "
+                                   f"failed: {str(e)}")
+                    ok = False
+                finally:
+                    with self._condition:
+                        if self._causes.get(device_id) is chain:
+                            del self._causes[device_id]
+                with self._condition:
+                    self._actions += 1
+                    self._failed += not ok
+        except Exception as e:
+            logger.error(f"Rule action failed: {str(e)}", exc_info=True)
+        finally:
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued action, including cascades, has run.
+        
+        Args:
+            timeout: Seconds to wait at most (None waits forever)
+            
+        Returns:
+            True if idle, False on timeout
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get rule counts, evaluation cost and cascade statistics.
+        
+        Returns:
+            Rules, events, rule evaluations, fired rules, actions, loops
+            and cut-off cascades, and evaluation latency per event
+        """
+        with self._condition:
+            metrics = {
+                'rules': len(self._rules),
+                'indexedKeys': len(self._index),
+                'events': self._events,
+                'evaluated': self._evaluated,
+                'fired': self._fired,
+                'actions': self._actions,
+                'failedActions': self._failed,
+                'pendingActions': self._pending,
+                'loopsDetected': self._loops,
+                'depthLimited': self._depth_limited
+            }
+        metrics['evaluationLatency'] = self._latency.snapshot()
+        return metrics
+    
+    def stop(self) -> None:
+        """Stop reacting to state changes and finish queued actions."""
+        self._manager.remove_listener(self.handle)
+        self._executor.shutdown(wait=True)
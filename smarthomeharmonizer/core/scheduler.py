@@ -0,0 +1,595 @@
+"""One-shot, cron and sunrise/sunset command schedules on a min-heap."""
+
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from threading import Condition, Thread
+import heapq
+import itertools
+import math
+import secrets
+import time
+import logging
+
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import (
+    InvalidCommandError, InvalidScheduleError, ScheduleNotFoundError, SmartHomeHarmonizerError
+)
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # pragma: no cover - Python 3.8
+    from backports.zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_CLIENT_ID = 'scheduler'
+
+# (name, minimum, maximum) of the five cron fields; weekday 7 is also Sunday
+CRON_FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day of month', 1, 31),
+               ('month', 1, 12), ('day of week', 0, 7))
+
+# Years searched for the next cron match before giving up (covers 29 February)
+CRON_SEARCH_YEARS = 8
+
+SUN_EVENTS = ('sunrise', 'sunset')
+
+
+class CronExpression:
+    """Five-field cron expression: minute, hour, day of month, month, day of week.
+    
+    Fields accept ``*``, numbers, ranges (``1-5``), lists (``1,15``) and
+    steps (``*/15``, ``8-18/2``). Day of week 0 and 7 are Sunday. As in
+    cron, when both day fields are restricted a day matching either runs.
+    """
+    
+    def __init__(self, expression: str):
+        """Parse the expression.
+        
+        Args:
+            expression: Cron expression such as ``0 22 * * 1-5``
+            
+        Raises:
+            InvalidScheduleError: If the expression is malformed
+        """
+        parts = expression.split() if isinstance(expression, str) else []
+        if len(parts) != 5:
+            raise InvalidScheduleError("cron needs 5 fields: minute hour day month weekday")
+        self.expression = ' '.join(parts)
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(part, *field) for part, field in zip(parts, CRON_FIELDS)
+        )
+        self.weekdays = sorted({day % 7 for day in weekdays})
+        self._any_day = parts[2].startswith('*')
+        self._any_weekday = parts[4].startswith('*')
+    
+    @staticmethod
+    def _parse(part: str, name: str, low: int, high: int) -> List[int]:
+        values = set()
+        try:
+            for item in part.split(','):
+                spec, _, step = item.partition('/')
+                if spec == '*':
+                    start, end = low, high
+                elif '-' in spec:
+                    start, end = (int(bound) for bound in spec.split('-', 1))
+                else:
+                    start = int(spec)
+                    end = high if step else start
+                step = int(step) if step else 1
+                if not low <= start <= end <= high or step < 1:
+                    raise ValueError(item)
+                values.update(range(start, end + 1, step))
+        except ValueError:
+            raise InvalidScheduleError(f"Invalid cron {name} field '{part}'")
+        return sorted(values)
+    
+    def _day_matches(self, day: datetime) -> bool:
+        in_month = day.day in self.days
+        in_week = day.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return (self._any_day or in_month) and (self._any_weekday or in_week)
+        return in_month or in_week
+    
+    def next_after(self, after: datetime) -> Optional[datetime]:
+        """Get the first matching minute after a local time.
+        
+        Jumps a month, day or hour at a time when that field does not
+        match, so a search takes at most a few hundred steps.
+        
+        Args:
+            after: Naive local time
+            
+        Returns:
+            Naive local time of the next match, or None if none follows
+            within CRON_SEARCH_YEARS years
+        """
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        while t.year <= after.year + CRON_SEARCH_YEARS:
+            if t.month not in self.months:
+                t = (t.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+            elif t.hour not in self.hours:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+            else:
+                minute = next((m for m in self.minutes if m >= t.minute), None)
+                if minute is not None:
+                    return t.replace(minute=minute)
+                t = (t + timedelta(hours=1)).replace(minute=0)
+        return None
+
+
+def sun_event(event: str, latitude: float, longitude: float, day: date) -> Optional[float]:
+    """Compute sunrise or sunset with the standard sunrise equation.
+    
+    Accurate to about a minute away from the poles.
+    
+    Args:
+        event: ``sunrise`` or ``sunset``
+        latitude: Degrees north
+        longitude: Degrees east
+        day: Date of the solar noon the event belongs to
+        
+    Returns:
+        Epoch seconds of the event, or None during polar day or night
+    """
+    # Days since the J2000 epoch, shifted to the mean solar noon at this longitude
+    mean_noon = day.toordinal() - date(2000, 1, 1).toordinal() - longitude / 360
+    anomaly = math.radians((357.5291 + 0.98560028 * mean_noon) % 360)
+    center = (1.9148 * math.sin(anomaly) + 0.02 * math.sin(2 * anomaly)
+              + 0.0003 * math.sin(3 * anomaly))
+    ecliptic = math.radians((math.degrees(anomaly) + center + 180 + 102.9372) % 360)
+    transit = 2451545.0 + mean_noon + 0.0053 * math.sin(anomaly) - 0.0069 * math.sin(2 * ecliptic)
+    declination = math.asin(math.sin(ecliptic) * math.sin(math.radians(23.4397)))
+    phi = math.radians(latitude)
+    cos_hour_angle = ((math.sin(math.radians(-0.833)) - math.sin(phi) * math.sin(declination))
+                      / (math.cos(phi) * math.cos(declination)))
+    if not -1 <= cos_hour_angle <= 1:
+        return None
+    half_day = math.degrees(math.acos(cos_hour_angle)) / 360
+    julian = transit + half_day if event == 'sunset' else transit - half_day
+    return (julian - 2440587.5) * 86400
+
+
+def _timezone(name: Any) -> tzinfo:
+    if name is None or name == 'UTC':
+        return timezone.utc
+    if not isinstance(name, str):
+        raise InvalidScheduleError("timezone must be a string")
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise InvalidScheduleError(f"Unknown timezone '{name}'")
+
+
+def _number(spec: Dict[str, Any], key: str, low: float, high: float, default: Any = None) -> float:
+    value = spec.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+        raise InvalidScheduleError(f"{key} must be a number between {low} and {high}")
+    return float(value)
+
+
+class Schedule:
+    """A command run once (``at``), on a cron expression or at sunrise/sunset."""
+    
+    def __init__(self, schedule_id: str, spec: Dict[str, Any]):
+        """Validate and parse a schedule definition.
+        
+        Args:
+            schedule_id: Schedule ID
+            spec: Definition with ``deviceId``, ``command``, optional
+                ``parameters``, ``priority``, ``enabled`` and ``timezone``
+                (IANA name, default UTC), and exactly one of ``at`` (ISO
+                8601 time or epoch seconds), ``cron`` or ``sun``
+                (``{"event": "sunset", "latitude": ..., "longitude": ...,
+                "offsetMinutes": 0}``)
+                
+        Raises:
+            InvalidScheduleError: If the definition is invalid
+        """
+        if not isinstance(spec, dict):
+            raise InvalidScheduleError("Schedule must be an object")
+        self.id = schedule_id
+        self.device_id = spec.get('deviceId')
+        self.command = spec.get('command')
+        if not isinstance(self.device_id, str) or not isinstance(self.command, str):
+            raise InvalidScheduleError("Schedule needs deviceId and command")
+        self.parameters = spec.get('parameters') or {}
+        if not isinstance(self.parameters, dict):
+            raise InvalidScheduleError("parameters must be an object")
+        self.priority = spec.get('priority')
+        self.enabled = spec.get('enabled', True) is not False
+        self.timezone = spec.get('timezone', 'UTC')
+        self._tz = _timezone(self.timezone)
+        
+        triggers = [key for key in ('at', 'cron', 'sun') if spec.get(key) is not None]
+        if len(triggers) != 1:
+            raise InvalidScheduleError("Schedule needs exactly one of at, cron or sun")
+        self.kind = triggers[0]
+        self.at: Optional[float] = None
+        self.cron: Optional[CronExpression] = None
+        self.sun: Optional[Dict[str, Any]] = None
+        if self.kind == 'at':
+            self.at = self._parse_at(spec['at'])
+        elif self.kind == 'cron':
+            self.cron = CronExpression(spec['cron'])
+        else:
+            self.sun = self._parse_sun(spec['sun'])
+        
+        self.generation = 0
+        self.next_run: Optional[float] = None
+        self.last_run: Optional[float] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.runs = 0
+    
+    def _parse_at(self, value: Any) -> float:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        try:
+            moment = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidScheduleError("at must be an ISO 8601 time or epoch seconds")
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=self._tz)
+        return moment.timestamp()
+    
+    @staticmethod
+    def _parse_sun(value: Any) -> Dict[str, Any]:
+        if not isinstance(value, dict) or value.get('event') not in SUN_EVENTS:
+            raise InvalidScheduleError(f"sun needs an event, one of {', '.join(SUN_EVENTS)}")
+        return {
+            'event': value['event'],
+            'latitude': _number(value, 'latitude', -90, 90),
+            'longitude': _number(value, 'longitude', -180, 180),
+            'offsetMinutes': _number(value, 'offsetMinutes', -720, 720, default=0)
+        }
+    
+    def next_after(self, after: float) -> Optional[float]:
+        """Get the first run time strictly after a moment.
+        
+        Args:
+            after: Epoch seconds
+            
+        Returns:
+            Epoch seconds of the next run, or None if the schedule is over
+        """
+        if self.kind == 'at':
+            return self.at if self.at > after else None
+        if self.kind == 'cron':
+            local = datetime.fromtimestamp(after, self._tz).replace(tzinfo=None)
+            while True:
+                local = self.cron.next_after(local)
+                if local is None:
+                    return None
+                moment = local.replace(tzinfo=self._tz).timestamp()
+                # A wall time repeated by a DST change may map before `after`
+                if moment > after:
+                    return moment
+        
+        offset = self.sun['offsetMinutes'] * 60
+        day = datetime.fromtimestamp(after, timezone.utc).date()
+        for days in range(-1, 367):
+            moment = sun_event(self.sun['event'], self.sun['latitude'], self.sun['longitude'],
+                               day + timedelta(days=days))
+            if moment is not None and moment + offset > after:
+                return moment + offset
+        return None
+    
+    def _format(self, moment: Optional[float]) -> Optional[str]:
+        if moment is None:
+            return None
+        return datetime.fromtimestamp(moment, self._tz).isoformat()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the definition and run status for the API."""
+        result = {
+            'id': self.id,
+            'deviceId': self.device_id,
+            'command': self.command,
+            'parameters': self.parameters,
+            'priority': self.priority,
+            'enabled': self.enabled,
+            'timezone': self.timezone
+        }
+        if self.kind == 'at':
+            result['at'] = self._format(self.at)
+        elif self.kind == 'cron':
+            result['cron'] = self.cron.expression
+        else:
+            result['sun'] = dict(self.sun)
+        result.update({
+            'nextRun': self._format(self.next_run),
+            'lastRun': self._format(self.last_run),
+            'lastResult': self.last_result,
+            'runs': self.runs
+        })
+        return result
+
+
+class CommandScheduler:
+    """Runs device commands at scheduled times.
+    
+    The next run of every enabled schedule sits in a min-heap of ``(time,
+    sequence, schedule ID, generation)``; editing or deleting a schedule
+    bumps its generation, so stale heap entries are skipped when popped
+    instead of searched for. A driver thread sleeps until the earliest
+    run, but never longer than ``max_sleep`` seconds of the monotonic
+    clock, so a clock change or a suspended host is noticed promptly.
+    
+    Everything due at once is popped as one batch and executed through
+    ``DeviceManager.execute_command`` in chunks of ``batch_size`` on a
+    worker pool. After a suspend, a schedule runs once if it had a run
+    within the last ``misfire_grace`` seconds and is skipped (recorded as
+    missed) otherwise; its next run is computed directly from the current
+    time instead of replaying every missed occurrence.
+    """
+    
+    def __init__(self, manager: DeviceManager, batch_size: int = 100,
+                 max_concurrency: int = 8, misfire_grace: float = 3600.0,
+                 max_sleep: float = 30.0, clock=time.time):
+        """Initialize the scheduler.
+        
+        Args:
+            manager: Device manager executing scheduled commands
+            batch_size: Maximum commands handed to one worker at a time
+            max_concurrency: Worker threads executing due commands
+            misfire_grace: Seconds a run may be late and still happen
+            max_sleep: Longest seconds between wall clock checks
+            clock: Wall clock in epoch seconds (injectable for tests)
+        """
+        if batch_size < 1 or max_concurrency < 1:
+            raise ValueError("batch_size and max_concurrency must be at least 1")
+        self._manager = manager
+        self.batch_size = batch_size
+        self.misfire_grace = misfire_grace
+        self.max_sleep = max_sleep
+        self._clock = clock
+        self._condition = Condition()
+        self._schedules: Dict[str, Schedule] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._sequence = itertools.count()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='command-scheduler')
+        self._thread: Optional[Thread] = None
+        self._running = False
+        self._fired = 0
+        self._failed = 0
+        self._missed = 0
+        self._batches = 0
+        self._largest_batch = 0
+        self._batch_latency = LatencyTracker()
+        
+        manager.register_metrics('scheduler', self.get_metrics)
+    
+    def _validate(self, schedule: Schedule) -> None:
+        device = self._manager.get_device(schedule.device_id)
+        if (schedule.command not in device.get_supported_commands()
+                and schedule.command not in device.RELATIVE_COMMANDS):
+            raise InvalidCommandError(
+                f"Command '{schedule.command}' not supported by device {schedule.device_id}"
+            )
+    
+    def _plan(self, schedule: Schedule, after: float) -> None:
+        """Set the next run and push it on the heap; caller holds the lock."""
+        schedule.generation += 1
+        schedule.next_run = schedule.next_after(after) if schedule.enabled else None
+        if schedule.next_run is not None:
+            heapq.heappush(self._heap, (schedule.next_run, next(self._sequence),
+                                        schedule.id, schedule.generation))
+        # Drop stale entries once they outnumber live ones
+        if len(self._heap) > 2 * len(self._schedules) + 64:
+            self._heap = [entry for entry in self._heap
+                          if entry[2] in self._schedules
+                          and self._schedules[entry[2]].generation == entry[3]]
+            heapq.heapify(self._heap)
+        self._condition.notify()
+    
+    def create_schedule(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a schedule.
+        
+        Args:
+            spec: Schedule definition (see Schedule)
+            
+        Returns:
+            The created schedule
+            
+        Raises:
+            InvalidScheduleError: If the definition is invalid or never runs
+            DeviceNotFoundError: If the device is not registered
+            InvalidCommandError: If the device does not support the command
+        """
+        return self._store(Schedule(f'sched-{secrets.token_hex(6)}', spec))
+    
+    def replace_schedule(self, schedule_id: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the definition of a schedule, keeping its ID.
+        
+        Args:
+            schedule_id: Schedule ID
+            spec: New schedule definition
+            
+        Returns:
+            The updated schedule
+            
+        Raises:
+            ScheduleNotFoundError: If the schedule does not exist
+        """
+        self.get_schedule(schedule_id)
+        return self._store(Schedule(schedule_id, spec))
+    
+    def _store(self, schedule: Schedule) -> Dict[str, Any]:
+        self._validate(schedule)
+        now = self._clock()
+        if schedule.enabled and schedule.next_after(now) is None:
+            raise InvalidScheduleError("Schedule has no run in the future")
+        with self._condition:
+            previous = self._schedules.get(schedule.id)
+            if previous is not None:
+                schedule.generation = previous.generation
+            self._schedules[schedule.id] = schedule
+            self._plan(schedule, now)
+            return schedule.to_dict()
+    
+    def delete_schedule(self, schedule_id: str) -> None:
+        """Delete a schedule.
+        
+        Args:
+            schedule_id: Schedule ID
+            
+        Raises:
+            ScheduleNotFoundError: If the schedule does not exist
+        """
+        with self._condition:
+            if self._schedules.pop(schedule_id, None) is None:
+                raise ScheduleNotFoundError(f"Schedule {schedule_id} not found")
+    
+    def get_schedule(self, schedule_id: str) -> Dict[str, Any]:
+        """Get a schedule and its run status.
+        
+        Args:
+            schedule_id: Schedule ID
+            
+        Returns:
+            The schedule
+            
+        Raises:
+            ScheduleNotFoundError: If the schedule does not exist
+        """
+        with self._condition:
+            schedule = self._schedules.get(schedule_id)
+            if schedule is None:
+                raise ScheduleNotFoundError(f"Schedule {schedule_id} not found")
+            return schedule.to_dict()
+    
+    def list_schedules(self, device_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List schedules ordered by next run, finished ones last.
+        
+        Args:
+            device_id: Only list schedules of this device
+            
+        Returns:
+            Schedules
+        """
+        with self._condition:
+            schedules = [s for s in self._schedules.values()
+                         if device_id is None or s.device_id == device_id]
+            schedules.sort(key=lambda s: (s.next_run is None, s.next_run or 0))
+            return [s.to_dict() for s in schedules]
+    
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Execute every schedule due by now as one batch.
+        
+        Called by the driver thread; call it directly to drive a scheduler
+        that was not started.
+        
+        Args:
+            now: Wall clock time (defaults to the clock)
+            
+        Returns:
+            Number of commands executed
+        """
+        if now is None:
+            now = self._clock()
+        batch: List[Schedule] = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                run_at, _, schedule_id, generation = heapq.heappop(self._heap)
+                schedule = self._schedules.get(schedule_id)
+                if schedule is None or schedule.generation != generation:
+                    continue
+                # Late beyond the grace period: run only if a later occurrence
+                # still falls inside it, e.g. after a suspend
+                recent = (run_at if now - run_at <= self.misfire_grace
+                          else schedule.next_after(now - self.misfire_grace))
+                if recent is not None and recent <= now:
+                    batch.append(schedule)
+                else:
+                    self._missed += 1
+                    schedule.last_result = {
+                        'success': False, 'error': 'Missed: due more than misfire_grace ago'
+                    }
+                self._plan(schedule, now)
+            if batch:
+                self._batches += 1
+                self._largest_batch = max(self._largest_batch, len(batch))
+        if not batch:
+            return 0
+        
+        started = time.monotonic()
+        chunks = [batch[i:i + self.batch_size] for i in range(0, len(batch), self.batch_size)]
+        wait([self._executor.submit(self._run_chunk, chunk, now) for chunk in chunks])
+        self._batch_latency.record(time.monotonic() - started)
+        return len(batch)
+    
+    def _run_chunk(self, chunk: List[Schedule], now: float) -> None:
+        for schedule in chunk:
+            try:
+                self._manager.execute_command(schedule.device_id, schedule.command,
+                                              schedule.parameters, priority=schedule.priority,
+                                              client_id=SCHEDULER_CLIENT_ID)
+                result = {'success': True, 'error': None}
+            except SmartHomeHarmonizerError as e:
+                result = {'success': False, 'error': str(e)}
+            except Exception as e:
+                logger.error(f"Schedule {schedule.id} failed: {str(e)}", exc_info=True)
+                result = {'success': False, 'error': 'Internal error'}
+            with self._condition:
+                schedule.last_run = now
+                schedule.last_result = result
+                schedule.runs += 1
+                self._fired += 1
+                self._failed += not result['success']
+    
+    def start(self) -> None:
+        """Start the driver thread."""
+        with self._condition:
+            self._running = True
+        self._thread = Thread(target=self._drive, name='command-scheduler-driver', daemon=True)
+        self._thread.start()
+    
+    def _drive(self) -> None:
+        while True:
+            with self._condition:
+                while self._running:
+                    timeout = self.max_sleep
+                    if self._heap:
+                        timeout = min(timeout, self._heap[0][0] - self._clock())
+                    if timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                if not self._running:
+                    return
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error(f"Scheduler run failed: {str(e)}", exc_info=True)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get schedule counts and batch statistics.
+        
+        Returns:
+            Schedules, heap size, run/failure/miss counts and batch latency
+        """
+        with self._condition:
+            metrics = {
+                'schedules': len(self._schedules),
+                'heapEntries': len(self._heap),
+                'fired': self._fired,
+                'failed': self._failed,
+                'missed': self._missed,
+                'batches': self._batches,
+                'largestBatch': self._largest_batch
+            }
+        metrics['batchLatency'] = self._batch_latency.snapshot()
+        return metrics
+    
+    def stop(self) -> None:
+        """Stop the driver thread and the worker pool."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
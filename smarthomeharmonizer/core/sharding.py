@@ -0,0 +1,495 @@
+"""Process-sharded device manager for multi-core adapter workloads."""
+
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+from concurrent.futures import Future
+from threading import Lock, Thread
+import itertools
+import multiprocessing
+import os
+import logging
+
+from smarthomeharmonizer.adapters.base import DeviceAdapter
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import (
+    AdapterError, DeviceNotFoundError, SmartHomeHarmonizerError
+)
+from smarthomeharmonizer.core.change_log import ChangeLog
+from smarthomeharmonizer.core.hashing import ConsistentHashRing
+from smarthomeharmonizer.core.timer_wheel import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+
+def _shard_main(conn) -> None:
+    """Serve DeviceManager calls received over a pipe until told to stop.
+    
+    Replies are ``(request_id, ok, result)`` tuples. After a ``subscribe``
+    call, state changes are also pushed as ``(None, device_id, state)``.
+    Each shard runs its own timing wheel for adapters' timed transitions.
+    State changes are pushed from whichever thread made them, such as the
+    wheel's driver, so every send goes through one lock.
+    """
+    timers = TimerWheel()
+    timers.start()
+    manager = DeviceManager(timers=timers)
+    send_lock = Lock()
+    
+    def send(message: Tuple[Any, Any, Any]) -> None:
+        with send_lock:
+            conn.send(message)
+    
+    def forward(device_id: str, state: Dict[str, Any]) -> None:
+        send((None, device_id, state))
+    
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        
+        request_id, method, args = message
+        if method == 'subscribe':
+            manager.add_listener(forward)
+            send((request_id, True, None))
+            continue
+        try:
+            response: Tuple[int, bool, Any] = (request_id, True, getattr(manager, method)(*args))
+        except Exception as e:
+            response = (request_id, False, e)
+        try:
+            send(response)
+        except Exception as e:
+            # Result or exception was not picklable
+            send((request_id, False, AdapterError(str(e))))
+    timers.stop()
+    conn.close()
+
+
+class _ShardClient:
+    """Parent-side handle multiplexing concurrent calls onto one shard pipe."""
+    
+    def __init__(self, index: int, context, on_state_change):
+        self.index = index
+        self._on_state_change = on_state_change
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_shard_main, args=(child_conn,),
+            name=f'smarthomeharmonizer-shard-{index}', daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        
+        self._send_lock = Lock()
+        # Separate from the send lock: a sender blocked on a full pipe must
+        # not stop the reader from draining replies
+        self._pending_lock = Lock()
+        self._pending: Dict[int, Future] = {}
+        self._stopped: Optional[Exception] = None
+        self._ids = itertools.count()
+        self._reader = Thread(target=self._read_responses, daemon=True)
+    
+    def start_reader(self) -> None:
+        # Started only once every shard is forked, so no child inherits
+        # the parent with reader threads running
+        self._reader.start()
+    
+    def _read_responses(self) -> None:
+        while True:
+            try:
+                request_id, ok, result = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            if request_id is None:
+                self._on_state_change(ok, result)
+                continue
+            with self._pending_lock:
+                future = self._pending.pop(request_id)
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+        
+        # Calls submitted from now on fail at once instead of never resolving
+        with self._pending_lock:
+            self._stopped = SmartHomeHarmonizerError(f"Shard {self.index} stopped")
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(self._stopped)
+    
+    def submit(self, method: str, *args: Any) -> Future:
+        future: Future = Future()
+        with self._pending_lock:
+            if self._stopped is not None:
+                future.set_exception(self._stopped)
+                return future
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+        try:
+            with self._send_lock:
+                self._conn.send((request_id, method, args))
+        except Exception as e:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            if not isinstance(e, (OSError, ValueError)):
+                # Arguments that cannot be pickled
+                raise
+            future.set_exception(SmartHomeHarmonizerError(
+                f"Shard {self.index} unreachable: {str(e)}"
+            ))
+        return future
+    
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+    
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._send_lock:
+            try:
+                self._conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._conn.close()
+
+
+class ShardedDeviceManager:
+    """Device manager that spreads devices across worker processes.
+    
+    Devices are assigned to shards by consistent hashing on ``device_id``;
+    each shard is a separate process running its own DeviceManager, so
+    CPU-heavy adapters use every core instead of contending for one GIL.
+    The public API mirrors DeviceManager. Adapters are pickled into their
+    shard on registration, and ``get_device`` returns a snapshot copy.
+    """
+    
+    def __init__(self, shards: Optional[int] = None, replicas: int = 100,
+                 mp_context: Optional[str] = None, timeout: Optional[float] = 30.0):
+        """Start the shard processes.
+        
+        Args:
+            shards: Number of worker processes (defaults to CPU count)
+            replicas: Virtual nodes per shard on the hash ring
+            mp_context: multiprocessing start method (platform default if None)
+            timeout: Seconds to wait for a shard reply (None waits forever)
+        """
+        shards = shards or os.cpu_count() or 1
+        context = multiprocessing.get_context(mp_context)
+        self.timeout = timeout
+        self._lock = Lock()
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._metrics_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._change_lock = Lock()
+        self._change_log: Optional[ChangeLog] = None
+        self._shards = [_ShardClient(i, context, self._notify) for i in range(shards)]
+        for shard in self._shards:
+            shard.start_reader()
+        self._ring = ConsistentHashRing(range(shards), replicas=replicas)
+        logger.info(f"ShardedDeviceManager started with {shards} shards")
+    
+    @property
+    def shard_count(self) -> int:
+        """Number of shard processes."""
+        return len(self._shards)
+    
+    def shard_for(self, device_id: str) -> int:
+        """Get the index of the shard owning a device.
+        
+        Args:
+            device_id: Device ID to look up
+            
+        Returns:
+            Shard index
+        """
+        return self._ring.get_node(device_id)
+    
+    def _call(self, device_id: str, method: str, *args: Any) -> Any:
+        shard = self._shards[self.shard_for(device_id)]
+        return shard.submit(method, *args).result(self.timeout)
+    
+    def register_device(self, adapter: DeviceAdapter) -> None:
+        """Register a device adapter on its owning shard.
+        
+        Args:
+            adapter: Picklable device adapter instance to register
+            
+        Raises:
+            ValueError: If device_id already exists
+        """
+        self._call(adapter.device_id, 'register_device', adapter)
+        if self._change_log is not None:
+            self._change_log.record(adapter.device_id, adapter.cached_state())
+    
+    def unregister_device(self, device_id: str) -> None:
+        """Unregister a device.
+        
+        Args:
+            device_id: ID of device to unregister
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        self._call(device_id, 'unregister_device', device_id)
+        if self._change_log is not None:
+            self._change_log.record(device_id)
+    
+    def get_device(self, device_id: str) -> DeviceAdapter:
+        """Get a snapshot copy of a device adapter.
+        
+        Args:
+            device_id: Device ID to retrieve
+            
+        Returns:
+            Copy of the adapter held by the owning shard
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        return self._call(device_id, 'get_device', device_id)
+    
+    def list_devices(self, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """List all registered devices, querying every shard in parallel.
+        
+        Args:
+            fields: Optional projection, passed to the shard managers
+        
+        Returns:
+            List of device information dictionaries
+        """
+        fields = list(fields) if fields is not None else None
+        futures = [shard.submit('list_devices', fields) for shard in self._shards]
+        devices: List[Dict[str, Any]] = []
+        for future in futures:
+            devices.extend(future.result(self.timeout))
+        return devices
+    
+    def describe_device(self, device_id: str,
+                        fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Get device information and state from its shard.
+        
+        Args:
+            device_id: Device ID to describe
+            fields: Optional projection, passed to the shard manager
+            
+        Returns:
+            Device information dictionary
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        fields = list(fields) if fields is not None else None
+        return self._call(device_id, 'describe_device', device_id, fields)
+    
+    def execute_command(self, device_id: str, command: str,
+                        parameters: Optional[Dict[str, Any]] = None,
+                        priority: Optional[str] = None,
+                        client_id: Optional[str] = None,
+                        if_version: Optional[int] = None,
+                        expected: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute a command on the shard owning the device.
+        
+        Args:
+            device_id: Target device ID
+            command: Command to execute
+            parameters: Optional command parameters
+            priority: Optional priority class, passed to the shard manager
+            client_id: Optional caller identity, passed to the shard manager
+            if_version: Only execute if the state version still equals this
+            expected: Only execute if these state fields have these values
+            
+        Returns:
+            Updated device state
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+            InvalidCommandError: If command not supported
+            AdapterError: If command execution fails
+            PreconditionFailedError: If if_version or expected do not match
+        """
+        return self._call(device_id, 'execute_command', device_id, command, parameters,
+                          priority, client_id, if_version, expected)
+    
+    def apply_state(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Overwrite a device state on its shard without executing a command.
+        
+        Args:
+            device_id: Target device ID
+            state: New device state
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        self._call(device_id, 'apply_state', device_id, state)
+    
+    def update_state(self, device_id: str, changes: Dict[str, Any],
+                     expected: Optional[Dict[str, Any]] = None) -> bool:
+        """Change some fields of a device state on its shard.
+        
+        Args:
+            device_id: Target device ID
+            changes: Fields to overwrite
+            expected: Only apply if these state fields have these values
+            
+        Returns:
+            False if expected did not match and nothing was changed
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        return self._call(device_id, 'update_state', device_id, changes, expected)
+    
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Subscribe to device state changes on every shard.
+        
+        Listeners run on the shard reader threads of this process.
+        
+        Args:
+            listener: Callable invoked with (device_id, state)
+        """
+        with self._lock:
+            subscribe = not self._listeners
+            self._listeners.append(listener)
+        if subscribe:
+            for future in [shard.submit('subscribe') for shard in self._shards]:
+                future.result(self.timeout)
+    
+    def remove_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Unsubscribe a state change listener.
+        
+        Args:
+            listener: Previously added listener
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+    
+    def _notify(self, device_id: str, state: Dict[str, Any]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(device_id, state)
+            except Exception as e:
+                logger.error(f"State listener failed for {device_id}: {str(e)}", exc_info=True)
+    
+    def register_metrics(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        """Expose metrics from a component attached to this manager.
+        
+        Args:
+            name: Section name in the metrics report
+            provider: Callable returning a JSON-serializable metrics dict
+        """
+        with self._lock:
+            self._metrics_providers[name] = provider
+    
+    def get_device_state(self, device_id: str) -> Dict[str, Any]:
+        """Get current state of a device from its shard.
+        
+        Args:
+            device_id: Device ID to query
+            
+        Returns:
+            Current device state
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        return self._call(device_id, 'get_device_state', device_id)
+    
+    def get_state_version(self, device_id: str) -> int:
+        """Get the state version of a device from its shard.
+        
+        Args:
+            device_id: Device ID to query
+            
+        Returns:
+            Monotonically increasing state version
+            
+        Raises:
+            DeviceNotFoundError: If device not found
+        """
+        return self._call(device_id, 'get_state_version', device_id)
+    
+    def _changes(self) -> ChangeLog:
+        """Get the change log, subscribing to every shard on first use.
+        
+        Cursors are only handed out after the subscription, so changes
+        made before it are never needed.
+        """
+        with self._change_lock:
+            if self._change_log is None:
+                change_log = ChangeLog()
+                self.add_listener(change_log.record)
+                self.register_metrics('changeLog', change_log.get_metrics)
+                self._change_log = change_log
+            return self._change_log
+    
+    def get_change_cursor(self) -> Dict[str, Any]:
+        """Get the position of the change log, to start a changes_since feed.
+        
+        Returns:
+            Dictionary with the log ``epoch`` and latest ``sequence``
+        """
+        change_log = self._changes()
+        return {'epoch': change_log.epoch, 'sequence': change_log.sequence}
+    
+    def changes_since(self, sequence: int, epoch: Optional[str] = None,
+                      fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Get the devices that changed after a change sequence number.
+        
+        Changed devices are described by their shards, one call each.
+        
+        Args:
+            sequence: Last sequence number the caller has seen
+            epoch: Epoch the sequence was issued in, to detect restarts
+            fields: Optional projection, passed to the shard managers
+            
+        Returns:
+            Dictionary as returned by DeviceManager.changes_since
+        """
+        change_log = self._changes()
+        fields = list(fields) if fields is not None else None
+        current, changed = change_log.since(sequence, epoch)
+        result: Dict[str, Any] = {'epoch': change_log.epoch, 'sequence': current,
+                                  'resync': changed is None, 'devices': [], 'removed': []}
+        for device_id in changed or ():
+            try:
+                result['devices'].append(self.describe_device(device_id, fields))
+            except DeviceNotFoundError:
+                result['removed'].append(device_id)
+        return result
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get sharding metrics.
+        
+        Returns:
+            Shard count, per-shard liveness and registered provider sections
+        """
+        metrics: Dict[str, Any] = {
+            'sharding': {
+                'shards': self.shard_count,
+                'alive': [shard.is_alive() for shard in self._shards]
+            }
+        }
+        with self._lock:
+            providers = dict(self._metrics_providers)
+        for name, provider in providers.items():
+            metrics[name] = provider()
+        return metrics
+    
+    def shutdown(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop all shard processes.
+        
+        Args:
+            timeout: Seconds to wait for each shard to exit
+        """
+        for shard in self._shards:
+            shard.close(timeout)
+        logger.info("ShardedDeviceManager shut down")
+    
+    def __enter__(self) -> 'ShardedDeviceManager':
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
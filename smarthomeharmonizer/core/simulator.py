@@ -0,0 +1,378 @@
+"""Fleet physics simulation on a virtual clock for load testing."""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from array import array
+from threading import Event, Lock, Thread
+import math
+import random
+import time
+import logging
+
+from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import DeviceNotFoundError
+from smarthomeharmonizer.core.timer_wheel import TimerWheel
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Thermostat HVAC modes as stored in the mode array
+MODE_CODES = {'off': 0, 'heat': 1, 'cool': 2, 'auto': 3}
+
+
+class VirtualClock:
+    """Wall clock running ``speed`` times faster than real time.
+    
+    ``advance`` jumps the clock forward; with ``speed=0`` the clock only
+    moves through ``advance``, which makes simulations deterministic.
+    """
+    
+    def __init__(self, speed: float = 1.0, start: Optional[float] = None):
+        """Initialize the clock.
+        
+        Args:
+            speed: Virtual seconds per real second
+            start: Virtual epoch time at creation (defaults to now)
+        """
+        if speed < 0:
+            raise ValueError("speed must not be negative")
+        self.speed = speed
+        self._origin = time.time() if start is None else start
+        self._started = time.monotonic()
+        self._offset = 0.0
+        self._lock = Lock()
+    
+    def now(self) -> float:
+        """Current virtual time in epoch seconds."""
+        with self._lock:
+            return self._origin + (time.monotonic() - self._started) * self.speed + self._offset
+    
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward.
+        
+        Args:
+            seconds: Virtual seconds to skip
+        """
+        with self._lock:
+            self._offset += seconds
+
+
+class _Fleet:
+    """Device IDs of one kind and their index in the column arrays."""
+    
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+    
+    def add(self, device_id: str) -> int:
+        self.index[device_id] = len(self.ids)
+        self.ids.append(device_id)
+        return self.index[device_id]
+
+
+class FleetSimulator:
+    """Advances simulated thermostats, lights and coffee makers over time.
+    
+    Continuous quantities live in per-kind column arrays (one ``array``
+    per field, one slot per device) and every tick updates them with the
+    same precomputed decay factors. Only devices whose visible (rounded)
+    values changed are published, via ``DeviceManager.update_state``, so
+    caches, change logs, history and other listeners see simulated
+    changes exactly like physical ones. Command results reach the
+    simulator through a state listener.
+    
+    Per tick of ``dt`` virtual seconds:
+    
+    * Thermostats relax ``currentTemperature`` toward the setpoint while
+      the HVAC mode calls for it (time constant ``hvac_time_constant``),
+      and toward ``ambient_temperature`` otherwise; the fan runs while the
+      HVAC is more than half a degree off. Humidity relaxes toward a
+      lower level while the HVAC runs.
+    * Coffee makers lose water to the warming plate while on. Brews
+      finish through the adapter's own timed transition, on the
+      manager's timer wheel; pass that wheel as ``timers`` to fire it on
+      virtual time.
+    * Lights are switched on or off at random, ``light_toggles_per_hour``
+      times per light on average.
+    """
+    
+    def __init__(self, manager: DeviceManager, clock: Optional[VirtualClock] = None,
+                 interval: float = 1.0, ambient_temperature: float = 60.0,
+                 hvac_time_constant: float = 900.0, envelope_time_constant: float = 7200.0,
+                 light_toggles_per_hour: float = 0.5, evaporation_per_hour: float = 0.5,
+                 seed: Optional[int] = None, timers: Optional[TimerWheel] = None):
+        """Initialize the simulator.
+        
+        Args:
+            manager: Device manager holding the simulated devices
+            clock: Virtual clock (defaults to real time)
+            interval: Real seconds between ticks once started
+            ambient_temperature: Outdoor temperature rooms drift toward
+            hvac_time_constant: Seconds for the HVAC to close 63% of the
+                gap to the setpoint
+            envelope_time_constant: Seconds for an idle room to close 63%
+                of the gap to ambient
+            light_toggles_per_hour: Random switches per light per hour
+            evaporation_per_hour: Water level percent lost per hour while
+                a coffee maker is on
+            seed: Seed for reproducible light toggles
+            timers: Timer wheel of the manager, built on ``clock.now`` and
+                not started, to advance on every tick
+        """
+        self._manager = manager
+        self.clock = clock or VirtualClock()
+        self.interval = interval
+        self.ambient_temperature = ambient_temperature
+        self.hvac_time_constant = hvac_time_constant
+        self.envelope_time_constant = envelope_time_constant
+        self.light_toggles_per_hour = light_toggles_per_hour
+        self.evaporation_per_hour = evaporation_per_hour
+        self._random = random.Random(seed)
+        self._timers = timers
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._last_tick = self.clock.now()
+        
+        self._thermostats = _Fleet()
+        self._current = array('d')
+        self._target = array('d')
+        self._humidity = array('d')
+        self._mode = array('b')
+        self._fan = array('b')
+        
+        self._lights = _Fleet()
+        self._light_on = array('b')
+        
+        self._coffee = _Fleet()
+        self._water = array('d')
+        self._coffee_on = array('b')
+        
+        self._ticks = 0
+        self._published = 0
+        self._tick_latency = LatencyTracker()
+        
+        manager.add_listener(self._on_state_change)
+        manager.register_metrics('simulator', self.get_metrics)
+    
+    def track(self, device_ids: Optional[Iterable[str]] = None) -> int:
+        """Start simulating devices of the supported kinds.
+        
+        Args:
+            device_ids: Devices to simulate (defaults to every registered device)
+            
+        Returns:
+            Number of devices newly tracked
+        """
+        if device_ids is None:
+            device_ids = self._manager.device_ids()
+        added = 0
+        for device_id in device_ids:
+            device = self._manager.get_device(device_id)
+            state = self._manager.get_device_state(device_id)
+            with self._lock:
+                if self._tracked(device_id):
+                    continue
+                if isinstance(device, ThermostatAdapter):
+                    self._thermostats.add(device_id)
+                    self._current.append(float(state['currentTemperature']))
+                    self._target.append(0.0)
+                    self._humidity.append(float(state['humidity']))
+                    self._mode.append(0)
+                    self._fan.append(0)
+                elif isinstance(device, SmartLightAdapter):
+                    self._lights.add(device_id)
+                    self._light_on.append(0)
+                elif isinstance(device, CoffeeMakerAdapter):
+                    self._coffee.add(device_id)
+                    self._water.append(float(state['waterLevel']))
+                    self._coffee_on.append(0)
+                else:
+                    continue
+                self._sync_inputs(device_id, state)
+                added += 1
+        return added
+    
+    def _tracked(self, device_id: str) -> bool:
+        return (device_id in self._thermostats.index or device_id in self._lights.index
+                or device_id in self._coffee.index)
+    
+    def _on_state_change(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Pick up setpoints and switches changed by commands."""
+        with self._lock:
+            self._sync_inputs(device_id, state)
+    
+    def _sync_inputs(self, device_id: str, state: Dict[str, Any]) -> None:
+        """Copy a device's discrete inputs into the arrays; caller holds the lock."""
+        i = self._thermostats.index.get(device_id)
+        if i is not None:
+            self._target[i] = float(state['targetTemperature'])
+            self._mode[i] = MODE_CODES.get(state['mode'], 0) if state['powerState'] == 'ON' else 0
+            self._fan[i] = bool(state['fanRunning'])
+            # Only a change from elsewhere moves the reading off our rounding
+            if abs(state['currentTemperature'] - self._current[i]) > 0.05:
+                self._current[i] = float(state['currentTemperature'])
+            return
+        i = self._lights.index.get(device_id)
+        if i is not None:
+            self._light_on[i] = state['powerState'] == 'ON'
+            return
+        i = self._coffee.index.get(device_id)
+        if i is not None:
+            self._coffee_on[i] = state['powerState'] == 'ON'
+            if round(self._water[i]) != state['waterLevel']:
+                self._water[i] = float(state['waterLevel'])
+    
+    def step(self) -> int:
+        """Advance every tracked device to the current virtual time.
+        
+        Returns:
+            Number of device state updates published
+        """
+        started = time.monotonic()
+        now = self.clock.now()
+        with self._lock:
+            dt = max(now - self._last_tick, 0.0)
+            self._last_tick = now
+            updates = self._step_thermostats(dt) + self._step_coffee(dt)
+            updates += self._step_lights(dt)
+            self._ticks += 1
+        
+        for device_id, changes in updates:
+            try:
+                self._manager.update_state(device_id, changes)
+            except DeviceNotFoundError:
+                self.untrack(device_id)
+        with self._lock:
+            self._published += len(updates)
+        if self._timers is not None:
+            # Fires timed transitions, such as brews finishing, on virtual time
+            self._timers.advance(now)
+        self._tick_latency.record(time.monotonic() - started)
+        return len(updates)
+    
+    def _step_thermostats(self, dt: float) -> List[Tuple[str, Dict[str, Any]]]:
+        hvac = 1.0 - math.exp(-dt / self.hvac_time_constant)
+        envelope = 1.0 - math.exp(-dt / self.envelope_time_constant)
+        ambient = self.ambient_temperature
+        current, target, humidity, mode, fan = (
+            self._current, self._target, self._humidity, self._mode, self._fan
+        )
+        updates = []
+        # One fused loop updating the arrays in place. Without numpy, whole-
+        # column passes (comprehensions over the zipped arrays) build a new
+        # list per column and per pass, and measured slower than this loop
+        for i, device_id in enumerate(self._thermostats.ids):
+            before = current[i]
+            gap = target[i] - before
+            m = mode[i]
+            running = (m == 3 or (m == 1 and gap > 0) or (m == 2 and gap < 0)) and gap != 0
+            if running:
+                current[i] = before + gap * hvac
+                humidity[i] += (40.0 - humidity[i]) * hvac
+            else:
+                current[i] = before + (ambient - before) * envelope
+                humidity[i] += (55.0 - humidity[i]) * envelope
+            
+            changes: Dict[str, Any] = {}
+            if round(current[i], 1) != round(before, 1):
+                changes['currentTemperature'] = round(current[i], 1)
+                changes['humidity'] = round(humidity[i], 1)
+            fan_on = running and abs(target[i] - current[i]) > 0.5
+            if fan_on != fan[i]:
+                fan[i] = fan_on
+                changes['fanRunning'] = fan_on
+            if changes:
+                updates.append((device_id, changes))
+        return updates
+    
+    def _step_coffee(self, dt: float) -> List[Tuple[str, Dict[str, Any]]]:
+        loss = self.evaporation_per_hour * dt / 3600.0
+        water, powered = self._water, self._coffee_on
+        updates = []
+        for i, device_id in enumerate(self._coffee.ids):
+            if powered[i] and water[i] > 0:
+                level = round(water[i])
+                water[i] = max(water[i] - loss, 0.0)
+                if round(water[i]) != level:
+                    updates.append((device_id, {'waterLevel': round(water[i])}))
+        return updates
+    
+    def _step_lights(self, dt: float) -> List[Tuple[str, Dict[str, Any]]]:
+        count = len(self._lights.ids)
+        expected = count * self.light_toggles_per_hour * dt / 3600.0
+        toggles = int(expected) + (self._random.random() < expected - int(expected))
+        updates = []
+        # Draw only the lights that toggle instead of a coin per light
+        for i in self._random.sample(range(count), min(toggles, count)):
+            self._light_on[i] = not self._light_on[i]
+            updates.append((self._lights.ids[i],
+                            {'powerState': 'ON' if self._light_on[i] else 'OFF'}))
+        return updates
+    
+    def untrack(self, device_id: str) -> None:
+        """Stop simulating a device.
+        
+        Args:
+            device_id: Device to stop simulating
+        """
+        with self._lock:
+            for fleet, columns in ((self._thermostats, ('_current', '_target', '_humidity',
+                                                        '_mode', '_fan')),
+                                   (self._lights, ('_light_on',)),
+                                   (self._coffee, ('_water', '_coffee_on'))):
+                i = fleet.index.pop(device_id, None)
+                if i is None:
+                    continue
+                # Move the last device into the freed slot
+                last = len(fleet.ids) - 1
+                fleet.ids[i] = fleet.ids[last]
+                fleet.ids.pop()
+                if i != last:
+                    fleet.index[fleet.ids[i]] = i
+                for name in columns:
+                    column = getattr(self, name)
+                    column[i] = column[last]
+                    column.pop()
+    
+    def start(self) -> None:
+        """Track every registered device and tick every ``interval`` seconds."""
+        self.track()
+        self._stop.clear()
+        self._last_tick = self.clock.now()
+        self._thread = Thread(target=self._run, name='fleet-simulator', daemon=True)
+        self._thread.start()
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.step()
+            except Exception as e:
+                logger.error(f"Simulation tick failed: {str(e)}", exc_info=True)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get simulated device counts and tick statistics.
+        
+        Returns:
+            Devices per kind, ticks, published updates and tick latency
+        """
+        with self._lock:
+            metrics = {
+                'thermostats': len(self._thermostats.ids),
+                'lights': len(self._lights.ids),
+                'coffeeMakers': len(self._coffee.ids),
+                'ticks': self._ticks,
+                'published': self._published,
+                'virtualTime': round(self._last_tick, 3)
+            }
+        metrics['tickLatency'] = self._tick_latency.snapshot()
+        return metrics
+    
+    def stop(self) -> None:
+        """Stop ticking and stop listening to state changes."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._manager.remove_listener(self._on_state_change)
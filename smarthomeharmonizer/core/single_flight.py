@@ -0,0 +1,161 @@
+"""Single-flight deduplication of concurrent identical device calls."""
+
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+from threading import Event, Lock
+import json
+import logging
+
+from smarthomeharmonizer.core.coalescing import _copy_error
+from smarthomeharmonizer.core.retry import DEFAULT_IDEMPOTENT_COMMANDS
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One adapter call shared by every caller that joined it."""
+    
+    __slots__ = ('key', 'callers', 'done', 'result', 'error')
+    
+    def __init__(self, key: Any):
+        self.key = key
+        self.callers = 1
+        self.done = Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Shares one in-flight adapter call among identical concurrent callers.
+    
+    A state read joins a read of the same device that is still running.
+    An idempotent command joins a running command with the same name and
+    parameters, but only while it is the most recent command submitted to
+    the device: once a different command arrives, a later repeat starts a
+    new call so the device ends up in the state that was asked for last.
+    Unlike ``CommandCoalescer`` nothing waits for a window; callers only
+    share work that is already under way.
+    """
+    
+    def __init__(self, commands: Iterable[str] = DEFAULT_IDEMPOTENT_COMMANDS):
+        """Initialize the group.
+        
+        Args:
+            commands: Commands safe to share between callers
+        """
+        self.commands = frozenset(commands)
+        self._lock = Lock()
+        self._reads: Dict[str, _Flight] = {}
+        self._commands: Dict[str, _Flight] = {}
+        self._read_calls = 0
+        self._reads_shared = 0
+        self._command_calls = 0
+        self._commands_shared = 0
+    
+    def read(self, device_id: str, load: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Read a device state, joining a read already in flight.
+        
+        Args:
+            device_id: Device being read
+            load: Callable performing the read
+            
+        Returns:
+            Device state
+        """
+        with self._lock:
+            flight = self._reads.get(device_id)
+            if flight is None:
+                flight = self._reads[device_id] = _Flight(device_id)
+                self._read_calls += 1
+                leader = True
+            else:
+                flight.callers += 1
+                self._reads_shared += 1
+                leader = False
+        return self._run(self._reads, device_id, flight, leader, load)
+    
+    def execute(self, device_id: str, command: str, parameters: Optional[Dict[str, Any]],
+                run: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Run a command, joining an identical command already in flight.
+        
+        Args:
+            device_id: Target device ID
+            command: Command name
+            parameters: Command parameters
+            run: Callable executing the command
+            
+        Returns:
+            Device state after the command
+        """
+        key = self._command_key(command, parameters)
+        with self._lock:
+            flight = self._commands.get(device_id)
+            if flight is not None and key is not None and flight.key == key:
+                flight.callers += 1
+                self._commands_shared += 1
+                leader = False
+            else:
+                # Any other command supersedes the joinable one
+                flight = _Flight(key)
+                if key is None:
+                    self._commands.pop(device_id, None)
+                else:
+                    self._commands[device_id] = flight
+                self._command_calls += 1
+                leader = True
+        return self._run(self._commands, device_id, flight, leader, run)
+    
+    def _command_key(self, command: str,
+                     parameters: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+        if command not in self.commands:
+            return None
+        try:
+            return command, json.dumps(parameters or {}, sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+    
+    def _run(self, table: Dict[str, _Flight], device_id: str, flight: _Flight,
+             leader: bool, call: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        if leader:
+            try:
+                flight.result = call()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    if table.get(device_id) is flight:
+                        del table[device_id]
+                flight.done.set()
+            if flight.callers > 1:
+                logger.debug(f"Shared one call for {device_id} among {flight.callers} callers")
+        else:
+            flight.done.wait()
+        
+        if flight.error is not None:
+            if leader:
+                raise flight.error
+            raise _copy_error(flight.error) from flight.error
+        return dict(flight.result or {})
+    
+    def forget(self, device_id: str) -> None:
+        """Stop later readers from joining a read that predates a change.
+        
+        Args:
+            device_id: Device whose state changed
+        """
+        with self._lock:
+            self._reads.pop(device_id, None)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get adapter call and sharing counters.
+        
+        Returns:
+            Calls made and callers served by a shared call, for reads and
+            commands
+        """
+        with self._lock:
+            return {
+                'reads': self._read_calls,
+                'readsShared': self._reads_shared,
+                'commands': self._command_calls,
+                'commandsShared': self._commands_shared
+            }
@@ -0,0 +1,176 @@
+"""Read-through device state cache with TTL and stale-while-revalidate."""
+
+from typing import Dict, Any, Callable, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+import time
+import logging
+
+from smarthomeharmonizer.adapters.base import DeviceAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """Cached state and the time it was loaded."""
+    
+    __slots__ = ('state', 'loaded_at')
+    
+    def __init__(self, state: Dict[str, Any], loaded_at: float):
+        self.state = state
+        self.loaded_at = loaded_at
+
+
+class StateCache:
+    """LRU cache of adapter states for adapters that read from hardware.
+    
+    An entry younger than its adapter type's TTL is served directly. An
+    entry past its TTL but within ``stale_ttl`` more seconds is served
+    immediately while a background refresh replaces it. Older or missing
+    entries are loaded synchronously. Concurrent loads of one device share
+    a single adapter call, and ``invalidate`` drops an entry (and any
+    refresh already in flight) after a command changes the device.
+    """
+    
+    def __init__(self, default_ttl: float = 1.0, stale_ttl: float = 30.0,
+                 max_entries: int = 10_000, type_ttls: Optional[Dict[str, float]] = None,
+                 refresh_workers: int = 4):
+        """Initialize the cache.
+        
+        Args:
+            default_ttl: Seconds an entry is fresh
+            stale_ttl: Further seconds a stale entry may be served while it
+                is refreshed in the background
+            max_entries: Maximum cached devices before LRU eviction
+            type_ttls: Fresh TTLs keyed by adapter class name
+            refresh_workers: Threads running background refreshes
+        """
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.type_ttls = dict(type_ttls or {})
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers,
+                                            thread_name_prefix='state-refresh')
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._collapsed = 0
+        self._evictions = 0
+    
+    def ttl_for(self, adapter_type: str) -> float:
+        """Get the fresh TTL of an adapter type.
+        
+        Args:
+            adapter_type: Adapter class name
+            
+        Returns:
+            TTL in seconds
+        """
+        return self.type_ttls.get(adapter_type, self.default_ttl)
+    
+    def get(self, adapter: DeviceAdapter,
+            loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Get a device state, loading or refreshing it as needed.
+        
+        Args:
+            adapter: Device adapter the state belongs to
+            loader: Callable reading the state from the adapter
+            
+        Returns:
+            Copy of the cached or freshly loaded state
+        """
+        key = adapter.device_id
+        ttl = self.ttl_for(adapter.__class__.__name__)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                age = now - entry.loaded_at
+                if age <= ttl:
+                    self._hits += 1
+                    return dict(entry.state)
+                if age <= ttl + self.stale_ttl:
+                    self._stale_hits += 1
+                    future, owner = self._begin(key)
+                    if owner:
+                        self._executor.submit(self._load, key, loader, future)
+                    return dict(entry.state)
+            self._misses += 1
+            future, owner = self._begin(key)
+        
+        if owner:
+            self._load(key, loader, future)
+        return dict(future.result())
+    
+    def _begin(self, key: str) -> Tuple[Future, bool]:
+        """Join or start the load of a key; caller holds the lock."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self._collapsed += 1
+            return future, False
+        future = self._inflight[key] = Future()
+        self._loads += 1
+        return future, True
+    
+    def _load(self, key: str, loader: Callable[[], Dict[str, Any]], future: Future) -> None:
+        try:
+            state = loader()
+        except BaseException as e:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+            logger.warning(f"State refresh for {key} failed: {str(e)}")
+            future.set_exception(e)
+            return
+        
+        with self._lock:
+            # Skip the store if the entry was invalidated while loading
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                self._entries[key] = _Entry(dict(state), time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        future.set_result(state)
+    
+    def invalidate(self, device_id: str) -> None:
+        """Drop a device's cached state and detach any refresh in flight.
+        
+        Args:
+            device_id: Device whose state changed
+        """
+        with self._lock:
+            self._entries.pop(device_id, None)
+            self._inflight.pop(device_id, None)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache hit, load and eviction counters.
+        
+        Returns:
+            Counters and current size
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'staleHits': self._stale_hits,
+                'misses': self._misses,
+                'loads': self._loads,
+                'collapsed': self._collapsed,
+                'evictions': self._evictions
+            }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the background refresh workers.
+        
+        Args:
+            wait: Block until running refreshes have finished
+        """
+        self._executor.shutdown(wait=wait)
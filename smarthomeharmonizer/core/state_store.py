@@ -0,0 +1,309 @@
+"""Shared-memory device state store for multi-process deployments."""
+
+from typing import Dict, Any, Optional, Tuple, List
+from multiprocessing import shared_memory
+import multiprocessing
+import json
+import struct
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SharedStateStore:
+    """Versioned device state slots in a shared memory segment.
+    
+    Every worker process of a multi-process server attaches to the same
+    segment, so a command handled by one worker is visible to state reads
+    on all others. Each slot stores one device's state as JSON behind a
+    seqlock: writers move the slot sequence to an odd value, copy the
+    payload and move it to the next even value, while readers copy without
+    locking and retry until they observe the same even sequence before
+    and after the copy. The slot version is half the sequence.
+    
+    Writers serialize per slot through a small set of striped, reentrant
+    ``multiprocessing`` locks. Create the store before forking workers
+    (for example with gunicorn ``--preload``) or pass it to
+    ``multiprocessing.Process`` so the locks are shared.
+    """
+    
+    KEY_SIZE = 64
+    TOMBSTONE = b'\xff' * KEY_SIZE
+    HEADER = struct.Struct('<QI')
+    READ_RETRIES = 1000
+    
+    def __init__(self, name: Optional[str] = None, slots: int = 1024,
+                 slot_size: int = 1024, lock_stripes: int = 16):
+        """Create a new shared state segment.
+        
+        Args:
+            name: Shared memory segment name (generated if None)
+            slots: Maximum number of devices the store can hold
+            slot_size: Maximum size in bytes of one JSON-encoded state
+            lock_stripes: Number of writer locks shared between slots
+        """
+        if slots <= 0 or slot_size <= 0 or lock_stripes <= 0:
+            raise ValueError("slots, slot_size and lock_stripes must be positive")
+        
+        self.slots = slots
+        self.slot_size = slot_size
+        self._stride = self.KEY_SIZE + self.HEADER.size + slot_size
+        self._shm = shared_memory.SharedMemory(name=name, create=True,
+                                               size=slots * self._stride)
+        self._shm.buf[:] = bytes(len(self._shm.buf))
+        self._register_lock = multiprocessing.Lock()
+        self._locks = [multiprocessing.RLock() for _ in range(lock_stripes)]
+        self._index: Dict[str, int] = {}
+        self._owner = True
+        logger.info(f"SharedStateStore {self.name} created with {slots} slots")
+    
+    @property
+    def name(self) -> str:
+        """Name of the underlying shared memory segment."""
+        return self._shm.name
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        """Pickle the segment name and locks for child processes."""
+        return {
+            'name': self.name,
+            'slots': self.slots,
+            'slot_size': self.slot_size,
+            'register_lock': self._register_lock,
+            'locks': self._locks
+        }
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Attach to an existing segment in a child process."""
+        self.slots = state['slots']
+        self.slot_size = state['slot_size']
+        self._stride = self.KEY_SIZE + self.HEADER.size + self.slot_size
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._register_lock = state['register_lock']
+        self._locks = state['locks']
+        self._index = {}
+        self._owner = False
+        try:
+            # Only the creating process may unlink the segment
+            from multiprocessing import resource_tracker
+            name = self._shm._name  # type: ignore[attr-defined]
+            resource_tracker.unregister(name, 'shared_memory')
+        except Exception:
+            pass
+    
+    def _encode_key(self, device_id: str) -> bytes:
+        key = device_id.encode('utf-8')
+        if not key or len(key) > self.KEY_SIZE:
+            raise ValueError(f"Device ID must be 1-{self.KEY_SIZE} bytes for the state store")
+        return key.ljust(self.KEY_SIZE, b'\0')
+    
+    def _find_slot(self, device_id: str, claim: bool = False) -> Optional[int]:
+        """Locate a device slot by linear probing from the key hash.
+        
+        Released slots hold a tombstone key: probing continues past them,
+        and claiming reuses the first one found.
+        """
+        key = self._encode_key(device_id)
+        buf = self._shm.buf
+        slot = self._index.get(device_id)
+        if slot is not None:
+            # Another process may have released and reused the slot
+            offset = slot * self._stride
+            if bytes(buf[offset:offset + self.KEY_SIZE]) == key:
+                return slot
+            del self._index[device_id]
+        
+        start = zlib.crc32(key) % self.slots
+        reusable = None
+        for probe in range(self.slots):
+            index = (start + probe) % self.slots
+            offset = index * self._stride
+            stored = bytes(buf[offset:offset + self.KEY_SIZE])
+            if stored == key:
+                self._index[device_id] = index
+                return index
+            if stored == self.TOMBSTONE:
+                if reusable is None:
+                    reusable = index
+                continue
+            if stored[0] == 0:
+                if reusable is None:
+                    reusable = index
+                break
+        if not claim:
+            return None
+        if reusable is None:
+            raise ValueError(f"State store is full ({self.slots} slots)")
+        offset = reusable * self._stride
+        buf[offset:offset + self.KEY_SIZE] = key
+        self._index[device_id] = reusable
+        return reusable
+    
+    def _header_offset(self, slot: int) -> int:
+        return slot * self._stride + self.KEY_SIZE
+    
+    def _write_slot(self, slot: int, payload: bytes) -> int:
+        if len(payload) > self.slot_size:
+            raise ValueError(
+                f"Encoded state is {len(payload)} bytes, slot size is {self.slot_size}"
+            )
+        buf = self._shm.buf
+        offset = self._header_offset(slot)
+        sequence, _ = self.HEADER.unpack_from(buf, offset)
+        self.HEADER.pack_into(buf, offset, sequence + 1, len(payload))
+        data = offset + self.HEADER.size
+        buf[data:data + len(payload)] = payload
+        self.HEADER.pack_into(buf, offset, sequence + 2, len(payload))
+        return (sequence + 2) // 2
+    
+    def lock(self, device_id: str):
+        """Get the writer lock guarding a device slot.
+        
+        Args:
+            device_id: Device whose slot will be written
+            
+        Returns:
+            Lock usable as a context manager across processes
+        """
+        return self._locks[zlib.crc32(device_id.encode('utf-8')) % len(self._locks)]
+    
+    def register(self, device_id: str, state: Dict[str, Any]) -> bool:
+        """Claim a slot for a device, seeding it with an initial state.
+        
+        Args:
+            device_id: Device to register
+            state: Initial state used if no process has registered it yet
+            
+        Returns:
+            True if the slot was created, False if it already existed
+            
+        Raises:
+            ValueError: If the store is full or the state does not fit
+        """
+        payload = json.dumps(state).encode('utf-8')
+        if len(payload) > self.slot_size:
+            raise ValueError(
+                f"Encoded state is {len(payload)} bytes, slot size is {self.slot_size}"
+            )
+        with self._register_lock:
+            if self._find_slot(device_id) is not None:
+                return False
+            slot = self._find_slot(device_id, claim=True)
+            with self.lock(device_id):
+                self._write_slot(slot, payload)
+        return True
+    
+    def write(self, device_id: str, state: Dict[str, Any]) -> int:
+        """Publish a new state for a registered device.
+        
+        Callers executing read-modify-write sequences should hold
+        ``lock(device_id)`` around the whole sequence.
+        
+        Args:
+            device_id: Device to update
+            state: New device state
+            
+        Returns:
+            New slot version
+            
+        Raises:
+            KeyError: If the device has no slot
+            ValueError: If the encoded state exceeds the slot size
+        """
+        slot = self._find_slot(device_id)
+        if slot is None:
+            raise KeyError(device_id)
+        payload = json.dumps(state).encode('utf-8')
+        with self.lock(device_id):
+            return self._write_slot(slot, payload)
+    
+    def release(self, device_id: str) -> bool:
+        """Free a device slot so it can be reused.
+        
+        The slot payload is cleared and its key replaced by a tombstone;
+        the slot sequence keeps increasing so versions never repeat.
+        
+        Args:
+            device_id: Device whose slot should be freed
+            
+        Returns:
+            True if a slot was freed, False if the device had none
+        """
+        with self._register_lock:
+            slot = self._find_slot(device_id)
+            if slot is None:
+                return False
+            with self.lock(device_id):
+                self._write_slot(slot, b'')
+                offset = slot * self._stride
+                self._shm.buf[offset:offset + self.KEY_SIZE] = self.TOMBSTONE
+            self._index.pop(device_id, None)
+        return True
+    
+    def version(self, device_id: str) -> int:
+        """Get the current slot version without copying the state.
+        
+        Args:
+            device_id: Device to query
+            
+        Returns:
+            Slot version, or 0 if the device has no slot
+        """
+        slot = self._find_slot(device_id)
+        if slot is None:
+            return 0
+        sequence, _ = self.HEADER.unpack_from(self._shm.buf, self._header_offset(slot))
+        return sequence // 2
+    
+    def read(self, device_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Read a consistent snapshot of a device state.
+        
+        Args:
+            device_id: Device to query
+            
+        Returns:
+            Tuple of (version, state), or None if the device has no
+            published state
+            
+        Raises:
+            TimeoutError: If a consistent snapshot could not be read
+        """
+        slot = self._find_slot(device_id)
+        if slot is None:
+            return None
+        
+        buf = self._shm.buf
+        offset = self._header_offset(slot)
+        data = offset + self.HEADER.size
+        for attempt in range(self.READ_RETRIES):
+            before, length = self.HEADER.unpack_from(buf, offset)
+            if before % 2 == 0:
+                payload = bytes(buf[data:data + length])
+                after, _ = self.HEADER.unpack_from(buf, offset)
+                if before == after:
+                    # An empty payload marks a claimed but unpublished slot
+                    return (before // 2, json.loads(payload)) if length else None
+            if attempt > 10:
+                time.sleep(0)
+        raise TimeoutError(f"Could not read a consistent state for {device_id}")
+    
+    def device_ids(self) -> List[str]:
+        """List every device that has a slot in the store."""
+        buf = self._shm.buf
+        ids = []
+        for slot in range(self.slots):
+            offset = slot * self._stride
+            key = bytes(buf[offset:offset + self.KEY_SIZE]).rstrip(b'\0')
+            if key and key != self.TOMBSTONE:
+                ids.append(key.decode('utf-8'))
+        return ids
+    
+    def close(self) -> None:
+        """Detach this process from the shared memory segment."""
+        self._shm.close()
+    
+    def unlink(self) -> None:
+        """Destroy the shared memory segment (creating process only)."""
+        if self._owner:
+            self._shm.unlink()
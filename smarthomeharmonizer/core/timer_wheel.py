@@ -0,0 +1,264 @@
+"""Hierarchical timing wheel for delayed device state transitions."""
+
+from typing import Dict, Any, Callable, List, Optional
+from threading import Condition, Thread
+import math
+import time
+import logging
+
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class TimerHandle:
+    """A scheduled callback; cancel it with ``cancel()``."""
+    
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled', '_expiry', '_slot', '_wheel')
+    
+    def __init__(self, wheel: 'TimerWheel', deadline: float, expiry: int,
+                 callback: Callable[..., Any], args: tuple):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._expiry = expiry
+        self._slot: Optional[Dict['TimerHandle', None]] = None
+        self._wheel = wheel
+    
+    def cancel(self) -> bool:
+        """Cancel the timer.
+        
+        Returns:
+            True if the timer was still pending
+        """
+        return self._wheel.cancel(self)
+
+
+class TimerWheel:
+    """Runs callbacks after a delay with O(1) scheduling and cancellation.
+    
+    Time is divided into ticks of ``tick`` seconds. Level 0 has one slot
+    per tick for the next ``slots`` ticks; each higher level has slots
+    ``slots`` times wider, so ``levels`` levels cover ``slots ** levels``
+    ticks (about 6.8 years with the defaults). A timer is placed in the
+    slot of the lowest level whose range reaches its deadline; when a
+    level's slot comes due its timers are re-placed into finer levels, so
+    each timer moves at most ``levels - 1`` times. Timers further out wait
+    in the coarsest level until they come into range.
+    
+    Slots are insertion-ordered dicts, so cancelling removes the handle
+    directly instead of leaving a tombstone. A single driver thread
+    advances the wheel; it sleeps while no timers are pending, and after a
+    long pause (such as a suspended host) it catches up by firing every
+    overdue timer in deadline-tick order. Callbacks run on the driver
+    thread and must not block; exceptions are logged.
+    """
+    
+    def __init__(self, tick: float = 0.05, slots: int = 256, levels: int = 4,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the wheel.
+        
+        Args:
+            tick: Resolution in seconds; timers fire up to one tick late
+            slots: Slots per level
+            levels: Number of levels
+            clock: Monotonic time source (injectable for tests)
+        """
+        if tick <= 0 or slots < 2 or levels < 1:
+            raise ValueError("tick must be positive, slots at least 2 and levels at least 1")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._clock = clock
+        self._origin = clock()
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels: List[List[Dict[TimerHandle, None]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        # Next tick to process
+        self._current = 0
+        self._pending = 0
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+        self._running = False
+        self._scheduled = 0
+        self._fired = 0
+        self._cancelled = 0
+        self._cascaded = 0
+        self._errors = 0
+        self._lateness = LatencyTracker()
+    
+    def schedule(self, delay: float, callback: Callable[..., Any], *args: Any) -> TimerHandle:
+        """Run ``callback(*args)`` after ``delay`` seconds.
+        
+        Args:
+            delay: Seconds from now; negative delays fire on the next tick
+            callback: Function to call on the driver thread
+            *args: Arguments for the callback
+            
+        Returns:
+            Handle for cancelling the timer
+        """
+        deadline = self._clock() + delay
+        expiry = math.ceil((deadline - self._origin) / self.tick)
+        with self._condition:
+            handle = TimerHandle(self, deadline, expiry, callback, args)
+            self._place(handle)
+            self._pending += 1
+            self._scheduled += 1
+            if self._pending == 1:
+                # Wake the driver from its idle wait
+                self._condition.notify()
+        return handle
+    
+    def _place(self, handle: TimerHandle) -> None:
+        """Put a timer into the slot covering its expiry; caller holds the lock."""
+        expiry = max(handle._expiry, self._current)
+        delta = expiry - self._current
+        level = 0
+        while level < self.levels - 1 and delta >= self._spans[level + 1]:
+            level += 1
+        if delta >= self._spans[level + 1]:
+            # Beyond the coarsest level: park in its last slot and re-place later
+            expiry = self._current + self._spans[self.levels] - 1
+        slot = self._wheels[level][expiry // self._spans[level] % self.slots]
+        slot[handle] = None
+        handle._slot = slot
+    
+    def cancel(self, handle: TimerHandle) -> bool:
+        """Cancel a timer.
+        
+        Args:
+            handle: Handle returned by schedule()
+            
+        Returns:
+            True if the timer was still pending
+        """
+        with self._condition:
+            if handle.cancelled:
+                return False
+            handle.cancelled = True
+            if handle._slot is None:
+                # Already fired or being fired
+                return False
+            del handle._slot[handle]
+            handle._slot = None
+            self._pending -= 1
+            self._cancelled += 1
+            return True
+    
+    @property
+    def pending(self) -> int:
+        """Number of scheduled timers not yet fired or cancelled."""
+        with self._condition:
+            return self._pending
+    
+    def advance(self, now: Optional[float] = None) -> int:
+        """Fire every timer due by ``now``.
+        
+        Called by the driver thread; call it directly to drive a wheel
+        that was not started.
+        
+        Args:
+            now: Clock reading to advance to (defaults to the clock)
+            
+        Returns:
+            Number of callbacks run
+        """
+        if now is None:
+            now = self._clock()
+        target = math.floor((now - self._origin) / self.tick)
+        due: List[TimerHandle] = []
+        with self._condition:
+            while self._current <= target:
+                if self._pending == 0:
+                    # Nothing can come due; skip the empty ticks
+                    self._current = target + 1
+                    break
+                self._process_tick(due)
+                self._current += 1
+        
+        for handle in due:
+            if handle.cancelled:
+                continue
+            self._lateness.record(max(now - handle.deadline, 0.0))
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                with self._condition:
+                    self._errors += 1
+                logger.error(f"Timer callback failed: {str(e)}", exc_info=True)
+        return len(due)
+    
+    def _process_tick(self, due: List[TimerHandle]) -> None:
+        """Cascade coarser slots reaching tick ``_current`` and collect its timers."""
+        current = self._current
+        level = 1
+        while level < self.levels and current % self._spans[level] == 0:
+            level += 1
+        # Coarsest first, so cascaded timers can land in finer slots cascaded next
+        for cascade in range(level - 1, 0, -1):
+            slot = self._wheels[cascade][current // self._spans[cascade] % self.slots]
+            handles = list(slot)
+            slot.clear()
+            for handle in handles:
+                self._place(handle)
+            self._cascaded += len(handles)
+        
+        slot = self._wheels[0][current % self.slots]
+        for handle in slot:
+            handle._slot = None
+            due.append(handle)
+        self._pending -= len(slot)
+        self._fired += len(slot)
+        slot.clear()
+    
+    def start(self) -> None:
+        """Start the driver thread."""
+        with self._condition:
+            self._running = True
+        self._thread = Thread(target=self._drive, name='timer-wheel', daemon=True)
+        self._thread.start()
+    
+    def _drive(self) -> None:
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                self._condition.wait(self.tick if self._pending else None)
+                if not self._running:
+                    return
+            try:
+                self.advance()
+            except Exception as e:
+                logger.error(f"Timer wheel tick failed: {str(e)}", exc_info=True)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get timer counters and firing lateness.
+        
+        Returns:
+            Pending, scheduled, fired, cancelled and cascaded counts and
+            lateness percentiles
+        """
+        with self._condition:
+            metrics = {
+                'pending': self._pending,
+                'scheduled': self._scheduled,
+                'fired': self._fired,
+                'cancelled': self._cancelled,
+                'cascaded': self._cascaded,
+                'errors': self._errors,
+                'tickSeconds': self.tick
+            }
+        metrics['lateness'] = self._lateness.snapshot()
+        return metrics
+    
+    def stop(self) -> None:
+        """Stop the driver thread; pending timers are kept but no longer fire."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,575 @@
+"""MessagePack and CBOR wire formats negotiated through Accept and Content-Type."""
+
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from threading import Lock
+import json
+import math
+import struct
+import logging
+
+from flask import Request, Response
+
+from smarthomeharmonizer.core.exceptions import MalformedBodyError
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - optional dependency
+    cbor2 = None
+
+logger = logging.getLogger(__name__)
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+CBOR_MIMETYPE = 'application/cbor'
+
+# Older clients still send the unregistered name
+MIMETYPE_ALIASES = {'application/x-msgpack': MSGPACK_MIMETYPE}
+
+_UINT8 = struct.Struct('>B')
+_UINT16 = struct.Struct('>H')
+_UINT32 = struct.Struct('>I')
+_UINT64 = struct.Struct('>Q')
+_INT8 = struct.Struct('>b')
+_INT16 = struct.Struct('>h')
+_INT32 = struct.Struct('>i')
+_INT64 = struct.Struct('>q')
+_FLOAT16 = struct.Struct('>e')
+_FLOAT32 = struct.Struct('>f')
+_FLOAT64 = struct.Struct('>d')
+
+
+def _fits(packer: struct.Struct, value: float) -> bool:
+    """Check whether a float survives a round trip through a narrower type."""
+    try:
+        return packer.unpack(packer.pack(value))[0] == value
+    except (OverflowError, struct.error):
+        return False
+
+
+# MessagePack ----------------------------------------------------------------
+
+def msgpack_dumps(obj: Any) -> bytes:
+    """Encode an object as MessagePack without third-party packages.
+    
+    Floats use float32 when that is exact, which covers the temperatures
+    and levels devices report.
+    
+    Args:
+        obj: JSON-compatible object; bytes are encoded as bin
+        
+    Returns:
+        Encoded bytes
+    """
+    out = bytearray()
+    _msgpack_encode(obj, out)
+    return bytes(out)
+
+
+def _msgpack_encode(obj: Any, out: bytearray) -> None:
+    if isinstance(obj, str):
+        data = obj.encode('utf-8')
+        size = len(data)
+        if size < 32:
+            out.append(0xa0 | size)
+        elif size <= 0xff:
+            out += b'\xd9' + _UINT8.pack(size)
+        elif size <= 0xffff:
+            out += b'\xda' + _UINT16.pack(size)
+        else:
+            out += b'\xdb' + _UINT32.pack(size)
+        out += data
+    elif obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xff)
+        elif obj >= 0:
+            if obj <= 0xff:
+                out += b'\xcc' + _UINT8.pack(obj)
+            elif obj <= 0xffff:
+                out += b'\xcd' + _UINT16.pack(obj)
+            elif obj <= 0xffffffff:
+                out += b'\xce' + _UINT32.pack(obj)
+            else:
+                out += b'\xcf' + _UINT64.pack(obj)
+        elif obj >= -0x80:
+            out += b'\xd0' + _INT8.pack(obj)
+        elif obj >= -0x8000:
+            out += b'\xd1' + _INT16.pack(obj)
+        elif obj >= -0x80000000:
+            out += b'\xd2' + _INT32.pack(obj)
+        else:
+            out += b'\xd3' + _INT64.pack(obj)
+    elif isinstance(obj, float):
+        if _fits(_FLOAT32, obj) or math.isnan(obj):
+            out += b'\xca' + _FLOAT32.pack(obj)
+        else:
+            out += b'\xcb' + _FLOAT64.pack(obj)
+    elif isinstance(obj, (bytes, bytearray)):
+        size = len(obj)
+        if size <= 0xff:
+            out += b'\xc4' + _UINT8.pack(size)
+        elif size <= 0xffff:
+            out += b'\xc5' + _UINT16.pack(size)
+        else:
+            out += b'\xc6' + _UINT32.pack(size)
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        size = len(obj)
+        if size < 16:
+            out.append(0x90 | size)
+        elif size <= 0xffff:
+            out += b'\xdc' + _UINT16.pack(size)
+        else:
+            out += b'\xdd' + _UINT32.pack(size)
+        for item in obj:
+            _msgpack_encode(item, out)
+    elif isinstance(obj, dict):
+        size = len(obj)
+        if size < 16:
+            out.append(0x80 | size)
+        elif size <= 0xffff:
+            out += b'\xde' + _UINT16.pack(size)
+        else:
+            out += b'\xdf' + _UINT32.pack(size)
+        for key, value in obj.items():
+            _msgpack_encode(key, out)
+            _msgpack_encode(value, out)
+    else:
+        # Same fallback as the JSON responses use
+        _msgpack_encode(str(obj), out)
+
+
+def msgpack_loads(data: bytes) -> Any:
+    """Decode a single MessagePack object without third-party packages.
+    
+    Args:
+        data: Encoded bytes
+        
+    Returns:
+        Decoded object
+        
+    Raises:
+        ValueError: If the data is truncated, has trailing bytes or uses an
+            extension type
+    """
+    try:
+        obj, offset = _msgpack_decode(bytes(data), 0)
+    except (IndexError, struct.error):
+        raise ValueError("Invalid MessagePack data: truncated")
+    except (ValueError, RecursionError) as e:
+        raise ValueError(f"Invalid MessagePack data: {str(e)}")
+    if offset != len(data):
+        raise ValueError("Invalid MessagePack data: trailing bytes")
+    return obj
+
+
+_MSGPACK_FIXED = {
+    0xcc: _UINT8, 0xcd: _UINT16, 0xce: _UINT32, 0xcf: _UINT64,
+    0xd0: _INT8, 0xd1: _INT16, 0xd2: _INT32, 0xd3: _INT64,
+    0xca: _FLOAT32, 0xcb: _FLOAT64
+}
+_MSGPACK_STR = {0xd9: _UINT8, 0xda: _UINT16, 0xdb: _UINT32}
+_MSGPACK_BIN = {0xc4: _UINT8, 0xc5: _UINT16, 0xc6: _UINT32}
+_MSGPACK_ARRAY = {0xdc: _UINT16, 0xdd: _UINT32}
+_MSGPACK_MAP = {0xde: _UINT16, 0xdf: _UINT32}
+
+
+def _msgpack_decode(data: bytes, offset: int) -> Tuple[Any, int]:
+    head = data[offset]
+    offset += 1
+    if head < 0x80:
+        return head, offset
+    if head >= 0xe0:
+        return head - 0x100, offset
+    if 0xa0 <= head < 0xc0:
+        end = offset + (head & 0x1f)
+        if end > len(data):
+            raise IndexError("string past end of data")
+        return data[offset:end].decode('utf-8'), end
+    if 0x90 <= head < 0xa0:
+        return _msgpack_array(data, offset, head & 0x0f)
+    if 0x80 <= head < 0x90:
+        return _msgpack_map(data, offset, head & 0x0f)
+    if head == 0xc0:
+        return None, offset
+    if head == 0xc2:
+        return False, offset
+    if head == 0xc3:
+        return True, offset
+    
+    packer = _MSGPACK_FIXED.get(head)
+    if packer is not None:
+        return packer.unpack_from(data, offset)[0], offset + packer.size
+    for table, read in ((_MSGPACK_STR, _read_str), (_MSGPACK_BIN, _read_bytes),
+                        (_MSGPACK_ARRAY, _msgpack_array), (_MSGPACK_MAP, _msgpack_map)):
+        packer = table.get(head)
+        if packer is not None:
+            size = packer.unpack_from(data, offset)[0]
+            return read(data, offset + packer.size, size)
+    raise ValueError(f"unsupported type byte 0x{head:02x}")
+
+
+def _msgpack_array(data: bytes, offset: int, size: int) -> Tuple[List[Any], int]:
+    items = []
+    for _ in range(size):
+        item, offset = _msgpack_decode(data, offset)
+        items.append(item)
+    return items, offset
+
+
+def _msgpack_map(data: bytes, offset: int, size: int) -> Tuple[Dict[Any, Any], int]:
+    result = {}
+    for _ in range(size):
+        key, offset = _msgpack_decode(data, offset)
+        value, offset = _msgpack_decode(data, offset)
+        result[key] = value
+    return result, offset
+
+
+def _read_str(data: bytes, offset: int, size: int) -> Tuple[str, int]:
+    end = offset + size
+    if end > len(data):
+        raise IndexError("string past end of data")
+    return data[offset:end].decode('utf-8'), end
+
+
+def _read_bytes(data: bytes, offset: int, size: int) -> Tuple[bytes, int]:
+    end = offset + size
+    if end > len(data):
+        raise IndexError("bytes past end of data")
+    return data[offset:end], end
+
+
+# CBOR -----------------------------------------------------------------------
+
+def cbor_dumps(obj: Any) -> bytes:
+    """Encode an object as CBOR (RFC 8949) without third-party packages.
+    
+    Uses definite lengths and the shortest float that is exact.
+    
+    Args:
+        obj: JSON-compatible object; bytes are encoded as byte strings
+        
+    Returns:
+        Encoded bytes
+    """
+    out = bytearray()
+    _cbor_encode(obj, out)
+    return bytes(out)
+
+
+def _cbor_head(major: int, value: int, out: bytearray) -> None:
+    major <<= 5
+    if value < 24:
+        out.append(major | value)
+    elif value <= 0xff:
+        out.append(major | 24)
+        out += _UINT8.pack(value)
+    elif value <= 0xffff:
+        out.append(major | 25)
+        out += _UINT16.pack(value)
+    elif value <= 0xffffffff:
+        out.append(major | 26)
+        out += _UINT32.pack(value)
+    else:
+        out.append(major | 27)
+        out += _UINT64.pack(value)
+
+
+def _cbor_encode(obj: Any, out: bytearray) -> None:
+    if isinstance(obj, str):
+        data = obj.encode('utf-8')
+        _cbor_head(3, len(data), out)
+        out += data
+    elif obj is None:
+        out.append(0xf6)
+    elif obj is True:
+        out.append(0xf5)
+    elif obj is False:
+        out.append(0xf4)
+    elif isinstance(obj, int):
+        if obj >= 0:
+            _cbor_head(0, obj, out)
+        else:
+            _cbor_head(1, -1 - obj, out)
+    elif isinstance(obj, float):
+        if _fits(_FLOAT16, obj) or math.isnan(obj):
+            out += b'\xf9' + _FLOAT16.pack(obj)
+        elif _fits(_FLOAT32, obj):
+            out += b'\xfa' + _FLOAT32.pack(obj)
+        else:
+            out += b'\xfb' + _FLOAT64.pack(obj)
+    elif isinstance(obj, (bytes, bytearray)):
+        _cbor_head(2, len(obj), out)
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _cbor_head(4, len(obj), out)
+        for item in obj:
+            _cbor_encode(item, out)
+    elif isinstance(obj, dict):
+        _cbor_head(5, len(obj), out)
+        for key, value in obj.items():
+            _cbor_encode(key, out)
+            _cbor_encode(value, out)
+    else:
+        _cbor_encode(str(obj), out)
+
+
+_BREAK = object()
+
+
+def cbor_loads(data: bytes) -> Any:
+    """Decode a single CBOR item without third-party packages.
+    
+    Indefinite-length strings, arrays and maps are accepted; tags are
+    skipped and their content returned.
+    
+    Args:
+        data: Encoded bytes
+        
+    Returns:
+        Decoded object
+        
+    Raises:
+        ValueError: If the data is truncated, malformed or has trailing bytes
+    """
+    try:
+        obj, offset = _cbor_decode(bytes(data), 0)
+    except (IndexError, struct.error):
+        raise ValueError("Invalid CBOR data: truncated")
+    except (ValueError, RecursionError) as e:
+        raise ValueError(f"Invalid CBOR data: {str(e)}")
+    if obj is _BREAK or offset != len(data):
+        raise ValueError("Invalid CBOR data: unexpected break or trailing bytes")
+    return obj
+
+
+_CBOR_ARGUMENT = {24: _UINT8, 25: _UINT16, 26: _UINT32, 27: _UINT64}
+_CBOR_SIMPLE = {20: False, 21: True, 22: None, 23: None}
+_CBOR_FLOAT = {25: _FLOAT16, 26: _FLOAT32, 27: _FLOAT64}
+
+
+def _cbor_decode(data: bytes, offset: int) -> Tuple[Any, int]:
+    head = data[offset]
+    offset += 1
+    major, info = head >> 5, head & 0x1f
+    
+    if major == 7:
+        if info in _CBOR_SIMPLE:
+            return _CBOR_SIMPLE[info], offset
+        if info in _CBOR_FLOAT:
+            packer = _CBOR_FLOAT[info]
+            return packer.unpack_from(data, offset)[0], offset + packer.size
+        if info == 31:
+            return _BREAK, offset
+        raise ValueError(f"unsupported simple value {info}")
+    
+    if info == 31:
+        if major in (2, 3):
+            return _cbor_chunks(data, offset, major)
+        if major == 4:
+            return _cbor_array(data, offset, None)
+        if major == 5:
+            return _cbor_map(data, offset, None)
+        raise ValueError(f"indefinite length not allowed for major type {major}")
+    if info < 24:
+        value = info
+    elif info in _CBOR_ARGUMENT:
+        packer = _CBOR_ARGUMENT[info]
+        value = packer.unpack_from(data, offset)[0]
+        offset += packer.size
+    else:
+        raise ValueError(f"reserved additional information {info}")
+    
+    if major == 0:
+        return value, offset
+    if major == 1:
+        return -1 - value, offset
+    if major == 2:
+        return _read_bytes(data, offset, value)
+    if major == 3:
+        return _read_str(data, offset, value)
+    if major == 4:
+        return _cbor_array(data, offset, value)
+    if major == 5:
+        return _cbor_map(data, offset, value)
+    # Major type 6: a tag followed by its content
+    return _cbor_decode(data, offset)
+
+
+def _cbor_chunks(data: bytes, offset: int, major: int) -> Tuple[Any, int]:
+    chunks = []
+    while True:
+        chunk, offset = _cbor_decode(data, offset)
+        if chunk is _BREAK:
+            break
+        if not isinstance(chunk, bytes if major == 2 else str):
+            raise ValueError("indefinite string chunk of the wrong type")
+        chunks.append(chunk)
+    return (b'' if major == 2 else '').join(chunks), offset
+
+
+def _cbor_array(data: bytes, offset: int, size: Optional[int]) -> Tuple[List[Any], int]:
+    items = []
+    while size is None or len(items) < size:
+        item, offset = _cbor_decode(data, offset)
+        if item is _BREAK:
+            if size is not None:
+                raise ValueError("unexpected break")
+            break
+        items.append(item)
+    return items, offset
+
+
+def _cbor_map(data: bytes, offset: int, size: Optional[int]) -> Tuple[Dict[Any, Any], int]:
+    result = {}
+    while size is None or len(result) < size:
+        key, offset = _cbor_decode(data, offset)
+        if key is _BREAK:
+            if size is not None:
+                raise ValueError("unexpected break")
+            break
+        value, offset = _cbor_decode(data, offset)
+        if value is _BREAK:
+            raise ValueError("map key without value")
+        result[key] = value
+    return result, offset
+
+
+# Negotiation ----------------------------------------------------------------
+
+def available_formats() -> Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    """Get the binary wire formats with their encoders and decoders.
+    
+    Returns:
+        Mapping of mimetype to ``(dumps, loads)``; the msgpack and cbor2
+        packages are used when installed, the pure-Python codecs otherwise
+    """
+    formats: Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {}
+    if msgpack is not None:
+        formats[MSGPACK_MIMETYPE] = (
+            lambda obj: msgpack.packb(obj, use_bin_type=True, default=str),
+            lambda data: msgpack.unpackb(data, raw=False)
+        )
+    else:
+        formats[MSGPACK_MIMETYPE] = (msgpack_dumps, msgpack_loads)
+    if cbor2 is not None:
+        formats[CBOR_MIMETYPE] = (lambda obj: cbor2.dumps(obj, default=_cbor2_default),
+                                  cbor2.loads)
+    else:
+        formats[CBOR_MIMETYPE] = (cbor_dumps, cbor_loads)
+    return formats
+
+
+def _cbor2_default(encoder: Any, value: Any) -> None:
+    encoder.encode(str(value))
+
+
+class WireCodec:
+    """Serves JSON API bodies as MessagePack or CBOR to clients that ask.
+    
+    Responses are built as JSON by the views; ``process`` re-encodes them
+    when the client's Accept header prefers a binary format, so every
+    endpoint and error handler supports it. Request bodies sent with a
+    binary Content-Type are decoded by ``decode_request``. JSON stays the
+    default whenever the client expresses no preference.
+    """
+    
+    def __init__(self):
+        """Initialize the codec with every available format."""
+        self.formats = available_formats()
+        self._suffixes = {mimetype: mimetype.split('/')[-1] for mimetype in self.formats}
+        self._lock = Lock()
+        self._encoded: Dict[str, int] = {mimetype: 0 for mimetype in self.formats}
+        self._decoded: Dict[str, int] = {mimetype: 0 for mimetype in self.formats}
+    
+    def negotiate(self, request: Request) -> Optional[str]:
+        """Pick the response format preferred by the client.
+        
+        Args:
+            request: Incoming request
+            
+        Returns:
+            Binary mimetype, or None to answer with JSON
+        """
+        best = request.accept_mimetypes.best_match([JSON_MIMETYPE] + list(self.formats))
+        return best if best in self.formats else None
+    
+    def decode_request(self, request: Request) -> Any:
+        """Decode a request body in whichever format it was sent.
+        
+        Args:
+            request: Incoming request
+            
+        Returns:
+            Decoded body, or None for an empty binary body
+            
+        Raises:
+            MalformedBodyError: If a binary body cannot be decoded
+        """
+        mimetype = MIMETYPE_ALIASES.get(request.mimetype, request.mimetype)
+        if mimetype not in self.formats:
+            return request.get_json()
+        data = request.get_data()
+        if not data:
+            return None
+        try:
+            body = self.formats[mimetype][1](data)
+        except Exception as e:
+            raise MalformedBodyError(f"Malformed {mimetype} body: {str(e)}")
+        with self._lock:
+            self._decoded[mimetype] += 1
+        return body
+    
+    def process(self, request: Request, response: Response) -> Response:
+        """Re-encode a JSON response in the negotiated binary format.
+        
+        Args:
+            request: Request being answered
+            response: Response to re-encode
+            
+        Returns:
+            The same response object
+        """
+        if response.mimetype != JSON_MIMETYPE or response.direct_passthrough:
+            return response
+        response.vary.add('Accept')
+        mimetype = self.negotiate(request)
+        if mimetype is None:
+            return response
+        body = response.get_data()
+        if not body:
+            return response
+        
+        response.set_data(self.formats[mimetype][0](json.loads(body)))
+        response.mimetype = mimetype
+        etag, weak = response.get_etag()
+        if etag is not None:
+            response.set_etag(f"{etag}-{self._suffixes[mimetype]}", weak)
+        with self._lock:
+            self._encoded[mimetype] += 1
+        return response
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get binary request and response counts per format.
+        
+        Returns:
+            Encoded responses and decoded requests keyed by format name
+        """
+        with self._lock:
+            return {
+                'encoded': {self._suffixes[m]: n for m, n in self._encoded.items()},
+                'decoded': {self._suffixes[m]: n for m, n in self._decoded.items()}
+            }
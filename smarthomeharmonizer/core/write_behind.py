@@ -0,0 +1,273 @@
+"""Write-behind command execution with optimistic state."""
+
+from typing import Dict, Any, Callable, Deque, Iterable, Optional, Set
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+import time
+import logging
+
+from smarthomeharmonizer.adapters.base import DeviceAdapter
+from smarthomeharmonizer.core.exceptions import QueueFullError
+from smarthomeharmonizer.utils.metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXCLUDED_COMMANDS = ('getStatus',)
+
+
+class _Write:
+    """A queued command not yet applied to the device.
+    
+    Optimistic writes carry their prediction and rollback; synchronous
+    commands queued behind them carry the future their caller waits on.
+    """
+    
+    __slots__ = ('call', 'rollback', 'predicted', 'future', 'answered')
+    
+    def __init__(self, call: Callable[[], Dict[str, Any]],
+                 rollback: Optional[Callable[[], Dict[str, Any]]] = None,
+                 predicted: Optional[Dict[str, Any]] = None):
+        self.call = call
+        self.rollback = rollback
+        self.predicted = predicted
+        self.future: Optional[Future] = Future() if predicted is None else None
+        self.answered = time.monotonic()
+
+
+class WriteBehind:
+    """Answers commands with a predicted state and drives devices afterwards.
+    
+    ``submit`` asks the adapter to predict the command's result (which also
+    validates it) and returns that state at once. The real call then runs
+    on a worker, in submission order per device. A result matching the
+    prediction is confirmed; a different result has already been published
+    by the normal command path and counts as reconciled; a failure runs
+    the rollback callback, which republishes the device's actual state.
+    While a device has writes pending, ``pending_state`` returns the
+    latest prediction so reads agree with what callers were told.
+    
+    Commands that cannot be answered optimistically are passed to
+    ``enqueue`` and wait in the same queue, so they never overtake writes
+    that were already acknowledged.
+    """
+    
+    def __init__(self, workers: int = 4, max_pending: int = 64,
+                 excluded_commands: Iterable[str] = DEFAULT_EXCLUDED_COMMANDS):
+        """Initialize the write-behind stage.
+        
+        Args:
+            workers: Threads driving devices in the background
+            max_pending: Maximum unapplied writes per device
+            excluded_commands: Commands that always run synchronously
+        """
+        self.max_pending = max_pending
+        self.excluded_commands = frozenset(excluded_commands)
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='write-behind')
+        self._lock = Lock()
+        self._pending: Dict[str, Deque[_Write]] = {}
+        self._views: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._draining: Set[str] = set()
+        self._optimistic = 0
+        self._synchronous = 0
+        self._serialized = 0
+        self._confirmed = 0
+        self._reconciled = 0
+        self._rolled_back = 0
+        self._saved = LatencyTracker()
+    
+    def pending_state(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Get the predicted state of a device with unapplied writes.
+        
+        Args:
+            device_id: Device ID
+            
+        Returns:
+            Copy of the latest predicted state, or None if nothing is pending
+        """
+        with self._lock:
+            view = self._views.get(device_id)
+            return dict(view) if view is not None else None
+    
+    def pending_version(self, device_id: str) -> Optional[int]:
+        """Get the state version a device will have once its writes land.
+        
+        Args:
+            device_id: Device ID
+            
+        Returns:
+            Predicted version, or None if nothing is pending
+        """
+        with self._lock:
+            return self._versions.get(device_id)
+    
+    def submit(self, device: DeviceAdapter, command: str,
+               parameters: Optional[Dict[str, Any]],
+               call: Callable[[], Dict[str, Any]],
+               rollback: Callable[[], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Answer a command optimistically and queue the real call.
+        
+        The caller must hold the device lock so predictions for one device
+        are made in order.
+        
+        Args:
+            device: Target adapter
+            command: Command name
+            parameters: Optional command parameters
+            call: Callable running the command through the normal path
+            rollback: Callable republishing the device's actual state
+            
+        Returns:
+            Predicted state, or None if the command must run synchronously
+            (through ``enqueue``)
+            
+        Raises:
+            InvalidCommandError: If the command is not supported
+            AdapterError: If the parameters are invalid
+            QueueFullError: If the device has too many unapplied writes
+        """
+        device_id = device.device_id
+        with self._lock:
+            # A prediction cannot build on a synchronous command still queued
+            blocked = any(write.future is not None for write in self._pending.get(device_id, ()))
+        if blocked or command in self.excluded_commands:
+            return None
+        previous = self.pending_state(device_id)
+        predicted = device.predict_state(command, parameters, previous)
+        if predicted is None:
+            with self._lock:
+                self._synchronous += 1
+            return None
+        
+        with self._lock:
+            queue = self._pending.setdefault(device_id, deque())
+            if len(queue) >= self.max_pending:
+                raise QueueFullError(f"Too many pending writes for device {device_id}")
+            queue.append(_Write(call, rollback, predicted))
+            self._views[device_id] = predicted
+            # Commands bump the version when they change the state
+            version = self._versions.get(device_id, device.version)
+            if predicted != (device.cached_state() if previous is None else previous):
+                version += 1
+            self._versions[device_id] = version
+            self._optimistic += 1
+            start = device_id not in self._draining
+            self._draining.add(device_id)
+        if start:
+            self._executor.submit(self._drain, device_id)
+        return dict(predicted)
+    
+    def enqueue(self, device_id: str,
+                call: Callable[[], Dict[str, Any]]) -> Optional[Future]:
+        """Queue a synchronous command behind a device's unapplied writes.
+        
+        The caller must hold the device lock, as for ``submit``, and release
+        it before waiting on the returned future.
+        
+        Args:
+            device_id: Target device ID
+            call: Callable running the command through the normal path
+            
+        Returns:
+            Future resolved with the command's result once every earlier
+            write has landed, or None if nothing is pending and the command
+            can run at once
+            
+        Raises:
+            QueueFullError: If the device has too many unapplied writes
+        """
+        with self._lock:
+            queue = self._pending.get(device_id)
+            if not queue:
+                return None
+            if len(queue) >= self.max_pending:
+                raise QueueFullError(f"Too many pending writes for device {device_id}")
+            write = _Write(call)
+            # A non-empty queue is always being drained
+            queue.append(write)
+            self._serialized += 1
+        return write.future
+    
+    def _drain(self, device_id: str) -> None:
+        while True:
+            with self._lock:
+                queue = self._pending[device_id]
+                write = queue[0]
+            
+            try:
+                actual: Optional[Dict[str, Any]] = write.call()
+                failed = False
+            except Exception as e:
+                if write.future is not None:
+                    write.future.set_exception(e)
+                else:
+                    logger.warning(f"Write-behind command for {device_id} failed: {str(e)}")
+                failed = True
+            
+            with self._lock:
+                queue.popleft()
+                done = not queue
+                if done:
+                    # Later predictions were built on this one, so the view
+                    # is only dropped once every pending write has landed
+                    del self._pending[device_id]
+                    self._views.pop(device_id, None)
+                    self._versions.pop(device_id, None)
+                    self._draining.discard(device_id)
+            
+            if write.future is not None:
+                # The caller waiting on a synchronous command gets its outcome
+                if not failed:
+                    write.future.set_result(actual)
+                if done:
+                    return
+                continue
+            
+            if failed:
+                try:
+                    write.rollback()
+                except Exception as e:
+                    logger.error(f"Rolling back {device_id} failed: {str(e)}")
+            
+            with self._lock:
+                self._saved.record(time.monotonic() - write.answered)
+                if failed:
+                    self._rolled_back += 1
+                elif actual == write.predicted:
+                    self._confirmed += 1
+                else:
+                    self._reconciled += 1
+            if done:
+                return
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get optimistic, reconciliation and rollback counters.
+        
+        Returns:
+            Counters, rates over completed writes and the device latency
+            callers did not wait for
+        """
+        with self._lock:
+            completed = self._confirmed + self._reconciled + self._rolled_back
+            return {
+                'optimistic': self._optimistic,
+                'synchronous': self._synchronous,
+                'serialized': self._serialized,
+                'pending': sum(len(queue) for queue in self._pending.values()),
+                'confirmed': self._confirmed,
+                'reconciled': self._reconciled,
+                'rolledBack': self._rolled_back,
+                'reconcileRate': round(self._reconciled / completed, 4) if completed else 0.0,
+                'rollbackRate': round(self._rolled_back / completed, 4) if completed else 0.0,
+                'latencySaved': self._saved.snapshot()
+            }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the background workers.
+        
+        Args:
+            wait: Block until pending writes have been applied
+        """
+        self._executor.shutdown(wait=wait)
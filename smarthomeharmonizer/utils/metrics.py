@@ -0,0 +1,77 @@
+"""Lightweight in-process metrics helpers."""
+
+from typing import Dict, Any
+from collections import deque
+from threading import Lock
+
+
+def _pick(samples: list, fraction: float) -> float:
+    """Nearest-rank percentile of pre-sorted samples."""
+    if not samples:
+        return 0.0
+    return samples[min(int(fraction * len(samples)), len(samples) - 1)]
+
+
+class LatencyTracker:
+    """Tracks a latency distribution over a sliding window of samples.
+    
+    Totals cover every recorded sample; percentiles are computed from the
+    most recent ``window`` samples only, which keeps memory bounded.
+    """
+    
+    def __init__(self, window: int = 1024):
+        """Initialize the tracker.
+        
+        Args:
+            window: Number of recent samples kept for percentiles
+        """
+        self._samples: deque = deque(maxlen=window)
+        self._lock = Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float) -> None:
+        """Record one latency sample.
+        
+        Args:
+            seconds: Observed latency in seconds
+        """
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+    
+    def percentile(self, fraction: float) -> float:
+        """Get a percentile of the recent samples.
+        
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.95
+            
+        Returns:
+            Latency in seconds, or 0.0 if nothing was recorded
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        return _pick(samples, fraction)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Summarize the distribution in milliseconds.
+        
+        Returns:
+            Count, average, maximum and p50/p95/p99 latencies
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, maximum = self.count, self.total, self.max
+        
+        return {
+            'count': count,
+            'avgMs': round(total / count * 1000, 3) if count else 0.0,
+            'maxMs': round(maximum * 1000, 3),
+            'p50Ms': round(_pick(samples, 0.50) * 1000, 3),
+            'p95Ms': round(_pick(samples, 0.95) * 1000, 3),
+            'p99Ms': round(_pick(samples, 0.99) * 1000, 3)
+        }
@@ -0,0 +1,133 @@
+"""Tests for deadlines, circuit breakers and bulkhead pools."""
+
+from threading import Event
+import time
+from unittest.mock import patch
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.bulkhead import Bulkhead, CircuitBreaker
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import (
+    AdapterError, CircuitOpenError, InvalidCommandError, InvalidParameterError, QueueFullError
+)
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class HangingThermostat(ThermostatAdapter):
+    """Thermostat whose commands block until released."""
+    
+    release = Event()
+    offline = False
+    
+    def execute_command(self, command, parameters=None):
+        self.release.wait(5)
+        if self.offline:
+            raise AdapterError("Thermostat is offline")
+        return super().execute_command(command, parameters)
+
+
+class TestCircuitBreaker:
+    """Test CircuitBreaker state transitions."""
+    
+    def test_open_half_open_close(self):
+        """Test opening on failures and closing after a good trial."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        now = [100.0]
+        with patch('smarthomeharmonizer.core.bulkhead.time.monotonic', lambda: now[0]):
+            breaker.record_failure()
+            assert breaker.allow()
+            breaker.record_failure()
+            assert breaker.state == 'open'
+            assert not breaker.allow()
+            
+            now[0] += 10
+            assert breaker.state == 'half_open'
+            assert breaker.allow()
+            # Only one trial call at a time
+            assert not breaker.allow()
+            breaker.record_success()
+            assert breaker.state == 'closed'
+
+
+class TestBulkhead:
+    """Test Bulkhead integration with DeviceManager."""
+    
+    @pytest.fixture
+    def setup(self):
+        """Create a manager with a hanging thermostat and a healthy light."""
+        HangingThermostat.release.clear()
+        HangingThermostat.offline = False
+        bulkhead = Bulkhead(workers=1, max_pending=0, deadline=0.1,
+                            failure_threshold=2, reset_timeout=60)
+        manager = DeviceManager(bulkhead=bulkhead)
+        manager.register_device(HangingThermostat('thermo1', 'Hallway Thermostat'))
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        yield manager, bulkhead
+        HangingThermostat.release.set()
+        bulkhead.shutdown()
+    
+    def test_deadline_and_isolation(self, setup):
+        """Test that a hung type times out without affecting other types."""
+        manager, _ = setup
+        
+        with pytest.raises(AdapterError, match="did not respond"):
+            manager.execute_command('thermo1', 'setMode', {'mode': 'cool'})
+        assert manager.execute_command('light1', 'turnOn')['powerState'] == 'ON'
+    
+    def test_breaker_fails_fast(self, setup):
+        """Test that repeated failures open the breaker."""
+        manager, bulkhead = setup
+        manager.execute_command('light1', 'turnOn')
+        
+        with pytest.raises(AdapterError):
+            manager.execute_command('thermo1', 'setMode', {'mode': 'cool'})
+        HangingThermostat.release.set()
+        HangingThermostat.offline = True
+        deadline = time.time() + 5
+        while True:
+            # Wait for the timed-out call to hand back its worker
+            try:
+                manager.execute_command('thermo1', 'setMode', {'mode': 'cool'})
+            except QueueFullError:
+                assert time.time() < deadline
+                time.sleep(0.01)
+            except AdapterError:
+                break
+        
+        with pytest.raises(CircuitOpenError, match="Circuit open"):
+            manager.execute_command('thermo1', 'setMode', {'mode': 'cool'})
+        metrics = manager.get_metrics()['bulkhead']
+        assert metrics['openDevices'] == ['thermo1']
+        assert metrics['types']['HangingThermostat']['shortCircuited'] == 1
+        assert metrics['types']['SmartLightAdapter']['breaker'] == 'closed'
+    
+    def test_invalid_commands_do_not_trip(self, setup):
+        """Test that client errors are not counted as device failures."""
+        manager, bulkhead = setup
+        
+        for _ in range(3):
+            with pytest.raises(InvalidCommandError):
+                manager.execute_command('light1', 'explode')
+        for _ in range(5):
+            with pytest.raises(InvalidParameterError):
+                manager.execute_command('light1', 'setBrightness', {'brightness': 500})
+        assert bulkhead.breaker_for('light1').state == 'closed'
+        metrics = bulkhead.get_metrics()['types']['SmartLightAdapter']
+        assert metrics['breaker'] == 'closed'
+        assert metrics['failures'] == 0
+        assert metrics['calls'] == 8
+    
+    def test_full_compartment_returns_503(self, setup):
+        """Test that a saturated compartment rejects new calls."""
+        manager, _ = setup
+        client = create_app(manager).test_client()
+        
+        response = client.post('/api/v1/devices/thermo1/command',
+                               json={'command': 'setMode', 'parameters': {'mode': 'cool'}})
+        assert response.status_code == 400
+        
+        # The timed-out call still holds the only worker
+        response = client.post('/api/v1/devices/thermo1/command',
+                               json={'command': 'setMode', 'parameters': {'mode': 'cool'}})
+        assert response.status_code == 503
@@ -0,0 +1,109 @@
+"""Tests for the change log and the changes feed."""
+
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.change_log import ChangeLog
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class TestChangeLog:
+    """Test ChangeLog functionality."""
+    
+    def test_since_orders_by_latest_change(self):
+        """Test that repeated changes are reported once, at their latest position."""
+        log = ChangeLog(capacity=8)
+        for device_id in ('a', 'b', 'a', 'c'):
+            log.record(device_id)
+        
+        assert log.since(0) == (4, ['b', 'a', 'c'])
+        assert log.since(2) == (4, ['a', 'c'])
+        assert log.since(4) == (4, [])
+    
+    def test_unchanged_state_is_not_recorded(self):
+        """Test that equal states do not take a sequence number."""
+        log = ChangeLog()
+        log.record('a', {'powerState': 'ON'})
+        log.record('a', {'powerState': 'ON'})
+        assert log.sequence == 1
+        log.record('a', {'powerState': 'OFF'})
+        assert log.sequence == 2
+    
+    def test_resync_when_behind_or_unknown(self):
+        """Test that overwritten, future and foreign cursors require a resync."""
+        log = ChangeLog(capacity=4)
+        for i in range(10):
+            log.record(f'd{i}')
+        
+        assert log.since(6) == (10, ['d6', 'd7', 'd8', 'd9'])
+        assert log.since(5) == (10, None)
+        assert log.since(11) == (10, None)
+        assert log.since(8, epoch='previous-process') == (10, None)
+        assert log.since(8, epoch=log.epoch) == (10, ['d8', 'd9'])
+        
+        metrics = log.get_metrics()
+        assert metrics['oldestRetained'] == 7
+        assert metrics['resyncs'] == 3
+    
+    def test_invalid_capacity(self):
+        """Test that an empty ring is rejected."""
+        with pytest.raises(ValueError):
+            ChangeLog(capacity=0)
+
+
+class TestChangesFeed:
+    """Test delta sync through the manager and the API."""
+    
+    def setup_method(self):
+        """Set up a manager with a small change log."""
+        self.manager = DeviceManager(change_log=ChangeLog(capacity=16))
+        self.manager.register_device(SmartLightAdapter('light1', 'Light'))
+        self.manager.register_device(ThermostatAdapter('thermo1', 'Thermostat'))
+        self.client = create_app(self.manager).test_client()
+    
+    def test_manager_changes_since(self):
+        """Test that only changed and removed devices are reported."""
+        cursor = self.manager.get_change_cursor()
+        self.manager.execute_command('light1', 'getStatus')
+        self.manager.execute_command('thermo1', 'setTemperature', {'temperature': 65})
+        self.manager.register_device(SmartLightAdapter('light2', 'New Light'))
+        self.manager.unregister_device('light2')
+        
+        changes = self.manager.changes_since(cursor['sequence'], cursor['epoch'],
+                                             ['state.targetTemperature'])
+        assert changes['resync'] is False
+        assert changes['devices'] == [{'deviceId': 'thermo1',
+                                       'state': {'targetTemperature': 65.0}}]
+        assert changes['removed'] == ['light2']
+        assert changes['sequence'] == cursor['sequence'] + 3
+    
+    def test_delta_sync_over_api(self):
+        """Test a client syncing from the list, then from the feed."""
+        listing = self.client.get('/api/v1/devices').get_json()
+        since, epoch = listing['sequence'], listing['epoch']
+        
+        self.client.post('/api/v1/devices/light1/command', json={'command': 'turnOn'})
+        response = self.client.get(f'/api/v1/devices/changes?since={since}&epoch={epoch}')
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data['resync'] is False
+        assert [d['deviceId'] for d in data['devices']] == ['light1']
+        assert data['devices'][0]['state']['powerState'] == 'ON'
+        
+        data = self.client.get(f"/api/v1/devices/changes?since={data['sequence']}").get_json()
+        assert data['devices'] == [] and data['removed'] == []
+    
+    def test_fallen_behind_client_must_resync(self):
+        """Test that a client older than the ring buffer is told to resync."""
+        for i in range(20):
+            self.manager.execute_command('thermo1', 'setTemperature', {'temperature': 60 + i})
+        data = self.client.get('/api/v1/devices/changes?since=1').get_json()
+        assert data['resync'] is True
+        assert data['devices'] == []
+        assert self.manager.get_metrics()['changeLog']['resyncs'] == 1
+    
+    def test_invalid_since(self):
+        """Test that a missing or non-numeric cursor is rejected."""
+        assert self.client.get('/api/v1/devices/changes').status_code == 400
+        assert self.client.get('/api/v1/devices/changes?since=abc').status_code == 400
@@ -0,0 +1,178 @@
+"""Tests for multi-node clustering."""
+
+import multiprocessing
+import socket
+import time
+import pytest
+import requests
+from werkzeug.serving import make_server
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.cluster import ClusterNode
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+DEVICE_IDS = [f'light{i}' for i in range(12)]
+
+
+def _free_port():
+    """Reserve an unused loopback port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _run_node(node_id, port, peers):
+    """Serve one cluster node with the full device set registered."""
+    cluster = ClusterNode(node_id, f'http://127.0.0.1:{port}', peers)
+    manager = DeviceManager()
+    for device_id in DEVICE_IDS:
+        manager.register_device(SmartLightAdapter(device_id, f'Light {device_id}'))
+    server = make_server('127.0.0.1', port, create_app(manager, cluster), threaded=True)
+    server.serve_forever()
+
+
+@pytest.fixture(scope='module')
+def cluster_urls():
+    """Start three cluster nodes as local processes."""
+    ports = {f'node{i}': _free_port() for i in range(3)}
+    peers = {node_id: f'http://127.0.0.1:{port}' for node_id, port in ports.items()}
+    processes = [
+        multiprocessing.Process(target=_run_node, args=(node_id, port, peers), daemon=True)
+        for node_id, port in ports.items()
+    ]
+    for process in processes:
+        process.start()
+    
+    deadline = time.time() + 10
+    for url in peers.values():
+        while True:
+            try:
+                requests.get(f'{url}/health', timeout=1)
+                break
+            except requests.ConnectionError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+    
+    yield peers
+    
+    for process in processes:
+        process.terminate()
+        process.join()
+
+
+class TestClusterNode:
+    """Test ClusterNode membership and ownership."""
+    
+    def test_nodes_agree_on_ownership(self):
+        """Test that every node computes the same owners."""
+        peers = {'a': 'http://a', 'b': 'http://b', 'c': 'http://c'}
+        nodes = [ClusterNode(node_id, url, peers) for node_id, url in peers.items()]
+        
+        for device_id in DEVICE_IDS:
+            owners = {node.owner_of(device_id) for node in nodes}
+            assert len(owners) == 1
+            assert sum(node.owns(device_id) for node in nodes) == 1
+    
+    def test_gossip_merge_and_failure_detection(self):
+        """Test that silent members leave the ring."""
+        node = ClusterNode('a', 'http://a', {'b': 'http://b'}, failure_timeout=0.05)
+        node.merge_gossip({'c': {'url': 'http://c', 'heartbeat': 1}})
+        assert set(node.get_members()) == {'a', 'b', 'c'}
+        
+        time.sleep(0.1)
+        node.gossip_once()
+        
+        members = node.get_members()
+        assert members['a']['alive'] is True
+        assert members['b']['alive'] is False
+        assert all(node.owns(device_id) for device_id in DEVICE_IDS)
+        node.stop()
+    
+    def test_failover_serves_devices_of_failed_node(self):
+        """Test that survivors serve a failed node's devices without 404s."""
+        dead_url = f'http://127.0.0.1:{_free_port()}'
+        node = ClusterNode('a', 'http://127.0.0.1:1', {'b': dead_url},
+                           timeout=1.0, failure_timeout=0.05)
+        manager = DeviceManager()
+        for device_id in DEVICE_IDS:
+            manager.register_device(SmartLightAdapter(device_id, f'Light {device_id}'))
+        client = create_app(manager, node).test_client()
+        
+        moved = [d for d in DEVICE_IDS if node.owner_of(d) == 'b']
+        assert moved
+        response = client.get(f'/api/v1/devices/{moved[0]}/state')
+        assert response.status_code == 503
+        
+        time.sleep(0.1)
+        node.gossip_once()
+        
+        for device_id in moved:
+            response = client.post(f'/api/v1/devices/{device_id}/command',
+                                   json={'command': 'turnOn'})
+            assert response.status_code == 200
+        devices = client.get('/api/v1/devices').get_json()['devices']
+        assert sorted(d['deviceId'] for d in devices) == sorted(DEVICE_IDS)
+        node.stop()
+
+
+class TestClusterForwarding:
+    """Test request forwarding between local node processes."""
+    
+    def test_any_node_lists_whole_fleet(self, cluster_urls):
+        """Test that listing on one node gathers devices from all nodes."""
+        for url in cluster_urls.values():
+            devices = requests.get(f'{url}/api/v1/devices').json()['devices']
+            assert sorted(d['deviceId'] for d in devices) == sorted(DEVICE_IDS)
+    
+    def test_commands_forwarded_to_owner(self, cluster_urls):
+        """Test that a command sent to any node reaches the owner."""
+        urls = list(cluster_urls.values())
+        for i, device_id in enumerate(DEVICE_IDS):
+            response = requests.post(f'{urls[i % 3]}/api/v1/devices/{device_id}/command',
+                                     json={'command': 'setBrightness',
+                                           'parameters': {'brightness': i}})
+            assert response.status_code == 200
+            assert response.json()['state']['brightness'] == i
+        
+        for i, device_id in enumerate(DEVICE_IDS):
+            response = requests.get(f'{urls[(i + 1) % 3]}/api/v1/devices/{device_id}/state')
+            assert response.json()['state']['brightness'] == i
+    
+    def test_errors_forwarded(self, cluster_urls):
+        """Test that owner errors are returned unchanged."""
+        url = cluster_urls['node0']
+        response = requests.post(f'{url}/api/v1/devices/light5/command',
+                                 json={'command': 'explode'})
+        assert response.status_code == 400
+        assert response.json()['success'] is False
+    
+    def test_changes_feed_covers_whole_fleet(self, cluster_urls):
+        """Test that the feed on one node reports changes owned by peers."""
+        urls = list(cluster_urls.values())
+        listing = requests.get(f'{urls[0]}/api/v1/devices').json()
+        cursor = {'since': listing['sequence'], 'epoch': listing['epoch']}
+        
+        node = ClusterNode('node0', urls[0], cluster_urls)
+        remote = [d for d in DEVICE_IDS if node.owner_of(d) != 'node0'][:2]
+        for device_id in remote:
+            requests.post(f'{urls[1]}/api/v1/devices/{device_id}/command',
+                          json={'command': 'setBrightness', 'parameters': {'brightness': 77}})
+        
+        data = requests.get(f'{urls[0]}/api/v1/devices/changes', params=cursor).json()
+        assert data['resync'] is False
+        assert sorted(d['deviceId'] for d in data['devices']) == sorted(remote)
+        assert all(d['state']['brightness'] == 77 for d in data['devices'])
+        
+        cursor = {'since': data['sequence'], 'epoch': data['epoch']}
+        data = requests.get(f'{urls[2]}/api/v1/devices/changes', params=cursor).json()
+        assert data['resync'] is False
+        assert data['devices'] == [] and data['removed'] == []
+    
+    def test_changes_feed_without_cluster_cursor_resyncs(self, cluster_urls):
+        """Test that a single-node cursor cannot resume a cluster feed."""
+        url = cluster_urls['node0']
+        data = requests.get(f'{url}/api/v1/devices/changes', params={'since': 0}).json()
+        assert data['resync'] is True
+        assert data['epoch'].startswith(ClusterNode.CURSOR_PREFIX)
+        assert data['devices'] == []
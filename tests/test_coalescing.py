@@ -0,0 +1,90 @@
+"""Tests for command coalescing."""
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+import pytest
+from smarthomeharmonizer.core.coalescing import CommandCoalescer
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import AdapterError
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+
+class CountingLight(SmartLightAdapter):
+    """Smart light recording every command it executes."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+    
+    def execute_command(self, command, parameters=None):
+        self.calls.append((command, parameters))
+        return super().execute_command(command, parameters)
+
+
+class TestCommandCoalescer:
+    """Test CommandCoalescer functionality."""
+    
+    @pytest.fixture
+    def setup(self):
+        """Create a manager with coalescing enabled."""
+        manager = DeviceManager(coalescer=CommandCoalescer(window=0.05))
+        light = CountingLight('light1', 'Living Room Light')
+        manager.register_device(light)
+        return manager, light
+    
+    def test_burst_collapses_to_last_value(self):
+        """Test that a slider burst executes once with the final value."""
+        coalescer = CommandCoalescer(window=30)
+        manager = DeviceManager(coalescer=coalescer)
+        light = CountingLight('light1', 'Living Room Light')
+        manager.register_device(light)
+        
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            futures = []
+            for count, brightness in enumerate(range(10, 20), start=1):
+                futures.append(pool.submit(manager.execute_command, 'light1',
+                                           'setBrightness', {'brightness': brightness}))
+                while coalescer.get_metrics()['submitted'] < count:
+                    time.sleep(0.001)
+            # Close the window explicitly instead of racing its timeout
+            coalescer.flush('light1')
+            states = [future.result(5) for future in futures]
+        
+        assert light.calls == [('setBrightness', {'brightness': 19})]
+        assert all(state['brightness'] == 19 for state in states)
+        metrics = manager.get_metrics()['coalescing']
+        assert metrics['submitted'] == 10
+        assert metrics['coalesced'] == 9
+    
+    def test_other_commands_run_immediately_in_order(self, setup):
+        """Test that non-coalescable commands flush pending windows first."""
+        manager, light = setup
+        
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            pending = pool.submit(manager.execute_command, 'light1', 'setBrightness',
+                                  {'brightness': 10})
+            time.sleep(0.01)
+            state = manager.execute_command('light1', 'turnOn')
+        
+        assert pending.result()['brightness'] == 10
+        assert state['powerState'] == 'ON'
+        assert [call[0] for call in light.calls] == ['setBrightness', 'turnOn']
+    
+    def test_errors_shared_by_all_callers(self, setup):
+        """Test that every waiting caller sees the merged command's error."""
+        manager, _ = setup
+        
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [
+                pool.submit(manager.execute_command, 'light1', 'setBrightness',
+                            {'brightness': value})
+                for value in (10, 20, 500)
+            ]
+        
+        errors = []
+        for future in futures:
+            with pytest.raises(AdapterError) as excinfo:
+                future.result()
+            errors.append(excinfo.value)
+        # Each caller raises its own exception instance
+        assert len({id(error) for error in errors}) == len(errors)
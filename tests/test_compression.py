@@ -0,0 +1,69 @@
+"""Tests for response compression."""
+
+import gzip
+import json
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.compression import ResponseCompressor
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+
+class TestResponseCompression:
+    """Test ResponseCompressor through the API."""
+    
+    def setup_method(self):
+        """Set up an app with enough devices for a large listing."""
+        self.manager = DeviceManager()
+        for i in range(100):
+            self.manager.register_device(SmartLightAdapter(f'light{i}', f'Light {i}'))
+        self.compressor = ResponseCompressor(min_size=512)
+        self.client = create_app(self.manager, compressor=self.compressor).test_client()
+    
+    def test_large_list_is_gzipped(self):
+        """Test that an accepted coding compresses large bodies."""
+        plain = self.client.get('/api/v1/devices')
+        response = self.client.get('/api/v1/devices', headers={'Accept-Encoding': 'gzip'})
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == plain.data
+        assert len(response.data) < len(plain.data) / 5
+        assert response.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    
+    def test_negotiation_and_threshold(self):
+        """Test that small bodies and refused codings stay uncompressed."""
+        response = self.client.get('/api/v1/devices', headers={'Accept-Encoding': 'gzip;q=0'})
+        assert 'Content-Encoding' not in response.headers
+        response = self.client.get('/api/v1/devices')
+        assert 'Content-Encoding' not in response.headers
+        response = self.client.get('/health', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+    
+    def test_unchanged_list_is_compressed_once(self):
+        """Test that compressed bodies are reused until the list changes."""
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        for _ in range(3):
+            self.client.get('/api/v1/devices', headers=headers)
+        self.manager.execute_command('light7', 'turnOn')
+        self.client.get('/api/v1/devices', headers=headers)
+        
+        metrics = self.compressor.get_metrics()
+        assert metrics['compressed'] == 2
+        assert metrics['cacheHits'] == 2
+        assert 0 < metrics['ratio'] < 0.2
+    
+    def test_if_none_match(self):
+        """Test that a client holding the current list gets 304."""
+        headers = {'Accept-Encoding': 'gzip'}
+        etag = self.client.get('/api/v1/devices', headers=headers).headers['ETag']
+        response = self.client.get('/api/v1/devices',
+                                   headers=dict(headers, **{'If-None-Match': etag}))
+        assert response.status_code == 304
+        assert response.data == b''
+        
+        self.manager.execute_command('light1', 'turnOn')
+        response = self.client.get('/api/v1/devices',
+                                   headers=dict(headers, **{'If-None-Match': etag}))
+        assert response.status_code == 200
+        devices = json.loads(gzip.decompress(response.data))['devices']
+        assert devices[1]['state']['powerState'] == 'ON'
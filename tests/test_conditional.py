@@ -0,0 +1,177 @@
+"""Tests for versioned and conditional commands."""
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import AdapterError, PreconditionFailedError
+from smarthomeharmonizer.core.state_store import SharedStateStore
+from smarthomeharmonizer.core.write_behind import WriteBehind
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class SlowLight(SmartLightAdapter):
+    """Light whose commands take a while to reach the hardware."""
+    
+    def execute_command(self, command, parameters=None):
+        time.sleep(0.02)
+        return super().execute_command(command, parameters)
+
+
+class TestConditionalCommands:
+    """Test versions, preconditions and relative commands in DeviceManager."""
+    
+    def setup_method(self):
+        """Set up a manager with a light and a thermostat."""
+        self.manager = DeviceManager()
+        self.manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        self.manager.register_device(ThermostatAdapter('thermo1', 'Hallway Thermostat'))
+    
+    def test_version_counts_changes(self):
+        """Test that versions grow with changes but not with reads."""
+        assert self.manager.get_state_version('light1') == 0
+        self.manager.execute_command('light1', 'turnOn')
+        self.manager.execute_command('light1', 'getStatus')
+        self.manager.execute_command('light1', 'turnOn')
+        assert self.manager.get_state_version('light1') == 1
+        self.manager.apply_state('light1', {'powerState': 'OFF', 'brightness': 10,
+                                            'color': {'r': 0, 'g': 0, 'b': 0}})
+        assert self.manager.get_state_version('light1') == 2
+    
+    def test_if_version(self):
+        """Test compare-and-set on the state version."""
+        self.manager.execute_command('light1', 'turnOn', if_version=0)
+        with pytest.raises(PreconditionFailedError) as excinfo:
+            self.manager.execute_command('light1', 'turnOff', if_version=0)
+        assert excinfo.value.version == 1
+        assert excinfo.value.state['powerState'] == 'ON'
+        assert self.manager.get_device_state('light1')['powerState'] == 'ON'
+    
+    def test_expected_fields(self):
+        """Test that expected field values guard a command."""
+        self.manager.execute_command('light1', 'turnOn', expected={'powerState': 'OFF'})
+        with pytest.raises(PreconditionFailedError, match="'powerState' is 'ON'"):
+            self.manager.execute_command('light1', 'setBrightness', {'brightness': 5},
+                                         expected={'powerState': 'OFF'})
+        assert self.manager.get_device_state('light1')['brightness'] == 100
+    
+    def test_relative_commands_clamp(self):
+        """Test relative commands against the current state."""
+        state = self.manager.execute_command('light1', 'incrementBrightness', {'amount': -30})
+        assert state['brightness'] == 70
+        state = self.manager.execute_command('light1', 'incrementBrightness', {'amount': 50})
+        assert state['brightness'] == 100
+        state = self.manager.execute_command('thermo1', 'incrementTemperature', {'amount': 2.5})
+        assert state['targetTemperature'] == 74.5
+        with pytest.raises(AdapterError):
+            self.manager.execute_command('light1', 'incrementBrightness', {'amount': 'up'})
+    
+    def test_relative_commands_are_atomic(self):
+        """Test that concurrent increments are not lost."""
+        self.manager.execute_command('light1', 'setBrightness', {'brightness': 0})
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for _ in range(50):
+                pool.submit(self.manager.execute_command, 'light1', 'incrementBrightness',
+                            {'amount': 1})
+        assert self.manager.get_device_state('light1')['brightness'] == 50
+    
+    def test_conditions_wait_for_write_behind(self):
+        """Test relative and If-Match commands behind queued absolute writes."""
+        write_behind = WriteBehind(workers=1)
+        manager = DeviceManager(write_behind=write_behind)
+        manager.register_device(SlowLight('light2', 'Porch Light'))
+        try:
+            state = manager.execute_command('light2', 'setBrightness', {'brightness': 50})
+            assert state['brightness'] == 50
+            version = manager.get_state_version('light2')
+            assert version == 1
+            
+            state = manager.execute_command('light2', 'incrementBrightness', {'amount': 10})
+            assert state['brightness'] == 60
+            manager.execute_command('light2', 'setBrightness', {'brightness': 20})
+            with pytest.raises(PreconditionFailedError) as excinfo:
+                manager.execute_command('light2', 'turnOn', if_version=version)
+            assert excinfo.value.version == 3
+            assert excinfo.value.state['brightness'] == 20
+            
+            manager.execute_command('light2', 'setBrightness', {'brightness': 30})
+            state = manager.execute_command('light2', 'turnOn',
+                                            if_version=manager.get_state_version('light2'))
+            assert state['powerState'] == 'ON'
+            
+            write_behind.shutdown()
+            assert manager.get_device_state('light2') == state
+            assert write_behind.get_metrics()['confirmed'] == 3
+        finally:
+            write_behind.shutdown()
+    
+    def test_shared_store_versions(self):
+        """Test that the store's slot version guards commands across workers."""
+        store = SharedStateStore(slots=8, slot_size=512)
+        try:
+            manager = DeviceManager(state_store=store)
+            manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+            version = manager.get_state_version('light1')
+            manager.execute_command('light1', 'turnOn', if_version=version)
+            assert manager.get_state_version('light1') > version
+            with pytest.raises(PreconditionFailedError):
+                manager.execute_command('light1', 'turnOff', if_version=version)
+        finally:
+            store.close()
+            store.unlink()
+
+
+class TestConditionalApi:
+    """Test If-Match and expected fields through the API."""
+    
+    def setup_method(self):
+        """Set up a test client."""
+        manager = DeviceManager()
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        self.client = create_app(manager).test_client()
+    
+    def test_etag_and_if_match(self):
+        """Test that the state ETag can guard a command."""
+        response = self.client.get('/api/v1/devices/light1/state')
+        etag = response.headers['ETag']
+        assert etag == '"0"'
+        assert response.get_json()['version'] == 0
+        
+        response = self.client.post('/api/v1/devices/light1/command',
+                                    json={'command': 'turnOn'}, headers={'If-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] == '"1"'
+        
+        response = self.client.post('/api/v1/devices/light1/command',
+                                    json={'command': 'turnOff'}, headers={'If-Match': etag})
+        assert response.status_code == 412
+        body = response.get_json()
+        assert body['version'] == 1
+        assert body['state']['powerState'] == 'ON'
+    
+    def test_expected_and_relative(self):
+        """Test a one-request conditional increment."""
+        response = self.client.post('/api/v1/devices/light1/command', json={
+            'command': 'incrementBrightness',
+            'parameters': {'amount': -10},
+            'expected': {'powerState': 'ON'}
+        })
+        assert response.status_code == 412
+        
+        response = self.client.post('/api/v1/devices/light1/command', json={
+            'command': 'incrementBrightness',
+            'parameters': {'amount': -10},
+            'expected': {'powerState': 'OFF'}
+        })
+        assert response.get_json()['state']['brightness'] == 90
+    
+    def test_invalid_conditions(self):
+        """Test validation of If-Match and expected."""
+        response = self.client.post('/api/v1/devices/light1/command',
+                                    json={'command': 'turnOn'}, headers={'If-Match': '"abc"'})
+        assert response.status_code == 400
+        response = self.client.post('/api/v1/devices/light1/command',
+                                    json={'command': 'turnOn', 'expected': ['ON']})
+        assert response.status_code == 400
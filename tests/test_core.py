@@ -1,5 +1,6 @@
 """Tests for core functionality."""
 
+import threading
 import pytest
 from flask import Flask
 from smarthomeharmonizer.core.app import create_app
@@ -78,6 +79,53 @@ class TestDeviceManager:
         
         with pytest.raises(InvalidCommandError):
             manager.execute_command('light1', 'invalidCommand')
+    
+    def test_state_listeners(self):
+        """Test that listeners see commands and applied states."""
+        manager = DeviceManager()
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        changes = []
+        manager.add_listener(
+            lambda device_id, state: changes.append((device_id, state['powerState']))
+        )
+        
+        manager.execute_command('light1', 'turnOn')
+        manager.apply_state('light1', dict(manager.get_device_state('light1'), powerState='OFF'))
+        
+        assert changes == [('light1', 'ON'), ('light1', 'OFF')]
+        assert manager.get_device_state('light1')['powerState'] == 'OFF'
+    
+    def test_failing_listener_does_not_break_command(self):
+        """Test that listener errors are isolated from the caller."""
+        manager = DeviceManager()
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        
+        def broken_listener(device_id, state):
+            raise RuntimeError("boom")
+        
+        manager.add_listener(broken_listener)
+        
+        assert manager.execute_command('light1', 'turnOn')['powerState'] == 'ON'
+    
+    def test_listeners_see_device_changes_in_order(self):
+        """Test that concurrent commands are notified in execution order."""
+        manager = DeviceManager()
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        seen = []
+        manager.add_listener(lambda device_id, state: seen.append(state['brightness']))
+        
+        def set_levels(start):
+            for level in range(start, 100, 4):
+                manager.execute_command('light1', 'setBrightness', {'brightness': level})
+        
+        threads = [threading.Thread(target=set_levels, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(seen) == 100
+        assert seen[-1] == manager.get_device_state('light1')['brightness']
 
 
 class TestFlaskApp:
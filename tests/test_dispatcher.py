@@ -0,0 +1,125 @@
+"""Tests for the priority command dispatcher."""
+
+from threading import Event
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.dispatcher import CommandDispatcher
+from smarthomeharmonizer.core.exceptions import InvalidCommandError, QueueFullError
+from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+
+
+class TestCommandDispatcher:
+    """Test CommandDispatcher scheduling."""
+    
+    @pytest.fixture
+    def dispatcher(self):
+        """Create a single-worker dispatcher so ordering is observable."""
+        dispatcher = CommandDispatcher(workers=1, max_queue=8)
+        yield dispatcher
+        dispatcher.shutdown()
+    
+    def _block(self, dispatcher, device_id='blocker'):
+        """Occupy the only worker until the returned event is set."""
+        started, release = Event(), Event()
+        
+        def block():
+            started.set()
+            release.wait()
+        
+        dispatcher.submit(device_id, 'setStrength', block)
+        started.wait()
+        return release
+    
+    def test_safety_preempts_polling(self, dispatcher):
+        """Test that turnOff runs before earlier queued polls."""
+        order = []
+        release = self._block(dispatcher)
+        polls = [dispatcher.submit(f'coffee{i}', 'getStatus', lambda i=i: order.append(f'poll{i}'))
+                 for i in range(3)]
+        safety = dispatcher.submit('coffee9', 'turnOff', lambda: order.append('turnOff'))
+        release.set()
+        
+        safety.result(timeout=5)
+        for poll in polls:
+            poll.result(timeout=5)
+        assert order[0] == 'turnOff'
+    
+    def test_round_robin_across_devices(self, dispatcher):
+        """Test that a busy device does not starve another device."""
+        order = []
+        release = self._block(dispatcher)
+        futures = [dispatcher.submit('busy', 'setSize', lambda i=i: order.append(('busy', i)))
+                   for i in range(4)]
+        futures.append(dispatcher.submit('quiet', 'setSize', lambda: order.append(('quiet', 0))))
+        release.set()
+        
+        for future in futures:
+            future.result(timeout=5)
+        assert order.index(('quiet', 0)) <= 1
+    
+    def test_queue_bound(self, dispatcher):
+        """Test that a full device queue rejects commands."""
+        release = self._block(dispatcher, 'coffee1')
+        for _ in range(8):
+            dispatcher.submit('coffee1', 'setSize', lambda: None)
+        
+        with pytest.raises(QueueFullError):
+            dispatcher.submit('coffee1', 'setSize', lambda: None)
+        release.set()
+        
+        metrics = dispatcher.get_metrics()['classes']['interactive']
+        assert metrics['rejected'] == 1
+    
+    def test_full_polling_queue_does_not_block_safety(self, dispatcher):
+        """Test that each priority class is bounded separately."""
+        release = self._block(dispatcher, 'coffee1')
+        for _ in range(8):
+            dispatcher.submit('coffee1', 'getStatus', lambda: None)
+        with pytest.raises(QueueFullError):
+            dispatcher.submit('coffee1', 'getStatus', lambda: None)
+        
+        safety = dispatcher.submit('coffee1', 'turnOff', lambda: 'off')
+        release.set()
+        
+        assert safety.result(timeout=5) == 'off'
+        assert dispatcher.get_metrics()['classes']['safety']['rejected'] == 0
+    
+    def test_unknown_priority(self, dispatcher):
+        """Test that unknown priority classes are rejected."""
+        with pytest.raises(InvalidCommandError):
+            dispatcher.submit('coffee1', 'turnOn', lambda: None, priority='urgent')
+    
+    def test_manager_runs_commands_on_workers(self):
+        """Test DeviceManager integration and per-class metrics."""
+        dispatcher = CommandDispatcher(workers=2)
+        manager = DeviceManager(dispatcher=dispatcher)
+        manager.register_device(CoffeeMakerAdapter('coffee1', 'Kitchen Coffee Maker'))
+        
+        manager.execute_command('coffee1', 'turnOn')
+        state = manager.execute_command('coffee1', 'turnOff')
+        manager.execute_command('coffee1', 'getStatus', priority='bulk')
+        
+        assert state['powerState'] == 'OFF'
+        metrics = manager.get_metrics()['dispatcher']['classes']
+        assert metrics['safety']['completed'] == 1
+        assert metrics['interactive']['completed'] == 1
+        assert metrics['bulk']['completed'] == 1
+        assert metrics['safety']['wait']['count'] == 1
+        dispatcher.shutdown()
+    
+    def test_app_priority_parameter(self):
+        """Test the priority field of the command endpoint."""
+        dispatcher = CommandDispatcher(workers=1)
+        manager = DeviceManager(dispatcher=dispatcher)
+        manager.register_device(CoffeeMakerAdapter('coffee1', 'Kitchen Coffee Maker'))
+        client = create_app(manager).test_client()
+        
+        response = client.post('/api/v1/devices/coffee1/command',
+                               json={'command': 'turnOn', 'priority': 'interactive'})
+        assert response.status_code == 200
+        
+        response = client.post('/api/v1/devices/coffee1/command',
+                               json={'command': 'turnOn', 'priority': 'urgent'})
+        assert response.status_code == 400
+        dispatcher.shutdown()
@@ -0,0 +1,129 @@
+"""Tests for the state history recorder."""
+
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.history import HistoryRecorder
+from smarthomeharmonizer.core.exceptions import InvalidFieldError
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class TestHistoryRecorder:
+    """Test HistoryRecorder functionality."""
+    
+    def setup_method(self):
+        """Set up a recorder with a small capacity."""
+        self.manager = DeviceManager()
+        self.manager.register_device(ThermostatAdapter('thermo1', 'Thermostat'))
+        self.history = HistoryRecorder(self.manager, capacity=5)
+    
+    def test_records_numeric_and_switch_fields_on_change(self):
+        """Test that only changed numeric and ON/OFF values are sampled."""
+        self.manager.execute_command('thermo1', 'turnOn')
+        self.manager.execute_command('thermo1', 'getStatus')
+        self.manager.execute_command('thermo1', 'setTemperature', {'temperature': 68})
+        
+        assert self.history.query('thermo1', 'targetTemperature')['value'] == [72.0, 68.0]
+        assert self.history.query('thermo1', 'powerState')['value'] == [1.0]
+        assert self.history.query('thermo1', 'fanRunning')['value'] == [0.0]
+        assert 'mode' not in self.history.recorded_fields('thermo1')
+        with pytest.raises(InvalidFieldError):
+            self.history.query('thermo1', 'mode')
+    
+    def test_ring_buffer_keeps_newest_samples(self):
+        """Test that old samples are overwritten in chronological order."""
+        for i in range(8):
+            self.history.record('probe', {'level': i}, timestamp=100.0 + i)
+        
+        samples = self.history.query('probe', 'level')
+        assert samples['t'] == [103.0, 104.0, 105.0, 106.0, 107.0]
+        assert samples['value'] == [3.0, 4.0, 5.0, 6.0, 7.0]
+        assert self.history.query('probe', 'level', start=104, end=105.5)['value'] == [4.0, 5.0]
+        
+        # A clock stepping back does not unsort the series
+        self.history.record('probe', {'level': 9}, timestamp=50.0)
+        assert self.history.query('probe', 'level')['t'][-1] == 107.0
+    
+    def test_downsampling(self):
+        """Test min/max/avg per bucket, skipping empty buckets."""
+        history = HistoryRecorder(self.manager, capacity=100)
+        for t, value in [(0, 1), (1, 5), (2, 3), (10, 7), (11, 9), (25, 2)]:
+            history.record('probe', {'level': value}, timestamp=1000.0 + t)
+        
+        buckets = history.query('probe', 'level', start=1000, step=5)
+        assert buckets == {
+            't': [1000.0, 1010.0, 1025.0],
+            'min': [1.0, 7.0, 2.0],
+            'max': [5.0, 9.0, 2.0],
+            'avg': [3.0, 8.0, 2.0],
+            'count': [3, 2, 1]
+        }
+        with pytest.raises(ValueError):
+            history.query('probe', 'level', step=0)
+        with pytest.raises(ValueError):
+            history.query('probe', 'level', step=0.001)
+    
+    def test_memory_reporting(self):
+        """Test that memory grows with samples up to the capacity."""
+        history = HistoryRecorder(self.manager, capacity=1000, fields=['level'])
+        history.record('probe', {'level': 0, 'other': 1}, timestamp=0.0)
+        small = history.memory_usage('probe')
+        for i in range(1, 2000):
+            history.record('probe', {'level': i}, timestamp=float(i))
+        
+        assert history.recorded_fields('probe') == ['level']
+        assert small < history.memory_usage('probe') < 1000 * 12 * 1.5
+        metrics = history.get_metrics()
+        assert metrics['retained'] == 1000
+        assert metrics['recorded'] == 2000
+        assert metrics['maxBytesPerDevice'] == history.memory_usage('probe')
+        
+        history.forget('probe')
+        assert history.memory_usage('probe') == 0
+        history.stop()
+
+
+class TestHistoryApi:
+    """Test the device history endpoint."""
+    
+    def setup_method(self):
+        """Set up an app with history recording."""
+        self.manager = DeviceManager()
+        self.manager.register_device(SmartLightAdapter('light1', 'Light'))
+        self.history = HistoryRecorder(self.manager)
+        self.client = create_app(self.manager, history=self.history).test_client()
+    
+    def test_history_endpoint(self):
+        """Test raw and downsampled history over the API."""
+        for brightness in (10, 20, 30):
+            self.client.post('/api/v1/devices/light1/command',
+                             json={'command': 'setBrightness',
+                                   'parameters': {'brightness': brightness}})
+        
+        data = self.client.get('/api/v1/devices/light1/history?field=brightness').get_json()
+        assert data['history']['value'] == [10.0, 20.0, 30.0]
+        assert data['memoryBytes'] > 0
+        
+        url = '/api/v1/devices/light1/history'
+        data = self.client.get(f'{url}?field=brightness&step=3600').get_json()
+        assert data['step'] == 3600
+        assert data['history']['count'] == [3]
+        assert data['history']['avg'] == [20.0]
+        assert self.manager.get_metrics()['history']['devices'] == 1
+    
+    def test_history_errors(self):
+        """Test validation of the history query."""
+        url = '/api/v1/devices/light1/history'
+        response = self.client.get(url)
+        assert response.status_code == 400
+        assert self.client.get('/api/v1/devices/nope/history?field=x').status_code == 404
+        assert self.client.get(f'{url}?field=color').status_code == 400
+        self.client.post('/api/v1/devices/light1/command', json={'command': 'turnOn'})
+        assert self.client.get(f'{url}?field=powerState&step=-1').status_code == 400
+        assert self.client.get(f'{url}?field=powerState&from=x').status_code == 400
+    
+    def test_endpoint_requires_recorder(self):
+        """Test that the endpoint only exists with a recorder."""
+        client = create_app(self.manager).test_client()
+        assert client.get('/api/v1/devices/light1/history?field=brightness').status_code == 404
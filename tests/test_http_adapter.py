@@ -0,0 +1,147 @@
+"""Tests for the pooled HTTP device adapter."""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import json
+import socket
+import time
+import pytest
+from smarthomeharmonizer.adapters.http_device import HttpDeviceAdapter, close_sessions
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import (
+    AdapterError, InvalidCommandError, InvalidParameterError, TransportError
+)
+
+
+class StubPlugHandler(BaseHTTPRequestHandler):
+    """Minimal Wi-Fi plug API speaking keep-alive HTTP/1.1."""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+    
+    def log_message(self, *args):
+        pass
+    
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        if self.path == '/status':
+            self._reply(200, {'relay': self.server.relay, 'watts': 12.5})
+        elif self.path == '/slow':
+            time.sleep(0.5)
+            self._reply(200, {})
+        else:
+            self._reply(404, {'error': 'not found'})
+    
+    def do_PUT(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path == '/relay':
+            self.server.relay = body['on']
+            self._reply(200, {'relay': self.server.relay})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+
+class StubPlugServer(ThreadingHTTPServer):
+    """Stub server that ignores clients hanging up mid-reply."""
+    
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        pass
+
+
+class SmartPlugAdapter(HttpDeviceAdapter):
+    """Wi-Fi plug controlled through the stub API."""
+    
+    COMMAND_REQUESTS = {
+        'turnOn': ('PUT', '/relay', {'on': True}),
+        'turnOff': ('PUT', '/relay', {'on': False}),
+        'setRelay': ('PUT', '/relay', lambda p: {'on': bool(p['on'])}),
+        'missing': ('GET', '/nowhere', None),
+        'slow': ('GET', '/slow', None)
+    }
+    STATE_REQUEST = ('GET', '/status')
+    
+    def parse_state(self, payload):
+        state = {}
+        if 'relay' in payload:
+            state['powerState'] = 'ON' if payload['relay'] else 'OFF'
+        if 'watts' in payload:
+            state['power'] = payload['watts']
+        return state
+
+
+@pytest.fixture
+def plug_url():
+    """Run a stub plug server on a loopback port."""
+    server = StubPlugServer(('127.0.0.1', 0), StubPlugHandler)
+    server.relay = False
+    server.connections = 0
+    thread = Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server, f'http://127.0.0.1:{server.server_address[1]}'
+    close_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpDeviceAdapter:
+    """Test HttpDeviceAdapter against a stub device."""
+    
+    def test_commands_and_state(self, plug_url):
+        """Test command mapping and state parsing."""
+        _, url = plug_url
+        plug = SmartPlugAdapter('plug1', 'Desk Plug', base_url=url)
+        
+        assert plug.execute_command('turnOn')['powerState'] == 'ON'
+        assert plug.execute_command('setRelay', {'on': 0})['powerState'] == 'OFF'
+        assert plug.get_state() == {'powerState': 'OFF', 'power': 12.5}
+        assert set(plug.get_supported_commands()) == set(SmartPlugAdapter.COMMAND_REQUESTS)
+    
+    def test_connections_are_reused(self, plug_url):
+        """Test that devices on one host share keep-alive connections."""
+        server, url = plug_url
+        plugs = [SmartPlugAdapter(f'plug{i}', f'Plug {i}', base_url=url) for i in range(3)]
+        
+        for _ in range(10):
+            for plug in plugs:
+                plug.execute_command('turnOn')
+                plug.get_state()
+        
+        assert server.connections == 1
+    
+    def test_errors(self, plug_url):
+        """Test invalid commands, parameters, HTTP errors and timeouts."""
+        _, url = plug_url
+        plug = SmartPlugAdapter('plug1', 'Desk Plug', base_url=url, timeout=0.1)
+        
+        with pytest.raises(InvalidCommandError):
+            plug.execute_command('explode')
+        with pytest.raises(InvalidParameterError, match="Invalid parameters"):
+            plug.execute_command('setRelay')
+        with pytest.raises(AdapterError, match="404") as excinfo:
+            plug.execute_command('missing')
+        assert not isinstance(excinfo.value, TransportError)
+        with pytest.raises(TransportError, match="request failed"):
+            plug.execute_command('slow')
+    
+    def test_with_device_manager(self, plug_url):
+        """Test serving an HTTP device through DeviceManager."""
+        _, url = plug_url
+        manager = DeviceManager()
+        manager.register_device(SmartPlugAdapter('plug1', 'Desk Plug', base_url=url))
+        
+        manager.execute_command('plug1', 'turnOn')
+        assert manager.get_device_state('plug1')['powerState'] == 'ON'
+        assert manager.list_devices()[0]['type'] == 'SmartPlugAdapter'
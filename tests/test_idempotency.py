@@ -0,0 +1,215 @@
+"""Tests for idempotency keys and batch commands."""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+import time
+from unittest.mock import patch
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import IdempotencyConflictError, QueueFullError
+from smarthomeharmonizer.core.idempotency import IdempotencyCache
+from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+
+class FakeClock:
+    """Controllable replacement for time.monotonic."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll a condition until it holds or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def setup():
+    """Create an app with a coffee maker and a light."""
+    manager = DeviceManager()
+    coffee = CoffeeMakerAdapter('coffee1', 'Kitchen Coffee Maker')
+    manager.register_device(coffee)
+    manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+    app = create_app(manager)
+    return app.test_client(), manager, coffee
+
+
+class TestIdempotencyCache:
+    """Test IdempotencyCache directly."""
+    
+    def test_ttl_and_capacity(self):
+        """Test that responses expire after the TTL and beyond max_entries."""
+        clock = FakeClock()
+        cache = IdempotencyCache(ttl=60, max_entries=2)
+        with patch('smarthomeharmonizer.core.idempotency.time.monotonic', clock):
+            cache.run('a', 'x', lambda: {'n': 1})
+            assert cache.run('a', 'x', lambda: {'n': 2}) == ({'n': 1}, True)
+            
+            clock.now += 61
+            assert cache.run('a', 'x', lambda: {'n': 3}) == ({'n': 3}, False)
+            cache.run('b', 'x', lambda: {'n': 4})
+            cache.run('c', 'x', lambda: {'n': 5})
+        
+        assert cache.get_metrics() == {'entries': 2, 'stored': 4, 'replayed': 1, 'evictions': 2}
+    
+    def test_concurrent_repeat_waits_for_first(self):
+        """Test that a repeat during the first request does not run it again."""
+        cache = IdempotencyCache()
+        started, release = Event(), Event()
+        calls = []
+        
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'ok': True}
+        
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(cache.run, 'k', 'x', slow)
+            started.wait(5)
+            second = pool.submit(cache.run, 'k', 'x', slow)
+            release.set()
+            assert first.result() == ({'ok': True}, False)
+            assert second.result() == ({'ok': True}, True)
+        assert calls == [1]
+    
+    def test_running_requests_are_bounded(self):
+        """Test that hung requests neither block eviction nor grow the cache."""
+        cache = IdempotencyCache(max_entries=3)
+        release = Event()
+        started = []
+        
+        def hung():
+            started.append(1)
+            release.wait(5)
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            hung_requests = [pool.submit(cache.run, 'hung-0', 'x', hung)]
+            wait_for(lambda: len(started) == 1)
+            for i in range(10):
+                cache.run(f'k{i}', 'x', lambda: {})
+            assert cache.get_metrics()['entries'] == 3
+            
+            hung_requests += [pool.submit(cache.run, f'hung-{i}', 'x', hung) for i in (1, 2)]
+            wait_for(lambda: len(started) == 3)
+            with pytest.raises(QueueFullError):
+                cache.run('k10', 'x', lambda: {})
+            release.set()
+            for future in hung_requests:
+                future.result()
+        assert cache.get_metrics()['entries'] == 3
+    
+    def test_key_reuse_with_other_body_conflicts(self):
+        """Test that one key cannot be used for two different requests."""
+        cache = IdempotencyCache()
+        cache.run('k', 'x', lambda: {})
+        with pytest.raises(IdempotencyConflictError):
+            cache.run('k', 'y', lambda: {})
+
+
+class TestIdempotentCommands:
+    """Test Idempotency-Key handling in the API."""
+    
+    def test_retried_brew_runs_once(self, setup):
+        """Test that a retried brew replays the stored response."""
+        client, manager, coffee = setup
+        client.post('/api/v1/devices/coffee1/command', json={'command': 'turnOn'})
+        headers = {'Idempotency-Key': 'directive-1'}
+        
+        first = client.post('/api/v1/devices/coffee1/command',
+                            json={'command': 'brew'}, headers=headers)
+        retry = client.post('/api/v1/devices/coffee1/command',
+                            json={'command': 'brew'}, headers=headers)
+        
+        assert first.status_code == retry.status_code == 200
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert 'Idempotent-Replayed' not in first.headers
+        assert retry.get_json() == first.get_json()
+        assert coffee.get_state()['waterLevel'] == 80
+        assert manager.get_metrics()['idempotency']['replayed'] == 1
+    
+    def test_failures_are_not_stored(self, setup):
+        """Test that a failed request can be retried with the same key."""
+        client, _, coffee = setup
+        headers = {'Idempotency-Key': 'directive-2'}
+        response = client.post('/api/v1/devices/coffee1/command',
+                               json={'command': 'brew'}, headers=headers)
+        assert response.status_code == 400
+        
+        client.post('/api/v1/devices/coffee1/command', json={'command': 'turnOn'})
+        response = client.post('/api/v1/devices/coffee1/command',
+                               json={'command': 'brew'}, headers=headers)
+        assert response.status_code == 200
+        assert coffee.get_state()['brewing'] is True
+    
+    def test_keys_are_scoped_to_the_client(self, setup):
+        """Test that two clients using the same key do not share responses."""
+        client, manager, _ = setup
+        for client_id, address in (('alexa', '10.0.0.1'), ('google', '10.0.0.1'),
+                                   ('alexa', '10.0.0.2')):
+            response = client.post('/api/v1/devices/light1/command', json={'command': 'turnOn'},
+                                   headers={'Idempotency-Key': 'k', 'X-Client-ID': client_id},
+                                   environ_base={'REMOTE_ADDR': address})
+            assert 'Idempotent-Replayed' not in response.headers
+        assert manager.get_metrics()['idempotency']['stored'] == 3
+    
+    def test_key_reuse_returns_422(self, setup):
+        """Test that a key reused for another command is rejected."""
+        client, _, _ = setup
+        headers = {'Idempotency-Key': 'directive-3'}
+        client.post('/api/v1/devices/light1/command', json={'command': 'turnOn'},
+                    headers=headers)
+        response = client.post('/api/v1/devices/light1/command', json={'command': 'turnOff'},
+                               headers=headers)
+        assert response.status_code == 422
+
+
+class TestBatchCommands:
+    """Test the batch command endpoint."""
+    
+    def test_batch_reports_each_result(self, setup):
+        """Test that batch items run in order and fail independently."""
+        client, _, _ = setup
+        response = client.post('/api/v1/commands/batch', json={'commands': [
+            {'deviceId': 'light1', 'command': 'turnOn'},
+            {'deviceId': 'light1', 'command': 'setBrightness', 'parameters': {'brightness': 30}},
+            {'deviceId': 'missing', 'command': 'turnOn'},
+            {'deviceId': 'coffee1', 'command': 'fly'}
+        ]})
+        
+        assert response.status_code == 200
+        results = response.get_json()['results']
+        assert [r['success'] for r in results] == [True, True, False, False]
+        assert results[1]['state']['brightness'] == 30
+        assert 'not found' in results[2]['error']
+    
+    def test_batch_is_idempotent(self, setup):
+        """Test that a retried batch does not brew twice."""
+        client, _, coffee = setup
+        body = {'commands': [{'deviceId': 'coffee1', 'command': 'turnOn'},
+                             {'deviceId': 'coffee1', 'command': 'brew'}]}
+        headers = {'Idempotency-Key': 'batch-1'}
+        first = client.post('/api/v1/commands/batch', json=body, headers=headers)
+        retry = client.post('/api/v1/commands/batch', json=body, headers=headers)
+        
+        assert retry.get_json() == first.get_json()
+        assert coffee.get_state()['waterLevel'] == 80
+    
+    def test_invalid_batches(self, setup):
+        """Test validation of batch bodies."""
+        client, _, _ = setup
+        assert client.post('/api/v1/commands/batch', json={}).status_code == 400
+        assert client.post('/api/v1/commands/batch',
+                           json={'commands': [{'command': 'turnOn'}]}).status_code == 400
+        too_many = [{'deviceId': 'light1', 'command': 'turnOn'}] * 101
+        assert client.post('/api/v1/commands/batch',
+                           json={'commands': too_many}).status_code == 400
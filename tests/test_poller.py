@@ -0,0 +1,87 @@
+"""Tests for the adaptive state poller."""
+
+import time
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.poller import StatePoller
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll a condition until it holds or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestStatePoller:
+    """Test StatePoller."""
+    
+    def setup_method(self):
+        """Set up a manager with two lights."""
+        self.manager = DeviceManager()
+        self.busy = SmartLightAdapter('busy', 'Busy Light')
+        self.idle = SmartLightAdapter('idle', 'Idle Light')
+        self.manager.register_device(self.busy)
+        self.manager.register_device(self.idle)
+        self.changes = []
+        self.manager.add_listener(lambda device_id, state: self.changes.append(device_id))
+    
+    def test_detects_outside_changes(self):
+        """Test that a change made behind the manager's back is published."""
+        poller = StatePoller(self.manager, min_interval=0.02, max_interval=0.05)
+        poller.start()
+        try:
+            assert wait_for(lambda: poller.get_metrics()['polls'] >= 2)
+            # Simulate a physical switch: bypass the manager
+            self.busy.execute_command('turnOn')
+            assert wait_for(lambda: 'busy' in self.changes)
+        finally:
+            poller.stop()
+        
+        assert 'idle' not in self.changes
+        assert poller.get_metrics()['changes'] == 1
+    
+    def test_intervals_adapt(self):
+        """Test that changing devices are polled faster than idle ones."""
+        poller = StatePoller(self.manager, min_interval=0.01, max_interval=0.16, backoff=2.0)
+        poller.start()
+        try:
+            for brightness in range(10, 60, 2):
+                self.busy.execute_command('setBrightness', {'brightness': brightness})
+                time.sleep(0.02)
+        finally:
+            poller.stop()
+        
+        assert poller.interval_of('idle') == 0.16
+        assert poller.interval_of('busy') < 0.16
+        assert poller.get_metrics()['tracked'] == 2
+    
+    def test_commands_are_not_drift(self):
+        """Test that commands through the manager do not count as changes."""
+        poller = StatePoller(self.manager, min_interval=0.02, max_interval=0.05)
+        poller.start()
+        try:
+            assert wait_for(lambda: poller.get_metrics()['polls'] >= 2)
+            self.manager.execute_command('busy', 'turnOn')
+            polls = poller.get_metrics()['polls']
+            assert wait_for(lambda: poller.get_metrics()['polls'] >= polls + 4)
+        finally:
+            poller.stop()
+        
+        assert poller.get_metrics()['changes'] == 0
+        assert self.changes == ['busy']
+    
+    def test_unregistered_devices_are_dropped(self):
+        """Test that the poller stops tracking removed devices."""
+        poller = StatePoller(self.manager, min_interval=0.02, max_interval=0.05)
+        poller.start()
+        try:
+            self.manager.unregister_device('idle')
+            assert wait_for(lambda: poller.interval_of('idle') is None)
+        finally:
+            poller.stop()
+        
+        assert self.manager.get_metrics()['poller']['tracked'] == 1
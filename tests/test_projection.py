@@ -0,0 +1,84 @@
+"""Tests for field projection."""
+
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import InvalidFieldError
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class CountingLight(SmartLightAdapter):
+    """Light counting state reads."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+    
+    def get_state(self):
+        self.reads += 1
+        return super().get_state()
+
+
+class TestFieldProjection:
+    """Test list_devices and describe_device projections."""
+    
+    def setup_method(self):
+        """Set up a manager with a light and a thermostat."""
+        self.manager = DeviceManager()
+        self.light = CountingLight('light1', 'Living Room Light')
+        self.manager.register_device(self.light)
+        self.manager.register_device(ThermostatAdapter('thermo1', 'Hallway Thermostat'))
+    
+    def test_default_fields_unchanged(self):
+        """Test that no projection returns the full description."""
+        device = self.manager.list_devices()[0]
+        assert list(device) == ['deviceId', 'name', 'type', 'supportedCommands', 'state']
+    
+    def test_names_only_skip_state(self):
+        """Test that a projection without state never reads device state."""
+        devices = self.manager.list_devices(fields=['name'])
+        assert devices == [{'deviceId': 'light1', 'name': 'Living Room Light'},
+                           {'deviceId': 'thermo1', 'name': 'Hallway Thermostat'}]
+        assert self.light.reads == 0
+    
+    def test_state_fields(self):
+        """Test selecting single state fields across device types."""
+        devices = self.manager.list_devices(fields=['state.brightness', 'state.powerState'])
+        assert devices[0]['state'] == {'brightness': 100, 'powerState': 'OFF'}
+        assert devices[1]['state'] == {'powerState': 'OFF'}
+        
+        device = self.manager.describe_device('light1', ['state', 'state.brightness', 'version'])
+        assert set(device['state']) == {'powerState', 'brightness', 'color'}
+        assert device['version'] == 0
+    
+    def test_unknown_fields_are_rejected(self):
+        """Test that typos in projections are reported."""
+        with pytest.raises(InvalidFieldError):
+            self.manager.list_devices(fields=['nmae'])
+
+
+class TestProjectionApi:
+    """Test the fields query parameter."""
+    
+    def setup_method(self):
+        """Set up a test client."""
+        manager = DeviceManager()
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        self.client = create_app(manager).test_client()
+    
+    def test_routes(self):
+        """Test fields= on the list, device and state routes."""
+        response = self.client.get('/api/v1/devices?fields=name')
+        assert response.get_json()['devices'] == [{'deviceId': 'light1',
+                                                   'name': 'Living Room Light'}]
+        
+        response = self.client.get('/api/v1/devices/light1?fields=type,state.powerState')
+        assert response.get_json() == {'success': True, 'deviceId': 'light1',
+                                       'type': 'SmartLightAdapter',
+                                       'state': {'powerState': 'OFF'}}
+        
+        response = self.client.get('/api/v1/devices/light1/state?fields=brightness')
+        assert response.get_json()['state'] == {'brightness': 100}
+        
+        assert self.client.get('/api/v1/devices?fields=bogus').status_code == 400
@@ -0,0 +1,114 @@
+"""Tests for token-bucket rate limiting."""
+
+from unittest.mock import patch
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import RateLimitError
+from smarthomeharmonizer.core.rate_limit import RateLimit, RateLimiter, TokenBucketTable
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class FakeClock:
+    """Controllable replacement for time.monotonic."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Patch the limiter clock."""
+    fake = FakeClock()
+    with patch('smarthomeharmonizer.core.rate_limit.time.monotonic', fake):
+        yield fake
+
+
+class TestRateLimiter:
+    """Test RateLimiter and TokenBucketTable."""
+    
+    def test_burst_then_refill(self, clock):
+        """Test that a bucket allows its burst and refills lazily."""
+        limiter = RateLimiter(default_device_limit=RateLimit(rate=2, burst=3))
+        for _ in range(3):
+            limiter.acquire('light1', 'SmartLightAdapter')
+        
+        with pytest.raises(RateLimitError) as excinfo:
+            limiter.acquire('light1', 'SmartLightAdapter')
+        assert excinfo.value.retry_after == pytest.approx(0.5)
+        
+        clock.now += 0.5
+        limiter.acquire('light1', 'SmartLightAdapter')
+        assert limiter.get_metrics()['rejected'] == 1
+    
+    def test_limit_resolution(self, clock):
+        """Test that device limits override type limits and defaults."""
+        limiter = RateLimiter(default_device_limit=RateLimit(100, 100),
+                              type_limits={'ThermostatAdapter': RateLimit(1, 1)},
+                              device_limits={'thermo2': RateLimit(100, 5)})
+        
+        limiter.acquire('thermo1', 'ThermostatAdapter')
+        with pytest.raises(RateLimitError):
+            limiter.acquire('thermo1', 'ThermostatAdapter')
+        for _ in range(5):
+            limiter.acquire('thermo2', 'ThermostatAdapter')
+        for _ in range(10):
+            limiter.acquire('light1', 'SmartLightAdapter')
+    
+    def test_rejection_consumes_no_tokens(self, clock):
+        """Test that a client is not charged when the device is limited."""
+        limiter = RateLimiter(default_device_limit=RateLimit(1, 1),
+                              client_limit=RateLimit(1, 2))
+        limiter.acquire('light1', 'SmartLightAdapter', 'alice')
+        with pytest.raises(RateLimitError, match='device light1'):
+            limiter.acquire('light1', 'SmartLightAdapter', 'alice')
+        
+        limiter.acquire('light2', 'SmartLightAdapter', 'alice')
+        with pytest.raises(RateLimitError, match='client alice'):
+            limiter.acquire('light3', 'SmartLightAdapter', 'alice')
+    
+    def test_table_evicts_least_recently_used(self, clock):
+        """Test that the bucket table stays within max_keys."""
+        table = TokenBucketTable(max_keys=1000)
+        limit = RateLimit(1, 1)
+        for i in range(100_000):
+            slot, _ = table.available(f'client{i}', limit, clock.now)
+            table.take(slot)
+        
+        assert len(table) == 1000
+        assert table.memory_bytes() == 1000 * 16
+        # An evicted bucket starts full again
+        assert table.available('client0', limit, clock.now)[1] == 1.0
+
+
+class TestRateLimitedApp:
+    """Test rate limiting through the API."""
+    
+    def test_429_with_retry_after(self, clock):
+        """Test that limited commands get 429 and a Retry-After header."""
+        limiter = RateLimiter(type_limits={'ThermostatAdapter': RateLimit(0.25, 1)},
+                              client_limit=RateLimit(10, 10))
+        manager = DeviceManager(rate_limiter=limiter)
+        manager.register_device(ThermostatAdapter('thermo1', 'Hallway Thermostat'))
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        client = create_app(manager).test_client()
+        
+        response = client.post('/api/v1/devices/thermo1/command',
+                               json={'command': 'setMode', 'parameters': {'mode': 'cool'}})
+        assert response.status_code == 200
+        
+        response = client.post('/api/v1/devices/thermo1/command',
+                               json={'command': 'setMode', 'parameters': {'mode': 'heat'}})
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '4'
+        assert response.get_json()['success'] is False
+        
+        # Other devices and clients are unaffected
+        response = client.post('/api/v1/devices/light1/command', json={'command': 'turnOn'},
+                               headers={'X-Client-ID': 'dashboard'})
+        assert response.status_code == 200
+        assert manager.get_metrics()['rateLimit']['clientBuckets'] == 2
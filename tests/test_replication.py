@@ -0,0 +1,114 @@
+"""Tests for primary/follower state replication."""
+
+import socket
+import time
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.replication import ReplicationPrimary, ReplicationFollower
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+
+def _make_manager():
+    """Create a manager with the same two lights on every node."""
+    manager = DeviceManager()
+    manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+    manager.register_device(SmartLightAdapter('light2', 'Bedroom Light'))
+    return manager
+
+
+def _wait_for(condition, timeout=5.0):
+    """Poll until a condition holds or the timeout expires."""
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Condition not met before timeout")
+        time.sleep(0.01)
+
+
+class TestReplication:
+    """Test ReplicationPrimary and ReplicationFollower."""
+    
+    @pytest.fixture
+    def nodes(self):
+        """Create a primary with one connected follower."""
+        primary_manager = _make_manager()
+        primary_manager.execute_command('light2', 'turnOn')
+        primary = ReplicationPrimary(primary_manager, batch_size=8)
+        primary.start()
+        
+        follower_manager = _make_manager()
+        follower = ReplicationFollower(follower_manager, *primary.address)
+        follower.start()
+        _wait_for(lambda: follower.connected)
+        
+        yield primary_manager, follower_manager, follower
+        
+        follower.stop()
+        primary.stop()
+    
+    def test_snapshot_on_connect(self, nodes):
+        """Test that a new follower receives existing state."""
+        _, follower_manager, _ = nodes
+        
+        _wait_for(lambda: follower_manager.get_device_state('light2')['powerState'] == 'ON')
+    
+    def test_changes_streamed_in_order(self, nodes):
+        """Test that the last write wins on the follower."""
+        primary_manager, follower_manager, follower = nodes
+        
+        for brightness in range(50):
+            primary_manager.execute_command('light1', 'setBrightness', {'brightness': brightness})
+        
+        _wait_for(lambda: follower_manager.get_device_state('light1')['brightness'] == 49)
+        _wait_for(lambda: follower.get_metrics()['lagRecords'] == 0)
+        metrics = primary_manager.get_metrics()['replication']
+        assert metrics['sequence'] == 50
+        assert metrics['batchesSent'] < 50
+    
+    def test_read_only_follower_app(self, nodes):
+        """Test that a follower serves reads and rejects commands."""
+        primary_manager, follower_manager, _ = nodes
+        primary_manager.execute_command('light1', 'turnOn')
+        _wait_for(lambda: follower_manager.get_device_state('light1')['powerState'] == 'ON')
+        
+        client = create_app(follower_manager, read_only=True).test_client()
+        
+        response = client.get('/api/v1/devices/light1/state')
+        assert response.get_json()['state']['powerState'] == 'ON'
+        
+        response = client.post('/api/v1/devices/light1/command', json={'command': 'turnOff'})
+        assert response.status_code == 403
+        
+        metrics = client.get('/api/v1/metrics').get_json()['metrics']['replication']
+        assert metrics['role'] == 'follower'
+        assert metrics['connected'] is True
+        assert metrics['lagSeconds'] >= 0
+    
+    def test_stalled_follower_is_dropped(self, nodes):
+        """Test that a follower that stops reading does not block others."""
+        primary_manager, follower_manager, _ = nodes
+        primary = ReplicationPrimary(primary_manager, batch_size=1, send_timeout=0.2)
+        primary.start()
+        live_manager = _make_manager()
+        follower = ReplicationFollower(live_manager, *primary.address)
+        follower.start()
+        stalled = socket.socket()
+        stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        stalled.connect(primary.address)
+        try:
+            _wait_for(lambda: primary.get_metrics()['followers'] == 2)
+            blob = 'x' * 65536
+            for i in range(200):
+                primary_manager.apply_state('light2', {'powerState': 'ON', 'blob': blob,
+                                                       'brightness': i})
+                if primary.get_metrics()['followersDropped']:
+                    break
+            
+            _wait_for(lambda: primary.get_metrics()['followersDropped'] == 1)
+            primary_manager.execute_command('light1', 'setBrightness', {'brightness': 77})
+            _wait_for(lambda: live_manager.get_device_state('light1')['brightness'] == 77)
+        finally:
+            stalled.close()
+            follower.stop()
+            primary.stop()
@@ -0,0 +1,143 @@
+"""Tests for retries and hedged reads."""
+
+from threading import Lock
+import time
+import pytest
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.bulkhead import Bulkhead
+from smarthomeharmonizer.core.exceptions import (
+    AdapterError, CircuitOpenError, InvalidParameterError, TransportError
+)
+from smarthomeharmonizer.core.retry import Retrier, RetryPolicy
+from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+
+class FlakyLight(SmartLightAdapter):
+    """Light that drops the first few commands and slows every other read."""
+    
+    def __init__(self, *args, failures=0, slow_reads=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+        self.slow_reads = slow_reads
+        self.attempts = 0
+        self.reads = 0
+        self._reads_lock = Lock()
+    
+    def execute_command(self, command, parameters=None):
+        self.attempts += 1
+        if self.failures:
+            self.failures -= 1
+            raise TransportError("Packet lost")
+        return super().execute_command(command, parameters)
+    
+    def get_state(self):
+        with self._reads_lock:
+            self.reads += 1
+            slow = self.slow_reads and self.reads % 2 == 1
+        if slow:
+            time.sleep(0.5)
+        return super().get_state()
+
+
+class FlakyCoffeeMaker(CoffeeMakerAdapter):
+    """Coffee maker whose first command fails."""
+    
+    attempts = 0
+    
+    def execute_command(self, command, parameters=None):
+        self.attempts += 1
+        if self.attempts == 1:
+            raise TransportError("Packet lost")
+        return super().execute_command(command, parameters)
+
+
+def _manager(*adapters, **policy):
+    """Create a manager with a fast retry policy."""
+    retrier = Retrier(RetryPolicy(base_delay=0.001, **policy))
+    manager = DeviceManager(retrier=retrier)
+    for adapter in adapters:
+        manager.register_device(adapter)
+    return manager, retrier
+
+
+class TestRetrier:
+    """Test Retrier behavior."""
+    
+    def test_idempotent_command_retried(self):
+        """Test that lost packets are retried with backoff."""
+        light = FlakyLight('light1', 'Living Room Light', failures=2)
+        manager, _ = _manager(light)
+        
+        assert manager.execute_command('light1', 'turnOn')['powerState'] == 'ON'
+        assert light.attempts == 3
+        metrics = manager.get_metrics()['retry']['FlakyLight']
+        assert metrics['retries'] == 2
+        assert metrics['calls'] == 1
+    
+    def test_attempts_exhausted(self):
+        """Test that the last error surfaces after max_attempts."""
+        light = FlakyLight('light1', 'Living Room Light', failures=5)
+        manager, _ = _manager(light)
+        
+        with pytest.raises(AdapterError, match="Packet lost"):
+            manager.execute_command('light1', 'turnOn')
+        assert light.attempts == 3
+        assert manager.get_metrics()['retry']['FlakyLight']['exhausted'] == 1
+    
+    def test_non_idempotent_command_not_retried(self):
+        """Test that brew runs at most once."""
+        coffee = FlakyCoffeeMaker('coffee1', 'Kitchen Coffee Maker')
+        manager, _ = _manager(coffee)
+        
+        with pytest.raises(AdapterError):
+            manager.execute_command('coffee1', 'brew')
+        assert coffee.attempts == 1
+    
+    def test_only_transient_errors_are_retried(self):
+        """Test that rejected input and open breakers are not retried."""
+        light = FlakyLight('light1', 'Living Room Light')
+        manager, _ = _manager(light, retry_on=(AdapterError,))
+        with pytest.raises(InvalidParameterError):
+            manager.execute_command('light1', 'setBrightness', {'brightness': 500})
+        assert light.attempts == 1
+        
+        light = FlakyLight('light2', 'Hall Light', failures=5)
+        bulkhead = Bulkhead(failure_threshold=1)
+        retrier = Retrier(RetryPolicy(base_delay=0.001))
+        manager = DeviceManager(retrier=retrier, bulkhead=bulkhead)
+        manager.register_device(light)
+        try:
+            # The first failure opens the breaker; its rejection ends the retries
+            with pytest.raises(CircuitOpenError):
+                manager.execute_command('light2', 'turnOn')
+            assert light.attempts == 1
+            assert retrier.get_metrics()['FlakyLight']['retries'] == 1
+        finally:
+            bulkhead.shutdown()
+    
+    def test_backoff_is_jittered_and_capped(self):
+        """Test full-jitter backoff bounds."""
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.3)
+        delays = [policy.backoff(5) for _ in range(200)]
+        
+        assert all(0 <= delay <= 0.3 for delay in delays)
+        assert len(set(delays)) > 1
+    
+    def test_hedged_read_takes_first_answer(self):
+        """Test that a slow read is hedged and the fast duplicate wins."""
+        light = FlakyLight('light1', 'Living Room Light', slow_reads=True)
+        manager, retrier = _manager(light, hedge=True, initial_hedge_delay=0.02)
+        
+        started = time.monotonic()
+        state = manager.get_device_state('light1')
+        elapsed = time.monotonic() - started
+        
+        assert state['powerState'] == 'OFF'
+        assert elapsed < 0.4
+        assert light.reads == 2
+        metrics = manager.get_metrics()['retry']['FlakyLight']
+        assert metrics['hedges'] == 1
+        assert metrics['hedgeWins'] == 1
+        retrier.shutdown()
+        assert retrier.get_metrics()['FlakyLight']['hedgeSaved']['count'] == 1
@@ -0,0 +1,168 @@
+"""Tests for the automation rules engine."""
+
+import pytest
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.rules import Rule, RuleEngine
+from smarthomeharmonizer.core.exceptions import InvalidRuleError, RuleNotFoundError
+from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class TestRule:
+    """Test rule definitions and conditions."""
+    
+    def test_threshold_crossing(self):
+        """Test that above/below fire on crossing only."""
+        rule = Rule('r', {'when': {'deviceId': 't', 'field': 'currentTemperature', 'above': 75},
+                          'then': {'deviceId': 'fan', 'command': 'turnOn'}})
+        assert rule.matches(74.0, 76.0) is True
+        assert rule.matches(76.0, 77.0) is False
+        assert rule.matches(None, 80) is True
+        assert rule.matches(76.0, 75.0) is False
+    
+    def test_invalid_definitions(self):
+        """Test validation of triggers and actions."""
+        action = {'deviceId': 'light1', 'command': 'turnOn'}
+        mode = {'deviceId': 'a', 'field': 'mode'}
+        number = {'deviceId': 'a', 'field': 'x'}
+        for spec in ({'then': action},
+                     {'when': {'field': 'mode'}, 'then': action},
+                     {'when': dict(mode, deviceType='B'), 'then': action},
+                     {'when': dict(mode, becomes=['cool']), 'then': action},
+                     {'when': dict(number, above='hot'), 'then': action},
+                     {'when': dict(number, above=1, below=2), 'then': action},
+                     {'when': mode, 'then': []},
+                     {'when': mode, 'then': [{'command': 'turnOn'}]}):
+            with pytest.raises(InvalidRuleError):
+                Rule('r', spec)
+
+
+class TestRuleEngine:
+    """Test RuleEngine functionality."""
+    
+    def setup_method(self):
+        """Set up two thermostats, lights and a coffee maker."""
+        self.manager = DeviceManager()
+        self.manager.register_device(ThermostatAdapter('thermo1', 'Living Room'))
+        self.manager.register_device(ThermostatAdapter('thermo2', 'Bedroom'))
+        self.manager.register_device(SmartLightAdapter('light1', 'Hall'))
+        self.manager.register_device(SmartLightAdapter('light2', 'Porch'))
+        self.manager.register_device(CoffeeMakerAdapter('coffee1', 'Coffee'))
+        self.engine = RuleEngine(self.manager)
+    
+    def teardown_method(self):
+        self.engine.stop()
+    
+    def test_mode_becomes_cool_turns_off_type(self):
+        """Test a device trigger with an action on every device of a type."""
+        self.manager.execute_command('light1', 'turnOn')
+        self.manager.execute_command('light2', 'turnOn')
+        self.engine.add_rule({
+            'when': {'deviceId': 'thermo1', 'field': 'mode', 'becomes': 'cool'},
+            'then': [{'deviceType': 'SmartLightAdapter', 'command': 'turnOff'}]
+        })
+        self.manager.execute_command('thermo1', 'setMode', {'mode': 'heat'})
+        self.engine.wait_idle(5)
+        assert self.manager.get_device_state('light1')['powerState'] == 'ON'
+        
+        self.manager.execute_command('thermo1', 'setMode', {'mode': 'cool'})
+        self.engine.wait_idle(5)
+        assert self.manager.get_device_state('light1')['powerState'] == 'OFF'
+        assert self.manager.get_device_state('light2')['powerState'] == 'OFF'
+        
+        # Unchanged field: no second firing
+        self.manager.execute_command('thermo1', 'getStatus')
+        self.engine.wait_idle(5)
+        assert self.engine.list_rules()[0]['fired'] == 1
+        assert self.engine.get_metrics()['actions'] == 2
+    
+    def test_only_indexed_rules_are_evaluated(self):
+        """Test that unrelated rules cost nothing per event."""
+        for i in range(200):
+            self.engine.add_rule({
+                'when': {'deviceId': f'other{i}', 'field': 'powerState', 'becomes': 'ON'},
+                'then': {'deviceId': 'light2', 'command': 'turnOn'}
+            })
+            self.engine.add_rule({
+                'when': {'deviceType': 'ThermostatAdapter', 'field': 'mode', 'becomes': 'cool'},
+                'then': {'deviceId': 'light2', 'command': 'turnOn'}
+            })
+        self.engine.add_rule({'when': {'deviceId': 'light1', 'field': 'powerState',
+                                       'becomes': 'ON'},
+                              'then': {'deviceId': 'coffee1', 'command': 'turnOn'}})
+        self.manager.execute_command('light1', 'turnOn')
+        self.engine.wait_idle(5)
+        
+        metrics = self.engine.get_metrics()
+        assert metrics['evaluated'] == 1
+        assert self.manager.get_device_state('coffee1')['powerState'] == 'ON'
+    
+    def test_cascade_and_loop_detection(self):
+        """Test that a rule cycle runs once around and then stops."""
+        def rule(source, value, target, command):
+            self.engine.add_rule({
+                'when': {'deviceId': source, 'field': 'powerState', 'becomes': value},
+                'then': {'deviceId': target, 'command': command}
+            })
+        rule('light1', 'ON', 'light2', 'turnOn')
+        rule('light2', 'ON', 'light1', 'turnOff')
+        rule('light1', 'OFF', 'light2', 'turnOff')
+        rule('light2', 'OFF', 'light1', 'turnOn')
+        
+        self.manager.execute_command('light1', 'turnOn')
+        assert self.engine.wait_idle(5)
+        metrics = self.engine.get_metrics()
+        assert metrics['fired'] == 4
+        assert metrics['loopsDetected'] == 1
+        assert self.manager.get_device_state('light1')['powerState'] == 'ON'
+        assert self.manager.get_device_state('light2')['powerState'] == 'OFF'
+    
+    def test_depth_limit(self):
+        """Test that long cascades are cut off."""
+        engine = RuleEngine(self.manager, max_depth=2)
+        try:
+            for source, target in (('light1', 'light2'), ('light2', 'coffee1'),
+                                   ('coffee1', 'thermo1')):
+                engine.add_rule({'when': {'deviceId': source, 'field': 'powerState',
+                                          'becomes': 'ON'},
+                                 'then': {'deviceId': target, 'command': 'turnOn'}})
+            self.manager.execute_command('light1', 'turnOn')
+            assert engine.wait_idle(5)
+            assert engine.get_metrics()['depthLimited'] == 1
+            assert self.manager.get_device_state('coffee1')['powerState'] == 'ON'
+            assert self.manager.get_device_state('thermo1')['powerState'] == 'OFF'
+        finally:
+            engine.stop()
+    
+    def test_failed_actions_and_removal(self):
+        """Test that failing actions are counted and removed rules stop firing."""
+        rule = self.engine.add_rule({
+            'when': {'deviceId': 'light1', 'field': 'brightness', 'below': 20},
+            'then': {'deviceId': 'coffee1', 'command': 'brew'}
+        })
+        self.manager.execute_command('light1', 'setBrightness', {'brightness': 10})
+        self.engine.wait_idle(5)
+        assert self.engine.get_metrics()['failedActions'] == 1
+        
+        self.engine.remove_rule(rule['id'])
+        with pytest.raises(RuleNotFoundError):
+            self.engine.remove_rule(rule['id'])
+        self.manager.execute_command('light1', 'setBrightness', {'brightness': 50})
+        self.manager.execute_command('light1', 'setBrightness', {'brightness': 5})
+        self.engine.wait_idle(5)
+        assert self.engine.get_metrics()['fired'] == 1
+        assert self.engine.get_metrics()['indexedKeys'] == 0
+    
+    def test_new_devices_start_with_a_baseline(self):
+        """Test that the first state of a later device does not trigger."""
+        self.engine.add_rule({'when': {'deviceType': 'SmartLightAdapter', 'field': 'powerState'},
+                              'then': {'deviceId': 'coffee1', 'command': 'turnOn'}})
+        self.manager.register_device(SmartLightAdapter('light3', 'New'))
+        self.manager.execute_command('light3', 'getStatus')
+        self.manager.execute_command('light3', 'getStatus')
+        self.engine.wait_idle(5)
+        assert self.engine.get_metrics()['fired'] == 0
+        self.manager.execute_command('light3', 'turnOn')
+        self.engine.wait_idle(5)
+        assert self.engine.get_metrics()['fired'] == 1
@@ -0,0 +1,226 @@
+"""Tests for the command scheduler and the schedules API."""
+
+from datetime import date, datetime, timezone
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.scheduler import (
+    CommandScheduler, CronExpression, Schedule, sun_event
+)
+from smarthomeharmonizer.core.exceptions import (
+    InvalidCommandError, InvalidScheduleError, ScheduleNotFoundError
+)
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+# Friday 2026-10-16 21:00:00 UTC
+NOW = datetime(2026, 10, 16, 21, 0, tzinfo=timezone.utc).timestamp()
+
+
+class TestCronExpression:
+    """Test cron parsing and matching."""
+    
+    def test_next_after(self):
+        """Test ranges, steps and lists."""
+        weekdays = CronExpression('0 22 * * 1-5')
+        assert weekdays.next_after(datetime(2026, 10, 16, 22, 0)) == datetime(2026, 10, 19, 22, 0)
+        office = CronExpression('*/15 8-18/2 * * *')
+        assert office.next_after(datetime(2026, 10, 16, 8, 50)) == datetime(2026, 10, 16, 10, 0)
+        leap_day = CronExpression('0 0 29 2 *')
+        assert leap_day.next_after(datetime(2026, 3, 1)) == datetime(2028, 2, 29)
+        assert CronExpression('0 0 30 2 *').next_after(datetime(2026, 3, 1)) is None
+    
+    def test_day_fields_match_either(self):
+        """Test cron's OR rule when both day fields are restricted."""
+        cron = CronExpression('0 12 1 * 0')
+        assert cron.next_after(datetime(2026, 10, 16)) == datetime(2026, 10, 18, 12, 0)
+        assert cron.next_after(datetime(2026, 10, 31, 13, 0)) == datetime(2026, 11, 1, 12, 0)
+    
+    def test_invalid_expressions(self):
+        """Test that malformed fields are rejected."""
+        for expression in ('* * * *', '60 * * * *', '*/0 * * * *', '5-1 * * * *', 'a * * * *'):
+            with pytest.raises(InvalidScheduleError):
+                CronExpression(expression)
+
+
+class TestSchedule:
+    """Test schedule definitions."""
+    
+    def test_sunset(self):
+        """Test sunset times against known values for Berlin."""
+        sunset = sun_event('sunset', 52.52, 13.405, date(2026, 6, 21))
+        assert abs(sunset - datetime(2026, 6, 21, 19, 33, tzinfo=timezone.utc).timestamp()) < 120
+        assert sun_event('sunset', 78.0, 15.0, date(2026, 6, 21)) is None
+        
+        schedule = Schedule('s', {'deviceId': 'light1', 'command': 'turnOn',
+                                  'sun': {'event': 'sunset', 'latitude': 52.52,
+                                          'longitude': 13.405, 'offsetMinutes': -30}})
+        first = schedule.next_after(NOW)
+        assert first - NOW > 12 * 3600
+        assert schedule.next_after(first) - first == pytest.approx(86400, abs=300)
+    
+    def test_at_in_timezone(self):
+        """Test that naive one-shot times use the schedule's timezone."""
+        schedule = Schedule('s', {'deviceId': 'd', 'command': 'turnOn',
+                                  'at': '2026-10-16T23:30:00', 'timezone': 'Europe/Berlin'})
+        assert schedule.at == datetime(2026, 10, 16, 21, 30, tzinfo=timezone.utc).timestamp()
+        assert schedule.to_dict()['at'] == '2026-10-16T23:30:00+02:00'
+        assert schedule.next_after(schedule.at) is None
+    
+    def test_invalid_definitions(self):
+        """Test validation of triggers and fields."""
+        for spec in ({'command': 'turnOn', 'cron': '* * * * *'},
+                     {'deviceId': 'd', 'command': 'turnOn'},
+                     {'deviceId': 'd', 'command': 'turnOn', 'at': 'soon'},
+                     {'deviceId': 'd', 'command': 'turnOn', 'cron': '* * * * *', 'at': 1},
+                     {'deviceId': 'd', 'command': 'turnOn', 'cron': '* * * * *',
+                      'timezone': 'Mars/Olympus'},
+                     {'deviceId': 'd', 'command': 'turnOn', 'sun': {'event': 'noon'}},
+                     {'deviceId': 'd', 'command': 'turnOn',
+                      'sun': {'event': 'sunset', 'latitude': 95, 'longitude': 0}}):
+            with pytest.raises(InvalidScheduleError):
+                Schedule('s', spec)
+
+
+class TestCommandScheduler:
+    """Test CommandScheduler functionality."""
+    
+    def setup_method(self):
+        """Set up a scheduler on a manual clock."""
+        self.now = NOW
+        self.manager = DeviceManager()
+        self.manager.register_device(SmartLightAdapter('light1', 'Porch Light'))
+        self.manager.register_device(ThermostatAdapter('thermo1', 'Thermostat'))
+        self.scheduler = CommandScheduler(self.manager, batch_size=10,
+                                          clock=lambda: self.now)
+    
+    def teardown_method(self):
+        self.scheduler.stop()
+    
+    def test_one_shot_runs_once(self):
+        """Test a one-shot schedule firing at its time."""
+        schedule = self.scheduler.create_schedule({
+            'deviceId': 'thermo1', 'command': 'setTemperature',
+            'parameters': {'temperature': 68}, 'at': '2026-10-16T22:00:00'
+        })
+        assert schedule['nextRun'] == '2026-10-16T22:00:00+00:00'
+        assert self.scheduler.run_due(NOW + 3599) == 0
+        assert self.scheduler.run_due(NOW + 3600) == 1
+        assert self.manager.get_device_state('thermo1')['targetTemperature'] == 68.0
+        
+        schedule = self.scheduler.get_schedule(schedule['id'])
+        assert schedule['runs'] == 1
+        assert schedule['nextRun'] is None
+        assert schedule['lastResult'] == {'success': True, 'error': None}
+        assert self.scheduler.run_due(NOW + 7200) == 0
+    
+    def test_due_schedules_run_as_one_batch(self):
+        """Test that schedules due at the same instant are dispatched together."""
+        for _ in range(35):
+            self.scheduler.create_schedule({'deviceId': 'light1', 'command': 'turnOn',
+                                            'cron': '0 22 * * *'})
+        assert self.scheduler.run_due(NOW + 3600) == 35
+        metrics = self.scheduler.get_metrics()
+        assert metrics['batches'] == 1
+        assert metrics['largestBatch'] == 35
+        assert metrics['fired'] == 35
+        assert all(s['nextRun'] == '2026-10-17T22:00:00+00:00'
+                   for s in self.scheduler.list_schedules('light1'))
+    
+    def test_catch_up_after_suspend(self):
+        """Test that a long pause runs recent schedules once and skips stale ones."""
+        every_minute = self.scheduler.create_schedule({'deviceId': 'light1', 'command': 'turnOn',
+                                                       'cron': '* * * * *'})
+        stale = self.scheduler.create_schedule({'deviceId': 'thermo1', 'command': 'turnOn',
+                                                'at': NOW + 60})
+        
+        # Resume three days later
+        assert self.scheduler.run_due(NOW + 3 * 86400) == 1
+        assert self.scheduler.get_schedule(every_minute['id'])['runs'] == 1
+        assert self.manager.get_device_state('light1')['powerState'] == 'ON'
+        stale = self.scheduler.get_schedule(stale['id'])
+        assert stale['runs'] == 0
+        assert stale['lastResult']['success'] is False
+        assert self.scheduler.get_metrics()['missed'] == 1
+    
+    def test_replace_and_delete(self):
+        """Test that edited and deleted schedules drop their old run."""
+        schedule = self.scheduler.create_schedule({'deviceId': 'light1', 'command': 'turnOn',
+                                                   'at': NOW + 60})
+        self.scheduler.replace_schedule(schedule['id'], {'deviceId': 'light1',
+                                                         'command': 'turnOn', 'at': NOW + 120})
+        assert self.scheduler.run_due(NOW + 60) == 0
+        self.scheduler.delete_schedule(schedule['id'])
+        assert self.scheduler.run_due(NOW + 120) == 0
+        with pytest.raises(ScheduleNotFoundError):
+            self.scheduler.get_schedule(schedule['id'])
+    
+    def test_failures_are_recorded(self):
+        """Test validation on creation and errors at run time."""
+        with pytest.raises(InvalidCommandError):
+            self.scheduler.create_schedule({'deviceId': 'light1', 'command': 'brew',
+                                            'cron': '* * * * *'})
+        with pytest.raises(InvalidScheduleError):
+            self.scheduler.create_schedule({'deviceId': 'light1', 'command': 'turnOn',
+                                            'at': NOW - 60})
+        
+        schedule = self.scheduler.create_schedule({'deviceId': 'light1', 'command': 'turnOn',
+                                                   'at': NOW + 60})
+        self.manager.unregister_device('light1')
+        self.scheduler.run_due(NOW + 60)
+        result = self.scheduler.get_schedule(schedule['id'])['lastResult']
+        assert result['success'] is False
+        assert 'light1' in result['error']
+
+
+class TestSchedulesApi:
+    """Test the schedules endpoints."""
+    
+    def setup_method(self):
+        """Set up an app with a scheduler."""
+        self.manager = DeviceManager()
+        self.manager.register_device(SmartLightAdapter('light1', 'Porch Light'))
+        self.scheduler = CommandScheduler(self.manager)
+        self.client = create_app(self.manager, scheduler=self.scheduler).test_client()
+    
+    def teardown_method(self):
+        self.scheduler.stop()
+    
+    def test_crud(self):
+        """Test creating, reading, replacing and deleting a schedule."""
+        response = self.client.post('/api/v1/schedules', json={
+            'deviceId': 'light1', 'command': 'turnOn',
+            'sun': {'event': 'sunset', 'latitude': 40.7, 'longitude': -74.0}
+        })
+        assert response.status_code == 201
+        schedule_id = response.get_json()['schedule']['id']
+        
+        listed = self.client.get('/api/v1/schedules?deviceId=light1').get_json()['schedules']
+        assert [s['id'] for s in listed] == [schedule_id]
+        
+        response = self.client.put(f'/api/v1/schedules/{schedule_id}', json={
+            'deviceId': 'light1', 'command': 'turnOff', 'cron': '0 23 * * *'
+        })
+        assert response.get_json()['schedule']['cron'] == '0 23 * * *'
+        assert self.client.get(f'/api/v1/schedules/{schedule_id}').get_json()['schedule'][
+            'command'] == 'turnOff'
+        
+        assert self.client.delete(f'/api/v1/schedules/{schedule_id}').status_code == 200
+        assert self.client.get(f'/api/v1/schedules/{schedule_id}').status_code == 404
+        assert self.manager.get_metrics()['scheduler']['schedules'] == 0
+    
+    def test_errors(self):
+        """Test status codes for invalid requests."""
+        assert self.client.post('/api/v1/schedules', json={
+            'deviceId': 'light1', 'command': 'turnOn', 'cron': 'every day'
+        }).status_code == 400
+        assert self.client.post('/api/v1/schedules', json={
+            'deviceId': 'nope', 'command': 'turnOn', 'cron': '* * * * *'
+        }).status_code == 404
+        assert self.client.put('/api/v1/schedules/missing', json={
+            'deviceId': 'light1', 'command': 'turnOn', 'cron': '* * * * *'
+        }).status_code == 404
+        
+        client = create_app(self.manager, read_only=True, scheduler=self.scheduler).test_client()
+        assert client.post('/api/v1/schedules', json={}).status_code == 403
+        assert create_app(self.manager).test_client().get('/api/v1/schedules').status_code == 404
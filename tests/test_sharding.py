@@ -0,0 +1,167 @@
+"""Tests for consistent hashing and the sharded device manager."""
+
+import threading
+import time
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.hashing import ConsistentHashRing
+from smarthomeharmonizer.core.sharding import ShardedDeviceManager
+from smarthomeharmonizer.core.exceptions import (
+    DeviceNotFoundError, InvalidCommandError, SmartHomeHarmonizerError
+)
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class TestConsistentHashRing:
+    """Test ConsistentHashRing functionality."""
+    
+    def test_assignment_is_stable(self):
+        """Test that the same key always maps to the same node."""
+        ring1 = ConsistentHashRing(['a', 'b', 'c'])
+        ring2 = ConsistentHashRing(['c', 'b', 'a'])
+        
+        for i in range(100):
+            assert ring1.get_node(f'device{i}') == ring2.get_node(f'device{i}')
+    
+    def test_load_is_balanced(self):
+        """Test that keys spread roughly evenly across nodes."""
+        ring = ConsistentHashRing(range(4))
+        counts = {node: 0 for node in range(4)}
+        for i in range(4000):
+            counts[ring.get_node(f'device{i}')] += 1
+        
+        assert min(counts.values()) > 600
+    
+    def test_removing_node_only_moves_its_keys(self):
+        """Test minimal key movement when a node leaves."""
+        ring = ConsistentHashRing(['a', 'b', 'c'])
+        before = {f'device{i}': ring.get_node(f'device{i}') for i in range(500)}
+        
+        ring.remove_node('c')
+        
+        for key, node in before.items():
+            if node != 'c':
+                assert ring.get_node(key) == node
+    
+    def test_empty_ring(self):
+        """Test that lookups on an empty ring raise error."""
+        with pytest.raises(LookupError):
+            ConsistentHashRing().get_node('device1')
+
+
+@pytest.fixture(scope='module')
+def manager():
+    """Create a two-shard manager with a few devices."""
+    manager = ShardedDeviceManager(shards=2)
+    for i in range(6):
+        manager.register_device(SmartLightAdapter(f'light{i}', f'Light {i}'))
+    manager.register_device(ThermostatAdapter('thermo1', 'Hallway Thermostat'))
+    yield manager
+    manager.shutdown()
+
+
+class TestShardedDeviceManager:
+    """Test ShardedDeviceManager functionality."""
+    
+    def test_devices_spread_across_shards(self, manager):
+        """Test that devices land on more than one shard."""
+        shards = {manager.shard_for(f'light{i}') for i in range(6)}
+        assert shards == {0, 1}
+    
+    def test_list_devices_gathers_all_shards(self, manager):
+        """Test scatter-gather listing."""
+        ids = {d['deviceId'] for d in manager.list_devices()}
+        assert ids == {f'light{i}' for i in range(6)} | {'thermo1'}
+    
+    def test_execute_command(self, manager):
+        """Test command routing to the owning shard."""
+        state = manager.execute_command('light3', 'setBrightness', {'brightness': 30})
+        
+        assert state['brightness'] == 30
+        assert manager.get_device_state('light3')['brightness'] == 30
+        assert manager.get_device('light3').name == 'Light 3'
+    
+    def test_errors_propagate(self, manager):
+        """Test that shard exceptions are re-raised in the caller."""
+        with pytest.raises(DeviceNotFoundError):
+            manager.execute_command('missing', 'turnOn')
+        with pytest.raises(InvalidCommandError):
+            manager.execute_command('thermo1', 'setBrightness')
+        with pytest.raises(ValueError, match="already registered"):
+            manager.register_device(SmartLightAdapter('light0', 'Duplicate'))
+    
+    def test_app_with_sharded_manager(self, manager):
+        """Test serving the API from a sharded manager."""
+        client = create_app(manager).test_client()
+        
+        response = client.post('/api/v1/devices/thermo1/command',
+                               json={'command': 'setTemperature',
+                                     'parameters': {'temperature': 68}})
+        assert response.status_code == 200
+        assert response.get_json()['state']['targetTemperature'] == 68.0
+        
+        response = client.get('/api/v1/devices/thermo1')
+        assert response.get_json()['type'] == 'ThermostatAdapter'
+    
+    def test_command_with_priority(self, manager):
+        """Test that the API priority field is accepted by sharded managers."""
+        client = create_app(manager).test_client()
+        
+        response = client.post('/api/v1/devices/light4/command',
+                               json={'command': 'turnOff', 'priority': 'safety'})
+        assert response.status_code == 200
+    
+    def test_listeners_and_metrics(self, manager):
+        """Test state change forwarding and metrics providers."""
+        changes = []
+        done = threading.Event()
+        
+        def listener(device_id, state):
+            changes.append((device_id, state['powerState']))
+            done.set()
+        
+        manager.add_listener(listener)
+        manager.register_metrics('extra', lambda: {'ok': True})
+        try:
+            manager.execute_command('light5', 'turnOn')
+            assert done.wait(5)
+            assert changes == [('light5', 'ON')]
+            
+            manager.apply_state('light5', {'powerState': 'OFF', 'brightness': 0,
+                                           'color': {'r': 0, 'g': 0, 'b': 0}})
+            assert manager.get_device_state('light5')['powerState'] == 'OFF'
+        finally:
+            manager.remove_listener(listener)
+        
+        assert manager.get_metrics()['extra'] == {'ok': True}
+    
+    def test_changes_since(self, manager):
+        """Test the change feed across shards."""
+        cursor = manager.get_change_cursor()
+        manager.execute_command('light2', 'turnOn')
+        manager.execute_command('thermo1', 'setMode', {'mode': 'heat'})
+        
+        # Shard notifications arrive on reader threads
+        deadline = time.monotonic() + 5
+        while manager.get_change_cursor()['sequence'] < cursor['sequence'] + 2:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        changes = manager.changes_since(cursor['sequence'], cursor['epoch'], ['state.mode'])
+        
+        assert [d['deviceId'] for d in changes['devices']] == ['light2', 'thermo1']
+        assert changes['devices'][1]['state'] == {'mode': 'heat'}
+        assert manager.changes_since(cursor['sequence'], 'other-epoch')['resync'] is True
+    
+    def test_dead_shard_fails_calls(self):
+        """Test that calls to a stopped shard fail instead of hanging."""
+        manager = ShardedDeviceManager(shards=1, timeout=None)
+        try:
+            manager.register_device(SmartLightAdapter('light1', 'Light'))
+            shard = manager._shards[0]
+            shard._process.terminate()
+            shard._reader.join(5)
+            with pytest.raises(SmartHomeHarmonizerError, match='stopped'):
+                manager.get_device_state('light1')
+        finally:
+            manager.shutdown()
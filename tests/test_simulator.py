@@ -0,0 +1,104 @@
+"""Tests for the fleet simulator."""
+
+import pytest
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.simulator import FleetSimulator, VirtualClock
+from smarthomeharmonizer.core.timer_wheel import TimerWheel
+from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class TestVirtualClock:
+    """Test VirtualClock functionality."""
+    
+    def test_stopped_clock_moves_only_when_advanced(self):
+        """Test that a zero-speed clock is deterministic."""
+        clock = VirtualClock(speed=0, start=1000.0)
+        assert clock.now() == 1000.0
+        clock.advance(90)
+        assert clock.now() == 1090.0
+        with pytest.raises(ValueError):
+            VirtualClock(speed=-1)
+
+
+class TestFleetSimulator:
+    """Test FleetSimulator functionality."""
+    
+    def setup_method(self):
+        """Set up a small fleet on a stopped virtual clock."""
+        self.clock = VirtualClock(speed=0, start=1_700_000_000.0)
+        self.timers = TimerWheel(clock=self.clock.now)
+        self.manager = DeviceManager(timers=self.timers)
+        self.manager.register_device(ThermostatAdapter('thermo1', 'Thermostat'))
+        self.manager.register_device(CoffeeMakerAdapter('coffee1', 'Coffee'))
+        self.manager.register_device(SmartLightAdapter('light1', 'Light'))
+        self.simulator = FleetSimulator(self.manager, clock=self.clock,
+                                        light_toggles_per_hour=0, seed=1,
+                                        timers=self.timers)
+        assert self.simulator.track() == 3
+    
+    def test_thermostat_heats_toward_setpoint(self):
+        """Test thermal drift toward the setpoint and the fan switching off."""
+        self.manager.execute_command('thermo1', 'setMode', {'mode': 'heat'})
+        self.clock.advance(60)
+        self.simulator.step()
+        state = self.manager.get_device_state('thermo1')
+        assert 70.0 < state['currentTemperature'] < 72.0
+        assert state['fanRunning'] is True
+        
+        self.clock.advance(6 * 3600)
+        self.simulator.step()
+        state = self.manager.get_device_state('thermo1')
+        assert state['currentTemperature'] == 72.0
+        assert state['fanRunning'] is False
+        assert state['humidity'] < 50.0
+    
+    def test_idle_room_drifts_to_ambient(self):
+        """Test that a room without HVAC approaches the ambient temperature."""
+        self.clock.advance(3600)
+        self.simulator.step()
+        assert 60.0 < self.manager.get_device_state('thermo1')['currentTemperature'] < 70.0
+    
+    def test_brew_completes_and_water_evaporates(self):
+        """Test that the adapter's brew transition fires on virtual time."""
+        self.manager.execute_command('coffee1', 'turnOn')
+        self.manager.execute_command('coffee1', 'brew')
+        self.clock.advance(60)
+        self.simulator.step()
+        assert self.manager.get_device_state('coffee1')['brewing'] is True
+        
+        self.clock.advance(4 * 3600)
+        self.simulator.step()
+        state = self.manager.get_device_state('coffee1')
+        assert state['brewing'] is False
+        assert state['lastBrewTime'] is not None
+        assert state['waterLevel'] == 78
+        # The next brew is accepted again
+        self.manager.execute_command('coffee1', 'brew')
+    
+    def test_changes_reach_listeners(self):
+        """Test that simulated changes are notified like command results."""
+        seen = []
+        self.manager.add_listener(lambda device_id, state: seen.append(device_id))
+        simulator = FleetSimulator(self.manager, clock=self.clock,
+                                   light_toggles_per_hour=3600, seed=7)
+        simulator.track(['light1'])
+        self.clock.advance(1)
+        assert simulator.step() == 1
+        assert seen == ['light1']
+        assert self.manager.get_device_state('light1')['powerState'] == 'ON'
+        assert self.manager.get_metrics()['simulator']['lights'] == 1
+        
+        # Sub-rounding drift is not published
+        self.clock.advance(0.001)
+        simulator.untrack('light1')
+        assert self.simulator.step() == 0
+    
+    def test_update_state_keeps_other_fields(self):
+        """Test that partial updates merge into the current state."""
+        self.manager.execute_command('thermo1', 'setTemperature', {'temperature': 65})
+        self.manager.update_state('thermo1', {'humidity': 42.0})
+        state = self.manager.get_device_state('thermo1')
+        assert state['humidity'] == 42.0
+        assert state['targetTemperature'] == 65.0
@@ -0,0 +1,131 @@
+"""Tests for single-flight deduplication."""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+import time
+import pytest
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.dispatcher import CommandDispatcher
+from smarthomeharmonizer.core.exceptions import AdapterError
+from smarthomeharmonizer.core.single_flight import SingleFlight
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+
+class GatedLight(SmartLightAdapter):
+    """Light whose reads and commands block until released."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gate = Event()
+        self.reads = 0
+        self.commands = []
+        self.fail = False
+    
+    def get_state(self):
+        self.reads += 1
+        self.gate.wait(5)
+        return super().get_state()
+    
+    def execute_command(self, command, parameters=None):
+        self.commands.append((command, parameters))
+        self.gate.wait(5)
+        if self.fail:
+            raise AdapterError('Light is offline')
+        return super().execute_command(command, parameters)
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll a condition until it holds or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+@pytest.fixture(params=['sync', 'dispatcher'])
+def setup(request):
+    """Create a single-flight manager on the sync or thread-pool path."""
+    dispatcher = CommandDispatcher(workers=4) if request.param == 'dispatcher' else None
+    single_flight = SingleFlight()
+    manager = DeviceManager(dispatcher=dispatcher, single_flight=single_flight)
+    light = GatedLight('light1', 'Hallway Light')
+    manager.register_device(light)
+    pool = ThreadPoolExecutor(max_workers=8)
+    yield manager, single_flight, light, pool
+    light.gate.set()
+    pool.shutdown()
+    if dispatcher is not None:
+        dispatcher.shutdown()
+
+
+class TestSingleFlight:
+    """Test SingleFlight through DeviceManager."""
+    
+    def test_concurrent_reads_share_one_call(self, setup):
+        """Test that simultaneous reads of a device hit the adapter once."""
+        manager, single_flight, light, pool = setup
+        futures = [pool.submit(manager.get_device_state, 'light1') for _ in range(5)]
+        wait_for(lambda: single_flight.get_metrics()['readsShared'] == 4)
+        light.gate.set()
+        
+        states = [f.result() for f in futures]
+        assert light.reads == 1
+        assert all(state == states[0] for state in states)
+        states[0]['powerState'] = 'ON'
+        assert states[1]['powerState'] == 'OFF'
+    
+    def test_identical_commands_share_one_call(self, setup):
+        """Test that a double-tapped command runs once."""
+        manager, single_flight, light, pool = setup
+        futures = [pool.submit(manager.execute_command, 'light1', 'setBrightness',
+                               {'brightness': 40}) for _ in range(3)]
+        wait_for(lambda: single_flight.get_metrics()['commandsShared'] == 2)
+        light.gate.set()
+        
+        assert all(f.result()['brightness'] == 40 for f in futures)
+        assert light.commands == [('setBrightness', {'brightness': 40})]
+    
+    def test_superseded_commands_are_not_joined(self, setup):
+        """Test that a repeat after a different command runs again."""
+        manager, single_flight, light, pool = setup
+        first = pool.submit(manager.execute_command, 'light1', 'setBrightness', {'brightness': 50})
+        wait_for(lambda: len(light.commands) == 1)
+        second = pool.submit(manager.execute_command, 'light1', 'setBrightness', {'brightness': 60})
+        wait_for(lambda: single_flight.get_metrics()['commands'] == 2)
+        third = pool.submit(manager.execute_command, 'light1', 'setBrightness', {'brightness': 50})
+        wait_for(lambda: single_flight.get_metrics()['commands'] == 3)
+        light.gate.set()
+        
+        for future in (first, second, third):
+            future.result()
+        # second and third may reach the device in either order
+        assert sorted(p['brightness'] for _, p in light.commands) == [50, 50, 60]
+        assert single_flight.get_metrics()['commandsShared'] == 0
+    
+    def test_followers_get_their_own_error(self, setup):
+        """Test that a shared failure raises a distinct error per caller."""
+        manager, single_flight, light, pool = setup
+        light.fail = True
+        futures = [pool.submit(manager.execute_command, 'light1', 'turnOn') for _ in range(3)]
+        wait_for(lambda: single_flight.get_metrics()['commandsShared'] == 2)
+        light.gate.set()
+        
+        errors = [f.exception() for f in futures]
+        assert all(isinstance(e, AdapterError) for e in errors)
+        assert len({id(e) for e in errors}) == 3
+    
+    def test_reads_after_a_command_start_fresh(self, setup):
+        """Test that a read begun before a command is not joined afterwards."""
+        manager, single_flight, light, pool = setup
+        stale = pool.submit(manager.get_device_state, 'light1')
+        wait_for(lambda: light.reads == 1)
+        single_flight.forget('light1')
+        fresh = pool.submit(manager.get_device_state, 'light1')
+        wait_for(lambda: light.reads == 2)
+        light.gate.set()
+        
+        stale.result()
+        fresh.result()
+        assert single_flight.get_metrics() == {
+            'reads': 2, 'readsShared': 0, 'commands': 0, 'commandsShared': 0
+        }
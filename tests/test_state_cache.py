@@ -0,0 +1,118 @@
+"""Tests for the read-through state cache."""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from unittest.mock import patch
+import time
+import pytest
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.state_cache import StateCache
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+class RemoteThermostat(ThermostatAdapter):
+    """Thermostat counting (and optionally blocking) state reads."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+        self.gate = Event()
+        self.gate.set()
+    
+    def get_state(self):
+        self.reads += 1
+        self.gate.wait(5)
+        return super().get_state()
+
+
+class FakeClock:
+    """Controllable replacement for time.monotonic."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def setup():
+    """Create a manager with a cached remote thermostat and a fake clock."""
+    clock = FakeClock()
+    cache = StateCache(default_ttl=1.0, stale_ttl=10.0, max_entries=2)
+    manager = DeviceManager(state_cache=cache)
+    thermostat = RemoteThermostat('thermo1', 'Hallway Thermostat')
+    manager.register_device(thermostat)
+    with patch('smarthomeharmonizer.core.state_cache.time.monotonic', clock):
+        yield manager, cache, thermostat, clock
+    cache.shutdown()
+
+
+class TestStateCache:
+    """Test StateCache behavior through DeviceManager."""
+    
+    def test_fresh_entries_are_served_from_cache(self, setup):
+        """Test that reads within the TTL do not touch the adapter."""
+        manager, cache, thermostat, _ = setup
+        
+        for _ in range(5):
+            manager.get_device_state('thermo1')
+        manager.list_devices()
+        
+        assert thermostat.reads == 1
+        assert cache.get_metrics()['hits'] == 5
+    
+    def test_stale_while_revalidate(self, setup):
+        """Test that stale entries are served while refreshing in background."""
+        manager, cache, thermostat, clock = setup
+        manager.get_device_state('thermo1')
+        thermostat._state['currentTemperature'] = 65.0
+        
+        clock.now += 5
+        thermostat.gate.clear()
+        assert manager.get_device_state('thermo1')['currentTemperature'] == 70.0
+        assert manager.get_device_state('thermo1')['currentTemperature'] == 70.0
+        thermostat.gate.set()
+        cache.shutdown()
+        
+        assert manager.get_device_state('thermo1')['currentTemperature'] == 65.0
+        metrics = cache.get_metrics()
+        assert metrics['staleHits'] == 2
+        assert metrics['collapsed'] == 1
+        assert thermostat.reads == 2
+    
+    def test_concurrent_misses_collapse(self, setup):
+        """Test that simultaneous cold reads share one adapter call."""
+        manager, cache, thermostat, _ = setup
+        thermostat.gate.clear()
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(manager.get_device_state, 'thermo1') for _ in range(8)]
+            while cache.get_metrics()['misses'] < 8:
+                time.sleep(0.001)
+            thermostat.gate.set()
+            states = [future.result(5) for future in futures]
+        
+        assert thermostat.reads == 1
+        assert all(state['mode'] == 'off' for state in states)
+    
+    def test_command_invalidates(self, setup):
+        """Test that a command forces the next read to hit the adapter."""
+        manager, cache, _, _ = setup
+        manager.get_device_state('thermo1')
+        
+        manager.execute_command('thermo1', 'setMode', {'mode': 'cool'})
+        
+        assert manager.get_device_state('thermo1')['mode'] == 'cool'
+        assert cache.get_metrics()['misses'] == 2
+    
+    def test_lru_eviction(self, setup):
+        """Test that the cache stays within max_entries."""
+        manager, cache, _, _ = setup
+        for i in range(3):
+            manager.register_device(RemoteThermostat(f'extra{i}', f'Extra {i}'))
+            manager.get_device_state(f'extra{i}')
+        
+        metrics = cache.get_metrics()
+        assert metrics['entries'] == 2
+        assert metrics['evictions'] == 1
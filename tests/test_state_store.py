@@ -0,0 +1,116 @@
+"""Tests for the shared-memory state store."""
+
+import multiprocessing
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.state_store import SharedStateStore
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+
+
+def _worker_turn_on(store, device_id):
+    """Execute a command from a separate worker process."""
+    manager = DeviceManager(state_store=store)
+    manager.register_device(SmartLightAdapter(device_id, 'Worker Light'))
+    manager.execute_command(device_id, 'setBrightness', {'brightness': 42})
+    store.close()
+
+
+class TestSharedStateStore:
+    """Test SharedStateStore functionality."""
+    
+    @pytest.fixture
+    def store(self):
+        """Create a small shared state store."""
+        store = SharedStateStore(slots=8, slot_size=256)
+        yield store
+        store.close()
+        store.unlink()
+    
+    def test_register_and_read(self, store):
+        """Test registering a slot and reading it back."""
+        assert store.register('light1', {'powerState': 'OFF'}) is True
+        assert store.register('light1', {'powerState': 'ON'}) is False
+        
+        assert store.read('light1') == (1, {'powerState': 'OFF'})
+        assert store.read('missing') is None
+    
+    def test_write_bumps_version(self, store):
+        """Test that every write produces a new version."""
+        store.register('light1', {'powerState': 'OFF'})
+        
+        assert store.write('light1', {'powerState': 'ON'}) == 2
+        assert store.version('light1') == 2
+        assert store.read('light1') == (2, {'powerState': 'ON'})
+    
+    def test_state_too_large(self, store):
+        """Test that oversized states are rejected."""
+        with pytest.raises(ValueError, match="slot size"):
+            store.register('light1', {'blob': 'x' * 1024})
+    
+    def test_store_full(self, store):
+        """Test that registering beyond capacity raises error."""
+        for i in range(8):
+            store.register(f'light{i}', {})
+        
+        with pytest.raises(ValueError, match="full"):
+            store.register('light8', {})
+        assert sorted(store.device_ids()) == sorted(f'light{i}' for i in range(8))
+    
+    def test_release_frees_slot(self, store):
+        """Test that released slots are reused and versions keep rising."""
+        for i in range(8):
+            store.register(f'light{i}', {})
+        store.write('light3', {'powerState': 'ON'})
+        
+        assert store.release('light3') is True
+        assert store.release('light3') is False
+        assert store.read('light3') is None
+        assert 'light3' not in store.device_ids()
+        
+        assert store.register('light8', {'powerState': 'OFF'}) is True
+        assert store.read('light8')[0] > 2
+        # Devices probed past the tombstone are still found
+        for i in (0, 1, 2, 4, 5, 6, 7):
+            assert store.read(f'light{i}') == (1, {})
+    
+    def test_reregister_gets_fresh_state(self, store):
+        """Test that a re-registered device does not adopt its old state."""
+        manager = DeviceManager(state_store=store)
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        manager.execute_command('light1', 'turnOn')
+        
+        manager.unregister_device('light1')
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        
+        assert manager.get_device_state('light1')['powerState'] == 'OFF'
+        assert store.device_ids() == ['light1']
+    
+    def test_state_visible_across_processes(self, store):
+        """Test that a command in one process is seen by another."""
+        manager = DeviceManager(state_store=store)
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        
+        worker = multiprocessing.Process(target=_worker_turn_on, args=(store, 'light1'))
+        worker.start()
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+        
+        assert manager.get_device_state('light1')['brightness'] == 42
+        
+        # Commands in this process build on the other worker's state
+        state = manager.execute_command('light1', 'turnOn')
+        assert state['brightness'] == 42
+        assert state['powerState'] == 'ON'
+    
+    def test_app_reads_shared_state(self, store):
+        """Test that API reads are served from the shared store."""
+        manager = DeviceManager(state_store=store)
+        manager.register_device(SmartLightAdapter('light1', 'Living Room Light'))
+        store.write('light1', {'powerState': 'ON', 'brightness': 10,
+                               'color': {'r': 0, 'g': 0, 'b': 0}})
+        
+        client = create_app(manager).test_client()
+        
+        response = client.get('/api/v1/devices/light1')
+        assert response.get_json()['state']['brightness'] == 10
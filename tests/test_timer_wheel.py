@@ -0,0 +1,162 @@
+"""Tests for the timing wheel and timed device transitions."""
+
+import pickle
+import time
+import pytest
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.timer_wheel import TimerWheel
+from smarthomeharmonizer.adapters.coffee_maker import CoffeeMakerAdapter
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestTimerWheel:
+    """Test TimerWheel functionality."""
+    
+    def setup_method(self):
+        """Set up a small wheel so tests cross every level."""
+        self.clock = FakeClock()
+        self.wheel = TimerWheel(tick=1.0, slots=4, levels=3, clock=self.clock)
+        self.fired = []
+    
+    def run_until(self, seconds):
+        for _ in range(int(seconds)):
+            self.clock.now += 1.0
+            self.wheel.advance()
+    
+    def test_fires_in_deadline_order_across_levels(self):
+        """Test that timers cascade from coarse levels and fire on their tick."""
+        for delay in (50, 3, 17, 4, 63, 2.5):
+            self.wheel.schedule(delay,
+                                lambda d=delay: self.fired.append((d, self.clock.now - 1000)))
+        
+        self.run_until(70)
+        assert self.fired == [(3, 3.0), (2.5, 3.0), (4, 4.0), (17, 17.0), (50, 50.0), (63, 63.0)]
+        metrics = self.wheel.get_metrics()
+        assert metrics['fired'] == 6
+        assert metrics['pending'] == 0
+        assert metrics['cascaded'] > 0
+    
+    def test_beyond_the_coarsest_level(self):
+        """Test a delay longer than the wheel covers."""
+        self.wheel.schedule(200, self.fired.append, 'late')
+        self.run_until(199)
+        assert self.fired == []
+        self.run_until(1)
+        assert self.fired == ['late']
+    
+    def test_cancel(self):
+        """Test that cancelled timers never fire."""
+        keep = self.wheel.schedule(10, self.fired.append, 'keep')
+        drop = self.wheel.schedule(10, self.fired.append, 'drop')
+        assert drop.cancel() is True
+        assert drop.cancel() is False
+        assert self.wheel.pending == 1
+        
+        self.run_until(10)
+        assert self.fired == ['keep']
+        assert keep.cancel() is False
+        assert self.wheel.get_metrics()['cancelled'] == 1
+    
+    def test_catch_up_after_pause(self):
+        """Test that overdue timers all fire after a long pause, in order."""
+        for delay in (30, 5, 12):
+            self.wheel.schedule(delay, self.fired.append, delay)
+        self.clock.now += 3600
+        assert self.wheel.advance() == 3
+        assert self.fired == [5, 12, 30]
+        assert self.wheel.get_metrics()['lateness']['count'] == 3
+    
+    def test_callback_errors_are_isolated(self):
+        """Test that a failing callback does not stop later ones."""
+        self.wheel.schedule(1, lambda: 1 / 0)
+        self.wheel.schedule(1, self.fired.append, 'ok')
+        self.run_until(1)
+        assert self.fired == ['ok']
+        assert self.wheel.get_metrics()['errors'] == 1
+    
+    def test_driver_thread(self):
+        """Test firing on the real clock through the driver thread."""
+        wheel = TimerWheel(tick=0.01)
+        wheel.start()
+        try:
+            wheel.schedule(0.02, self.fired.append, 'done')
+            deadline = time.monotonic() + 2
+            while not self.fired and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            wheel.stop()
+        assert self.fired == ['done']
+    
+    def test_invalid_configuration(self):
+        """Test that degenerate wheels are rejected."""
+        with pytest.raises(ValueError):
+            TimerWheel(tick=0)
+        with pytest.raises(ValueError):
+            TimerWheel(slots=1)
+
+
+class TestTimedTransitions:
+    """Test adapters' delayed state transitions through the manager."""
+    
+    def setup_method(self):
+        """Set up a manager with a manually driven wheel."""
+        self.clock = FakeClock()
+        self.wheel = TimerWheel(tick=1.0, clock=self.clock)
+        self.manager = DeviceManager(timers=self.wheel)
+        self.manager.register_device(CoffeeMakerAdapter('coffee1', 'Coffee'))
+        self.manager.execute_command('coffee1', 'turnOn')
+    
+    def advance(self, seconds):
+        self.clock.now += seconds
+        self.wheel.advance()
+    
+    def test_brew_finishes(self):
+        """Test that a brew completes after the time for its size."""
+        seen = []
+        self.manager.add_listener(lambda device_id, state: seen.append(state['brewing']))
+        self.manager.execute_command('coffee1', 'setSize', {'size': 'small'})
+        self.manager.execute_command('coffee1', 'brew')
+        self.advance(59)
+        assert self.manager.get_device_state('coffee1')['brewing'] is True
+        
+        self.advance(1)
+        state = self.manager.get_device_state('coffee1')
+        assert state['brewing'] is False
+        assert state['lastBrewTime'] is not None
+        assert seen == [False, True, False]
+    
+    def test_turn_off_cancels_brew(self):
+        """Test that a stale brew timer does not end a later brew."""
+        self.manager.execute_command('coffee1', 'brew')
+        self.manager.execute_command('coffee1', 'turnOff')
+        self.manager.execute_command('coffee1', 'turnOn')
+        self.advance(60)
+        self.manager.execute_command('coffee1', 'brew')
+        self.advance(61)
+        assert self.manager.get_device_state('coffee1')['brewing'] is True
+        assert self.wheel.get_metrics()['cancelled'] == 1
+        
+        self.manager.unregister_device('coffee1')
+        assert self.wheel.pending == 0
+    
+    def test_adapter_without_timers(self):
+        """Test that unbound adapters keep their state and stay picklable."""
+        adapter = pickle.loads(pickle.dumps(self.manager.get_device('coffee1')))
+        adapter.execute_command('brew')
+        assert adapter.get_state()['brewing'] is True
+        assert self.wheel.pending == 0
+    
+    def test_update_state_expected(self):
+        """Test that mismatched expectations leave the state untouched."""
+        assert self.manager.update_state('coffee1', {'waterLevel': 5},
+                                         expected={'brewing': True}) is False
+        assert self.manager.get_device_state('coffee1')['waterLevel'] == 100
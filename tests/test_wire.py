@@ -0,0 +1,146 @@
+"""Tests for MessagePack and CBOR wire formats."""
+
+import gzip
+import pytest
+from smarthomeharmonizer.core.app import create_app
+from smarthomeharmonizer.core.compression import ResponseCompressor
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.wire import (
+    msgpack_dumps, msgpack_loads, cbor_dumps, cbor_loads,
+    MSGPACK_MIMETYPE, CBOR_MIMETYPE
+)
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.thermostat import ThermostatAdapter
+
+
+SAMPLES = [
+    None, True, False, 0, 127, 128, -1, -32, -33, -200, 70000, -70000, 2 ** 40,
+    -2 ** 63, 2 ** 64 - 1, 72.0, 0.1, float('inf'), '', 'x' * 31, 'ü' * 200,
+    'y' * 70000, b'\x00\xff', list(range(20)), {f'k{i}': i for i in range(20)},
+    {'state': {'powerState': 'ON', 'brightness': 80, 'color': None}}
+]
+
+
+class TestCodecs:
+    """Test the pure-Python encoders and decoders."""
+    
+    @pytest.mark.parametrize('dumps,loads', [(msgpack_dumps, msgpack_loads),
+                                             (cbor_dumps, cbor_loads)])
+    def test_round_trip(self, dumps, loads):
+        """Test that every JSON value type survives encoding."""
+        for sample in SAMPLES:
+            assert loads(dumps(sample)) == sample
+    
+    def test_compact_floats(self):
+        """Test that exact floats use the narrowest encoding."""
+        assert len(msgpack_dumps(72.0)) == 5
+        assert len(msgpack_dumps(0.1)) == 9
+        assert cbor_dumps(72.5) == b'\xf9\x54\x88'
+    
+    def test_cbor_indefinite_lengths(self):
+        """Test that streamed CBOR containers are accepted."""
+        assert cbor_loads(bytes([0x9f, 0x01, 0x02, 0xff])) == [1, 2]
+        assert cbor_loads(bytes([0xbf, 0x61, 0x61, 0x01, 0xff])) == {'a': 1}
+        assert cbor_loads(bytes([0x7f, 0x61, 0x61, 0x61, 0x62, 0xff])) == 'ab'
+    
+    @pytest.mark.parametrize('loads,data', [
+        (msgpack_loads, b''), (msgpack_loads, b'\x92\x01'), (msgpack_loads, b'\xc1'),
+        (msgpack_loads, b'\x01\x02'), (cbor_loads, b'\x82\x01'), (cbor_loads, b'\xff'),
+        (cbor_loads, b'\x1c')
+    ])
+    def test_malformed_data(self, loads, data):
+        """Test that truncated or invalid data raises ValueError."""
+        with pytest.raises(ValueError):
+            loads(data)
+
+
+class TestBinaryApi:
+    """Test wire format negotiation through the API."""
+    
+    def setup_method(self):
+        """Set up an app with two devices."""
+        self.manager = DeviceManager()
+        self.manager.register_device(SmartLightAdapter('light1', 'Light'))
+        self.manager.register_device(ThermostatAdapter('thermo1', 'Thermostat'))
+        self.client = create_app(self.manager).test_client()
+    
+    def test_state_as_msgpack(self):
+        """Test that Accept selects MessagePack responses."""
+        response = self.client.get('/api/v1/devices/thermo1/state',
+                                   headers={'Accept': MSGPACK_MIMETYPE})
+        assert response.mimetype == MSGPACK_MIMETYPE
+        assert 'Accept' in response.headers['Vary']
+        assert response.headers['ETag'] == '"0-msgpack"'
+        body = msgpack_loads(response.data)
+        assert body['state']['targetTemperature'] == 72.0
+        assert len(response.data) < len(self.client.get('/api/v1/devices/thermo1/state').data)
+    
+    def test_json_stays_default(self):
+        """Test that clients without a binary preference get JSON."""
+        for accept in (None, '*/*', f'application/json, {CBOR_MIMETYPE};q=0.5'):
+            headers = {'Accept': accept} if accept else {}
+            response = self.client.get('/api/v1/devices', headers=headers)
+            assert response.mimetype == 'application/json'
+    
+    def test_binary_command(self):
+        """Test a CBOR command answered in CBOR, then made conditional."""
+        response = self.client.post(
+            '/api/v1/devices/light1/command',
+            data=cbor_dumps({'command': 'setBrightness', 'parameters': {'brightness': 40}}),
+            content_type=CBOR_MIMETYPE, headers={'Accept': CBOR_MIMETYPE}
+        )
+        assert response.status_code == 200
+        assert cbor_loads(response.data)['state']['brightness'] == 40
+        
+        # The format suffix does not break If-Match
+        response = self.client.post(
+            '/api/v1/devices/light1/command',
+            data=cbor_dumps({'command': 'turnOn'}), content_type=CBOR_MIMETYPE,
+            headers={'If-Match': response.headers['ETag']}
+        )
+        assert response.status_code == 200
+        assert response.get_json()['state']['powerState'] == 'ON'
+    
+    def test_binary_batch_and_errors(self):
+        """Test a MessagePack batch and a malformed binary body."""
+        commands = [{'deviceId': 'light1', 'command': 'turnOn'},
+                    {'deviceId': 'thermo1', 'command': 'setTemperature',
+                     'parameters': {'temperature': 68.5}}]
+        response = self.client.post('/api/v1/commands/batch',
+                                    data=msgpack_dumps({'commands': commands}),
+                                    content_type='application/x-msgpack',
+                                    headers={'Accept': MSGPACK_MIMETYPE})
+        results = msgpack_loads(response.data)['results']
+        assert [r['success'] for r in results] == [True, True]
+        assert self.manager.get_device_state('thermo1')['targetTemperature'] == 68.5
+        
+        response = self.client.post('/api/v1/devices/light1/command', data=b'\x92\x01',
+                                    content_type=MSGPACK_MIMETYPE,
+                                    headers={'Accept': MSGPACK_MIMETYPE})
+        assert response.status_code == 400
+        assert msgpack_loads(response.data)['success'] is False
+        
+        metrics = self.manager.get_metrics()['wireFormats']
+        assert metrics['decoded']['msgpack'] == 1
+        assert metrics['encoded']['msgpack'] == 2
+    
+    def test_idempotency_key_across_formats(self):
+        """Test that a binary retry of a JSON request is replayed."""
+        headers = {'Idempotency-Key': 'abc'}
+        body = {'command': 'turnOn'}
+        self.client.post('/api/v1/devices/light1/command', json=body, headers=headers)
+        response = self.client.post('/api/v1/devices/light1/command', data=msgpack_dumps(body),
+                                    content_type=MSGPACK_MIMETYPE, headers=headers)
+        assert response.status_code == 200
+        assert response.headers['Idempotent-Replayed'] == 'true'
+    
+    def test_binary_bodies_are_compressed(self):
+        """Test that large binary responses are still compressed."""
+        for i in range(100):
+            self.manager.register_device(SmartLightAdapter(f'extra{i}', f'Extra {i}'))
+        client = create_app(self.manager, compressor=ResponseCompressor(min_size=512)).test_client()
+        response = client.get('/api/v1/devices',
+                              headers={'Accept': MSGPACK_MIMETYPE, 'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'].endswith('-msgpack-gzip"')
+        assert len(msgpack_loads(gzip.decompress(response.data))['devices']) == 102
@@ -0,0 +1,157 @@
+"""Tests for write-behind command execution."""
+
+import time
+import pytest
+from smarthomeharmonizer.core.device_manager import DeviceManager
+from smarthomeharmonizer.core.exceptions import AdapterError, InvalidCommandError
+from smarthomeharmonizer.core.state_store import SharedStateStore
+from smarthomeharmonizer.core.write_behind import WriteBehind
+from smarthomeharmonizer.adapters.smart_light import SmartLightAdapter
+from smarthomeharmonizer.adapters.http_device import HttpDeviceAdapter
+
+
+class RemoteLight(SmartLightAdapter):
+    """Slow light whose hardware can fail or drift from predictions."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = 0.1
+        self.fail = False
+        self.brightness_cap = 100
+    
+    def predict_state(self, command, parameters=None, state=None):
+        scratch = SmartLightAdapter(self.device_id, self.name)
+        scratch.restore_state(self._state if state is None else state)
+        return scratch.execute_command(command, parameters)
+    
+    def execute_command(self, command, parameters=None):
+        time.sleep(self.delay)
+        if self.fail:
+            raise AdapterError('Light is offline')
+        super().execute_command(command, parameters)
+        self._state['brightness'] = min(self._state['brightness'], self.brightness_cap)
+        return self.get_state()
+
+
+class TestWriteBehind:
+    """Test WriteBehind through DeviceManager."""
+    
+    def setup_method(self):
+        """Set up a write-behind manager with a slow remote light."""
+        self.write_behind = WriteBehind()
+        self.manager = DeviceManager(write_behind=self.write_behind)
+        self.light = RemoteLight('light1', 'Porch Light')
+        self.manager.register_device(self.light)
+        self.published = []
+        self.manager.add_listener(lambda device_id, state: self.published.append(dict(state)))
+    
+    def teardown_method(self):
+        """Stop background workers."""
+        self.write_behind.shutdown()
+    
+    def test_answers_before_the_device(self):
+        """Test that callers get the predicted state immediately."""
+        started = time.monotonic()
+        state = self.manager.execute_command('light1', 'turnOn')
+        assert time.monotonic() - started < self.light.delay
+        assert state['powerState'] == 'ON'
+        assert self.manager.get_device_state('light1')['powerState'] == 'ON'
+        assert self.light._state['powerState'] == 'OFF'
+        
+        self.write_behind.shutdown()
+        metrics = self.manager.get_metrics()['writeBehind']
+        assert metrics['confirmed'] == 1
+        assert metrics['pending'] == 0
+        assert metrics['latencySaved']['count'] == 1
+        assert self.light._state['powerState'] == 'ON'
+    
+    def test_commands_apply_in_order(self):
+        """Test that queued writes build on each other and land in order."""
+        self.light.delay = 0.02
+        self.manager.execute_command('light1', 'turnOn')
+        for brightness in (10, 20, 30):
+            state = self.manager.execute_command('light1', 'setBrightness',
+                                                 {'brightness': brightness})
+        assert state == {'powerState': 'ON', 'brightness': 30,
+                         'color': {'r': 255, 'g': 255, 'b': 255}}
+        
+        self.write_behind.shutdown()
+        assert self.light.get_state() == state
+        assert self.write_behind.get_metrics()['confirmed'] == 4
+    
+    def test_mismatch_is_reconciled(self):
+        """Test that the device's actual state replaces a wrong prediction."""
+        self.light.brightness_cap = 80
+        state = self.manager.execute_command('light1', 'setBrightness', {'brightness': 90})
+        assert state['brightness'] == 90
+        
+        self.write_behind.shutdown()
+        assert self.published[-1]['brightness'] == 80
+        assert self.manager.get_device_state('light1')['brightness'] == 80
+        metrics = self.write_behind.get_metrics()
+        assert metrics['reconciled'] == 1
+        assert metrics['reconcileRate'] == 1.0
+    
+    def test_failure_is_rolled_back(self):
+        """Test that a failed write republishes the device's real state."""
+        self.light.fail = True
+        self.manager.execute_command('light1', 'turnOn')
+        
+        self.write_behind.shutdown()
+        assert [s['powerState'] for s in self.published] == ['ON', 'OFF']
+        assert self.manager.get_device_state('light1')['powerState'] == 'OFF'
+        assert self.write_behind.get_metrics()['rollbackRate'] == 1.0
+    
+    def test_invalid_commands_fail_synchronously(self):
+        """Test that validation errors reach the caller and queue nothing."""
+        with pytest.raises(InvalidCommandError):
+            self.manager.execute_command('light1', 'fly')
+        with pytest.raises(AdapterError):
+            self.manager.execute_command('light1', 'setBrightness', {'brightness': 500})
+        assert self.write_behind.get_metrics()['optimistic'] == 0
+        assert self.published == []
+    
+    def test_unpredictable_commands_run_synchronously(self):
+        """Test that adapters without predictions keep the normal path."""
+        class Gateway(HttpDeviceAdapter):
+            COMMAND_REQUESTS = {'reboot': ('POST', '/reboot', None)}
+            
+            def request(self, method, path, body=None):
+                return {'rebooted': True}
+        
+        self.manager.register_device(Gateway('gw1', 'Gateway', 'http://gateway.local'))
+        state = self.manager.execute_command('gw1', 'reboot')
+        assert state == {'rebooted': True}
+        assert self.write_behind.get_metrics()['synchronous'] == 1
+    
+    def test_synchronous_commands_wait_for_pending_writes(self):
+        """Test that reads and unpredictable commands never overtake queued writes."""
+        self.light.delay = 0.05
+        self.manager.execute_command('light1', 'turnOn')
+        self.manager.execute_command('light1', 'setBrightness', {'brightness': 40})
+        
+        state = self.manager.execute_command('light1', 'getStatus')
+        assert state['powerState'] == 'ON'
+        assert state['brightness'] == 40
+        assert self.light._state['brightness'] == 40
+        assert self.write_behind.get_metrics()['serialized'] == 1
+    
+    def test_errors_of_queued_commands_reach_the_caller(self):
+        """Test that a failing synchronous command behind writes raises."""
+        self.manager.execute_command('light1', 'turnOn')
+        self.light.fail = True
+        with pytest.raises(AdapterError):
+            self.manager.execute_command('light1', 'getStatus')
+        
+        self.write_behind.shutdown()
+        assert self.write_behind.get_metrics()['rolledBack'] == 1
+    
+    def test_state_store_is_rejected(self):
+        """Test that write-behind refuses a shared state store."""
+        store = SharedStateStore(slots=8, slot_size=256)
+        try:
+            with pytest.raises(ValueError):
+                DeviceManager(state_store=store, write_behind=WriteBehind())
+        finally:
+            store.close()
+            store.unlink()